@@ -98,8 +98,10 @@ from AnomalyDetector_Ensemble import AnomalyDetector_Ensemble
 
 from utils.DataframeUtils import DataframeUtils, ScalerType
 from utils.DataframePopulator import DataframePopulator, DatasetType
+from utils.DataframeCache import DataframeCache
 import utils.TrainingSignals as TrainingSignals
 from utils.Environment import Environment
+import utils.profiler as profiler
 
 """
 ####################################################################################
@@ -199,8 +201,12 @@ class Anomaly(IStrategy):
     compress_data = True
     scaler_type = ScalerType.Robust # scaler type used for normalisation
 
+    # re-use the results of populate_indicators() from previous hyperopt runs (see utils/DataframeCache.py)
+    use_dataframe_cache = True
+
     dataframeUtils = None
     dataframePopulator = None
+    dataframeCache = None
 
     num_pairs = 0
     buy_classifier = None
@@ -360,6 +366,13 @@ class Anomaly(IStrategy):
 
     ###################################
 
+    def bot_start(self, **kwargs) -> None:
+        # stage timing (if enabled in the config)
+        profiler.configure(self.config, self.dp.runmode.value if self.dp else "")
+        return
+
+    ###################################
+
     def print_strategy_info(self):
 
         print("")
@@ -407,6 +420,7 @@ class Anomaly(IStrategy):
     Indicator Definitions
     """
 
+    @profiler.timed('populate')
     def populate_indicators(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
 
         # Base pair inf timeframe indicators
@@ -436,8 +450,19 @@ class Anomaly(IStrategy):
             self.dataframePopulator.n_loss_stddevs = self.n_loss_stddevs
             self.dataframePopulator.n_profit_stddevs = self.n_profit_stddevs
 
+        # in hyperopt, nothing below depends on the hyperopt parameters, so re-use previous results if possible
+        if self.dataframeCache is None:
+            self.dataframeCache = DataframeCache(self, str(Path(__file__).parent) + "/cache",
+                                                 params=self.get_cache_params(), files=self.get_cache_files())
+            self.dataframeCache.enabled = self.use_dataframe_cache and (self.dp.runmode.value in ('hyperopt'))
+
+        cached_df = self.dataframeCache.load(curr_pair, dataframe)
+        if cached_df is not None:
+            return cached_df
+
         # populate the normal dataframe
-        dataframe = self.dataframePopulator.add_indicators(dataframe)
+        with profiler.stage('indicators'):
+            dataframe = self.dataframePopulator.add_indicators(dataframe)
         # dataframe = self.add_indicators(dataframe)
 
         if Anomaly.first_time:
@@ -491,8 +516,48 @@ class Anomaly(IStrategy):
             print("    updating stoploss data...")
         self.add_stoploss_indicators(dataframe, curr_pair)
 
+        self.dataframeCache.save(curr_pair, dataframe)
+
         return dataframe
 
+    # non-hyperoptable settings that affect the output of populate_indicators(). Used to identify cached results,
+    # so add to this in subclasses if they have extra settings
+    def get_cache_params(self) -> dict:
+        cls = self.__class__
+        return {
+            'dataset_type': cls.dataset_type,
+            'signal_type': cls.signal_type,
+            'classifier_type': cls.classifier_type,
+            'lookahead_hours': cls.lookahead_hours,
+            'startup_candle_count': cls.startup_candle_count,
+            'compress_data': cls.compress_data,
+            'scaler_type': cls.scaler_type,
+            # the sell classifier is only trained if exit signals are enabled (value is fixed during hyperopt)
+            'enable_exit_signal': self.enable_exit_signal.value
+        }
+
+    # saved model files. Used to identify cached results, so that retrained/replaced models are not ignored
+    def get_cache_files(self) -> list:
+        detector_classes = {
+            self.ClassifierType.LSTMAutoEncoder: AnomalyDetector_LSTM,
+            self.ClassifierType.MLPAutoEncoder: AnomalyDetector_AEnc,
+            self.ClassifierType.LocalOutlierFactor: AnomalyDetector_LOF,
+            self.ClassifierType.KMeans: AnomalyDetector_KMeans,
+            self.ClassifierType.IsolationForest: AnomalyDetector_IFOR,
+            self.ClassifierType.EllipticEnvelope: AnomalyDetector_EE,
+            self.ClassifierType.OneClassSVM: AnomalyDetector_SVM,
+            self.ClassifierType.PCA: AnomalyDetector_PCA,
+            self.ClassifierType.GaussianMixture: AnomalyDetector_GMix,
+            self.ClassifierType.DBSCAN: AnomalyDetector_DBSCAN,
+            self.ClassifierType.Ensemble: AnomalyDetector_Ensemble
+        }
+        if self.classifier_type not in detector_classes:
+            return []
+
+        # the detectors save their models in utils/models/<detector class>/ (see ClassifierSklearn)
+        models_dir = Path(__file__).parent.parent / "utils" / "models"
+        return [str(models_dir / detector_classes[self.classifier_type].__name__)]
+
     ###################################
     
     # fast curve smoothing utility
@@ -543,6 +608,7 @@ class Anomaly(IStrategy):
     ################################
 
     # creates the buy/sell labels absed on looking ahead into the supplied dataframe
+    @profiler.timed('labelling')
     def create_training_data(self, dataframe: DataFrame):
 
         # future_df = self.add_future_data(dataframe.copy())
@@ -669,6 +735,7 @@ class Anomaly(IStrategy):
 
     # train the PCA reduction and classification models
 
+    @profiler.timed('training')
     def train_models(self, curr_pair, dataframe: DataFrame, buys, sells) -> DataFrame:
 
         # check input - need at least 2 samples or classifiers will not train
@@ -683,7 +750,8 @@ class Anomaly(IStrategy):
 
         rand_st = 27  # use fixed number for reproducibility
 
-        full_df_norm = self.dataframeUtils.norm_dataframe(dataframe)
+        with profiler.stage('normalisation'):
+            full_df_norm = self.dataframeUtils.norm_dataframe(dataframe)
 
 
         if self.compress_data:
@@ -744,6 +812,18 @@ class Anomaly(IStrategy):
         test_buy_labels = self.dataframeUtils.get_binary_labels(test_buys)
         test_sell_labels = self.dataframeUtils.get_binary_labels(test_sells)
 
+        # dates of the training samples (used by classifiers that are updated incrementally rather than refitted)
+        train_dates = dataframe['date'].iloc[:df_train.shape[0]]
+        self.buy_classifier.set_train_dates(train_dates)
+        if self.enable_exit_signal.value:
+            self.sell_classifier.set_train_dates(train_dates)
+
+        # incremental updates (and saved state) are only used in live/dry-run modes, other modes do a full fit
+        live_mode = self.dp.runmode.value in ('live', 'dry_run')
+        self.buy_classifier.set_live_mode(live_mode)
+        if self.enable_exit_signal.value:
+            self.sell_classifier.set_live_mode(live_mode)
+
         # force train/fit the classifiers in backtest mode only
         force_train = True if (self.dp.runmode.value in ('backtest')) else False
 
@@ -791,6 +871,7 @@ class Anomaly(IStrategy):
         return dataframe
 
     # compress the supplied dataframe
+    @profiler.timed('compression')
     def compress_dataframe(self, df_norm: DataFrame) -> DataFrame:
         if not self.compressor:
             self.compressor = self.get_compressor(df_norm)
@@ -865,6 +946,7 @@ class Anomaly(IStrategy):
         # print (predict)
         return predict
 
+    @profiler.timed('prediction')
     def predict_buy(self, df: DataFrame, pair):
         clf = self.buy_classifier
 
@@ -882,6 +964,7 @@ class Anomaly(IStrategy):
 
         return predict
 
+    @profiler.timed('prediction')
     def predict_sell(self, df: DataFrame, pair):
         clf = self.sell_classifier
         if clf is None:
@@ -927,6 +1010,7 @@ class Anomaly(IStrategy):
     Buy Signal
     """
 
+    @profiler.timed('signals')
     def populate_entry_trend(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
         conditions = []
         dataframe.loc[:, 'enter_tag'] = ''
@@ -984,6 +1068,7 @@ class Anomaly(IStrategy):
     Sell Signal
     """
 
+    @profiler.timed('signals')
     def populate_exit_trend(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
         conditions = []
         dataframe.loc[:, 'exit_tag'] = ''
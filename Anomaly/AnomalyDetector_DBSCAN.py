@@ -43,6 +43,7 @@ from keras import layers
 from sklearn.svm import OneClassSVM
 
 from ClassifierSklearn import ClassifierSklearn
+from ScalableNeighbours import dbscan_labels
 
 
 import h5py
@@ -52,10 +53,19 @@ class AnomalyDetector_DBSCAN(ClassifierSklearn):
     classifier = None
     clean_data_required = False # training data can contain anomalies
 
+    max_samples = 20000  # max number of samples clustered directly, the rest are assigned to the nearest cluster
+    leaf_size = 40  # leaf size of the neighbour search tree
+    eps = 0.00001  # max distance between neighbours (see Anomaly/bench_neighbours.py)
+
     def create_classifier(self):
         classifier = DBSCAN(eps=1.0)
         return classifier
 
+    # clusters are found in predict(), so there is nothing to fit (fitting would just cluster the training data and
+    # throw the result away)
+    def model_fit(self, df, labels):
+        return self.model
+
     # DBSCAN is different in that it doesn't really match the usual fit/predict model
     # So, need to override the predict() method of the base class
     def predict(self, df_norm: DataFrame):
@@ -70,8 +80,8 @@ class AnomalyDetector_DBSCAN(ClassifierSklearn):
         else:
             min_samples = int(num_samples * 0.05)
         print(f'num_samples: {num_samples} self.contamination:{self.contamination} min_samples: {min_samples}')
-        db = DBSCAN(eps=0.00001, min_samples=min_samples).fit(df_norm)
-        labels = db.labels_
+        labels = dbscan_labels(df_norm, eps=self.eps, min_samples=min_samples,
+                               max_samples=self.max_samples, leaf_size=self.leaf_size)
 
         no_clusters = len(np.unique(labels))
         no_noise = np.sum(np.array(labels) == -1, axis=0)
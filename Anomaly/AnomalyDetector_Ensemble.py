@@ -1,4 +1,13 @@
 # class that implements an Anomaly detector using a stacked ensemble of various anomaly detection techniques
+#
+# The base detectors are independent, so they are fitted (and run) at the same time, using threads (most of the work
+# is done in compiled sklearn code, and threads avoid copying the data and fitted models between processes). Cost is
+# then roughly that of the slowest detector rather than the sum of all of them.
+# Other optimisations:
+#   - OneClassSVM fitting is O(n^2) (or worse), so it is fitted to a random subsample of the training data
+#   - base detector predictions for the training data are cached, and re-used for any matching rows in predict()
+#     (training data is normally a subset of the data being predicted)
+#   - fitting is skipped if the training data is the same as the previous fit
 
 import sys
 from pathlib import Path
@@ -40,6 +49,7 @@ log = logging.getLogger(__name__)
 warnings.simplefilter(action='ignore', category=pd.errors.PerformanceWarning)
 
 from sklearn.ensemble import IsolationForest, StackingClassifier, RandomForestClassifier
+from joblib import Parallel, delayed
 from ClassifierSklearn import ClassifierSklearn
 
 
@@ -49,52 +59,96 @@ class AnomalyDetector_Ensemble(ClassifierSklearn):
     clean_data_required = True  # training data should not contain anomalies
     use_scores = False
 
+    n_jobs = -1  # number of base detectors fitted/run at the same time. -1: all of them
+    svm_max_samples = 8192  # max number of samples used to fit OneClassSVM. 0: use all samples
+
     c1 = None
     c2 = None
     c3 = None
     c4 = None
     c_ensemble = None
 
+    train_key = None  # identifies the data used for the last fit
+    train_hashes = None  # row hashes of the training data (pd.Series, hash -> row)
+    train_features = None  # base detector predictions for the training data
+
     def create_classifier(self):
         self.c1 = IsolationForest(contamination=self.contamination)
         # self.c2 = GaussianMixture(reg_covar=1e-5, n_components=2)
         self.c3 = LocalOutlierFactor(n_neighbors=30, novelty=True, contamination=self.contamination)
         self.c4 = OneClassSVM(gamma='scale', nu=self.contamination)
         self.c_ensemble = IsolationForest(contamination=self.contamination)
+        self.train_key = None  # new (unfitted) detectors
         return self.c_ensemble
 
+    def get_detectors(self):
+        # return [self.c1, self.c2, self.c3, self.c4]
+        return [self.c1, self.c3, self.c4]
+
+    # hash of each row, used to match rows against the training data
+    def hash_rows(self, df) -> np.ndarray:
+        return pd.util.hash_pandas_object(pd.DataFrame(df), index=False).to_numpy()
+
+    # fit a single base detector. OneClassSVM is fitted to a (repeatable) random subsample
+    def fit_detector(self, detector, df, labels):
+        if isinstance(detector, OneClassSVM) and (self.svm_max_samples > 0) and (len(df) > self.svm_max_samples):
+            rng = np.random.default_rng(seed)
+            idx = np.sort(rng.choice(len(df), self.svm_max_samples, replace=False))
+            df = df.iloc[idx] if isinstance(df, pd.DataFrame) else df[idx]
+            labels = None
+        return detector.fit(df, labels)
+
+    # predictions from each base detector (one column per detector), run in parallel
+    def get_features(self, df) -> np.ndarray:
+        preds = Parallel(n_jobs=self.n_jobs, prefer='threads')(
+            delayed(detector.predict)(df) for detector in self.get_detectors()
+        )
+        return np.column_stack(preds)
+
     def model_fit(self, df, labels):
 
+        # base detectors are not saved with the model, so create them if the model was loaded from file
+        if self.c1 is None:
+            self.create_classifier()
+
+        # nothing to do if the data has not changed since the last fit
+        hashes = self.hash_rows(df)
+        key = hash(hashes.tobytes())
+        if (key == self.train_key) and (self.train_features is not None):
+            return self.c_ensemble
+
         # fit all of the classifiers
-        self.c1.fit(df, labels)
-        # self.c2.fit(df, labels)
-        self.c3.fit(df, labels)
-        self.c4.fit(df, labels)
+        Parallel(n_jobs=self.n_jobs, prefer='threads')(
+            delayed(self.fit_detector)(detector, df, labels) for detector in self.get_detectors()
+        )
 
-        # get predictions from each algorithm
-        y1 = self.c1.predict(df)
-        # y2 = self.c2.predict(df)
-        y3 = self.c3.predict(df)
-        y4 = self.c4.predict(df)
+        # get predictions from each algorithm, and keep them for re-use in model_predict()
+        X_new = self.get_features(df)
+        self.train_features = X_new
+        self.train_hashes = pd.Series(np.arange(len(hashes)), index=hashes)
+        self.train_hashes = self.train_hashes[~self.train_hashes.index.duplicated()]
+        self.train_key = key
 
         # Fit ensemble classifier using predictions from each algorithm
-        # X_new = np.column_stack((y1, y2, y3, y4))
-        X_new = np.column_stack((y1, y3, y4))
-        # X_new = np.column_stack((y1, y2, y3))
         self.c_ensemble.fit(X_new, labels)
 
         return self.c_ensemble
 
     def model_predict(self, df):
 
-        # get predictions from each algorithm
-        y1 = self.c1.predict(df)
-        # y2 = self.c2.predict(df)
-        y3 = self.c3.predict(df)
-        y4 = self.c4.predict(df)
+        # re-use the base predictions for rows that were in the training data, run the detectors on the rest
+        X_new = np.empty((np.shape(df)[0], len(self.get_detectors())))
+        pos = np.full(np.shape(df)[0], -1)
+        if self.train_hashes is not None:
+            pos = self.train_hashes.reindex(self.hash_rows(df)).fillna(-1).to_numpy(dtype=int)
+
+        cached = pos >= 0
+        if cached.any():
+            X_new[cached] = self.train_features[pos[cached]]
+
+        if not cached.all():
+            todo = np.flatnonzero(~cached)
+            X_new[todo] = self.get_features(df.iloc[todo] if isinstance(df, pd.DataFrame) else df[todo])
 
         # run ensemble classifier using predictions from each algorithm
-        # X_new = np.column_stack((y1, y2, y3, y4))
-        X_new = np.column_stack((y1, y3, y4))
-        # X_new = np.column_stack((y1, y2, y3))
-        return self.c_ensemble.predict(X_new)
\ No newline at end of file
+        return self.c_ensemble.predict(X_new)
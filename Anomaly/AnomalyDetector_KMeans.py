@@ -39,7 +39,7 @@ tf.compat.v1.logging.set_verbosity(tf.compat.v1.logging.WARN)
 
 #import keras
 from keras import layers
-from sklearn.cluster import KMeans
+from IncrementalModels import IncrementalKMeans
 from ClassifierSklearn import ClassifierSklearn
 
 import h5py
@@ -49,8 +49,10 @@ class AnomalyDetector_KMeans(ClassifierSklearn):
     classifier = None
     clean_data_required = False # training data should not contain anomalies
 
+    incremental = True  # update with new candles (partial_fit) instead of refitting
+    memory = 1008  # time constant (samples) of the model history, similar to refitting on 2 * memory. 0: keep all
 
     def create_classifier(self):
-        classifier = KMeans(n_clusters=2)
+        classifier = IncrementalKMeans(n_clusters=2, memory=self.memory)
         return classifier
 
@@ -0,0 +1,162 @@
+# IncrementalModels - clustering and mixture models that can be updated with new samples (partial_fit)
+#
+# KMeans and GaussianMixture have to be refitted from scratch to take new data into account. In live/dry-run modes
+# only one or two candles are new each time the models are trained, so instead these models keep the sufficient
+# statistics of the data they have seen (per cluster/component: weight, sum of samples and, for the mixture, sum of
+# outer products), and each update only processes the new samples:
+#   - IncrementalKMeans: new samples are assigned to the nearest centre, which moves towards them (sequential or
+#     'mini-batch' k-means)
+#   - OnlineGaussianMixture: one (stepwise) EM iteration per update - responsibilities of the new samples are
+#     calculated using the current parameters (E step), added to the statistics, and the parameters are recalculated
+#     from the statistics (M step)
+# The initial fit() is a normal (full) sklearn fit, and the statistics are initialised from its result.
+#
+# memory sets how much history is kept: the statistics decay exponentially, with a time constant of 'memory' samples,
+# which lets the models follow the market rather than being dominated by old data. The average age of the samples is
+# then the same as for a refit on the last 2 * memory samples. 0 means keep everything, in which case the models stay
+# close to a full refit on all of the data seen (see Anomaly/bench_incremental.py)
+#
+# Both classes wrap the underlying sklearn estimator and keep its attributes up to date, so predict() etc. behave
+# the same as for the sklearn versions
+
+import numpy as np
+from scipy import linalg
+from sklearn.cluster import KMeans
+from sklearn.mixture import GaussianMixture
+
+
+# factor applied to the statistics before adding num_samples new samples
+def decay_factor(memory: int, num_samples: int) -> float:
+    if memory <= 0:
+        return 1.0
+    return (1.0 - 1.0 / memory) ** num_samples
+
+
+# -----------------------------------
+
+class IncrementalKMeans():
+
+    def __init__(self, n_clusters=2, memory=0, random_state=42):
+        self.n_clusters = n_clusters
+        self.memory = memory
+        self.random_state = random_state
+        self.kmeans = None
+        self.counts = None  # (weighted) number of samples per cluster
+        self.sums = None  # (weighted) sum of the samples in each cluster
+        self.n_samples_seen = 0
+
+    def fit(self, X, y=None):
+        self.kmeans = KMeans(n_clusters=self.n_clusters, random_state=self.random_state).fit(X)
+        self.counts = np.zeros(self.n_clusters)
+        self.sums = np.zeros_like(self.kmeans.cluster_centers_)
+        self.n_samples_seen = 0
+        self.update_stats(np.asarray(X, dtype=float), self.kmeans.labels_, 1.0)
+        return self
+
+    def partial_fit(self, X, y=None):
+        if self.kmeans is None:
+            return self.fit(X, y)
+
+        labels = self.kmeans.predict(X)
+        self.update_stats(np.asarray(X, dtype=float), labels, decay_factor(self.memory, np.shape(X)[0]))
+
+        # empty clusters keep their previous centre
+        used = self.counts > 0
+        self.kmeans.cluster_centers_[used] = self.sums[used] / self.counts[used, np.newaxis]
+        return self
+
+    def update_stats(self, X, labels, decay):
+        self.counts *= decay
+        self.sums *= decay
+        np.add.at(self.counts, labels, 1.0)
+        np.add.at(self.sums, labels, X)
+        self.n_samples_seen += len(X)
+
+    def predict(self, X) -> np.ndarray:
+        return self.kmeans.predict(X)
+
+    def transform(self, X) -> np.ndarray:
+        return self.kmeans.transform(X)
+
+    def score(self, X, y=None) -> float:
+        return self.kmeans.score(X)
+
+    @property
+    def cluster_centers_(self) -> np.ndarray:
+        return self.kmeans.cluster_centers_
+
+
+# -----------------------------------
+
+# Note: only full covariance matrices are supported (the GaussianMixture default)
+class OnlineGaussianMixture():
+
+    def __init__(self, n_components=2, memory=0, reg_covar=1e-6, random_state=42):
+        self.n_components = n_components
+        self.memory = memory
+        self.reg_covar = reg_covar
+        self.random_state = random_state
+        self.gmm = None
+        self.resp_sums = None  # sum of responsibilities per component
+        self.sums = None  # responsibility-weighted sum of samples, per component
+        self.outer_sums = None  # responsibility-weighted sum of outer products, per component
+        self.n_samples_seen = 0
+
+    def fit(self, X, y=None):
+        self.gmm = GaussianMixture(n_components=self.n_components, covariance_type='full', reg_covar=self.reg_covar,
+                                   random_state=self.random_state).fit(X)
+        num_features = self.gmm.means_.shape[1]
+        self.resp_sums = np.zeros(self.n_components)
+        self.sums = np.zeros((self.n_components, num_features))
+        self.outer_sums = np.zeros((self.n_components, num_features, num_features))
+        self.n_samples_seen = 0
+        self.update_stats(X, 1.0)
+        return self
+
+    def partial_fit(self, X, y=None):
+        if self.gmm is None:
+            return self.fit(X, y)
+
+        self.update_stats(X, decay_factor(self.memory, np.shape(X)[0]))
+        self.update_params()
+        return self
+
+    # E step for the new samples, added to the (decayed) statistics
+    def update_stats(self, X, decay):
+        resp = self.gmm.predict_proba(X)
+        X = np.asarray(X, dtype=float)
+        self.resp_sums = decay * self.resp_sums + resp.sum(axis=0)
+        self.sums = decay * self.sums + resp.T @ X
+        self.outer_sums = decay * self.outer_sums + np.einsum('nk,nd,ne->kde', resp, X, X)
+        self.n_samples_seen += len(X)
+
+    # M step, using the statistics
+    def update_params(self):
+        resp_sums = self.resp_sums + 10 * np.finfo(float).eps
+        means = self.sums / resp_sums[:, np.newaxis]
+        covariances = self.outer_sums / resp_sums[:, np.newaxis, np.newaxis] - np.einsum('kd,ke->kde', means, means)
+        covariances += self.reg_covar * np.eye(means.shape[1])
+
+        # same as sklearn's _compute_precision_cholesky() for 'full'
+        precisions_chol = np.empty_like(covariances)
+        for k in range(self.n_components):
+            cov_chol = linalg.cholesky(covariances[k], lower=True)
+            precisions_chol[k] = linalg.solve_triangular(cov_chol, np.eye(means.shape[1]), lower=True).T
+
+        self.gmm.weights_ = resp_sums / resp_sums.sum()
+        self.gmm.means_ = means
+        self.gmm.covariances_ = covariances
+        self.gmm.precisions_cholesky_ = precisions_chol
+        self.gmm.precisions_ = np.einsum('kij,klj->kil', precisions_chol, precisions_chol)
+
+    def predict(self, X) -> np.ndarray:
+        return self.gmm.predict(X)
+
+    def predict_proba(self, X) -> np.ndarray:
+        return self.gmm.predict_proba(X)
+
+    def score_samples(self, X) -> np.ndarray:
+        return self.gmm.score_samples(X)
+
+    def score(self, X, y=None) -> float:
+        return self.gmm.score(X)
@@ -0,0 +1,107 @@
+# ScalableNeighbours - neighbour-based anomaly detection (LOF, DBSCAN) that scales to large training sets
+#
+# The sklearn LOF and DBSCAN estimators search for neighbours across the whole training set. Fitting LOF needs the
+# k nearest neighbours of every training sample, and novelty scoring needs the neighbours of every new sample, so the
+# cost grows much faster than the amount of data (multi-month 5m data across many pairs).
+# To keep this manageable (CPU only, no extra dependencies):
+#   - neighbour searches use a KD tree (or a ball tree for higher dimensions, where KD trees degrade), with a
+#     configurable leaf size
+#   - the reference set is a (repeatable) random subsample of at most max_samples rows. Neighbour density estimates
+#     from a large random subsample are close to those from the full set, and the fitted tree is saved with the model
+#   - DBSCAN clusters a subsample (with min_samples scaled to match), then assigns every sample to the cluster of its
+#     nearest core sample, if that is within eps (otherwise it is noise). This is the same rule that DBSCAN uses for
+#     border points
+#
+# Usage:
+#   lof = ScalableLOF(n_neighbors=30, contamination=0.01, max_samples=20000).fit(df_train)
+#   predictions = lof.predict(df)  # -1 for outliers, 1 for inliers (same as LocalOutlierFactor)
+#   labels = dbscan_labels(df, eps=0.1, min_samples=10, max_samples=20000)  # -1 for noise
+#
+# See Anomaly/bench_neighbours.py for timing and recall compared to the exact versions
+
+import numpy as np
+from sklearn.cluster import DBSCAN
+from sklearn.neighbors import KDTree, BallTree, LocalOutlierFactor
+
+max_kd_dims = 16  # use a ball tree above this number of features
+seed = 42
+
+
+# tree algorithm to use for the number of features
+def choose_algorithm(num_features: int) -> str:
+    return 'kd_tree' if num_features <= max_kd_dims else 'ball_tree'
+
+
+# sorted indices of a (repeatable) random subsample of at most max_samples rows. 0 means use all rows
+def subsample_index(num_samples: int, max_samples: int) -> np.ndarray:
+    if (max_samples <= 0) or (num_samples <= max_samples):
+        return np.arange(num_samples)
+    rng = np.random.default_rng(seed)
+    return np.sort(rng.choice(num_samples, max_samples, replace=False))
+
+
+# LocalOutlierFactor (novelty mode) fitted to a subsample of the training data, using a tree for neighbour searches
+class ScalableLOF():
+
+    def __init__(self, n_neighbors=30, contamination=0.01, max_samples=20000, leaf_size=40, n_jobs=-1):
+        self.n_neighbors = n_neighbors
+        self.contamination = contamination
+        self.max_samples = max_samples
+        self.leaf_size = leaf_size
+        self.n_jobs = n_jobs
+        self.lof = None
+
+    def fit(self, X, y=None):
+        X = np.asarray(X, dtype=float)
+        X = X[subsample_index(len(X), self.max_samples)]
+
+        # LocalOutlierFactor only accepts contamination in (0, 0.5]
+        contamination = self.contamination if 0.0 < self.contamination <= 0.5 else 'auto'
+
+        self.lof = LocalOutlierFactor(n_neighbors=min(self.n_neighbors, len(X) - 1),
+                                      novelty=True,
+                                      contamination=contamination,
+                                      algorithm=choose_algorithm(X.shape[1]),
+                                      leaf_size=self.leaf_size,
+                                      n_jobs=self.n_jobs)
+        self.lof.fit(X)
+        return self
+
+    def predict(self, X) -> np.ndarray:
+        return self.lof.predict(np.asarray(X, dtype=float))
+
+    def score_samples(self, X) -> np.ndarray:
+        return self.lof.score_samples(np.asarray(X, dtype=float))
+
+    def decision_function(self, X) -> np.ndarray:
+        return self.lof.decision_function(np.asarray(X, dtype=float))
+
+
+# DBSCAN cluster labels (-1 for noise) for every row of X. If there are more than max_samples rows, the clusters are
+# found using a subsample, and the remaining rows are assigned to the cluster of the nearest core sample within eps
+def dbscan_labels(X, eps: float, min_samples: int, max_samples=20000, leaf_size=40, n_jobs=-1) -> np.ndarray:
+    X = np.asarray(X, dtype=float)
+    algorithm = choose_algorithm(X.shape[1])
+
+    idx = subsample_index(len(X), max_samples)
+    if len(idx) == len(X):
+        db = DBSCAN(eps=eps, min_samples=max(1, min_samples), algorithm=algorithm, leaf_size=leaf_size,
+                    n_jobs=n_jobs)
+        return db.fit(X).labels_
+
+    # density threshold is relative to the number of samples, so scale it to the subsample
+    sub_min_samples = max(2, int(round(min_samples * len(idx) / len(X))))
+    db = DBSCAN(eps=eps, min_samples=sub_min_samples, algorithm=algorithm, leaf_size=leaf_size, n_jobs=n_jobs)
+    db.fit(X[idx])
+
+    labels = np.full(len(X), -1, dtype=int)
+    core = db.core_sample_indices_
+    if len(core) == 0:
+        return labels
+
+    tree_type = KDTree if algorithm == 'kd_tree' else BallTree
+    tree = tree_type(X[idx][core], leaf_size=leaf_size)
+    dist, nearest = tree.query(X, k=1)
+    within = dist[:, 0] <= eps
+    labels[within] = db.labels_[core][nearest[within, 0]]
+    return labels
@@ -0,0 +1,166 @@
+# Benchmark and tolerance check for the incremental models (IncrementalModels.py) against a full refit
+#
+# Uses seeded synthetic data (two gaussian clusters, similar to PCA-compressed indicator data, with the cluster
+# centres drifting slowly over time), fits each model to the first part of the data, then feeds it the rest a few
+# samples at a time with partial_fit() (as happens in live/dry-run modes), and compares the result to a full refit:
+#   - cumulative (memory=0): full refit on all of the data
+#   - windowed (memory=N): full refit on the last 2N samples (same average sample age)
+# For the mixture, the comparison uses the average log likelihood of the reference data and the agreement between the
+# anomaly flags (score below mean - 2 std, as in ClassifierSklearn.predict()). For k-means, it uses the relative
+# difference in inertia (sum of squared distances to the nearest centre) and the agreement between the cluster labels
+# (after matching the clusters, since their numbering is arbitrary). A 'frozen' model (fitted once, never updated) is
+# shown for comparison.
+#
+# Usage: python bench_incremental.py [options]
+#
+#   --samples=N           total number of samples. Default is 6000
+#   --dims=D              number of features. Default is 8
+#   --batch=B             number of samples per update. Default is 1
+#   --memory=N            memory for the windowed runs (the refit window is 2N). Default is 1008
+#   --tolerance=0.05      max allowed difference in log likelihood (per sample) and in relative inertia
+#   --agreement=0.97      min allowed fraction of matching anomaly flags (mixture) or cluster labels (k-means)
+#   --quick               same as --samples=3000 --batch=4
+#
+# Exits with status 1 if any incremental model is outside the tolerance
+
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+
+sys.path.append(str(Path(__file__).parent))
+
+from IncrementalModels import IncrementalKMeans, OnlineGaussianMixture
+
+
+# -----------------------------------
+
+# seeded synthetic data, with slowly drifting cluster centres
+def get_data(num_samples, num_features, seed=42) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(0.0, 2.0, size=(2, num_features))
+    drift = rng.normal(0.0, 1.0, size=(2, num_features)) / num_samples
+    labels = rng.integers(0, 2, num_samples)
+    t = np.arange(num_samples)[:, np.newaxis]
+    return centres[labels] + drift[labels] * t + rng.normal(0.0, 0.6, size=(num_samples, num_features))
+
+
+def anomaly_flags(scores) -> np.ndarray:
+    return scores <= (scores.mean() - 2.0 * scores.std())
+
+
+def compare_gmix(model, reference, data):
+    scores = model.score_samples(data)
+    ref_scores = reference.score_samples(data)
+    ll_diff = abs(scores.mean() - ref_scores.mean())
+    agreement = np.mean(anomaly_flags(scores) == anomaly_flags(ref_scores))
+    return ll_diff, agreement
+
+
+# fraction of samples with the same cluster label, using the best match between the clusters of the two models
+def label_agreement(labels, ref_labels, num_clusters) -> float:
+    counts = np.zeros((num_clusters, num_clusters))
+    np.add.at(counts, (labels, ref_labels), 1)
+    rows, cols = linear_sum_assignment(-counts)
+    return counts[rows, cols].sum() / len(labels)
+
+
+def compare_kmeans(model, reference, data):
+    inertia = -model.score(data)
+    ref_inertia = -reference.score(data)
+    agreement = label_agreement(model.predict(data), reference.predict(data), reference.n_clusters)
+    return abs(inertia - ref_inertia) / ref_inertia, agreement
+
+
+# -----------------------------------
+
+def run(name, make_model, compare, data, start, batch, memory):
+    # reference data: everything (cumulative), or the last 2 * memory samples
+    reference_data = data if memory <= 0 else data[-2 * memory:]
+
+    model = make_model(memory).fit(data[:start])
+    frozen = make_model(memory).fit(data[:start])
+
+    update_time = time.perf_counter()
+    num_updates = 0
+    for i in range(start, len(data), batch):
+        model.partial_fit(data[i:i + batch])
+        num_updates += 1
+    update_time = (time.perf_counter() - update_time) / max(1, num_updates)
+
+    refit_time = time.perf_counter()
+    reference = make_model(memory).fit(reference_data)
+    refit_time = time.perf_counter() - refit_time
+
+    diff, agreement = compare(model, reference, reference_data)
+    frozen_diff, frozen_agreement = compare(frozen, reference, reference_data)
+    return {
+        'name': name, 'memory': memory, 'update_ms': 1000.0 * update_time, 'refit_ms': 1000.0 * refit_time,
+        'diff': diff, 'agreement': agreement, 'frozen_diff': frozen_diff, 'frozen_agreement': frozen_agreement
+    }
+
+
+def main():
+    num_samples = 6000
+    num_features = 8
+    batch = 1
+    memory = 1008
+    tolerance = 0.05
+    min_agreement = 0.97
+
+    args = sys.argv[1:]
+    for arg in args:
+        if arg == '--quick':
+            num_samples = 3000
+            batch = 4
+        elif arg.startswith('--samples='):
+            num_samples = int(arg.split('=')[1])
+        elif arg.startswith('--dims='):
+            num_features = int(arg.split('=')[1])
+        elif arg.startswith('--batch='):
+            batch = int(arg.split('=')[1])
+        elif arg.startswith('--memory='):
+            memory = int(arg.split('=')[1])
+        elif arg.startswith('--tolerance='):
+            tolerance = float(arg.split('=')[1])
+        elif arg.startswith('--agreement='):
+            min_agreement = float(arg.split('=')[1])
+        else:
+            print(f"Unknown option: {arg}")
+            sys.exit(1)
+
+    data = get_data(num_samples, num_features)
+
+    models = [
+        ('KMeans', lambda m: IncrementalKMeans(n_clusters=2, memory=m), compare_kmeans),
+        ('GMix', lambda m: OnlineGaussianMixture(n_components=2, memory=m), compare_gmix)
+    ]
+
+    results = []
+    for name, make_model, compare in models:
+        # cumulative: start with half of the data
+        results.append(run(name, make_model, compare, data, num_samples // 2, batch, 0))
+        # windowed: start with the first window
+        results.append(run(name, make_model, compare, data, min(2 * memory, num_samples // 2), batch, memory))
+
+    print("")
+    print(f"{'model':<8} {'memory':>7} {'update (ms)':>12} {'refit (ms)':>11} {'diff':>8} {'agree':>7} "
+          f"{'frozen diff':>12} {'frozen agree':>13}  result")
+
+    failed = False
+    for r in results:
+        ok = (r['diff'] <= tolerance) and (r['agreement'] >= min_agreement)
+        failed = failed or (not ok)
+        print(f"{r['name']:<8} {r['memory']:>7} {r['update_ms']:>12.3f} {r['refit_ms']:>11.1f} {r['diff']:>8.4f} "
+              f"{r['agreement']:>7.3f} {r['frozen_diff']:>12.4f} {r['frozen_agreement']:>13.3f}  "
+              f"{'ok' if ok else 'FAIL'}")
+
+    if failed:
+        print(f"Incremental model(s) outside tolerance (diff > {tolerance} or agreement < {min_agreement})")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
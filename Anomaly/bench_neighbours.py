@@ -0,0 +1,163 @@
+# Benchmark of the scalable neighbour-based detectors (ScalableNeighbours.py) against the exact sklearn versions
+#
+# For every training size, uses seeded synthetic data (a few gaussian clusters, similar to PCA-compressed indicator
+# data, plus a small fraction of injected outliers). The training and test data are different samples from the same
+# clusters. For LOF and DBSCAN, records:
+#   - fit and predict time of the exact and scalable versions
+#   - fraction of the (test) samples flagged as anomalies by the exact version
+#   - recall: fraction of the samples flagged by the exact version that are also flagged by the scalable version
+#   - precision: fraction of the samples flagged by the scalable version that are also flagged by the exact version
+#
+# DBSCAN uses the same min_samples as AnomalyDetector_DBSCAN and, by default, runs with the detector's eps and with an
+# eps that actually clusters this data. Note that with the detector's (very small) eps every sample is noise, i.e.
+# flagged, so recall/precision are trivially 1.0 for that run
+#
+# Usage: python bench_neighbours.py [options]
+#
+#   --sizes=10000,40000,...    training sizes. Default is 10000,40000,100000
+#   --dims=8                   number of features. Default is 8
+#   --max_samples=20000        max size of the reference set for the scalable versions. Default is 20000
+#   --leaf_sizes=30,40,...     tree leaf sizes to run. Default is 40
+#   --eps=0.00001,1.5          DBSCAN eps values. Default is the AnomalyDetector_DBSCAN value (0.00001) and 1.5
+#   --quick                    same as --sizes=10000,40000
+#   --csv=<file>               save results to a CSV file
+
+import csv
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+from sklearn.cluster import DBSCAN
+from sklearn.neighbors import LocalOutlierFactor
+
+sys.path.append(str(Path(__file__).parent))
+
+from ScalableNeighbours import ScalableLOF, dbscan_labels
+
+contamination = 0.01
+n_neighbors = 30
+detector_eps = 0.00001  # AnomalyDetector_DBSCAN.eps (the detector can't be imported here, it needs tensorflow)
+cluster_eps = 1.5  # eps that gives ~contamination noise for the synthetic data
+centres_seed = 1  # cluster centres are the same for all data sets
+
+
+# -----------------------------------
+
+# seeded synthetic data: num_samples rows of clustered data, with ~contamination of the rows replaced by outliers.
+# The cluster centres do not depend on seed, so different seeds give different samples of the same distribution
+def get_data(num_samples, num_features, seed=42) -> np.ndarray:
+    centres = np.random.default_rng(centres_seed).normal(0.0, 2.0, size=(4, num_features))
+    rng = np.random.default_rng(seed)
+    data = centres[rng.integers(0, len(centres), num_samples)] + rng.normal(0.0, 0.5, size=(num_samples, num_features))
+    outliers = rng.choice(num_samples, int(contamination * num_samples), replace=False)
+    data[outliers] = rng.uniform(-8.0, 8.0, size=(len(outliers), num_features))
+    return data
+
+
+def compare(exact_flags, flags):
+    both = np.sum(exact_flags & flags)
+    recall = both / max(1, np.sum(exact_flags))
+    precision = both / max(1, np.sum(flags))
+    return recall, precision
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+# -----------------------------------
+
+def bench_lof(train, test, max_samples, leaf_size):
+    exact = LocalOutlierFactor(n_neighbors=n_neighbors, novelty=True, contamination=contamination)
+    _, exact_fit = timed(exact.fit, train)
+    exact_preds, exact_predict = timed(exact.predict, test)
+
+    scalable = ScalableLOF(n_neighbors=n_neighbors, contamination=contamination, max_samples=max_samples,
+                           leaf_size=leaf_size)
+    _, fit_time = timed(scalable.fit, train)
+    preds, predict_time = timed(scalable.predict, test)
+
+    recall, precision = compare(exact_preds == -1, preds == -1)
+    return exact_fit, exact_predict, fit_time, predict_time, np.mean(exact_preds == -1), recall, precision
+
+
+def bench_dbscan(data, eps, max_samples, leaf_size):
+    # same as AnomalyDetector_DBSCAN.predict()
+    min_samples = int(contamination * len(data) / 4)
+
+    exact_labels, exact_time = timed(lambda: DBSCAN(eps=eps, min_samples=max(1, min_samples)).fit(data).labels_)
+    labels, scalable_time = timed(dbscan_labels, data, eps=eps, min_samples=min_samples, max_samples=max_samples,
+                                  leaf_size=leaf_size)
+
+    recall, precision = compare(exact_labels == -1, labels == -1)
+    return exact_time, 0.0, scalable_time, 0.0, np.mean(exact_labels == -1), recall, precision
+
+
+# -----------------------------------
+
+def main():
+    sizes = [10000, 40000, 100000]
+    num_features = 8
+    max_samples = 20000
+    leaf_sizes = [40]
+    eps_values = [detector_eps, cluster_eps]
+    csv_file = ""
+
+    args = sys.argv[1:]
+    for arg in args:
+        if arg == '--quick':
+            sizes = [10000, 40000]
+        elif arg.startswith('--sizes='):
+            sizes = [int(s) for s in arg.split('=')[1].split(',')]
+        elif arg.startswith('--dims='):
+            num_features = int(arg.split('=')[1])
+        elif arg.startswith('--max_samples='):
+            max_samples = int(arg.split('=')[1])
+        elif arg.startswith('--leaf_sizes='):
+            leaf_sizes = [int(s) for s in arg.split('=')[1].split(',')]
+        elif arg.startswith('--eps='):
+            eps_values = [float(s) for s in arg.split('=')[1].split(',')]
+        elif arg.startswith('--csv='):
+            csv_file = arg.split('=')[1]
+        else:
+            print(f"Unknown option: {arg}")
+            sys.exit(1)
+
+    results = []
+    print("")
+    print(f"{'detector':<8} {'eps':>8} {'size':>8} {'leaf':>5} {'exact fit':>10} {'exact pred':>10} {'fit':>8} {'pred':>8} "
+          f"{'speedup':>8} {'flagged':>8} {'recall':>7} {'precision':>9}")
+
+    for size in sizes:
+        train = get_data(size, num_features, seed=42)
+        test = get_data(size, num_features, seed=43)
+
+        for leaf_size in leaf_sizes:
+            runs = [('LOF', 0.0, bench_lof(train, test, max_samples, leaf_size))]
+            for eps in eps_values:
+                runs.append(('DBSCAN', eps, bench_dbscan(test, eps, max_samples, leaf_size)))
+            for name, eps, (exact_fit, exact_predict, fit_time, predict_time, flagged, recall, precision) in runs:
+                speedup = (exact_fit + exact_predict) / max(1e-9, fit_time + predict_time)
+                print(f"{name:<8} {eps:>8g} {size:>8} {leaf_size:>5} {exact_fit:>10.3f} {exact_predict:>10.3f} "
+                      f"{fit_time:>8.3f} {predict_time:>8.3f} {speedup:>7.1f}x {flagged:>8.3f} {recall:>7.3f} "
+                      f"{precision:>9.3f}")
+                results.append({
+                    'detector': name, 'size': size, 'leaf_size': leaf_size, 'max_samples': max_samples,
+                    'exact_fit': exact_fit, 'exact_predict': exact_predict,
+                    'fit': fit_time, 'predict': predict_time, 'eps': eps, 'flagged': flagged,
+                    'recall': recall, 'precision': precision
+                })
+
+    if csv_file:
+        with open(csv_file, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(results[0].keys()))
+            writer.writeheader()
+            writer.writerows(results)
+        print(f"Saved results to {csv_file}")
+
+
+if __name__ == '__main__':
+    main()
@@ -171,6 +171,12 @@ class NNPredict(IStrategy):
     batch_size = 1024  # batch size for training
     predict_batch_size = 128
 
+    # rolling predictions (classifiers that only return a single prediction)
+    rolling_window = 64  # number of rows passed to the model for each prediction
+    rolling_stride = 1  # predict every N rows (the latest prediction is held in between). >1 speeds up long backtests
+    rolling_batch_size = 256  # max number of windows per call to the model (if the classifier supports batches)
+    rolling_retrain_interval = 0  # re-train the model every N rows during rolling predictions (0 = never)
+
     classifier_list = {}  # classifier for each pair
     curr_classifier = None
     init_done = {}  # flags whether initialisation has been done for a pair or not
@@ -291,6 +297,13 @@ class NNPredict(IStrategy):
 
 
 
+    ###################################
+
+    def bot_start(self, **kwargs) -> None:
+        # stage timing (if enabled in the config)
+        profiler.configure(self.config, self.dp.runmode.value if self.dp else "")
+        return
+
     """
     inf Pair Definitions
     """
@@ -308,6 +321,7 @@ class NNPredict(IStrategy):
     Indicator Definitions
     """
 
+    @profiler.timed('populate')
     def populate_indicators(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
 
         # Base pair inf timeframe indicators
@@ -419,6 +433,7 @@ class NNPredict(IStrategy):
 
     dataset_type = DatasetType.DEFAULT # can change this in subclass if desired
 
+    @profiler.timed('indicators')
     def add_indicators(self, dataframe: DataFrame) -> DataFrame:
 
         # populate the standard indicators
@@ -435,6 +450,7 @@ class NNPredict(IStrategy):
         return dataframe
 
     # add in any indicators to be used for training
+    @profiler.timed('labelling')
     def add_training_indicators(self, dataframe: DataFrame) -> DataFrame:
 
         # placeholders, just need the columns to be there for later
@@ -517,6 +533,7 @@ class NNPredict(IStrategy):
     ################################
 
     # prepare data and train the model
+    @profiler.timed('training')
     def train_model(self, dataframe: DataFrame, pair) -> DataFrame:
 
         nfeatures = np.shape(dataframe)[1]
@@ -531,6 +548,9 @@ class NNPredict(IStrategy):
             if not self.curr_classifier:
                 self.curr_classifier = self.make_classifier(self.curr_pair, self.seq_len, nfeatures)
 
+        # some classifiers keep data (scalers, series etc.) for each pair
+        self.curr_classifier.set_pair(self.curr_pair)
+
         # constrain size to what will be available in run modes
         df_size = dataframe.shape[0]
         # data_size = int(min(975, df_size))
@@ -577,10 +597,11 @@ class NNPredict(IStrategy):
         # dataframe = self.add_stoploss_indicators(dataframe)
 
         # scale the dataframe
-        if self.curr_classifier.prescale_data():
-            df_norm = self.dataframeUtils.norm_dataframe(dataframe)
-        else:
-            df_norm = dataframe.copy()
+        with profiler.stage('normalisation'):
+            if self.curr_classifier.prescale_data():
+                df_norm = self.dataframeUtils.norm_dataframe(dataframe)
+            else:
+                df_norm = dataframe.copy()
 
 
         # future_gain = df_norm['gain'].shift(-self.lookahead)
@@ -621,7 +642,8 @@ class NNPredict(IStrategy):
         else:
 
             # convert dataframe to tensor before extracting train/test data (avoid edge effects)
-            df_tensor = self.dataframeUtils.df_to_tensor(df_norm, self.seq_len)
+            with profiler.stage('tensorisation'):
+                df_tensor = self.dataframeUtils.df_to_tensor(df_norm, self.seq_len)
             train_tensor = df_tensor[train_start:train_start + train_size]
             test_tensor = df_tensor[test_start:test_start + test_size]
 
@@ -979,7 +1001,8 @@ class NNPredict(IStrategy):
 
         return dataframe
 
-    # run prediction in rolling fashion (one result at a time -> slow) over the entire history
+    # run prediction in rolling fashion over the entire history. Each prediction only sees a fixed-size window of
+    # data ending at that row, so run time is linear in the size of the dataframe
     def add_model_rolling_predictions(self, dataframe: DataFrame) -> DataFrame:
 
         print("    Adding rolling predictions. Might take a while...")
@@ -997,28 +1020,53 @@ class NNPredict(IStrategy):
         else:
             df_norm = dataframe
 
-        if not use_dataframes:
-            df_tensor = self.dataframeUtils.df_to_tensor(df_norm, self.seq_len)
+        if use_dataframes:
+            data = df_norm
+        else:
+            data = self.dataframeUtils.df_to_tensor(df_norm, self.seq_len)
 
-        window = 64
-        start = window
-        end = np.shape(df_norm)[0]
+        nrows = np.shape(df_norm)[0]
+        if nrows == 0:
+            dataframe['predicted_gain'] = np.zeros(0, dtype=float)
+            return dataframe
+
+        window = min(self.rolling_window, nrows)
+        stride = max(1, self.rolling_stride)
+
+        # rows to predict. Always include the latest row
+        positions = np.arange(window - 1, nrows, stride)
+        if positions[-1] != (nrows - 1):
+            positions = np.append(positions, nrows - 1)
 
-        preds_notrend: np.array = []
+        # batches must not span a re-train
+        batch_size = max(1, self.rolling_batch_size)
+        if self.rolling_retrain_interval > 0:
+            batch_size = min(batch_size, max(1, self.rolling_retrain_interval // stride))
+        next_retrain = positions[0] + self.rolling_retrain_interval
 
-        # set values for startup window
-        for index in range(0, start):
-            preds_notrend = np.concatenate((preds_notrend, [df_norm[self.target_column].iloc[index]]))
+        preds = np.full(nrows, np.nan, dtype=float)
 
         # add predictions
-        for i in tqdm(range(start, end), desc="    Predicting…", ascii=True, ncols=75):
-            # for index in range(start, end):
+        for start in tqdm(range(0, len(positions), batch_size), desc="    Predicting…", ascii=True, ncols=75):
+            batch = positions[start:start + batch_size]
+
+            if (self.rolling_retrain_interval > 0) and (batch[0] >= next_retrain):
+                self.retrain_rolling_model(dataframe, batch[0])
+                next_retrain = batch[0] + self.rolling_retrain_interval
+
             if use_dataframes:
-                chunk = df_norm.iloc[start:end]
+                windows = [data.iloc[pos + 1 - window:pos + 1] for pos in batch]
             else:
-                chunk = df_tensor[start:end]
-            preds = self.get_predictions(chunk)
-            preds_notrend = np.concatenate((preds_notrend, preds))
+                windows = [data[pos + 1 - window:pos + 1] for pos in batch]
+
+            preds[batch] = self.get_rolling_predictions(windows)
+
+        # set values for startup window, and hold the latest prediction between strided rows
+        preds_notrend = df_norm[self.target_column].to_numpy(dtype=float, copy=True)
+        latest = np.full(nrows, -1)
+        latest[positions] = positions
+        latest = np.maximum.accumulate(latest)
+        preds_notrend[window - 1:] = preds[latest[window - 1:]]
 
         # re-scale, if needed
         if prescale_data:
@@ -1036,9 +1084,24 @@ class NNPredict(IStrategy):
 
         return dataframe
 
+    # get the (single) prediction for each window. Uses one model call for all windows if the classifier supports it
+    def get_rolling_predictions(self, windows: list) -> np.ndarray:
+        if self.curr_classifier.supports_batch_prediction():
+            return np.asarray(self.curr_classifier.predict_batch(windows), dtype=float)
+
+        return np.array([self.get_predictions(w)[-1] for w in windows], dtype=float)
+
+    # re-train the current model using data up to (and including) row end, so that there is no lookahead
+    def retrain_rolling_model(self, dataframe: DataFrame, end: int):
+        refit = self.refit_model
+        self.refit_model = True
+        self.train_model(dataframe.iloc[:end + 1], self.curr_pair)
+        self.refit_model = refit
+
     ################################
 
     # add columns based on predictions. Do not call until after model has been trained
+    @profiler.timed('prediction')
     def add_predictions(self, dataframe: DataFrame, pair) -> DataFrame:
 
         win_size = max(self.lookahead, 14)
@@ -1091,6 +1154,7 @@ class NNPredict(IStrategy):
         return compressor
 
     # compress the supplied dataframe
+    @profiler.timed('compression')
     def compress_dataframe(self, dataframe: DataFrame) -> DataFrame:
         if not self.compressor:
             self.compressor = self.get_compressor(dataframe)
@@ -1175,6 +1239,7 @@ class NNPredict(IStrategy):
     entry Signal
     """
 
+    @profiler.timed('signals')
     def populate_entry_trend(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
         conditions = []
         dataframe.loc[:, "enter_tag"] = ""
@@ -1270,6 +1335,7 @@ class NNPredict(IStrategy):
     exit Signal
     """
 
+    @profiler.timed('signals')
     def populate_exit_trend(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
         conditions = []
         dataframe.loc[:, "exit_tag"] = ""
@@ -75,6 +75,7 @@ tf_logger.setLevel(logging.WARN)
 
 from utils.DataframeUtils import DataframeUtils, ScalerType 
 from utils.DataframePopulator import DataframePopulator, DatasetType
+from utils.DataframeCache import DataframeCache
 import utils.TrainingSignals as TrainingSignals
 
 import NNTClassifier
@@ -213,8 +214,12 @@ class NNTC(IStrategy):
 
     scaler_type = ScalerType.Robust  # scaler type used for normalisation
 
+    # re-use the results of populate_indicators() from previous hyperopt runs (see utils/DataframeCache.py)
+    use_dataframe_cache = True
+
     dataframeUtils = None
     dataframePopulator = None
+    dataframeCache = None
 
     dwt_window = startup_candle_count
 
@@ -329,6 +334,13 @@ class NNTC(IStrategy):
 
     ###################################
 
+    def bot_start(self, **kwargs) -> None:
+        # stage timing (if enabled in the config)
+        profiler.configure(self.config, self.dp.runmode.value if self.dp else "")
+        return
+
+    ###################################
+
     def print_strategy_info(self):
 
         print("")
@@ -351,6 +363,7 @@ class NNTC(IStrategy):
     Indicator Definitions
     """
 
+    @profiler.timed('populate')
     def populate_indicators(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
 
         # Base pair inf timeframe indicators
@@ -406,6 +419,17 @@ class NNTC(IStrategy):
         print("")
         print(curr_pair)
 
+        # in hyperopt, nothing below depends on the hyperopt parameters, so re-use previous results if possible
+        if self.dataframeCache is None:
+            self.dataframeCache = DataframeCache(self, group_dir + "/cache",
+                                                 params=self.get_cache_params(), files=self.get_cache_files())
+            self.dataframeCache.enabled = self.use_dataframe_cache and (self.dp.runmode.value in ('hyperopt'))
+
+        cached_df = self.dataframeCache.load(curr_pair, dataframe)
+        if cached_df is not None:
+            self.add_stoploss_info(curr_pair)
+            return cached_df
+
         # make sure we only retrain in backtest modes
         if self.dp.runmode.value not in ('backtest'):
             self.refit_model = False
@@ -416,7 +440,8 @@ class NNTC(IStrategy):
         # populate the normal dataframe
         if self.dbg_verbose:
             print("    adding indicators...")
-        dataframe = self.dataframePopulator.add_indicators(dataframe, dataset_type=self.dataset_type)
+        with profiler.stage('indicators'):
+            dataframe = self.dataframePopulator.add_indicators(dataframe, dataset_type=self.dataset_type)
 
         # if number of features less than compressed size, just disable compression
         if dataframe.shape[-1] <= self.COMPRESSED_SIZE:
@@ -449,8 +474,37 @@ class NNTC(IStrategy):
         if self.dbg_trace_memory and (self.dbg_trace_pair == self.curr_pair):
             profiler.snapshot()
 
+        self.dataframeCache.save(curr_pair, dataframe)
+
         return dataframe
 
+    # non-hyperoptable settings that affect the output of populate_indicators(). Used to identify cached results,
+    # so add to this in subclasses if they have extra settings
+    def get_cache_params(self) -> dict:
+        cls = self.__class__
+        return {
+            'dataset_type': cls.dataset_type,
+            'signal_type': cls.signal_type,
+            'classifier_type': cls.classifier_type,
+            'lookahead_hours': cls.lookahead_hours,
+            'startup_candle_count': cls.startup_candle_count,
+            'compress_data': cls.compress_data,
+            'COMPRESSED_SIZE': cls.COMPRESSED_SIZE,
+            'seq_len': cls.seq_len,
+            'num_epochs': cls.num_epochs,
+            'batch_size': cls.batch_size,
+            'use_full_dataset': cls.use_full_dataset,
+            'model_per_pair': cls.model_per_pair,
+            'combine_models': cls.combine_models,
+            'scaler_type': cls.scaler_type,
+            'use_custom_stoploss': cls.use_custom_stoploss
+        }
+
+    # files that affect the output of populate_indicators() (i.e. the saved models)
+    def get_cache_files(self) -> list:
+        clf_name = str(self.classifier_type).split(".")[-1]
+        return [str(Path(self.get_model_path(self.curr_pair, clf_name)).parent)]
+
     ################################
     # run data augmentation techniques
     def augment_training_signals(self, buys, sells):
@@ -480,6 +534,7 @@ class NNTC(IStrategy):
         return buys, sells
 
     # creates the buy/sell labels absed on looking ahead into the supplied dataframe
+    @profiler.timed('labelling')
     def create_training_data(self, dataframe: DataFrame):
 
         # future_df = self.add_future_data(dataframe.copy())
@@ -560,16 +615,21 @@ class NNTC(IStrategy):
 
     # add indicators used by stoploss/custom sell logic
     def add_stoploss_indicators(self, dataframe, pair) -> DataFrame:
-        if not pair in self.custom_trade_info:
-            self.custom_trade_info[pair] = {}
-            if not 'had_trend' in self.custom_trade_info[pair]:
-                self.custom_trade_info[pair]['had_trend'] = False
+        self.add_stoploss_info(pair)
 
         # Indicators used for ROI and Custom Stoploss
         dataframe = self.dataframePopulator.add_stoploss_indicators(dataframe)
         return dataframe
 
+    # per-pair info used by stoploss/custom sell logic
+    def add_stoploss_info(self, pair):
+        if not pair in self.custom_trade_info:
+            self.custom_trade_info[pair] = {}
+            if not 'had_trend' in self.custom_trade_info[pair]:
+                self.custom_trade_info[pair]['had_trend'] = False
+
     # compress the supplied dataframe
+    @profiler.timed('compression')
     def compress_dataframe(self, dataframe: DataFrame) -> DataFrame:
         if not self.compressor:
             self.compressor = self.get_compressor(dataframe)
@@ -578,6 +638,7 @@ class NNTC(IStrategy):
 
     # train the classification model
 
+    @profiler.timed('training')
     def train_models(self, curr_pair, dataframe: DataFrame, buys, sells):
 
         # check input - need at least 2 samples or classifiers will not train
@@ -601,7 +662,8 @@ class NNTC(IStrategy):
             full_df_norm, buys, sells = self.dataframeUtils.remove_outliers(full_df_norm, buys, sells)
         else:
             # full_df_norm = self.dataframeUtils.norm_dataframe(dataframe).clip(lower=-3.0, upper=3.0)  # supress outliers
-            full_df_norm = self.dataframeUtils.norm_dataframe(dataframe)
+            with profiler.stage('normalisation'):
+                full_df_norm = self.dataframeUtils.norm_dataframe(dataframe)
 
         # compress data
         if self.compress_data:
@@ -665,7 +727,8 @@ class NNTC(IStrategy):
         labels = np.array([holds, blabels, slabels]).T
 
         # convert to tensors
-        full_tensor = self.dataframeUtils.df_to_tensor(full_df_norm, self.seq_len)
+        with profiler.stage('tensorisation'):
+            full_tensor = self.dataframeUtils.df_to_tensor(full_df_norm, self.seq_len)
         # lbl_tensor = self.dataframeUtils.df_to_tensor(labels, self.seq_len)
 
         # if output is not in tensor format, don't convert
@@ -1025,6 +1088,7 @@ class NNTC(IStrategy):
         # print (predict)
         return predict
 
+    @profiler.timed('prediction')
     def predict_buysell(self, df: DataFrame, pair):
         clf = self.trinary_classifier
 
@@ -1076,6 +1140,7 @@ class NNTC(IStrategy):
     Buy Signal
     """
 
+    @profiler.timed('signals')
     def populate_entry_trend(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
         conditions = []
         dataframe.loc[:, 'enter_tag'] = ''
@@ -1139,6 +1204,7 @@ class NNTC(IStrategy):
     Sell Signal
     """
 
+    @profiler.timed('signals')
     def populate_exit_trend(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
         conditions = []
         dataframe.loc[:, 'exit_tag'] = ''
@@ -23,9 +23,7 @@ TS_Predict - base class for 'simple' time series prediction
 
 
 import copy
-import cProfile
 import os
-import pstats
 
 import sys
 import traceback
@@ -75,6 +73,7 @@ import utils.custom_indicators as cta
 
 import utils.Wavelets as Wavelets
 import utils.Forecasters as Forecasters
+import utils.profiler as profiler
 
 from utils.DataframeUtils import DataframeUtils, ScalerType  # pylint: disable=E0401
 
@@ -276,6 +275,9 @@ class TSPredict(IStrategy):
     ###################################
 
     def bot_start(self, **kwargs) -> None:
+        # stage timing (if enabled in the config)
+        profiler.configure(self.config, self.dp.runmode.value if self.dp else "")
+
         if self.dataframeUtils is None:
             self.dataframeUtils = DataframeUtils()
             self.dataframeUtils.set_scaler_type(ScalerType.Robust)
@@ -357,6 +359,7 @@ class TSPredict(IStrategy):
     Indicator Definitions
     """
 
+    @profiler.timed('populate')
     def populate_indicators(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
         # NOTE: if you change the indicators, you need to regenerate the model
 
@@ -444,7 +447,8 @@ class TSPredict(IStrategy):
             dataframe["squeeze"] = np.where(((lower_bb > lower_kc) & (upper_bb < upper_kc)), 1, 0)
 
         # Add strategy-specific indicators
-        dataframe = self.add_strategy_indicators(dataframe)
+        with profiler.stage('indicators'):
+            dataframe = self.add_strategy_indicators(dataframe)
 
         # create and init the model, if first time (dataframe has to be populated first)
         if self.model is None:
@@ -679,6 +683,7 @@ class TSPredict(IStrategy):
 
     # train the model. Override if not an sklearn-compatible algorithm
     # set save_model=False if you don't want to save the model (needed for ML algorithms)
+    @profiler.timed('training')
     def train_model(self, forecaster: Forecasters.base_forecaster, data: np.array, results: np.array, save_model):
         if forecaster is None:
             print("***    ERR: no forecaster ***")
@@ -1084,15 +1089,10 @@ class TSPredict(IStrategy):
     # -------------
 
     # add predictions to dataframe['predicted_gain']
+    @profiler.timed('prediction')
     def add_predictions(self, dataframe: DataFrame) -> DataFrame:
         # print(f"    {self.curr_pair} adding predictions")
 
-        run_profiler = False
-
-        if run_profiler:
-            prof = cProfile.Profile()
-            prof.enable()
-
         self.scaler = RobustScaler()  # reset scaler each time
 
         self.init_model(dataframe)
@@ -1152,12 +1152,6 @@ class TSPredict(IStrategy):
         # add shifted version, for debug only
         dataframe["shifted_pred"] = dataframe["predicted_gain"].shift(self.lookahead)
 
-        if run_profiler:
-            prof.disable()
-            # print profiling output
-            stats = pstats.Stats(prof).strip_dirs().sort_stats("cumtime")
-            stats.print_stats(20)  # top 20 rows
-
         return dataframe
 
     ###################################
@@ -1166,6 +1160,7 @@ class TSPredict(IStrategy):
     entry Signal
     """
 
+    @profiler.timed('signals')
     def populate_entry_trend(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
         conditions = []
         dataframe.loc[:, "enter_tag"] = ""
@@ -1261,6 +1256,7 @@ class TSPredict(IStrategy):
     exit Signal
     """
 
+    @profiler.timed('signals')
     def populate_exit_trend(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
         conditions = []
         dataframe.loc[:, "exit_tag"] = ""
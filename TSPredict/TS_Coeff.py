@@ -124,31 +124,14 @@ class TS_Coeff(TSPredict):
         # print(f"nrows:{nrows} start:{start} end:{end} dest:{dest} nbuffs:{nbuffs}")
 
         self.coeff_table = None
-        num_coeffs = 0
-        init_done = False
 
-        while end < nrows:
-            dslice = data[start:end]
-
-            # print(f"start:{start} end:{end} dest:{dest} len:{len(dslice)}")
-
-            coeffs = self.wavelet.get_coeffs(dslice)
-            features = self.wavelet.coeff_to_array(coeffs)
-            # print(f'build_coefficient_table() features: {np.shape(features)}')
-
-            # initialise the np.array (need features first to know size)
-            if not init_done:
-                init_done = True
-                num_coeffs = len(features)
-                self.coeff_table = np.zeros((nrows, num_coeffs), dtype=float)
-                # print(f"coeff_table:{np.shape(self.coeff_table)}")
-
-            # copy the features to the appropriate row of the coefficient array (offset due to startup window)
-            self.coeff_table[dest] = features
-
-            start = start + 1
-            dest = dest + 1
-            end = end + 1
+        # get the coefficients for every (rolling) window at once (much faster for some wavelets), then copy the
+        # features to the appropriate rows of the coefficient array (offset due to startup window)
+        if end < nrows:
+            c_table = self.wavelet.get_coeffs_batch(data[:nrows-1], end - start)
+            num_coeffs = len(c_table[0])
+            self.coeff_table = np.zeros((nrows, num_coeffs), dtype=float)
+            self.coeff_table[dest:dest+len(c_table)] = np.array(c_table)
 
 
         # print(f'build_coefficient_table() self.coeff_table: {np.shape(self.coeff_table)}')
@@ -43,6 +43,7 @@ from pathlib import Path
 import os
 import joblib
 import copy
+from concurrent.futures import ThreadPoolExecutor
 
 group_dir = str(Path(__file__).parent)
 strat_dir = str(Path(__file__).parent.parent)
@@ -70,6 +71,7 @@ import utils.custom_indicators as cta
 
 import utils.Wavelets as Wavelets
 import utils.Forecasters as Forecasters
+import utils.profiler as profiler
 
 from TSPredict import TSPredict
 
@@ -120,6 +122,7 @@ class TS_Wavelet(TSPredict):
     coeff_array = None
     coeff_start_col = 0
     col_forecasters = None
+    col_executor = None
     gain_data = None
     data = None
     # curr_dataframe = None
@@ -131,6 +134,8 @@ class TS_Wavelet(TSPredict):
     use_rolling = False # if True, also set single_col_prediction = True
     detrend_data = True # if True, also set single_col_prediction = True
     single_col_prediction = True
+    multi_output = False # if True (and single_col_prediction), train one multi-target model on all coefficients
+    col_workers = 1 # if > 1, run the column forecasters in parallel threads (only helps if the model releases the GIL)
 
     # NOTE: can only use longer lengths with FFT, too slow otherwise
     wavelet_size = 64  # Windowing should match this. Longer = better but slower with edge effects. Should be even
@@ -236,6 +241,7 @@ class TS_Wavelet(TSPredict):
 
 
     # builds a numpy array of coefficients
+    @profiler.timed('transform')
     def build_coefficient_table(self, start, end):
 
         # print(f'start:{start} end:{end} self.win_size:{self.win_size}')
@@ -276,20 +282,13 @@ class TS_Wavelet(TSPredict):
         nrows = end - start + 1
         row_start = max(self.wavelet_size, start) - 1 # don't run until we have enough data for the transform
 
-        c_table: np.array = []
+        # get the coefficients for every (rolling) window. Some wavelets can do this much faster than one at a time
+        win_start = max(0, row_start-self.wavelet_size+1)
+        c_table = self.wavelet.get_coeffs_batch(self.data[win_start:end], self.wavelet_size)
 
         max_features = 0
-        for row in range(row_start, end):
-            # dslice = data[start:end].copy()
-            win_start = max(0, row-self.wavelet_size+1)
-            dslice = self.data[win_start:row+1]
-
-            coeffs = self.wavelet.get_coeffs(dslice)
-            features = self.wavelet.coeff_to_array(coeffs)
-            features = np.array(features)
-            flen = len(features)
-            max_features = max(max_features, flen)
-            c_table.append(features)
+        for features in c_table:
+            max_features = max(max_features, len(features))
 
         # convert into a zero-padded fixed size array
         nrows = len(c_table)
@@ -390,29 +389,32 @@ class TS_Wavelet(TSPredict):
         # print(f'start:{start} end:{end} train_start:{train_start} train_end:{train_end} nrows:{nrows}')
 
         # train/predict for each coefficient individually
-        for i in range(self.coeff_start_col, ncols):
+        def predict_column(i):
 
             # get the data buffers from self.coeff_table
             # if single column, then just use a single coefficient
             if self.single_col_prediction:
-                predict_data = self.coeff_table[start:end, i].reshape(-1,1)
-                predict_data = np.nan_to_num(predict_data)
-                train_data = self.coeff_table[train_start:train_end, i].reshape(-1,1)
+                col_predict_data = self.coeff_table[start:end, i].reshape(-1,1)
+                col_predict_data = np.nan_to_num(col_predict_data)
+                col_train_data = self.coeff_table[train_start:train_end, i].reshape(-1,1)
+            else:
+                col_predict_data = predict_data
+                col_train_data = train_data if self.forecaster.requires_pretraining() else None
 
             results = self.coeff_table[results_start:results_end, i]
 
             col_forecaster = self.col_forecasters[i-self.coeff_start_col]
 
-            # print(f'predict_data: {np.shape(predict_data)}')
-            # print(f'train_data: {np.shape(train_data)}')
+            # print(f'predict_data: {np.shape(col_predict_data)}')
+            # print(f'train_data: {np.shape(col_train_data)}')
             # print(f'results: {np.shape(results)}')
 
             if self.forecaster.requires_pretraining():
                 # since we know we are switching data surces, disable incremental training
-                col_forecaster.train(train_data, results, incremental=True)
+                col_forecaster.train(col_train_data, results, incremental=True)
 
             # get a prediction
-            preds = col_forecaster.forecast(predict_data, self.lookahead)
+            preds = col_forecaster.forecast(col_predict_data, self.lookahead)
 
             if preds.ndim > 1:
                 preds = preds.squeeze()
@@ -420,8 +422,26 @@ class TS_Wavelet(TSPredict):
             # # smooth predictions to try and avoid drastic changes
             # preds = self.smooth(preds, 2)
 
-            # append prediction for this column
-            coeff_arr.append(preds[-1])
+            # prediction for this column
+            return preds[-1]
+
+        if self.use_multi_output():
+            # one model for all coefficients
+            cols = slice(self.coeff_start_col, ncols)
+            multi_predict_data = np.nan_to_num(self.coeff_table[start:end, cols])
+            multi_results = self.coeff_table[results_start:results_end, cols]
+            if self.forecaster.requires_pretraining():
+                self.col_forecasters[0].train(self.coeff_table[train_start:train_end, cols], multi_results,
+                                              incremental=True)
+            preds = self.col_forecasters[0].forecast(multi_predict_data, self.lookahead)
+            coeff_arr = np.array(preds).reshape(-1, ncols - self.coeff_start_col)[-1]
+        elif self.col_workers > 1:
+            # columns are independent, so they can run in parallel
+            if self.col_executor is None:
+                self.col_executor = ThreadPoolExecutor(max_workers=self.col_workers)
+            coeff_arr = list(self.col_executor.map(predict_column, range(self.coeff_start_col, ncols)))
+        else:
+            coeff_arr = [predict_column(i) for i in range(self.coeff_start_col, ncols)]
 
         # convert back to gain
         c_array = np.array(coeff_arr)
@@ -443,6 +463,40 @@ class TS_Wavelet(TSPredict):
 
     # -------------
 
+    # check whether to use a single, multi-output model for all coefficients
+    def use_multi_output(self) -> bool:
+        return self.multi_output and self.single_col_prediction and self.forecaster.supports_multi_output()
+
+    # create a new bank of forecasters for the current pair (one for each coefficient column, or a single
+    # multi-output forecaster). Each one is an independent copy of self.forecaster, so they do not share state
+    def init_col_forecasters(self):
+        if self.multi_output and not self.forecaster.supports_multi_output():
+            print(f'    **** WARN: forecaster ({self.forecaster.get_name()}) does not support multi-output')
+            print('               Reverting to a forecaster per column')
+            self.multi_output = False
+
+        num_forecasters = 1 if self.use_multi_output() else self.coeff_num_cols
+        self.col_forecasters = [copy.deepcopy(self.forecaster) for _ in range(num_forecasters)]
+
+        if self.curr_pair in self.custom_trade_info:
+            self.custom_trade_info[self.curr_pair]['col_forecasters'] = self.col_forecasters
+        return self.col_forecasters
+
+    # get the forecasters for the current pair, creating them if needed
+    def get_col_forecasters(self):
+        num_forecasters = 1 if self.use_multi_output() else self.coeff_num_cols
+        col_forecasters = None
+        if self.curr_pair in self.custom_trade_info:
+            col_forecasters = self.custom_trade_info[self.curr_pair].get('col_forecasters', None)
+
+        if (col_forecasters is None) or (len(col_forecasters) != num_forecasters):
+            return self.init_col_forecasters()
+
+        self.col_forecasters = col_forecasters
+        return self.col_forecasters
+
+    # -------------
+
     # single prediction (for use in rolling calculation)
     def predict(self, gain, df) -> float:
          # Get the start and end index labels of the series
@@ -487,10 +541,8 @@ class TS_Wavelet(TSPredict):
         nrows = len(x)
         preds = np.zeros(nrows, dtype=float)
 
-        # if self.col_forecasters is  None:
-        #     # create an array of forecasters (1 for each column)
-        #     self.col_forecasters = np.full(self.coeff_num_cols, self.forecaster)
-        self.col_forecasters = np.full(self.coeff_num_cols, self.forecaster)
+        # create a new set of forecasters (1 for each column) for this pair
+        self.init_col_forecasters()
  
         while end <= nrows:
 
@@ -570,7 +622,7 @@ class TS_Wavelet(TSPredict):
 
             # initialise the prediction array, using the close data
             pred_array = np.zeros(np.shape(future_gain_data), dtype=float)
-            self.col_forecasters = np.full(self.coeff_num_cols, self.forecaster)
+            self.init_col_forecasters()
  
             win_size = self.model_window
 
@@ -675,6 +727,9 @@ class TS_Wavelet(TSPredict):
             # self.build_coefficient_table(start, end)
             self.build_coefficient_table(0, end)
 
+            # continue with the forecasters for this pair
+            self.get_col_forecasters()
+
             preds = self.predict_data(start, end)
 
             # self.model = base_model # restore original model
@@ -657,6 +657,18 @@ class Anomaly(IStrategy):
         test_buy_labels = self.dataframeUtils.get_binary_labels(test_buys)
         test_sell_labels = self.dataframeUtils.get_binary_labels(test_sells)
 
+        # dates of the training samples (used by classifiers that are updated incrementally rather than refitted)
+        train_dates = dataframe['date'].iloc[-df_train.shape[0]:]
+        self.buy_classifier.set_train_dates(train_dates)
+        if not self.ignore_exit_signals:
+            self.sell_classifier.set_train_dates(train_dates)
+
+        # incremental updates (and saved state) are only used in live/dry-run modes, other modes do a full fit
+        live_mode = self.dp.runmode.value in ('live', 'dry_run')
+        self.buy_classifier.set_live_mode(live_mode)
+        if not self.ignore_exit_signals:
+            self.sell_classifier.set_live_mode(live_mode)
+
         # force train/fit the classifiers in backtest mode only
         force_train = True if (self.dp.runmode.value in ('backtest')) else False
 
@@ -40,7 +40,7 @@ tf.compat.v1.logging.set_verbosity(tf.compat.v1.logging.WARN)
 
 #import keras
 from keras import layers
-from sklearn.mixture import GaussianMixture
+from IncrementalModels import OnlineGaussianMixture
 from ClassifierSklearn import ClassifierSklearn
 
 import h5py
@@ -51,7 +51,9 @@ class AnomalyDetector_GMix(ClassifierSklearn):
     classifier = None
     clean_data_required = False # training data should not contain anomalies
 
+    incremental = True  # update with new candles (online EM) instead of refitting
+    memory = 1008  # time constant (samples) of the model history, similar to refitting on 2 * memory. 0: keep all
 
     def create_classifier(self):
-        classifier = GaussianMixture(n_components=2)
+        classifier = OnlineGaussianMixture(n_components=2, memory=self.memory)
         return classifier
@@ -39,7 +39,7 @@ tf.compat.v1.logging.set_verbosity(tf.compat.v1.logging.WARN)
 
 #import keras
 from keras import layers
-from sklearn.neighbors import LocalOutlierFactor
+from ScalableNeighbours import ScalableLOF
 from ClassifierSklearn import ClassifierSklearn
 
 
@@ -50,7 +50,10 @@ class AnomalyDetector_LOF(ClassifierSklearn):
     classifier = None
     clean_data_required = True # training data should not contain anomalies
 
+    max_samples = 20000  # max size of the reference set (random subsample of the training data). 0: use all
+    leaf_size = 40  # leaf size of the neighbour search tree
 
     def create_classifier(self):
-        classifier = LocalOutlierFactor(n_neighbors=30, novelty=True, contamination=self.contamination)
+        classifier = ScalableLOF(n_neighbors=30, contamination=self.contamination,
+                                 max_samples=self.max_samples, leaf_size=self.leaf_size)
         return classifier
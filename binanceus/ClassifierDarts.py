@@ -75,6 +75,7 @@ random.seed(seed)
 np.random.seed(seed)
 
 from DataframeUtils import DataframeUtils
+from DartsSeriesCache import DartsSeriesCache
 
 
 # ---------------------------
@@ -105,14 +106,25 @@ class ClassifierDarts():
     requires_dataframes = True  # set to True if classifier takes dataframes rather than tensors
     prescale_dataframe = False  # set to True if algorithms need dataframes to be pre-scaled
     single_prediction = False  # True if algorithm only produces 1 prediction (not entire data array)
+    batch_prediction = False  # True if predict_batch() can process multiple dataframes in a single call
 
     trainer = None
     trainer_args = {}
     # num_cpus = 1
     use_gpu = True  # Note: not all classifiers can use the GPU, and some are slower when they do
 
+    # execution profile. 64-bit inference is several times slower than 32-bit on CPU, so use 32-bit everywhere
+    use_float32 = True  # convert series (and loaded models) to 32-bit, even if there is no GPU
+    num_threads = 0  # torch intra-op threads used on CPU. 0: use all CPUs
+    forecast_horizon = 0  # number of predictions from each forecast origin in backtest(). 0: use lookahead
+    forecast_stride = 0  # distance between forecast origins in backtest(). 0: single forecast (series length)
+    forecast_batch_size = 1024  # number of forecast origins processed in each forward pass
+
     train_cols = []  # used for debug
 
+    curr_pair = ""  # key for the series cache (set via set_pair())
+    series_cache = None  # scaled TimeSeries and scalers for each pair
+
     # ---------------------------
 
     # Note: pair is needed because we cannot combine model across pairs because of huge price differences
@@ -131,6 +143,14 @@ class ClassifierDarts():
         self.num_cpus = multiprocessing.cpu_count()
         print(f"    CPUs:{self.num_cpus} GPU:{self.is_gpu_available()}")
 
+        # target and covariates are scaled using the training span
+        self.series_cache = DartsSeriesCache(covariate_scaler=RobustScaler, target_scaler=RobustScaler,
+                                             use_float32=self.use_float32_data())
+
+        # CPU: set the number of threads used within each torch operation
+        if not self.is_gpu_available():
+            torch.set_num_threads(self.num_threads if self.num_threads > 0 else self.num_cpus)
+
         if self.model_per_pair:
             pair_suffix = "_" + pair.split("/")[0]
         else:
@@ -190,8 +210,11 @@ class ClassifierDarts():
         self.trainer_args["devices"] = devices
         # self.trainer_args["devices"] = "auto"
 
-        if self.is_gpu_available():
+        # precision must match the dtype of the series
+        if self.use_float32_data():
             self.trainer_args['precision'] = 32
+        else:
+            self.trainer_args['precision'] = 64
 
         print(f'    self.trainer_args: {self.trainer_args}')
 
@@ -235,6 +258,12 @@ class ClassifierDarts():
 
     # ---------------------------
 
+    # set the current pair. Scalers and cached series are kept separately for each pair
+    def set_pair(self, pair):
+        self.curr_pair = pair
+
+    # ---------------------------
+
     # the following are intended to be overridden by  the subclass, if necessary
 
     # return loss metric for fitting. Can vary by model, hence it's a function. IOverride in subclass if necessary
@@ -255,14 +284,17 @@ class ClassifierDarts():
 
         return model
 
+    # Note: with retrain=False, darts builds a single (strided) inference dataset covering all of the forecast origins,
+    # so each forward pass processes forecast_batch_size origins rather than one
     def model_historical_forecasts(self, model, target_series, covariate_series):
         preds = model.historical_forecasts(target_series,
                                            past_covariates=covariate_series,
-                                           # forecast_horizon=self.lookahead,
-                                           forecast_horizon=self.lookahead,
-                                           stride=target_series.n_timesteps,
+                                           forecast_horizon=self.get_forecast_horizon(),
+                                           stride=self.get_forecast_stride(target_series.n_timesteps),
                                            # last_points_only=True,
                                            retrain=False,
+                                           enable_optimization=True,
+                                           predict_kwargs=self.get_predict_args(),
                                            verbose=True)
         return preds
 
@@ -305,6 +337,9 @@ class ClassifierDarts():
 
         # just return if model has already been trained, unless force_train is set, or this was a new model
         if self.model_is_trained() and (not force_train) and (not self.new_model_created()):
+            # still need scalers for this pair (fitted on the training span only)
+            if not self.series_cache.has_scalers(self.curr_pair):
+                self.series_cache.fit_scalers(self.curr_pair, df_train, self.target_column)
             return
 
         # no model? Create it from scratch
@@ -350,9 +385,9 @@ class ClassifierDarts():
         test_price_series = darts.TimeSeries.from_dataframe(df3, time_col='date', value_cols=self.target_column,
                                                             fillna_value=0)
 
-        # convert to 32-bit (allows use of GPU)
-        if self.is_gpu_available():
-            print("    Converting to 32-bit to allow GPU usage...")
+        # convert to 32-bit (allows use of GPU, and is much faster on CPU)
+        if self.use_float32_data():
+            print("    Converting to 32-bit...")
             train_time_series = train_time_series.astype(np.float32)
             test_time_series = test_time_series.astype(np.float32)
             train_price_series = train_price_series.astype(np.float32)
@@ -384,6 +419,9 @@ class ClassifierDarts():
 
         self.is_trained = True
 
+        # use the same (training span) scaling for backtest and predict
+        self.series_cache.fit_scalers(self.curr_pair, df_train, self.target_column)
+
         return
 
     # ---------------------------
@@ -404,45 +442,23 @@ class ClassifierDarts():
             print(f"  train_cols:{self.train_cols}")
             print(f"  predict_cols:{predict_cols}")
 
-        # use the whole dataframe the 'covariate' series
-        df = dataframe.copy()
-        df['date'] = pd.to_datetime(df.date).dt.tz_localize(None)
-
-        # convert closing price column to time series & scale
-        price_series = darts.TimeSeries.from_dataframe(df, time_col='date', value_cols=self.target_column)
-        price_scaler = Scaler(RobustScaler())
-        price_scaler = price_scaler.fit(price_series)
-        price_series = price_scaler.transform(price_series)
-
-        # convert dataframe to timeseries
-        df_time_series = darts.TimeSeries.from_dataframe(df, time_col='date')
-
-        # convert to 32-bit (allows use of GPU)
-        if self.is_gpu_available():
-            price_series = price_series.astype(np.float32)
-            df_time_series = df_time_series.astype(np.float32)
-
-        # scale the dataframe
-        df_scaler = Scaler(RobustScaler())
-        covariate_series = df_scaler.fit_transform(df_time_series)
+        # use the whole dataframe as the 'covariate' series. Scaled using the training span, and cached per pair
+        price_series, covariate_series = self.series_cache.get_series(self.curr_pair, dataframe, self.target_column)
 
         # print(f'    dataframe:{np.shape(dataframe)}')
         # print(f'    covariate_series:{covariate_series.n_samples}, {covariate_series.n_timesteps}, {covariate_series.n_components}')
         # print(f'    price_series:{price_series.n_samples}, {price_series.n_timesteps}, {price_series.n_components}')
 
-        time_est = dataframe.shape[0] / (200.0 * 60.0)  # ~200 it/sec
-        print(f"    backtesting {dataframe.shape[0]} samples. Estimated time:{time_est:.2f} (mins)")
+        num_forecasts = max(1, (dataframe.shape[0] - self.lookback) // self.get_forecast_stride(dataframe.shape[0]))
+        print(f"    backtesting {dataframe.shape[0]} samples ({num_forecasts} forecasts, " +
+              f"batch size: {self.forecast_batch_size})")
         # run backtesting
 
         with torch.inference_mode():
             preds = self.model_historical_forecasts(self.model, price_series, covariate_series)
 
         # reverse scaling
-        preds2 = price_scaler.inverse_transform(preds)
-
-        # get the underlying dataframe and column
-        df = preds2.pd_dataframe()
-        scaled_preds = np.array(df[self.target_column])
+        scaled_preds = self.series_cache.inverse_target(self.curr_pair, preds.values()[:, 0])
 
         # predictions = np.zeros(np.shape(dataframe)[0])
         predictions = np.array(dataframe[self.target_column])
@@ -479,31 +495,8 @@ class ClassifierDarts():
             print(f"  train_cols:{self.train_cols}")
             print(f"  predict_cols:{predict_cols}")
 
-        # use the whole dataframe the 'covariate' series
-        df = dataframe.copy()
-        df['date'] = pd.to_datetime(df.date).dt.tz_localize(None)
-
-        # convert closing price column to time series & scale
-        price_series = darts.TimeSeries.from_dataframe(df, time_col='date', value_cols=self.target_column)
-        price_scaler = Scaler(RobustScaler())
-        price_scaler = price_scaler.fit(price_series)
-        price_series = price_scaler.transform(price_series)
-
-        # convert dataframe to timeseries
-        df_time_series = darts.TimeSeries.from_dataframe(df, time_col='date')
-
-        # # convert to 32-bit (allows use of GPU)
-        # if self.is_gpu_available():
-        #     price_series = price_series.astype(np.float32)
-        #     df_time_series = df_time_series.astype(np.float32)
-
-        # workaround for GPU bug: always convert to 32-bit
-        price_series = price_series.astype(np.float32)
-        df_time_series = df_time_series.astype(np.float32)
-
-        # scale the dataframe
-        df_scaler = Scaler(RobustScaler())
-        covariate_series = df_scaler.fit_transform(df_time_series)
+        # use the whole dataframe as the 'covariate' series. Only candles that are not already cached are converted
+        price_series, covariate_series = self.series_cache.get_series(self.curr_pair, dataframe, self.target_column)
 
         self.trainer = Trainer(accelerator='mps', devices=1)
         # print(f'Prediction data size: {np.shape(df)}')
@@ -518,11 +511,7 @@ class ClassifierDarts():
         # preds_series = darts.TimeSeries.from_series(scaled_preds)
 
         # reverse scaling
-        preds2 = price_scaler.inverse_transform(preds)
-
-        # get the underlying dataframe and column
-        df = preds2.pd_dataframe()
-        scaled_preds = np.array(df[self.target_column])
+        scaled_preds = self.series_cache.inverse_target(self.curr_pair, preds.values()[:, 0])
 
         predictions = scaled_preds
 
@@ -651,6 +640,7 @@ class ClassifierDarts():
             print("    loading from: ", self.model_path)
             # self.model = joblib.load(self.model_path)
             self.model = self.load_from_file(self.model_path, use_gpu=self.is_gpu_available())
+            self.model = self.match_model_precision(self.model)
             self.loaded_from_file = True
             self.is_trained = True
             print(f'Model: {self.model_path}')
@@ -711,6 +701,11 @@ class ClassifierDarts():
 
     # ---------------------------
 
+    def supports_batch_prediction(self) -> bool:
+        return self.batch_prediction
+
+    # ---------------------------
+
     def new_model_created(self) -> bool:
         return ClassifierDarts.new_model  # note use of class-level variable
 
@@ -727,6 +722,41 @@ class ClassifierDarts():
 
     # ---------------------------
 
+    # True if series (and models) should be 32-bit
+    def use_float32_data(self) -> bool:
+        return self.use_float32 or self.is_gpu_available()
+
+    # ---------------------------
+
+    def get_forecast_horizon(self) -> int:
+        return self.forecast_horizon if self.forecast_horizon > 0 else self.lookahead
+
+    def get_forecast_stride(self, num_timesteps) -> int:
+        return self.forecast_stride if self.forecast_stride > 0 else num_timesteps
+
+    # ---------------------------
+
+    # args passed to model.predict() by historical_forecasts()
+    def get_predict_args(self):
+        return {'batch_size': self.forecast_batch_size}
+
+    # ---------------------------
+
+    # models saved from 64-bit series would otherwise reject (or run slowly with) 32-bit series, so cast them
+    def match_model_precision(self, model):
+        if (model is None) or (not self.use_float32_data()):
+            return model
+
+        module = getattr(model, 'model', None)
+        if (module is not None) and (module.dtype == torch.float64):
+            print("    Converting model to 32-bit...")
+            module.to_dtype(torch.float32)
+            model.trainer_params['precision'] = self.trainer_args['precision']
+
+        return model
+
+    # ---------------------------
+
     # Median Absolute Deviation
     def mad_score(self, points):
         """https://www.itl.nist.gov/div898/handbook/eda/section3/eda35h.htm """
@@ -17,10 +17,14 @@
 import multiprocessing
 
 import torch
+
+import darts
 import pytorch_lightning
 
 from pytorch_lightning import Trainer
 import numpy as np
+from darts.dataprocessing.transformers import Scaler
+from darts.models import NBEATSModel
 from pandas import DataFrame, Series
 import pandas as pd
 
@@ -65,6 +69,7 @@ random.seed(seed)
 np.random.seed(seed)
 
 from DataframeUtils import DataframeUtils
+from DartsSeriesCache import DartsSeriesCache
 
 
 # ---------------------------
@@ -94,6 +99,7 @@ class ClassifierPyTorch():
     requires_dataframes = True  # set to True if classifier takes dataframes rather than tensors
     prescale_dataframe = False  # set to True if algorithms need dataframes to be pre-scaled
     single_prediction = True  # True if algorithm only produces 1 prediction (not entire data array)
+    batch_prediction = True  # True if predict_batch() can process multiple dataframes in a single call
 
     trainer = None
     num_cpus = 1
@@ -101,6 +107,9 @@ class ClassifierPyTorch():
 
     train_cols = []  # used for debug
 
+    curr_pair = ""  # key for the series cache (set via set_pair())
+    series_cache = None  # scaled TimeSeries and scalers for each pair
+
     # ---------------------------
 
     # Note: pair is needed because we cannot combine model across pairs because of huge price differences
@@ -163,6 +172,10 @@ class ClassifierPyTorch():
 
         print(f"    CPUs:{self.num_cpus} GPU:{self.is_gpu_available()}")
 
+        # target and covariates are scaled using the training span
+        self.series_cache = DartsSeriesCache(covariate_scaler=RobustScaler, target_scaler=RobustScaler,
+                                             use_float32=self.is_gpu_available())
+
     # ---------------------------
 
     # set model name - this overrides the default naming. This allows the strategy to set the naming convention
@@ -188,6 +201,12 @@ class ClassifierPyTorch():
 
     # ---------------------------
 
+    # set the current pair. Scalers and cached series are kept separately for each pair
+    def set_pair(self, pair):
+        self.curr_pair = pair
+
+    # ---------------------------
+
     # create model - subclasses should overide this
     def create_model(self, seq_len, num_features):
 
@@ -215,6 +234,9 @@ class ClassifierPyTorch():
 
         # just return if model has already been trained, unless force_train is set, or this was a new model
         if self.model_is_trained() and (not force_train) and (not self.new_model_created()):
+            # still need scalers for this pair (fitted on the training span only)
+            if not self.series_cache.has_scalers(self.curr_pair):
+                self.series_cache.fit_scalers(self.curr_pair, df_train, 'close')
             return
 
         # no model? Create it from scratch
@@ -311,6 +333,9 @@ class ClassifierPyTorch():
 
         self.is_trained = True
 
+        # use the same (training span) scaling for backtest and predict
+        self.series_cache.fit_scalers(self.curr_pair, df_train, 'close')
+
         return
 
     # ---------------------------
@@ -331,27 +356,8 @@ class ClassifierPyTorch():
             print(f"  train_cols:{self.train_cols}")
             print(f"  predict_cols:{predict_cols}")
 
-        # use the whole dataframe the 'covariate' series
-        df = dataframe.copy()
-        df['date'] = pd.to_datetime(df.date).dt.tz_localize(None)
-
-        # convert closing price column to time series & scale
-        price_series = darts.TimeSeries.from_dataframe(df, time_col='date', value_cols='close')
-        price_scaler = Scaler(RobustScaler())
-        price_scaler = price_scaler.fit(price_series)
-        price_series = price_scaler.transform(price_series)
-
-        # convert dataframe to timeseries
-        df_time_series = darts.TimeSeries.from_dataframe(df, time_col='date')
-
-        # convert to 32-bit (allows use of GPU)
-        if self.is_gpu_available():
-            price_series = price_series.astype(np.float32)
-            df_time_series = df_time_series.astype(np.float32)
-
-        # scale the dataframe
-        df_scaler = Scaler(RobustScaler())
-        covariate_series = df_scaler.fit_transform(df_time_series)
+        # use the whole dataframe as the 'covariate' series. Scaled using the training span, and cached per pair
+        price_series, covariate_series = self.series_cache.get_series(self.curr_pair, dataframe, 'close')
 
         time_est = dataframe.shape[0] / 600.0 # ~10 it/sec
         print(f"    backtesting {dataframe.shape[0]} samples. Estimated time:{time_est:.2f} (mins)")
@@ -366,11 +372,7 @@ class ClassifierPyTorch():
                                                     verbose=False)
 
         # reverse scaling
-        preds2 = price_scaler.inverse_transform(preds)
-
-        # get the underlying dataframe and column
-        df = preds2.pd_dataframe()
-        scaled_preds = np.array(df['close'])
+        scaled_preds = self.series_cache.inverse_target(self.curr_pair, preds.values()[:, 0])
 
         # predictions = np.zeros(np.shape(dataframe)[0])
         predictions = np.array(dataframe['close'])
@@ -407,32 +409,8 @@ class ClassifierPyTorch():
             print(f"  train_cols:{self.train_cols}")
             print(f"  predict_cols:{predict_cols}")
 
-        # use the whole dataframe the 'covariate' series
-        df = dataframe.copy()
-        df['date'] = pd.to_datetime(df.date).dt.tz_localize(None)
-
-
-        # convert closing price column to time series & scale
-        price_series = darts.TimeSeries.from_dataframe(df, time_col='date', value_cols='close')
-        price_scaler = Scaler(RobustScaler())
-        price_scaler = price_scaler.fit(price_series)
-        price_series = price_scaler.transform(price_series)
-
-        # convert dataframe to timeseries
-        df_time_series = darts.TimeSeries.from_dataframe(df, time_col='date')
-
-        # # convert to 32-bit (allows use of GPU)
-        # if self.is_gpu_available():
-        #     price_series = price_series.astype(np.float32)
-        #     df_time_series = df_time_series.astype(np.float32)
-
-        # workaround for GPU bug: always convert to 32-bit
-        price_series = price_series.astype(np.float32)
-        df_time_series = df_time_series.astype(np.float32)
-
-        # scale the dataframe
-        df_scaler = Scaler(RobustScaler())
-        covariate_series = df_scaler.fit_transform(df_time_series)
+        # use the whole dataframe as the 'covariate' series. Only candles that are not already cached are converted
+        price_series, covariate_series = self.series_cache.get_series(self.curr_pair, dataframe, 'close')
 
         self.trainer = Trainer(accelerator='mps', devices=1)
         # print(f'Prediction data size: {np.shape(df)}')
@@ -452,11 +430,7 @@ class ClassifierPyTorch():
         # preds_series = darts.TimeSeries.from_series(scaled_preds)
 
         # reverse scaling
-        preds2 = price_scaler.inverse_transform(preds)
-
-        # get the underlying dataframe and column
-        df = preds2.pd_dataframe()
-        scaled_preds = np.array(df['close'])
+        scaled_preds = self.series_cache.inverse_target(self.curr_pair, preds.values()[:, 0])
 
         predictions = scaled_preds
 
@@ -464,6 +438,37 @@ class ClassifierPyTorch():
 
     # ---------------------------
 
+    # get predictions for a list of dataframes (e.g. rolling windows) in a single call to the model. Series come from
+    # the cache (scaled using the training span), so overlapping windows only convert their new candles.
+    # Returns the last prediction for each dataframe
+    def predict_batch(self, dataframes: list) -> np.ndarray:
+
+        if self.model is None:
+            print("    ERR: no model")
+            return np.zeros(len(dataframes))
+
+        price_list = []
+        covariate_list = []
+        for dataframe in dataframes:
+            price_series, covariate_series = self.series_cache.get_series(self.curr_pair, dataframe, 'close')
+            price_list.append(price_series)
+            covariate_list.append(covariate_series)
+
+        with torch.inference_mode():
+            preds = self.model.predict(n=self.lookahead,
+                                       series=price_list,
+                                       past_covariates=covariate_list,
+                                       batch_size=self.batch_size,
+                                       verbose=False)
+
+        # reverse scaling, then take the last prediction for each series
+        last_preds = np.array([p.values()[-1, 0] for p in preds], dtype=float)
+        predictions = self.series_cache.inverse_target(self.curr_pair, last_preds)
+
+        return predictions
+
+    # ---------------------------
+
     # evaluate model using the supplied (normalised) dataframe as test data.
     def evaluate(self, df_norm: DataFrame):
 
@@ -634,6 +639,11 @@ class ClassifierPyTorch():
 
     # ---------------------------
 
+    def supports_batch_prediction(self) -> bool:
+        return self.batch_prediction
+
+    # ---------------------------
+
     def new_model_created(self) -> bool:
         return ClassifierDarts.new_model  # note use of class-level variable
 
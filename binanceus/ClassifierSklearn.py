@@ -69,8 +69,14 @@ class ClassifierSklearn():
     requires_dataframes = True  # set to True if classifier takes dataframes rather than tensors
     prescale_dataframe = False  # set to True if algorithms need dataframes to be pre-scaled
     single_prediction = False  # True if alogorithm only produces 1 prediction (not entire data array)
+    batch_prediction = False  # True if predict_batch() can process multiple dataframes in a single call
     use_scores = True # True if model supports scoring of results (ensembles do not)
 
+    incremental = False  # True if the model is updated with new samples (partial_fit) rather than refitted
+    train_dates = None  # dates of the training samples (set via set_train_dates()). Used by incremental models
+    last_train_date = None  # date of the latest sample used for training (incremental models)
+    live_mode = False  # True in live/dry-run modes. Only then are incremental models updated and their state saved
+
     def __init__(self, pair, tag=""):
         super().__init__()
 
@@ -111,6 +117,15 @@ class ClassifierSklearn():
 
         return self.model_path
 
+    # set the current pair. Only used by classifiers that cache data for each pair
+    def set_pair(self, pair):
+        pass
+
+    # set the dates of the training samples (same length as the training data). Incremental models use these to
+    # identify the samples that are new since the last fit
+    def set_train_dates(self, dates):
+        self.train_dates = None if dates is None else pd.to_datetime(pd.Series(dates)).reset_index(drop=True)
+
     # create classifier - subclasses should overide this
     def create_classifier(self):
 
@@ -125,14 +140,54 @@ class ClassifierSklearn():
     def model_fit(self, df, labels):
         return self.model.fit(df, labels)
 
+    # update the model with new samples (incremental models only, can be overridden)
+    def model_partial_fit(self, df, labels):
+        return self.model.partial_fit(df, labels)
+
     # run predciction (can be overridden)
     def model_predict(self, df):
         return self.model.predict(df)
 
+    # number of samples at the end of the training data that are newer than the last fit, or -1 if the model needs a
+    # full fit (not trained yet, no dates, or all of the data is new)
+    def get_num_new_samples(self, num_samples) -> int:
+        if (not self.is_trained) or (self.last_train_date is None) or (self.train_dates is None):
+            return -1
+        if len(self.train_dates) != num_samples:
+            return -1
+        num_new = int((self.train_dates > self.last_train_date).sum())
+        return num_new if num_new < num_samples else -1
+
+    # set live mode (live/dry-run). In other modes (backtest, hyperopt, plot...) incremental models are always refitted,
+    # and the saved state is neither loaded (it may be trained on data later than the run) nor overwritten
+    def set_live_mode(self, live_mode):
+        self.live_mode = live_mode
+
+    # record the latest training date and, in live mode, save the model state, so that a restart can carry on
+    # updating the model rather than refitting it
+    def update_state(self, persist):
+        if self.train_dates is not None:
+            self.last_train_date = self.train_dates.iloc[-1]
+        if persist:
+            path = self.get_state_path()
+            joblib.dump({'model': self.model, 'last_train_date': self.last_train_date}, path)
+
     # update training using the suplied (normalised) dataframe. Training is cumulative
     # the 'labels' args should contain 0.0 for normal results, '1.0' for anomalies (buy or sell)
     def train(self, df_train_norm: DataFrame, df_test_norm: DataFrame, train_labels, test_labels, force_train=False):
 
+        # incremental models just need to be updated with the samples that are new since the last fit (live mode only)
+        if self.incremental and self.live_mode and (not force_train):
+            if self.model is None:
+                self.load_state()
+            num_new = self.get_num_new_samples(np.shape(df_train_norm)[0])
+            if num_new >= 0:
+                if num_new > 0:
+                    self.model = self.model_partial_fit(df_train_norm.iloc[-num_new:],
+                                                        np.asarray(train_labels)[-num_new:])
+                    self.update_state(persist=True)
+                return
+
         # NOTE: sklearn algorithms are *not* cumulative or reusable, so need to re-train each time
         # # already trained? Just return
         # if self.is_trained and (force_train == False):
@@ -168,6 +223,9 @@ class ClassifierSklearn():
 
         self.is_trained = True
 
+        if self.incremental:
+            self.update_state(persist=self.live_mode)
+
         return
 
     # evaluate model using the supplied (normalised) dataframe as test data.
@@ -246,6 +304,15 @@ class ClassifierSklearn():
         model_path = save_dir + self.name + ".sav"
         return model_path
 
+    # returns path to the saved state of an incremental model (model plus latest training date)
+    def get_state_path(self):
+        root_dir = self.get_model_root_dir()
+        save_dir = root_dir + self.category + '/'
+        if not os.path.exists(save_dir):
+            os.makedirs(save_dir)
+        state_path = save_dir + self.name + "_state.sav"
+        return state_path
+
     def get_checkpoint_path(self):
         checkpoint_dir = '/tmp' + "/" + self.name + "/"
         if not os.path.exists(checkpoint_dir):
@@ -291,6 +358,17 @@ class ClassifierSklearn():
                 self.new_model = True
         return self.model
 
+    # load the saved state of an incremental model, if present
+    def load_state(self):
+        path = self.get_state_path()
+        if os.path.exists(path):
+            print("    loading state from: ", path)
+            state = joblib.load(path)
+            self.model = state['model']
+            self.last_train_date = state['last_train_date']
+            self.is_trained = True
+        return self.model
+
     def model_exists(self) -> bool:
         path = self.get_model_path()
         return os.path.exists(path)
@@ -311,5 +389,11 @@ class ClassifierSklearn():
     def returns_single_prediction(self) -> bool:
         return self.single_prediction
 
+    def supports_batch_prediction(self) -> bool:
+        return self.batch_prediction
+
+    def supports_incremental_training(self) -> bool:
+        return self.incremental
+
     def new_model_created(self) -> bool:
         return ClassifierSklearn.new_model  # note use of class-level variable
@@ -38,6 +38,7 @@ warnings.simplefilter(action='ignore', category=pd.errors.PerformanceWarning)
 
 
 from DataframeUtils import DataframeUtils, ScalerType
+import RollingWavelet
 import pywt
 import talib.abstract as ta
 
@@ -193,7 +194,7 @@ class DWT_Predict(IStrategy):
 
         # # build the DWT
         # print("    Building DWT...")
-        # dataframe['model_model'] = dataframe['close'].rolling(window=self.model_window).apply(self.model)
+        # dataframe['model_model'] = self.rolling_model(dataframe['close'])
 
         # RSI
         dataframe['rsi'] = ta.RSI(dataframe, timeperiod=self.win_size)
@@ -265,42 +266,21 @@ class DWT_Predict(IStrategy):
 
         # the choice of wavelet makes a big difference
         # for an overview, check out: https://www.kaggle.com/theoviel/denoising-with-direct-wavelet-transform
-        # wavelet = 'db1'
-        # wavelet = 'bior1.1'
-        wavelet = 'haar'  # deals well with harsh transitions
-        level = 2
-        wmode = "smooth"
-        length = len(data)
-
-        coeff = pywt.wavedec(data, wavelet, mode=wmode)
-
-        # remove higher harmonics
-        sigma = (1 / 0.6745) * self.madev(coeff[-level])
-        uthresh = sigma * np.sqrt(2 * np.log(length))
-        coeff[1:] = (pywt.threshold(i, value=uthresh, mode='hard') for i in coeff[1:])
-
-        # inverse transform
-        model = pywt.waverec(coeff, wavelet, mode=wmode)
-
-        return model
+        # 'haar' deals well with harsh transitions
+        model = RollingWavelet.dwt_model(np.asarray(data, dtype=float)[np.newaxis, :], wavelet='haar',
+                                         threshold_level=2, wmode="smooth", tmode="hard")
+        return model[0]
 
     def model(self, a: np.ndarray) -> float:
         # must return scalar, so just calculate prediction and take last value
-        # model = self.dwtModel(np.array(a))
-
-        # de-trend the data
-        w_mean = a.mean()
-        w_std = a.std()
-        x_notrend = (a - w_mean) / w_std
-
-        # get DWT model of data
-        restored_sig = self.dwtModel(x_notrend)
-
-        # re-trend
-        model = (restored_sig * w_std) + w_mean
-
-        length = len(model)
-        return model[length - 1]
+        return self.rolling_model(a, window=len(a))[-1]
+
+    # DWT model of every window of data (same as rolling(window=self.model_window).apply(self.model), but batched)
+    def rolling_model(self, data, window=0) -> np.ndarray:
+        if window <= 0:
+            window = self.model_window
+        return RollingWavelet.rolling_dwt(data, window, wavelet='haar', threshold_level=2, wmode="smooth",
+                                          tmode="hard")
 
     ###################################
 
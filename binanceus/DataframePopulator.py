@@ -8,7 +8,6 @@ import math
 import numpy as np
 import pandas as pd
 
-import pywt
 import talib.abstract as ta
 from scipy.ndimage import gaussian_filter1d
 
@@ -36,6 +35,7 @@ from finta import TA as fta
 import legendary_ta as lta
 
 from DataframeUtils import DataframeUtils
+import RollingWavelet
 from scipy.stats import linregress
 
 
@@ -56,6 +56,8 @@ class DataframePopulator():
 
     startup_win = 128  # should be a power of 2
     win_size = 14
+    dwt_wavelet = 'db8'  # wavelet used for the 'dwt' column
+    dwt_level = 1        # level of the detail coefficients used to calculate the DWT threshold
     runmode = ""  # set this to self.dp.runmode.value
 
     n_profit_stddevs = 0.0
@@ -129,7 +131,9 @@ class DataframePopulator():
         # if in backtest or hyperopt, then we have to do rolling calculations
         if self.runmode in ('hyperopt', 'backtest', 'plot'):
             # dataframe['dwt'] = dataframe['close'].rolling(window=self.startup_win).apply(self.roll_get_dwt)
-            dataframe['dwt'] = dataframe['mid'].rolling(window=self.startup_win).apply(self.roll_get_dwt)
+            # dataframe['dwt'] = dataframe['mid'].rolling(window=self.startup_win).apply(self.roll_get_dwt)
+            dataframe['dwt'] = RollingWavelet.rolling_dwt(dataframe['mid'], self.startup_win,
+                                                          wavelet=self.dwt_wavelet, threshold_level=self.dwt_level)
         else:
             # dataframe['dwt'] = self.get_dwt(dataframe['close'])
             dataframe['dwt'] = self.get_dwt(dataframe['mid'])
@@ -762,33 +766,10 @@ class DataframePopulator():
 
         # the choice of wavelet makes a big difference
         # for an overview, check out: https://www.kaggle.com/theoviel/denoising-with-direct-wavelet-transform
-        # wavelet = 'db1'
-        wavelet = 'db8'
-        # wavelet = 'bior1.1'
-        # wavelet = 'haar'  # deals well with harsh transitions
-        level = 1
-        wmode = "smooth"
-        tmode = "hard"
-        length = len(data)
-
-        # Apply DWT transform
-        coeff = pywt.wavedec(data, wavelet, mode=wmode)
-
-        # remove higher harmonics
-        std = np.std(coeff[level])
-        sigma = (1 / 0.6745) * self.madev(coeff[-level])
-        # sigma = madev(coeff[-level])
-        uthresh = sigma * np.sqrt(2 * np.log(length))
-
-        coeff[1:] = (pywt.threshold(i, value=uthresh, mode=tmode) for i in coeff[1:])
-
-        # inverse DWT transform
-        model = pywt.waverec(coeff, wavelet, mode=wmode)
-
-        # there is a known bug in waverec where odd numbered lengths result in an extra item at the end
-        diff = len(model) - len(data)
-        return model[0:len(model) - diff]
-        # return model[diff:]
+        # Uses the same (batched) code as the rolling version, with a single window
+        model = RollingWavelet.dwt_model(np.asarray(data, dtype=float)[np.newaxis, :], wavelet=self.dwt_wavelet,
+                                         threshold_level=self.dwt_level, wmode="smooth", tmode="hard")
+        return model[0]
 
     def madev(self, d, axis=None):
         """ Mean absolute deviation of a signal """
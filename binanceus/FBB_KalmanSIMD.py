@@ -35,6 +35,8 @@ warnings.simplefilter(action='ignore', category=pd.errors.PerformanceWarning)
 import custom_indicators as cta
 
 from  simdkalman import KalmanFilter
+from RollingKalman import RollingKalman
+from KalmanParamStore import KalmanParamStore
 
 
 """
@@ -80,8 +82,8 @@ class FBB_KalmanSIMD(IStrategy):
     process_only_new_candles = True
 
     custom_trade_info = {}
-    filter_list = {}
-    filter_init_list = {}
+    kf_engines = {}  # RollingKalman engine (and filter) for each pair
+    kf_store = None  # fitted filter parameters for all pairs (see KalmanParamStore)
 
     kalman_filter = KalmanFilter(
                 state_transition=1.0,
@@ -174,20 +176,26 @@ class FBB_KalmanSIMD(IStrategy):
 
         self.current_pair = curr_pair
 
-        # create if not already done
-        if not curr_pair in self.filter_list:
-            self.filter_list[curr_pair] = kalman_filter = KalmanFilter(
+        # parameters are only saved/loaded in live modes, so that backtests do not overwrite them
+        if self.kf_store is None:
+            persist = self.dp.runmode.value in ('dry_run', 'live')
+            self.kf_store = KalmanParamStore(self.get_kf_param_file(), self.kf_window, persist=persist)
+
+        # create if not already done. Filter parameters are fitted (and refreshed) by the store
+        if not curr_pair in self.kf_engines:
+            kalman_filter = KalmanFilter(
                 state_transition=1.0,
                 process_noise=2.0,
                 observation_model=1.0,
                 observation_noise=0.5
             )
-            self.filter_init_list[curr_pair] = False
-
-        # set current filter (can't pass parameter to apply())
-        self.kalman_filter = self.filter_list[curr_pair]
+            key = KalmanParamStore.make_key(curr_pair, self.inf_timeframe)
+            self.kf_engines[curr_pair] = RollingKalman(kalman_filter, self.kf_window, store=self.kf_store, key=key)
 
-        informative['kf_model'] = informative['close'].rolling(window=self.kf_window).apply(self.model)
+        # model all windows in one batch (only new windows, if this pair has been seen before)
+        engine = self.kf_engines[curr_pair]
+        informative['kf_model'] = engine.update(informative['date'], informative['close'])
+        self.kalman_filter = engine.kfilter
         # informative['kf_predict'] = informative['kf_model'].rolling(window=self.kf_window).apply(self.predict)
         # informative['stddev'] = informative['close'].rolling(window=self.kf_window).std()
 
@@ -254,31 +262,17 @@ class FBB_KalmanSIMD(IStrategy):
 
     ###################################
 
+    # file used to save the fitted Kalman parameters
+    def get_kf_param_file(self) -> str:
+        return str(Path(__file__).parent / "models" / self.__class__.__name__ / "kalman_params.json")
+
     def madev(self, d, axis=None):
         """ Mean absolute deviation of a signal """
         return np.mean(np.absolute(d - np.mean(d, axis)), axis)
 
+    # Kalman model of a single window (see RollingKalman for the batched version used in populate_indicators)
     def model(self, a: np.ndarray) -> float:
-        # scale the data
-        standardized = a.copy()
-        w_mean = np.mean(standardized)
-        w_std = np.std(standardized)
-        scaled = (standardized - w_mean) / w_std
-        scaled.fillna(0, inplace=True)
-
-        # init filter if needed
-        if not self.filter_init_list[self.current_pair]:
-            self.filter_init_list[self.current_pair] = True
-            self.filter_list[self.current_pair] = self.filter_list[self.current_pair].em(scaled, n_iter=6)
-
-        # get the Kalman model
-        restored_sig = self.kalmanModel(scaled, self.kalman_filter)
-
-        # re-trend
-        model = (restored_sig * w_std) + w_mean
-
-        length = len(model)
-        return model[length - 1]
+        return self.kf_engines[self.current_pair].model(np.asarray(a, dtype=float).reshape(1, -1))[0]
 
     def scaledModel(self, a: np.ndarray) -> float:
         # must return scalar, so just calculate prediction and take last value
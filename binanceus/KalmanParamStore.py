@@ -0,0 +1,148 @@
+# KalmanParamStore - fitted Kalman filter parameters, per pair and timeframe
+#
+# The filter parameters are estimated (EM) on a training span of standardised windows, then kept until:
+#   - refresh_hours have passed since the last fit, or
+#   - the volatility of the most recent candles differs from the volatility at fit time by more than
+#     regime_threshold (i.e. a regime change), or
+#   - the previous fit had less than train_len candles available (e.g. at the start of a backtest) and there are
+#     now enough
+#
+# If persist is True (live/dry-run), parameters are saved to (and loaded from) a json file, so that a restart does not
+# need to re-run EM. Backtests keep the parameters in memory only, so that historical fits never overwrite the live
+# parameters.
+
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from simdkalman import KalmanFilter
+
+
+class KalmanParamStore():
+
+    train_len = 512          # number of candles used for fitting
+    em_iterations = 6        # number of EM iterations per fit
+    refresh_hours = 24 * 7   # refit after this long
+    regime_len = 96          # number of recent candles used to check for a regime change
+    regime_threshold = 2.0   # refit if volatility changes by more than this factor
+
+    param_names = ['state_transition', 'process_noise', 'observation_model', 'observation_noise']
+
+    def __init__(self, file_name: str, window: int, persist=False):
+        self.file_name = file_name
+        self.window = window
+        self.persist = persist
+        self.params = {}   # key -> dict of parameters and fit info
+        self.filters = {}  # key -> KalmanFilter
+
+        if self.persist:
+            self.load()
+
+    @staticmethod
+    def make_key(pair: str, timeframe: str) -> str:
+        return f"{pair}|{timeframe}"
+
+    # volatility of the log returns of data
+    @staticmethod
+    def volatility(data: np.ndarray) -> float:
+        data = data[data > 0]
+        if len(data) < 3:
+            return 0.0
+        return float(np.std(np.diff(np.log(data))))
+
+    # check whether the parameters for key need to be (re-)fitted, given data up to (and including) pos
+    def refit_needed(self, key, dates, data, pos) -> bool:
+        if key not in self.params:
+            return True
+
+        info = self.params[key]
+
+        if (info['fit_len'] < self.train_len) and (pos + 1 >= self.train_len):
+            return True
+
+        elapsed = pd.Timestamp(dates[pos]) - pd.Timestamp(info['fit_date'])
+        if elapsed >= pd.Timedelta(hours=self.refresh_hours):
+            return True
+
+        if (info['fit_vol'] > 0.0) and (pos + 1 >= self.regime_len):
+            ratio = self.volatility(data[pos + 1 - self.regime_len:pos + 1]) / info['fit_vol']
+            if (ratio > self.regime_threshold) or (ratio < 1.0 / self.regime_threshold):
+                return True
+
+        return False
+
+    # fit the parameters for key to the training span ending at pos. All windows in the span are used (as separate
+    # series), each standardised in the same way as for modelling
+    def fit(self, key, base_filter: KalmanFilter, dates, data, pos) -> KalmanFilter:
+        start = max(0, pos + 1 - self.train_len)
+        span = np.asarray(data[start:pos + 1], dtype=float)
+
+        windows = sliding_window_view(span, self.window)
+        w_mean = np.mean(windows, axis=1, keepdims=True)
+        w_std = np.std(windows, axis=1, keepdims=True)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            scaled = np.nan_to_num((windows - w_mean) / w_std, nan=0.0, posinf=0.0, neginf=0.0)
+
+        # adjacent windows are almost identical, so use non-overlapping ones (plus the last one)
+        idx = np.unique(np.append(np.arange(0, len(scaled), self.window), len(scaled) - 1))
+        fitted = base_filter.em(scaled[idx], n_iter=self.em_iterations)
+
+        # EM estimates the noise separately for each series, so average them to get one set of parameters
+        params = {}
+        for name in self.param_names:
+            value = np.asarray(getattr(fitted, name))
+            params[name] = np.mean(value, axis=0, keepdims=True) if value.ndim == 3 else value
+        kfilter = KalmanFilter(**params)
+
+        self.filters[key] = kfilter
+        self.params[key] = {name: params[name].tolist() for name in self.param_names}
+        self.params[key]['fit_date'] = str(pd.Timestamp(dates[pos]))
+        self.params[key]['fit_len'] = len(span)
+        self.params[key]['fit_vol'] = self.volatility(span[-self.regime_len:])
+
+        if self.persist:
+            self.save()
+
+        return kfilter
+
+    # returns the filter to use for windows ending at pos (fitting first, if needed)
+    def get_filter(self, key, base_filter: KalmanFilter, dates, data, pos) -> KalmanFilter:
+        if self.refit_needed(key, dates, data, pos):
+            return self.fit(key, base_filter, dates, data, pos)
+
+        if key not in self.filters:
+            info = self.params[key]
+            self.filters[key] = KalmanFilter(**{name: np.array(info[name]) for name in self.param_names})
+
+        return self.filters[key]
+
+    # index of the first position after pos at which the parameters might need to be refitted
+    def next_check(self, key, dates, pos) -> int:
+        next_pos = pos + self.regime_len
+        info = self.params[key]
+        if info['fit_len'] < self.train_len:
+            next_pos = min(next_pos, self.train_len - 1)
+        refresh_date = pd.Timestamp(info['fit_date']) + pd.Timedelta(hours=self.refresh_hours)
+        refresh_pos = int(pd.DatetimeIndex(dates).searchsorted(refresh_date))
+        return max(pos + 1, min(next_pos, refresh_pos))
+
+    def load(self):
+        if not os.path.isfile(self.file_name):
+            return
+        try:
+            with open(self.file_name, 'r') as f:
+                self.params = json.load(f)
+            print(f"    Loaded Kalman parameters for {len(self.params)} pairs from {self.file_name}")
+        except (OSError, ValueError) as e:
+            print(f"    Error loading Kalman parameters from {self.file_name}: {e}")
+            self.params = {}
+
+    def save(self):
+        Path(self.file_name).parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = self.file_name + ".tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump(self.params, f, indent=4)
+        os.replace(tmp_file, self.file_name)
@@ -161,6 +161,12 @@ class NNPredict(IStrategy):
     batch_size = 1024  # batch size for training
     predict_batch_size = 512
 
+    # rolling predictions (classifiers that only return a single prediction)
+    rolling_window = 64  # number of rows passed to the model for each prediction
+    rolling_stride = 1  # predict every N rows (the latest prediction is held in between). >1 speeds up long backtests
+    rolling_batch_size = 256  # max number of windows per call to the model (if the classifier supports batches)
+    rolling_retrain_interval = 0  # re-train the model every N rows during rolling predictions (0 = never)
+
     classifier_list = {}  # classifier for each pair
     curr_classifier = None
     init_done = {}  # flags whether initialisation has been done for a pair or not
@@ -417,6 +423,9 @@ class NNPredict(IStrategy):
             if not self.curr_classifier:
                 self.curr_classifier = self.make_classifier(self.curr_pair, self.seq_len, nfeatures)
 
+        # some classifiers keep data (scalers, series etc.) for each pair
+        self.curr_classifier.set_pair(self.curr_pair)
+
         if self.curr_classifier.prescale_data():
             df_norm = self.dataframeUtils.norm_dataframe(dataframe)
         else:
@@ -788,7 +797,8 @@ class NNPredict(IStrategy):
         dataframe['predict'] = predictions
         return dataframe
 
-    # run prediction in rolling fashion (one result at a time -> slow) over the entire history
+    # run prediction in rolling fashion over the entire history. Each prediction only sees a fixed-size window of
+    # data ending at that row, so run time is linear in the size of the dataframe
     def add_model_rolling_predictions(self, dataframe: DataFrame) -> DataFrame:
 
         print("    Adding rolling predictions. Might take a while...")
@@ -806,28 +816,53 @@ class NNPredict(IStrategy):
         else:
             df_norm = dataframe
 
-        if not use_dataframes:
-            df_tensor = self.dataframeUtils.df_to_tensor(df_norm, self.seq_len)
+        if use_dataframes:
+            data = df_norm
+        else:
+            data = self.dataframeUtils.df_to_tensor(df_norm, self.seq_len)
 
-        window = 64
-        start = window
-        end = np.shape(df_norm)[0]
+        nrows = np.shape(df_norm)[0]
+        if nrows == 0:
+            dataframe['predict'] = np.zeros(0, dtype=float)
+            return dataframe
 
-        preds_notrend: np.array = []
+        window = min(self.rolling_window, nrows)
+        stride = max(1, self.rolling_stride)
+
+        # rows to predict. Always include the latest row
+        positions = np.arange(window - 1, nrows, stride)
+        if positions[-1] != (nrows - 1):
+            positions = np.append(positions, nrows - 1)
 
-        # set values for startup window
-        for index in range(0, start):
-            preds_notrend = np.concatenate((preds_notrend, [df_norm[self.target_column].iloc[index]]))
+        # batches must not span a re-train
+        batch_size = max(1, self.rolling_batch_size)
+        if self.rolling_retrain_interval > 0:
+            batch_size = min(batch_size, max(1, self.rolling_retrain_interval // stride))
+        next_retrain = positions[0] + self.rolling_retrain_interval
+
+        preds = np.full(nrows, np.nan, dtype=float)
 
         # add predictions
-        for i in tqdm(range(start, end), desc="    Predicting…", ascii=True, ncols=75):
-            # for index in range(start, end):
+        for start in tqdm(range(0, len(positions), batch_size), desc="    Predicting…", ascii=True, ncols=75):
+            batch = positions[start:start + batch_size]
+
+            if (self.rolling_retrain_interval > 0) and (batch[0] >= next_retrain):
+                self.retrain_rolling_model(dataframe, batch[0])
+                next_retrain = batch[0] + self.rolling_retrain_interval
+
             if use_dataframes:
-                chunk = df_norm.iloc[start:end]
+                windows = [data.iloc[pos + 1 - window:pos + 1] for pos in batch]
             else:
-                chunk = df_tensor[start:end]
-            preds = self.get_predictions(chunk)
-            preds_notrend = np.concatenate((preds_notrend, preds))
+                windows = [data[pos + 1 - window:pos + 1] for pos in batch]
+
+            preds[batch] = self.get_rolling_predictions(windows)
+
+        # set values for startup window, and hold the latest prediction between strided rows
+        preds_notrend = df_norm[self.target_column].to_numpy(dtype=float, copy=True)
+        latest = np.full(nrows, -1)
+        latest[positions] = positions
+        latest = np.maximum.accumulate(latest)
+        preds_notrend[window - 1:] = preds[latest[window - 1:]]
 
         # re-scale, if needed
         if prescale_data:
@@ -844,6 +879,20 @@ class NNPredict(IStrategy):
 
         return dataframe
 
+    # get the (single) prediction for each window. Uses one model call for all windows if the classifier supports it
+    def get_rolling_predictions(self, windows: list) -> np.ndarray:
+        if self.curr_classifier.supports_batch_prediction():
+            return np.asarray(self.curr_classifier.predict_batch(windows), dtype=float)
+
+        return np.array([self.get_predictions(w)[-1] for w in windows], dtype=float)
+
+    # re-train the current model using data up to (and including) row end, so that there is no lookahead
+    def retrain_rolling_model(self, dataframe: DataFrame, end: int):
+        refit = self.refit_model
+        self.refit_model = True
+        self.train_model(dataframe.iloc[:end + 1], self.curr_pair)
+        self.refit_model = refit
+
     ################################
 
     # add columns based on predictions. Do not call until after model has been trained
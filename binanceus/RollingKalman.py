@@ -0,0 +1,114 @@
+# RollingKalman - batched Kalman model of a rolling window (used by FBB_KalmanSIMD)
+#
+# The model for each window is: standardise the window, run a Kalman smoother over it, re-scale and take the last value.
+# Running that through rolling().apply() smooths one short series at a time, which gets none of the benefit of
+# simdkalman. Instead, every window is stacked into a (n_windows, window) array and filtered in a single vectorised
+# call. Only the last value of each window is used, and the last smoothed value is the same as the last filtered
+# value, so only the forward (filter) pass is needed.
+#
+# Results are cached by candle date, so in live/dry-run modes each call only models the new windows (normally one),
+# using the persistent (EM-fitted) filter for the pair.
+#
+# Filter parameters are either fitted (EM) to the first window seen, or managed by a KalmanParamStore, which fits them
+# to a longer training span and refreshes them on a schedule or when the volatility regime changes.
+#
+# Usage:
+#   engine = RollingKalman(KalmanFilter(...), window=32, store=store, key=KalmanParamStore.make_key(pair, timeframe))
+#   model = engine.update(dataframe['date'], dataframe['close'])  # same length as input, NaN for the first window-1
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from simdkalman import KalmanFilter
+
+from KalmanParamStore import KalmanParamStore
+
+
+class RollingKalman():
+
+    batch_size = 16384  # max number of windows filtered in one call (limits memory usage)
+    em_iterations = 6   # EM iterations used to fit the filter to the first window (0 to disable)
+
+    def __init__(self, kfilter: KalmanFilter, window: int, store: KalmanParamStore = None, key: str = ""):
+        self.base_filter = kfilter  # un-fitted filter, used as the starting point for EM
+        self.kfilter = kfilter
+        self.window = window
+        self.store = store
+        self.key = key
+        self.fitted = (self.store is not None) or (self.em_iterations <= 0)
+        self.cache = None  # model values from the previous call, indexed by date
+
+    # standardise each row of a 2-D array. Constant windows are set to 0
+    def standardise(self, windows: np.ndarray):
+        w_mean = np.mean(windows, axis=1)
+        w_std = np.std(windows, axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            scaled = (windows - w_mean[:, np.newaxis]) / w_std[:, np.newaxis]
+        return np.nan_to_num(scaled, nan=0.0, posinf=0.0, neginf=0.0), w_mean, w_std
+
+    # fit the filter parameters to the first window seen
+    def fit(self, scaled: np.ndarray):
+        self.kfilter = self.kfilter.em(scaled, n_iter=self.em_iterations)
+        self.fitted = True
+
+    # last (re-scaled) model value for each row of windows
+    def model(self, windows: np.ndarray) -> np.ndarray:
+        windows = np.asarray(windows, dtype=float)
+        model = np.empty(len(windows), dtype=float)
+
+        for start in range(0, len(windows), self.batch_size):
+            scaled, w_mean, w_std = self.standardise(windows[start:start + self.batch_size])
+
+            if not self.fitted:
+                self.fit(scaled[0])
+
+            result = self.kfilter.compute(scaled, 0, smoothed=False, filtered=True, states=False, covariances=False)
+            last = result.filtered.observations.mean[:, -1]
+            model[start:start + len(scaled)] = last * w_std + w_mean
+
+        return model
+
+    # model values for every full window of data (NaN for the first window-1 entries), without caching
+    def rolling(self, data) -> np.ndarray:
+        data = np.asarray(data, dtype=float)
+        result = np.full(len(data), np.nan)
+        if len(data) >= self.window:
+            result[self.window - 1:] = self.model(sliding_window_view(data, self.window))
+        return result
+
+    # model values for the supplied data, re-using the results from previous calls where the dates match
+    def update(self, dates, data) -> np.ndarray:
+        data = np.asarray(data, dtype=float)
+        dates = pd.Index(dates)
+
+        if (self.cache is None) and (self.store is None):
+            result = self.rolling(data)
+        else:
+            if self.cache is None:
+                result = np.full(len(data), np.nan)
+            else:
+                result = self.cache.reindex(dates).to_numpy(dtype=float, copy=True)
+            todo = np.flatnonzero(np.isnan(result))
+            todo = todo[todo >= self.window - 1]
+            if len(todo) > 0:
+                if self.store is None:
+                    windows = sliding_window_view(data, self.window)[todo - (self.window - 1)]
+                    result[todo] = self.model(windows)
+                else:
+                    self.update_with_store(dates, data, todo, result)
+
+        self.cache = pd.Series(result, index=dates)
+        return result
+
+    # model the windows ending at the todo positions, in blocks that share the same filter parameters. Parameters are
+    # only checked (and refitted) at the start of each block, using data up to that point
+    def update_with_store(self, dates, data, todo, result):
+        windows = sliding_window_view(data, self.window)
+        i = 0
+        while i < len(todo):
+            pos = todo[i]
+            self.kfilter = self.store.get_filter(self.key, self.base_filter, dates, data, pos)
+            end = max(i + 1, int(np.searchsorted(todo, self.store.next_check(self.key, dates, pos))))
+            block = todo[i:end]
+            result[block] = self.model(windows[block - (self.window - 1)])
+            i = end
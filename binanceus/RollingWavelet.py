@@ -0,0 +1,120 @@
+# RollingWavelet - batched wavelet denoising of a rolling window (DWT and SWT)
+#
+# The wavelet models (DWT_Predict, SWT_Predict, the DataframePopulator 'dwt' column) all do the same thing for each
+# window: standardise the window, decompose it, threshold the detail coefficients, reconstruct it, re-scale it and take
+# the last value. Running that through rolling().apply() does a separate pywt call (plus Python overhead) per window.
+# pywt can transform along an axis, so instead every window is stacked into a (n_windows, window) array (a strided
+# view, no copy) and the whole batch is decomposed, thresholded and reconstructed in one set of calls.
+#
+# The threshold is the 'universal' threshold, calculated separately for each window:
+#   sigma = madev(coeff[-threshold_level]) / 0.6745
+#   uthresh = sigma * sqrt(2 * log(window))
+#
+# Usage:
+#   model = RollingWavelet.rolling_dwt(dataframe['close'], window=128, wavelet='db8', threshold_level=1)
+#   model = RollingWavelet.rolling_swt(dataframe['close'], window=128, wavelet='db4', level=2)
+# Both return an array the same length as the input, with NaN for the first window-1 entries (and for any window that
+# contains a NaN), i.e. the same as rolling(window).apply(<single window model>)
+
+import numpy as np
+import pywt
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+batch_size = 8192  # max number of windows transformed in one call (limits memory usage)
+
+
+# mean absolute deviation of each row
+def madev(d: np.ndarray) -> np.ndarray:
+    return np.mean(np.absolute(d - np.mean(d, axis=-1, keepdims=True)), axis=-1, keepdims=True)
+
+
+# standardise each row of a 2-D array. Returns the scaled array plus the mean and std needed to re-scale it
+def standardise(windows: np.ndarray):
+    w_mean = np.mean(windows, axis=1, keepdims=True)
+    w_std = np.std(windows, axis=1, keepdims=True)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        scaled = (windows - w_mean) / w_std
+    return scaled, w_mean, w_std
+
+
+# hard or soft threshold, with a separate threshold value for each row
+def threshold(coeff: np.ndarray, uthresh: np.ndarray, tmode='hard') -> np.ndarray:
+    if tmode == 'hard':
+        return np.where(np.absolute(coeff) < uthresh, 0.0, coeff)
+    if tmode == 'soft':
+        return np.sign(coeff) * np.maximum(np.absolute(coeff) - uthresh, 0.0)
+    raise ValueError(f"Unknown threshold mode: {tmode}")
+
+
+def universal_threshold(detail: np.ndarray, length: int) -> np.ndarray:
+    sigma = (1 / 0.6745) * madev(detail)
+    return sigma * np.sqrt(2 * np.log(length))
+
+
+# DWT denoise of each row of a 2-D array. Returns the reconstructed rows (same length as the input)
+def dwt_model(windows: np.ndarray, wavelet='db8', threshold_level=1, wmode='smooth', tmode='hard',
+              level=None) -> np.ndarray:
+    length = np.shape(windows)[1]
+
+    coeff = pywt.wavedec(windows, wavelet, mode=wmode, level=level, axis=-1)
+
+    # remove higher harmonics
+    uthresh = universal_threshold(coeff[-threshold_level], length)
+    coeff[1:] = [threshold(c, uthresh, tmode) for c in coeff[1:]]
+
+    model = pywt.waverec(coeff, wavelet, mode=wmode, axis=-1)
+
+    # waverec returns an extra item for odd lengths
+    return model[:, :length]
+
+
+# SWT denoise of each row of a 2-D array. SWT needs a length that is a multiple of 2^level, so the oldest entries are
+# dropped if necessary (and returned unchanged)
+def swt_model(windows: np.ndarray, wavelet='db4', threshold_level=1, tmode='hard', level=2) -> np.ndarray:
+    length = np.shape(windows)[1]
+    level = max(1, min(level, pywt.swt_max_level(length)))
+    trim = length % (2 ** level)
+
+    model = np.array(windows, dtype=float)
+    coeff = pywt.swt(windows[:, trim:], wavelet, level=level, axis=-1)
+
+    # coeff is [(cA_n, cD_n), ..., (cA_1, cD_1)], so the finest detail is the last entry
+    uthresh = universal_threshold(coeff[-threshold_level][1], length - trim)
+    coeff = [(c_a, threshold(c_d, uthresh, tmode)) for c_a, c_d in coeff]
+
+    model[:, trim:] = pywt.iswt(coeff, wavelet, axis=-1)
+    return model
+
+
+# last (re-scaled) model value for every full window of data (NaN for the first window-1 entries)
+def rolling_model(data, window: int, model_func, **kwargs) -> np.ndarray:
+    data = np.asarray(data, dtype=float)
+    result = np.full(len(data), np.nan)
+    if len(data) < window:
+        return result
+
+    windows = sliding_window_view(data, window)
+    model = np.empty(len(windows), dtype=float)
+
+    for start in range(0, len(windows), batch_size):
+        scaled, w_mean, w_std = standardise(windows[start:start + batch_size])
+        restored = model_func(scaled, **kwargs)
+        model[start:start + len(scaled)] = restored[:, -1] * w_std[:, 0] + w_mean[:, 0]
+
+    # rolling().apply() skips windows with missing data
+    model[np.isnan(windows).any(axis=1)] = np.nan
+
+    result[window - 1:] = model
+    return result
+
+
+def rolling_dwt(data, window: int, wavelet='db8', threshold_level=1, wmode='smooth', tmode='hard',
+                level=None) -> np.ndarray:
+    return rolling_model(data, window, dwt_model, wavelet=wavelet, threshold_level=threshold_level, wmode=wmode,
+                         tmode=tmode, level=level)
+
+
+def rolling_swt(data, window: int, wavelet='db4', threshold_level=1, tmode='hard', level=2) -> np.ndarray:
+    return rolling_model(data, window, swt_model, wavelet=wavelet, threshold_level=threshold_level, tmode=tmode,
+                         level=level)
@@ -27,10 +27,15 @@ from pandas import DataFrame, Series
 import pywt
 
 from TS_Predict import TS_Predict
+import RollingWavelet
 
 class SWT_Predict(TS_Predict):
     ###################################
 
+    swt_window = 64  # window size used by swt_model()/rolling_swt_model()
+
+    ###################################
+
  
     # function to get swt coefficients
     def get_coeffs(self, data: np.array) -> np.array:
@@ -92,4 +97,16 @@ class SWT_Predict(TS_Predict):
         #     features = features[:128]
 
         return features
-    
+
+    ###################################
+
+    # SWT model (denoised price) of a single window. Must return scalar, so just take the last value
+    # (named swt_model so that it doesn't hide the regression model attribute of TS_Predict)
+    def swt_model(self, a: np.ndarray) -> float:
+        return self.rolling_swt_model(a, window=len(a))[-1]
+
+    # SWT model of every window of data (same as rolling(window=self.swt_window).apply(self.swt_model), but batched)
+    def rolling_swt_model(self, data, window=0) -> np.ndarray:
+        if window <= 0:
+            window = self.swt_window
+        return RollingWavelet.rolling_swt(data, window, wavelet='db4', threshold_level=1, tmode="hard", level=2)
@@ -0,0 +1,198 @@
+"""
+CompositeHyperOptLoss
+
+This module is a custom HyperoptLoss class that evaluates all of the other objectives in one pass
+
+Instead of running hyperopt once per loss function (Expectancy, MedianProfit, QuickProfit, Win), this loss
+calculates all of them for each epoch (they share the same metrics, see HyperOptMetrics.py), returns one of them
+to hyperopt and logs everything to a sidecar (CSV) file. The hyperopt run can then be re-ranked offline using
+any of the objectives (see scripts/RankCompositeResults.py), without re-running the backtests.
+Each row has a results_key column, which matches the epoch (and its parameters) in the hyperopt .fthypt file
+
+Config options (all optional):
+    "composite_loss_objective": objective returned to hyperopt. One of: Expectancy, MedianProfit, QuickProfit, Win
+                                Default is Expectancy
+    "composite_loss_file":      path of the sidecar file.
+                                Default is <user_data>/hyperopt_results/<strategy>_composite.csv
+
+Note: rows are appended, so delete the sidecar file before starting a new hyperopt run (or filter by timerange)
+
+To deploy this, copy the file to the <freqtrade>/user_data/hyperopts directory (along with the other loss files)
+"""
+
+import csv
+import io
+import os
+
+from pandas import DataFrame
+
+from freqtrade.optimize.hyperopt import IHyperOptLoss
+from datetime import datetime
+import numpy as np
+from typing import Any, Dict
+
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent))
+
+from HyperOptMetrics import get_metrics, get_results_key, timed_loss
+import ExpectancyHyperOptLoss
+import MedianProfitHyperOptLoss
+import QuickProfitHyperOptLoss
+import WinHyperOptLoss
+
+
+DEFAULT_OBJECTIVE = 'Expectancy'
+
+# objectives evaluated for each epoch. Names are used for the 'loss_<name>' columns in the sidecar file
+OBJECTIVES = {
+    'Expectancy': ExpectancyHyperOptLoss.ExpectancyHyperOptLoss,
+    'MedianProfit': MedianProfitHyperOptLoss.WeightedProfitHyperOptLoss,
+    'QuickProfit': QuickProfitHyperOptLoss.QuickHyperOptLoss,
+    'Win': WinHyperOptLoss.WinHyperOptLoss
+}
+
+# value returned to hyperopt if an objective could not be evaluated. Same as the objective's own 'undesired' value
+UNDESIRED_SOLUTIONS = {
+    'Expectancy': ExpectancyHyperOptLoss.UNDESIRED_SOLUTION,
+    'MedianProfit': MedianProfitHyperOptLoss.UNDESIRED_SOLUTION,
+    'QuickProfit': QuickProfitHyperOptLoss.UNDESIRED_SOLUTION,
+    'Win': WinHyperOptLoss.UNDESIRED_SOLUTION
+}
+
+# metrics logged for each epoch (followed by the objectives). results_key identifies the epoch in the .fthypt file
+METRIC_COLUMNS = [
+    'results_key', 'timerange', 'trade_count', 'wins', 'losses', 'draws', 'win_rate',
+    'profit_total_abs', 'profit_total', 'profit_mean', 'duration_mean',
+    'expectancy', 'expectancy_rel', 'sharpe', 'max_drawdown', 'drawdown_abs', 'drawdown_rel', 'calmar'
+]
+
+LOG_COLUMNS = METRIC_COLUMNS + ['loss_' + name for name in OBJECTIVES.keys()]
+
+
+class CompositeHyperOptLoss(IHyperOptLoss):
+    """
+    Defines a custom loss function for hyperopt
+    """
+
+    @staticmethod
+    @timed_loss
+    def hyperopt_loss_function(results: DataFrame, trade_count: int,
+                               min_date: datetime, max_date: datetime,
+                               config: Dict, processed: Dict[str, DataFrame],
+                               backtest_stats: Dict[str, Any],
+                               *args, **kwargs) -> float:
+
+        objective = config.get('composite_loss_objective', DEFAULT_OBJECTIVE)
+        if objective not in OBJECTIVES:
+            print(f"    Unknown composite_loss_objective: {objective}. Using {DEFAULT_OBJECTIVE}")
+            objective = DEFAULT_OBJECTIVE
+
+        # all of the objectives (and the metrics below) re-use the same metrics for this epoch
+        metrics = get_metrics(results, min_date, max_date)
+
+        losses = {}
+        for name, loss_class in OBJECTIVES.items():
+            # call the unwrapped function, otherwise the timing hook would report each objective separately
+            loss_func = getattr(loss_class.hyperopt_loss_function, '__wrapped__', loss_class.hyperopt_loss_function)
+            try:
+                losses[name] = float(loss_func(results=results, trade_count=trade_count,
+                                               min_date=min_date, max_date=max_date,
+                                               config=config, processed=processed,
+                                               backtest_stats=backtest_stats, **kwargs))
+            except Exception as e:
+                print(f"    Error evaluating {name} objective: {e}")
+                losses[name] = np.nan
+
+        row = CompositeHyperOptLoss.get_metrics_row(metrics, trade_count, min_date, max_date, config, backtest_stats)
+        for name, loss in losses.items():
+            row['loss_' + name] = loss
+
+        CompositeHyperOptLoss.log_row(config, row)
+
+        result = losses[objective]
+        if np.isnan(result):
+            result = UNDESIRED_SOLUTIONS[objective]  # treat as undesired solution
+        return result
+
+    # collect the metrics for this epoch. Values from backtest_stats are used where available (they match the reports)
+    @staticmethod
+    def get_metrics_row(metrics, trade_count, min_date, max_date, config, backtest_stats) -> dict:
+
+        stake = backtest_stats.get('stake_amount', None)
+        if not isinstance(stake, (int, float)):
+            stake = None  # 'unlimited' stake
+
+        wins = backtest_stats.get('wins', None) or metrics.win_count()
+        losses = backtest_stats.get('losses', None) or metrics.loss_count()
+        draws = max(trade_count - wins - losses, 0)
+
+        starting_balance = config.get('dry_run_wallet', None) or backtest_stats.get('starting_balance', 0.0)
+        drawdown_abs, drawdown_rel = metrics.max_drawdown(starting_balance)
+
+        profit_std = metrics.profit_std()
+        sharpe = metrics.returns_mean() / profit_std * np.sqrt(365) if profit_std != 0 else 0.0
+
+        try:
+            calmar = metrics.calmar(starting_balance) if starting_balance else np.nan
+        except Exception:
+            calmar = np.nan
+
+        return {
+            'results_key': get_results_key(backtest_stats),
+            'timerange': f"{min_date:%Y%m%d}-{max_date:%Y%m%d}",
+            'trade_count': trade_count,
+            'wins': wins,
+            'losses': losses,
+            'draws': draws,
+            'win_rate': wins / trade_count if trade_count > 0 else 0.0,
+            'profit_total_abs': backtest_stats.get('profit_total_abs', None) or metrics.profit_sum,
+            'profit_total': backtest_stats.get('profit_total', np.nan),
+            'profit_mean': backtest_stats.get('profit_mean', np.nan),
+            'duration_mean': metrics.mean('trade_duration'),
+            'expectancy': metrics.expectancy(trade_count=trade_count),
+            'expectancy_rel': metrics.expectancy(trade_count=trade_count, stake=stake, relative_wins=True,
+                                                 min_loss=0.01) if stake else np.nan,
+            'sharpe': sharpe,
+            'max_drawdown': backtest_stats.get('max_drawdown', np.nan),
+            'drawdown_abs': drawdown_abs,
+            'drawdown_rel': drawdown_rel,
+            'calmar': calmar
+        }
+
+    @staticmethod
+    def get_log_path(config) -> str:
+        if config.get('composite_loss_file', None):
+            return str(config['composite_loss_file'])
+
+        user_data = config.get('user_data_dir', 'user_data')
+        strategy = config.get('strategy', 'strategy')
+        return os.path.join(str(user_data), 'hyperopt_results', f"{strategy}_composite.csv")
+
+    # append a row to the sidecar file. Hyperopt runs epochs in parallel processes, so each row is written with a
+    # single (appending) write call, which keeps rows intact
+    @staticmethod
+    def log_row(config, row: dict):
+        path = CompositeHyperOptLoss.get_log_path(config)
+
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        writer.writerow([CompositeHyperOptLoss.format_value(row.get(col, '')) for col in LOG_COLUMNS])
+        line = buf.getvalue()
+
+        try:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            with open(path, 'a', newline='') as f:
+                if f.tell() == 0:
+                    header = io.StringIO()
+                    csv.writer(header).writerow(LOG_COLUMNS)
+                    line = header.getvalue() + line
+                f.write(line)
+        except OSError as e:
+            print(f"    WARNING: could not write to {path}: {e}")
+
+    @staticmethod
+    def format_value(value):
+        if isinstance(value, (float, np.floating)):
+            return '' if np.isnan(value) else f"{value:.10g}"
+        return value
@@ -12,12 +12,17 @@ from math import exp
 
 from pandas import DataFrame
 
-from freqtrade.data.metrics import calculate_calmar
 from freqtrade.optimize.hyperopt import IHyperOptLoss
 from datetime import datetime
 import numpy as np
 from typing import Any, Dict
 
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent))
+
+from HyperOptMetrics import get_metrics, timed_loss
+
 # Contstants to allow evaluation in cases where thre is insufficient (or nonexistent) info in the configuration
 EXPECTED_TRADES_PER_DAY = 2                       # used to set target goals
 MIN_TRADES_PER_DAY = EXPECTED_TRADES_PER_DAY / 3  # used to filter out scenarios where there are not enough trades
@@ -31,6 +36,7 @@ class ExpectancyHyperOptLoss(IHyperOptLoss):
     """
 
     @staticmethod
+    @timed_loss
     def hyperopt_loss_function(results: DataFrame, trade_count: int,
                                min_date: datetime, max_date: datetime,
                                config: Dict, processed: Dict[str, DataFrame],
@@ -44,34 +50,18 @@ class ExpectancyHyperOptLoss(IHyperOptLoss):
         #     print("Profit columns:")
         #     print(profit_cols)
 
-        stake = backtest_stats['stake_amount']
-        total_profit_pct = results["profit_abs"] / stake
+        metrics = get_metrics(results, min_date, max_date)
 
         # Winning trades
-        results['upside_returns'] = 0
-        results.loc[total_profit_pct > 0.0001, 'upside_returns'] = 1.0
-
+        stake = backtest_stats['stake_amount']
         if backtest_stats['wins']:
             winning_count = backtest_stats['wins']
         else:
-            winning_count = results['upside_returns'].sum()
-
-        # Losing trades
-        results['downside_returns'] = 0
-        results.loc[total_profit_pct < 0, 'downside_returns'] = 1.0
+            winning_count = metrics.win_count(stake)
 
         # Expectancy (refer to freqtrade edge page for info)
-        w = winning_count / trade_count
-        l = 1.0 - w
-        results['net_gain'] = total_profit_pct * results['upside_returns']
-        results['net_loss'] = total_profit_pct * results['downside_returns']
-        ave_profit = results['net_gain'].sum() / trade_count
-        ave_loss = results['net_loss'].sum() / trade_count
-
-        if abs(ave_loss) < 0.01:
-            ave_loss = 0.01  # set min loss = 1%, otherwise results can be wildly skewed
-        r = ave_profit / abs(ave_loss)
-        e = r * w - l
+        # set min loss = 1%, otherwise results can be wildly skewed
+        e = metrics.expectancy(winning_count, trade_count, stake=stake, relative_wins=True, min_loss=0.01)
 
         # expectancy_loss = 1.0 - e  # goal is <1.0
         expectancy_loss = -e
@@ -80,7 +70,7 @@ class ExpectancyHyperOptLoss(IHyperOptLoss):
 
         # use Calmar and profit as a tie-breaker
         starting_balance = config['dry_run_wallet']
-        calmar_loss = -calculate_calmar(results, min_date, max_date, starting_balance) / 100.0
+        calmar_loss = -metrics.calmar(starting_balance) / 100.0
         if (debug_level > 1):
                 print(f"calmar_loss:{calmar_loss:.3f}")
 
@@ -90,7 +80,7 @@ class ExpectancyHyperOptLoss(IHyperOptLoss):
         if 'profit_total_abs' in backtest_stats:
             profit_sum = backtest_stats['profit_total_abs']
         elif "profit_abs" in results:
-            profit_sum = results["profit_abs"].sum()
+            profit_sum = metrics.profit_sum
         else:
             profit_sum = 0.0
 
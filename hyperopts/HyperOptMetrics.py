@@ -0,0 +1,296 @@
+"""
+HyperOptMetrics
+
+Shared metrics 'kernel' for the custom HyperoptLoss classes in this directory
+
+The trade results are converted to numpy arrays once per epoch, and the metrics used by the loss functions
+(win rate, expectancy, Sharpe/Sortino inputs, drawdown, Calmar) are calculated on first use and then re-used.
+The results dataframe is never modified (the older loss functions added temporary columns to it every epoch)
+
+Usage (inside hyperopt_loss_function):
+
+    metrics = get_metrics(results, min_date, max_date)
+    winning_count = backtest_stats['wins'] if backtest_stats['wins'] else metrics.win_count()
+    e = metrics.expectancy(winning_count)
+
+There is also an optional timing hook (timed_loss), which reports the cost of the loss function for each epoch.
+Enable it by adding "hyperopt_loss_timing": true to the config, or by setting HyperOptMetrics.report_timing = True
+
+To deploy this, copy the file to the <freqtrade>/user_data/hyperopts directory, along with the loss files
+"""
+
+import functools
+import hashlib
+import time
+import weakref
+from datetime import datetime
+
+import numpy as np
+from pandas import DataFrame
+
+
+class HyperOptMetrics():
+
+    win_threshold = 0.0001  # a trade is counted as a win if its profit is above this
+    report_timing = False   # set to True to report loss function timing for every epoch
+
+    def __init__(self, results: DataFrame, min_date: datetime = None, max_date: datetime = None):
+        self.results_ref = weakref.ref(results)
+        self.nrows = results.shape[0]
+        self.min_date = min_date
+        self.max_date = max_date
+        self.cache = {}
+
+        self.profit_abs = results['profit_abs'].to_numpy(dtype=float)
+        self.num_trades = len(self.profit_abs)
+        self.profit_sum = float(self.profit_abs.sum())
+
+        if (min_date is not None) and (max_date is not None):
+            self.days_period = (max_date - min_date).days
+        else:
+            self.days_period = 0
+
+    # check whether these metrics apply to the supplied results
+    def matches(self, results: DataFrame, min_date: datetime, max_date: datetime) -> bool:
+        return (self.results_ref() is results) and (self.nrows == results.shape[0]) and \
+            (self.min_date == min_date) and (self.max_date == max_date)
+
+    # returns the named column as a float array (or None if not present)
+    def col(self, name) -> np.ndarray:
+        key = ('col', name)
+        if key not in self.cache:
+            results = self.results_ref()
+            if (results is not None) and (name in results.columns):
+                self.cache[key] = results[name].to_numpy(dtype=float)
+            else:
+                self.cache[key] = None
+        return self.cache[key]
+
+    # mean of the named column (NaN if missing or empty)
+    def mean(self, name) -> float:
+        key = ('mean', name)
+        if key not in self.cache:
+            values = self.col(name)
+            self.cache[key] = float(np.nanmean(values)) if (values is not None) and (len(values) > 0) else np.nan
+        return self.cache[key]
+
+    ################################
+    # Wins/Losses
+
+    # Winning trades (mask). If stake is supplied, the threshold is applied to profit relative to stake
+    def win_mask(self, stake=None) -> np.ndarray:
+        key = ('win_mask', stake)
+        if key not in self.cache:
+            if stake:
+                self.cache[key] = (self.profit_abs / stake) > self.win_threshold
+            else:
+                self.cache[key] = self.profit_abs > self.win_threshold
+        return self.cache[key]
+
+    # Losing trades (mask). Draws are neither wins nor losses
+    def loss_mask(self) -> np.ndarray:
+        if 'loss_mask' not in self.cache:
+            self.cache['loss_mask'] = self.profit_abs < 0.0
+        return self.cache['loss_mask']
+
+    def win_count(self, stake=None) -> int:
+        return int(np.count_nonzero(self.win_mask(stake)))
+
+    def loss_count(self) -> int:
+        return int(np.count_nonzero(self.loss_mask()))
+
+    def win_rate(self, stake=None) -> float:
+        return self.win_count(stake) / self.num_trades if self.num_trades > 0 else 0.0
+
+    # total profit of winning trades, and total (-ve) profit of losing trades
+    def gain_sum(self, stake=None) -> float:
+        key = ('gain_sum', stake)
+        if key not in self.cache:
+            self.cache[key] = float(self.profit_abs[self.win_mask(stake)].sum())
+        return self.cache[key]
+
+    def loss_sum(self) -> float:
+        if 'loss_sum' not in self.cache:
+            self.cache['loss_sum'] = float(self.profit_abs[self.loss_mask()].sum())
+        return self.cache['loss_sum']
+
+    ################################
+    # Expectancy (refer to freqtrade edge page for info)
+    # Parameters:
+    #   winning_count: number of winning trades (e.g. from backtest_stats). Calculated if not supplied
+    #   trade_count:   number of trades (e.g. as supplied to the loss function). Defaults to the number of results
+    #   stake:         if supplied, profits are treated as a fraction of stake
+    #   relative_wins: if True, the win threshold is also applied to the relative profit
+    #   min_loss:      lower limit for the average loss, otherwise results can be wildly skewed
+
+    # average profit of winning trades and average (-ve) loss of losing trades, averaged over *all* trades
+    def ave_gain_loss(self, trade_count=None, stake=None, relative_wins=False, min_loss=0.001):
+
+        if trade_count is None:
+            trade_count = self.num_trades
+        if trade_count == 0:
+            return 0.0, min_loss
+
+        mask_stake = stake if relative_wins else None
+        ave_profit = self.gain_sum(mask_stake) / trade_count
+        ave_loss = self.loss_sum() / trade_count
+        if stake:
+            ave_profit = ave_profit / stake
+            ave_loss = ave_loss / stake
+
+        if abs(ave_loss) < min_loss:
+            ave_loss = min_loss
+        return ave_profit, ave_loss
+
+    def expectancy(self, winning_count=None, trade_count=None, stake=None, relative_wins=False,
+                   min_loss=0.001) -> float:
+
+        if trade_count is None:
+            trade_count = self.num_trades
+        if trade_count == 0:
+            return 0.0
+
+        if winning_count is None:
+            winning_count = self.win_count(stake if relative_wins else None)
+
+        w = winning_count / trade_count
+        l = 1.0 - w
+        ave_profit, ave_loss = self.ave_gain_loss(trade_count, stake, relative_wins, min_loss)
+        r = ave_profit / abs(ave_loss)
+        return r * w - l
+
+    ################################
+    # Sharpe/Sortino inputs
+    # Note: these match the (simplified) versions used in the loss functions, i.e. the Sortino denominator
+    # is the deviation of the 'losing trade' indicator, not of the losses themselves
+
+    def returns_mean(self) -> float:
+        return self.profit_sum / self.days_period if self.days_period > 0 else 0.0
+
+    def profit_std(self) -> float:
+        if 'profit_std' not in self.cache:
+            self.cache['profit_std'] = float(np.std(self.profit_abs)) if self.num_trades > 0 else 0.0
+        return self.cache['profit_std']
+
+    def downside_std(self) -> float:
+        if 'downside_std' not in self.cache:
+            self.cache['downside_std'] = float(np.std(self.loss_mask().astype(float))) if self.num_trades > 0 else 0.0
+        return self.cache['downside_std']
+
+    ################################
+    # Drawdown & Calmar
+
+    # max drawdown of the cumulative profit (trades ordered by close date).
+    # Returns (absolute drawdown, drawdown relative to the peak balance)
+    def max_drawdown(self, starting_balance=0.0):
+        key = ('max_drawdown', starting_balance)
+        if key not in self.cache:
+            if self.num_trades == 0:
+                self.cache[key] = (0.0, 0.0)
+            else:
+                close_date = self.col_raw('close_date')
+                if close_date is not None:
+                    order = np.argsort(close_date, kind='stable')
+                    profit = self.profit_abs[order]
+                else:
+                    profit = self.profit_abs
+                cumulative = np.cumsum(profit)
+                high_value = np.maximum.accumulate(cumulative)
+                drawdown = high_value - cumulative
+                if starting_balance:
+                    peak_balance = starting_balance + high_value
+                    relative = drawdown / np.where(peak_balance != 0.0, peak_balance, np.nan)
+                    rel_drawdown = float(np.nanmax(relative)) if np.any(np.isfinite(relative)) else 0.0
+                else:
+                    rel_drawdown = 0.0
+                self.cache[key] = (float(drawdown.max()), rel_drawdown)
+        return self.cache[key]
+
+    # Calmar ratio. Uses the freqtrade implementation, so that values match the backtest reports
+    def calmar(self, starting_balance) -> float:
+        key = ('calmar', starting_balance)
+        if key not in self.cache:
+            from freqtrade.data.metrics import calculate_calmar
+            self.cache[key] = calculate_calmar(self.results_ref(), self.min_date, self.max_date, starting_balance)
+        return self.cache[key]
+
+    # returns the named column without type conversion (e.g. for dates)
+    def col_raw(self, name):
+        key = ('col_raw', name)
+        if key not in self.cache:
+            results = self.results_ref()
+            if (results is not None) and (name in results.columns):
+                self.cache[key] = results[name].to_numpy()
+            else:
+                self.cache[key] = None
+        return self.cache[key]
+
+
+# single-slot cache, i.e. the metrics for the current epoch
+_curr_metrics = None
+
+
+# get the metrics for the supplied results, re-using them if they were already calculated for this epoch
+def get_metrics(results: DataFrame, min_date: datetime = None, max_date: datetime = None) -> HyperOptMetrics:
+    global _curr_metrics
+    if (_curr_metrics is None) or (not _curr_metrics.matches(results, min_date, max_date)):
+        _curr_metrics = HyperOptMetrics(results, min_date, max_date)
+    return _curr_metrics
+
+
+################################
+# Results key
+# Identifies the results of an epoch from the backtest stats, which hyperopt passes to the loss function (as
+# backtest_stats) and also saves in the .fthypt results file (as results_metrics). Used to join logged metrics with
+# the epochs (and parameters) in the .fthypt file. Epochs with identical results get the same key
+
+results_key_fields = [
+    'backtest_start', 'backtest_end', 'total_trades', 'wins', 'losses', 'draws',
+    'profit_total_abs', 'profit_total', 'max_drawdown_abs', 'holding_avg_s'
+]
+
+
+def get_results_key(backtest_stats: dict) -> str:
+    values = []
+    for field in results_key_fields:
+        value = backtest_stats.get(field, '')
+        if isinstance(value, (float, np.floating)):
+            value = f"{value:.10g}"  # same value after a round trip through the results file
+        values.append(str(value))
+    return hashlib.sha1('|'.join(values).encode('utf-8')).hexdigest()[:16]
+
+
+################################
+# Timing hook
+# Wraps a hyperopt_loss_function and reports how long it took. Use as:
+#
+#     @staticmethod
+#     @timed_loss
+#     def hyperopt_loss_function(...)
+
+_timing_stats = {}
+
+
+def timed_loss(func):
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        config = kwargs.get('config', None)
+        enabled = HyperOptMetrics.report_timing or \
+            ((config is not None) and bool(config.get('hyperopt_loss_timing', False)))
+        if not enabled:
+            return func(*args, **kwargs)
+
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        dur = (time.perf_counter() - start) * 1000.0
+
+        name = func.__qualname__.split('.')[0]
+        count, total = _timing_stats.get(name, (0, 0.0))
+        count = count + 1
+        total = total + dur
+        _timing_stats[name] = (count, total)
+        print(f"    {name}: {dur:.3f} ms (epoch {count}, mean {total / count:.3f} ms)")
+        return result
+
+    return wrapper
@@ -17,6 +17,12 @@ from datetime import datetime
 import numpy as np
 from typing import Any, Dict
 
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent))
+
+from HyperOptMetrics import get_metrics, timed_loss
+
 # Contstants to allow evaluation in cases where thre is insufficient (or nonexistent) info in the configuration
 EXPECTED_TRADES_PER_DAY = 3  # used to set target goals
 MIN_TRADES_PER_DAY = EXPECTED_TRADES_PER_DAY / 3  # used to filter out scenarios where there are not enough trades
@@ -29,6 +35,7 @@ class OnlyExpectancyHyperOptLoss(IHyperOptLoss):
     """
 
     @staticmethod
+    @timed_loss
     def hyperopt_loss_function(results: DataFrame, trade_count: int,
                                min_date: datetime, max_date: datetime,
                                config: Dict, processed: Dict[str, DataFrame],
@@ -44,34 +51,18 @@ class OnlyExpectancyHyperOptLoss(IHyperOptLoss):
         else:
             target_trades = days_period * EXPECTED_TRADES_PER_DAY
 
-        stake = backtest_stats['stake_amount']
-        total_profit_pct = results["profit_abs"] / stake
+        metrics = get_metrics(results, min_date, max_date)
 
         # Winning trades
-        results['upside_returns'] = 0
-        results.loc[total_profit_pct > 0.0001, 'upside_returns'] = 1.0
-
+        stake = backtest_stats['stake_amount']
         if backtest_stats['wins']:
             winning_count = backtest_stats['wins']
         else:
-            winning_count = results['upside_returns'].sum()
-
-        # Losing trades
-        results['downside_returns'] = 0
-        results.loc[total_profit_pct < 0, 'downside_returns'] = 1.0
+            winning_count = metrics.win_count(stake)
 
         # Expectancy (refer to freqtrade edge page for info)
-        w = winning_count / trade_count
-        l = 1.0 - w
-        results['net_gain'] = total_profit_pct * results['upside_returns']
-        results['net_loss'] = total_profit_pct * results['downside_returns']
-        ave_profit = results['net_gain'].sum() / trade_count
-        ave_loss = results['net_loss'].sum() / trade_count
-
-        if abs(ave_loss) < 0.01:
-            ave_loss = 0.01  # set min loss = 1%, otherwise results can be wildly skewed
-        r = ave_profit / abs(ave_loss)
-        e = r * w - l
+        # set min loss = 1%, otherwise results can be wildly skewed
+        e = metrics.expectancy(winning_count, trade_count, stake=stake, relative_wins=True, min_loss=0.01)
 
         # expectancy_loss = 1.0 - e  # goal is <1.0
         expectancy_loss = -e
@@ -16,6 +16,12 @@ from datetime import datetime
 import numpy as np
 from typing import Any, Dict
 
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent))
+
+from HyperOptMetrics import get_metrics, timed_loss
+
 
 # Contstants to allow evaluation in cases where thre is insufficient (or nonexistent) info in the configuration
 EXPECTED_TRADES_PER_DAY = 3                         # used to set target goals
@@ -41,6 +47,7 @@ class PEDHyperOptLoss(IHyperOptLoss):
     """
 
     @staticmethod
+    @timed_loss
     def hyperopt_loss_function(results: DataFrame, trade_count: int,
                                min_date: datetime, max_date: datetime,
                                config: Dict, processed: Dict[str, DataFrame],
@@ -49,6 +56,8 @@ class PEDHyperOptLoss(IHyperOptLoss):
 
         debug_level = 0 # displays (more) messages if higher
 
+        metrics = get_metrics(results, min_date, max_date)
+
         # define weights
         weight_num_trades = 0.6
         weight_duration = 2.0
@@ -102,7 +111,7 @@ class PEDHyperOptLoss(IHyperOptLoss):
         if backtest_stats['profit_total_abs']:
             profit_sum = backtest_stats['profit_total_abs']
         else:
-            profit_sum = results["profit_abs"].sum()
+            profit_sum = metrics.profit_sum
 
         if profit_sum < 0.0:
             if debug_level > 2:
@@ -143,12 +152,11 @@ class PEDHyperOptLoss(IHyperOptLoss):
 
         # note that we don't have enough info to calculate profit % because we don't know the original investment
         # so, we approximate
-        total_profit = results["profit_abs"]
 
         if backtest_stats['starting_balance']:
             expected_sum = backtest_stats['starting_balance'] * (1.0 + EXPECTED_MONTHLY_PROFIT * num_months)
         else:
-            expected_sum = results['stake_amount'].mean() * trade_count * EXPECTED_PROFIT_PER_TRADE
+            expected_sum = metrics.mean('stake_amount') * trade_count * EXPECTED_PROFIT_PER_TRADE
         exp_profit_loss = (expected_sum - profit_sum) / expected_sum
 
         # if num_trades_loss < 0.0:
@@ -156,7 +164,7 @@ class PEDHyperOptLoss(IHyperOptLoss):
         #           .format(profit_sum, expected_sum, ave_profit_loss, exp_profit_loss))
 
         # trade duration (taken from default loss function)
-        trade_duration = results['trade_duration'].mean()
+        trade_duration = metrics.mean('trade_duration')
         duration_loss = (trade_duration - EXPECTED_TRADE_DURATION) / EXPECTED_TRADE_DURATION
 
         # punish if below goal
@@ -166,23 +174,18 @@ class PEDHyperOptLoss(IHyperOptLoss):
             return UNDESIRED_SOLUTION
 
         # Winning trades
-        results['upside_returns'] = 0
-        results.loc[total_profit > 0.0001, 'upside_returns'] = 1.0
-
         if backtest_stats['wins']:
             winning_count = backtest_stats['wins']
         else:
-            winning_count = results['upside_returns'].sum()
+            winning_count = metrics.win_count()
 
         # Losing trades
-        results['downside_returns'] = 0
-        results.loc[total_profit < 0, 'downside_returns'] = 1.0
         losing_count = trade_count - winning_count
 
         if backtest_stats['losses']:
             act_losing_count = backtest_stats['wins']
         else:
-            act_losing_count = results['downside_returns'].sum()
+            act_losing_count = metrics.loss_count()
 
 
         # if winning_count < (2.0 * losing_count):
@@ -194,12 +197,7 @@ class PEDHyperOptLoss(IHyperOptLoss):
         # Expectancy (refer to freqtrade edge page for info)
         w = winning_count / trade_count
         l = 1.0 - w
-        results['net_gain'] = results['profit_abs'] * results['upside_returns']
-        results['net_loss'] = results['profit_abs'] * results['downside_returns']
-        ave_profit = results['net_gain'].sum() / trade_count
-        ave_loss = results['net_loss'].sum() / trade_count
-        if abs(ave_loss) < 0.001:
-            ave_loss = 0.001
+        ave_profit, ave_loss = metrics.ave_gain_loss(trade_count, min_loss=0.001)
         r = ave_profit / abs(ave_loss)
         e = r * w - l
 
@@ -223,8 +221,8 @@ class PEDHyperOptLoss(IHyperOptLoss):
         #     return UNDESIRED_SOLUTION
 
         # Sharpe Ratio
-        expected_returns_mean = total_profit.sum() / days_period
-        up_stdev = np.std(total_profit)
+        expected_returns_mean = metrics.profit_sum / days_period
+        up_stdev = metrics.profit_std()
         if up_stdev != 0:
             # calculate Sharpe ratio, but scale down to match other parameters
             sharp_ratio_loss = 0.01 - (expected_returns_mean / up_stdev * np.sqrt(365)) / 100.0
@@ -234,7 +232,7 @@ class PEDHyperOptLoss(IHyperOptLoss):
             return UNDESIRED_SOLUTION
 
         # Sortino Ratio
-        down_stdev = np.std(results['downside_returns'])
+        down_stdev = metrics.downside_std()
         if down_stdev != 0:
             sortino_ratio_loss = -1.0 * (expected_returns_mean / down_stdev * np.sqrt(365)) / 10000.0
         else:
@@ -14,6 +14,12 @@ from datetime import datetime
 import numpy as np
 from typing import Any, Dict
 
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent))
+
+from HyperOptMetrics import get_metrics, timed_loss
+
 
 # Contstants to allow evaluation in cases where thre is insufficient (or nonexistent) info in the configuration
 EXPECTED_TRADES_PER_DAY = 1                         # used to set target goals
@@ -29,6 +35,7 @@ class WinHyperOptLoss(IHyperOptLoss):
     """
 
     @staticmethod
+    @timed_loss
     def hyperopt_loss_function(results: DataFrame, trade_count: int,
                                min_date: datetime, max_date: datetime,
                                config: Dict, processed: Dict[str, DataFrame],
@@ -38,15 +45,10 @@ class WinHyperOptLoss(IHyperOptLoss):
         debug_level = 1 # displays (more) messages if higher
 
         # Winning trades
-
-        total_profit = results["profit_abs"]
-
         if backtest_stats['wins']:
             winning_count = backtest_stats['wins']
         else:
-            results['upside_returns'] = 0
-            results.loc[total_profit > 0.0001, 'upside_returns'] = 1.0
-            winning_count = results['upside_returns'].sum()
+            winning_count = get_metrics(results, min_date, max_date).win_count()
 
         # calculate win ratio loss. Scale so that 0.0 equates to 50% win/loss ratio
         # win_ratio_loss = 10.0 * (0.5 - winning_count / trade_count)
@@ -17,6 +17,11 @@ from datetime import datetime, timedelta
 from technical.util import resample_to_interval, resampled_merge
 from technical.indicators import RMI, zema, VIDYA, ichimoku
 import time
+import sys
+
+sys.path.append(str(pathlib.Path(__file__).parent))
+
+from VectorisedSells import VectorisedSells
 
 log = logging.getLogger(__name__)
 #log.setLevel(logging.DEBUG)
@@ -157,6 +162,11 @@ class NostalgiaForInfinityX(IStrategy):
     # Run "populate_indicators()" only for new candle.
     process_only_new_candles = True
 
+    # Evaluate the candle conditions of the sell_*() functions once per candle, in populate_indicators(), rather than
+    # for every open trade in custom_exit() (see VectorisedSells.py). Exit decisions are the same
+    vectorised_sells = True
+    vectorised_sells_cache = None
+
     # These values can be overridden in the "ask_strategy" section in the config.
     use_sell_signal = True
     sell_profit_only = False
@@ -1926,6 +1936,19 @@ class NostalgiaForInfinityX(IStrategy):
         # If the cached data hasn't changed, it's a no-op
         self.target_profit_cache.save()
 
+        if self.vectorised_sells and (self.vectorised_sells_cache is None):
+            try:
+                self.vectorised_sells_cache = VectorisedSells(pathlib.Path(__file__).read_text(),
+                                                              'NostalgiaForInfinityX', globals())
+                # the compiled functions are the ones in this file, so they can't be used if a subclass changes them
+                overridden = [name for name in self.vectorised_sells_cache.functions
+                              if getattr(type(self), name) is not getattr(NostalgiaForInfinityX, name)]
+                if overridden:
+                    raise ValueError(f"sell functions overridden: {overridden}")
+            except Exception as e:
+                log.warning(f"Vectorised sells disabled: {e}")
+                self.vectorised_sells = False
+
     def get_hold_trades_config_file(self):
         proper_holds_file_path = self.config["user_data_dir"].resolve() / "nfi-hold-trades.json"
         if proper_holds_file_path.is_file():
@@ -6484,78 +6507,93 @@ class NostalgiaForInfinityX(IStrategy):
 
         return False, None
 
-    def custom_exit(self, pair: str, trade: 'Trade', current_time: 'datetime', current_rate: float,
-                    current_profit: float, **kwargs):
-        dataframe, _ = self.dp.get_analyzed_dataframe(pair, self.timeframe)
-        last_candle = dataframe.iloc[-1]
-        previous_candle_1 = dataframe.iloc[-2]
-        previous_candle_2 = dataframe.iloc[-3]
-        previous_candle_3 = dataframe.iloc[-4]
-        previous_candle_4 = dataframe.iloc[-5]
-        previous_candle_5 = dataframe.iloc[-6]
-
-        buy_tag = 'empty'
-        if hasattr(trade, 'buy_tag') and trade.buy_tag is not None:
-            buy_tag = trade.buy_tag
+    # Sell signals, in order. Returns (True, signal_name) for the first one that applies, else (False, None)
+    def sell_exit_signals(self, current_profit: float, max_profit:float, max_loss:float, last_candle, previous_candle_1, previous_candle_2, previous_candle_3, previous_candle_4, previous_candle_5, trade: 'Trade', current_time: 'datetime', buy_tag) -> tuple:
         buy_tags = buy_tag.split()
-        max_profit = ((trade.max_rate - trade.open_rate) / trade.open_rate)
-        max_loss = ((trade.open_rate - trade.min_rate) / trade.min_rate)
 
         # Long mode
         if all(c in ['31', '32', '33', '34', '35', '36'] for c in buy_tags):
-            sell, signal_name = self.sell_long_mode(current_profit, max_profit, max_loss, last_candle, previous_candle_1, previous_candle_2, previous_candle_3, previous_candle_4, previous_candle_5, trade, current_time, buy_tag)
-            if sell and (signal_name is not None):
-                return f"{signal_name} ( {buy_tag})"
             # Skip remaining sell logic for long mode
-            return None
+            return self.sell_long_mode(current_profit, max_profit, max_loss, last_candle, previous_candle_1, previous_candle_2, previous_candle_3, previous_candle_4, previous_candle_5, trade, current_time, buy_tag)
 
         # Original sell signals
         sell, signal_name = self.sell_signals(current_profit, max_profit, max_loss, last_candle, previous_candle_1, previous_candle_2, previous_candle_3, previous_candle_4, previous_candle_5, trade, current_time, buy_tag)
         if sell and (signal_name is not None):
-            return f"{signal_name} ( {buy_tag})"
+            return True, signal_name
 
         # Stoplosses
         sell, signal_name = self.sell_stoploss(current_profit, max_profit, max_loss, last_candle, previous_candle_1, trade, current_time)
         if sell and (signal_name is not None):
-            return f"{signal_name} ( {buy_tag})"
+            return True, signal_name
 
         # Over EMA200, main profit targets
         sell, signal_name = self.sell_over_main(current_profit, last_candle)
         if sell and (signal_name is not None):
-            return f"{signal_name} ( {buy_tag})"
+            return True, signal_name
 
         # Under EMA200, main profit targets
         sell, signal_name = self.sell_under_main(current_profit, last_candle)
         if sell and (signal_name is not None):
-            return f"{signal_name} ( {buy_tag})"
+            return True, signal_name
 
         # Williams %R based sells
         sell, signal_name = self.sell_r(current_profit, max_profit, max_loss, last_candle, previous_candle_1, trade, current_time)
         if sell and (signal_name is not None):
-            return f"{signal_name} ( {buy_tag})"
+            return True, signal_name
 
         # Trailing
         sell, signal_name = self.sell_trail(current_profit, max_profit, max_loss, last_candle, previous_candle_1, trade, current_time)
         if sell and (signal_name is not None):
-            return f"{signal_name} ( {buy_tag})"
+            return True, signal_name
 
         # The pair is descending
         sell, signal_name = self.sell_dec_main(current_profit, last_candle)
         if sell and (signal_name is not None):
-            return f"{signal_name} ( {buy_tag})"
+            return True, signal_name
 
         # Sell logic for pumped pairs
         sell, signal_name = self.sell_pump_main(current_profit, last_candle)
         if sell and (signal_name is not None):
-            return f"{signal_name} ( {buy_tag})"
+            return True, signal_name
 
         # The pair is pumped, stoploss
         sell, signal_name = self.sell_pump_stoploss(current_profit, max_profit, max_loss, last_candle, previous_candle_1, trade, current_time)
         if sell and (signal_name is not None):
-            return f"{signal_name} ( {buy_tag})"
+            return True, signal_name
 
         # Pivot points based sells
         sell, signal_name = self.sell_pivot(current_profit, max_profit, max_loss, last_candle, previous_candle_1, trade, current_time)
+        if sell and (signal_name is not None):
+            return True, signal_name
+
+        return False, None
+
+    def custom_exit(self, pair: str, trade: 'Trade', current_time: 'datetime', current_rate: float,
+                    current_profit: float, **kwargs):
+        dataframe, _ = self.dp.get_analyzed_dataframe(pair, self.timeframe)
+
+        buy_tag = 'empty'
+        if hasattr(trade, 'buy_tag') and trade.buy_tag is not None:
+            buy_tag = trade.buy_tag
+        max_profit = ((trade.max_rate - trade.open_rate) / trade.open_rate)
+        max_loss = ((trade.open_rate - trade.min_rate) / trade.min_rate)
+
+        # Precomputed candle conditions, if available (the candle rows are not needed)
+        flags = None
+        if self.vectorised_sells:
+            flags = self.vectorised_sells_cache.get_flags(pair, dataframe)
+
+        if flags is not None:
+            sell, signal_name = self.vectorised_sells_cache.call('sell_exit_signals', self, current_profit, max_profit, max_loss, flags, None, None, None, None, None, trade, current_time, buy_tag)
+        else:
+            last_candle = dataframe.iloc[-1]
+            previous_candle_1 = dataframe.iloc[-2]
+            previous_candle_2 = dataframe.iloc[-3]
+            previous_candle_3 = dataframe.iloc[-4]
+            previous_candle_4 = dataframe.iloc[-5]
+            previous_candle_5 = dataframe.iloc[-6]
+            sell, signal_name = self.sell_exit_signals(current_profit, max_profit, max_loss, last_candle, previous_candle_1, previous_candle_2, previous_candle_3, previous_candle_4, previous_candle_5, trade, current_time, buy_tag)
+
         if sell and (signal_name is not None):
             return f"{signal_name} ( {buy_tag})"
 
@@ -7036,6 +7074,15 @@ class NostalgiaForInfinityX(IStrategy):
         '''
         dataframe = self.normal_tf_indicators(dataframe, metadata)
 
+        '''
+        --> Candle conditions of the sell signals
+        ___________________________________________________________________________________________
+        '''
+        if self.vectorised_sells:
+            # only the last candle is used in live/dry-run modes
+            num_rows = 1 if self.config['runmode'].value in ('live', 'dry_run') else 0
+            self.vectorised_sells_cache.populate(metadata['pair'], dataframe, num_rows)
+
         tok = time.perf_counter()
         log.debug(f"[{metadata['pair']}] Populate indicators took a total of: {tok - tik:0.4f} seconds.")
 
@@ -0,0 +1,302 @@
+# VectorisedSells - evaluates the candle conditions of a strategy's sell_*() functions once per candle
+#
+# Strategies like NostalgiaForInfinityX decide exits in custom_exit() by calling a chain of sell_*() functions for
+# every open trade, every time the bot loops. Each function tests hundreds of conditions that mix candle data
+# (last_candle['rsi_14'] < 36.0, previous_candle_1['close'] > ...) with trade data (current_profit, max_profit, ...).
+# The candle conditions are the same for every trade on the pair, and reading scalar fields from the candle rows is
+# slow, so with many open trades this dominates the loop.
+#
+# This class parses the source of the sell_*() functions and splits the tests of their 'if' statements:
+#   - every candle-only test, or candle-only part of an 'and'/'or' test, becomes a condition. Conditions are
+#     evaluated on whole columns (numpy arrays), once per pair per candle, in populate_indicators(), giving one boolean
+#     column per condition
+#   - a copy of each sell_*() function is compiled with the candle conditions replaced by a lookup in the row of
+#     precomputed flags for the current candle (passed in place of last_candle). Everything else - trade/profit
+#     conditions, the order of the tests and the returned signal names - is unchanged, so exit decisions are the same
+#
+# Usage (in the strategy):
+#   sells = VectorisedSells(pathlib.Path(__file__).read_text(), 'MyStrategy', globals())
+#   sells.populate(pair, dataframe)  # in populate_indicators(). Use num_rows=1 in live/dry-run modes
+#   flags = sells.get_flags(pair, dataframe)  # in custom_exit(). None if not available (use the normal functions)
+#   sell, signal_name = sells.call('sell_xyz', self, current_profit, ..., flags, None, ..., trade, current_time)
+#
+# Limitations: the candle rows must only be used in 'if' tests (or passed on to other sell_*() functions), and
+# conditions must only use column lookups, constants, comparisons, arithmetic and and/or/not.
+# See reference/check_vectorised_sells.py for the equivalence check
+
+import ast
+import copy
+import logging
+
+import numpy as np
+import pandas as pd
+
+log = logging.getLogger(__name__)
+
+candle_names = ['last_candle'] + [f'previous_candle_{i}' for i in range(1, 6)]
+
+# name of last_candle in the compiled functions
+flags_name = 'flags'
+
+
+# -----------------------------------
+
+# column data for vectorised evaluation, shifted for the previous candles. Shifted columns are cached
+class CandleColumns():
+
+    def __init__(self, dataframe: pd.DataFrame):
+        self.dataframe = dataframe
+        self.columns = {}
+
+    def get(self, column: str, shift: int) -> np.ndarray:
+        key = (column, shift)
+        if key not in self.columns:
+            if shift == 0:
+                self.columns[key] = self.dataframe[column].to_numpy()
+            else:
+                self.columns[key] = self.dataframe[column].shift(shift).to_numpy()
+        return self.columns[key]
+
+
+# element-wise equivalent of bool() (NaN is True, as for scalars)
+def truth(values) -> np.ndarray:
+    values = np.asarray(values)
+    if values.dtype == bool:
+        return values
+    if values.dtype == object:
+        return np.fromiter((bool(v) for v in values), dtype=bool, count=len(values))
+    return values != 0
+
+
+def all_of(*values) -> np.ndarray:
+    return np.logical_and.reduce([truth(v) for v in values])
+
+
+def any_of(*values) -> np.ndarray:
+    return np.logical_or.reduce([truth(v) for v in values])
+
+
+# -----------------------------------
+
+# True if node only uses candle data (and constants)
+def is_candle_only(node) -> bool:
+    names = {n.id for n in ast.walk(node) if isinstance(n, ast.Name)}
+    if (not names) or (not names.issubset(candle_names)):
+        return False
+    for n in ast.walk(node):
+        if isinstance(n, ast.Name) and not isinstance(n.ctx, ast.Load):
+            return False
+        if isinstance(n, (ast.Call, ast.Attribute, ast.Lambda, ast.IfExp, ast.NamedExpr)):
+            return False
+    return True
+
+
+# converts a candle condition into an expression that evaluates it for all candles, using CandleColumns (columns)
+class VectorExpression(ast.NodeTransformer):
+
+    def visit_Subscript(self, node):
+        if not (isinstance(node.value, ast.Name) and isinstance(node.slice, ast.Constant)):
+            raise ValueError(f"Unsupported candle access: {ast.unparse(node)}")
+        shift = candle_names.index(node.value.id)
+        return ast.Call(func=ast.Attribute(value=ast.Name(id='columns', ctx=ast.Load()), attr='get', ctx=ast.Load()),
+                        args=[ast.Constant(value=node.slice.value), ast.Constant(value=shift)], keywords=[])
+
+    def visit_Name(self, node):
+        raise ValueError(f"Unsupported use of {node.id}")
+
+    def visit_BoolOp(self, node):
+        func = 'all_of' if isinstance(node.op, ast.And) else 'any_of'
+        return ast.Call(func=ast.Name(id=func, ctx=ast.Load()),
+                        args=[self.visit(v) for v in node.values], keywords=[])
+
+    def visit_UnaryOp(self, node):
+        if isinstance(node.op, ast.Not):
+            return ast.UnaryOp(op=ast.Invert(), operand=ast.Call(func=ast.Name(id='truth', ctx=ast.Load()),
+                                                                   args=[self.visit(node.operand)], keywords=[]))
+        return self.generic_visit(node)
+
+    # a < b < c is (a < b) and (b < c)
+    def visit_Compare(self, node):
+        node = self.generic_visit(node)
+        if len(node.ops) == 1:
+            return node
+        operands = [node.left] + node.comparators
+        pairs = [ast.Compare(left=operands[i], ops=[op], comparators=[operands[i + 1]])
+                 for i, op in enumerate(node.ops)]
+        return ast.Call(func=ast.Name(id='all_of', ctx=ast.Load()), args=pairs, keywords=[])
+
+
+# replaces the candle conditions in the sell_*() functions with lookups in the row of flags, and calls to other
+# sell_*() functions with calls to the compiled versions
+class FlagFunction(ast.NodeTransformer):
+
+    def __init__(self, sells, function_names):
+        self.sells = sells
+        self.function_names = function_names
+
+    def visit_If(self, node):
+        node.test = self.split_test(node.test)
+        node.body = [self.visit(n) for n in node.body]
+        node.orelse = [self.visit(n) for n in node.orelse]
+        return node
+
+    def split_test(self, test):
+        if is_candle_only(test):
+            return self.sells.add_condition(test)
+        if isinstance(test, ast.BoolOp):
+            # candle-only operands are combined into one condition. Conditions have no side effects, so the order
+            # of the operands does not change the result
+            candle_values = [v for v in test.values if is_candle_only(v)]
+            other_values = [self.split_test(v) for v in test.values if not is_candle_only(v)]
+            if len(candle_values) > 1:
+                candle_values = [ast.BoolOp(op=test.op, values=candle_values)]
+            values = [self.sells.add_condition(v) for v in candle_values] + other_values
+            return ast.BoolOp(op=test.op, values=values) if len(values) > 1 else values[0]
+        if isinstance(test, ast.UnaryOp) and isinstance(test.op, ast.Not):
+            return ast.UnaryOp(op=test.op, operand=self.split_test(test.operand))
+        return self.generic_visit(test)
+
+    def visit_Call(self, node):
+        node = self.generic_visit(node)
+        if isinstance(node.func, ast.Attribute) and isinstance(node.func.value, ast.Name) and \
+                (node.func.value.id == 'self') and (node.func.attr in self.function_names):
+            node.func = ast.Name(id=node.func.attr, ctx=ast.Load())
+            node.args = [ast.Name(id='self', ctx=ast.Load())] + node.args
+        return node
+
+    def visit_Subscript(self, node):
+        if isinstance(node.value, ast.Name) and (node.value.id in candle_names):
+            raise ValueError(f"Candle data used outside of a candle condition: {ast.unparse(node)}")
+        return self.generic_visit(node)
+
+    # anything left is the candle rows being passed on to other functions
+    def visit_Name(self, node):
+        if node.id == 'last_candle':
+            node.id = flags_name
+        return node
+
+    def visit_arg(self, node):
+        if node.arg == 'last_candle':
+            node.arg = flags_name
+        return node
+
+
+# -----------------------------------
+
+class VectorisedSells():
+
+    prefix = 'sell_'
+
+    # source: source code of the module containing the strategy class
+    # namespace: globals used by the sell_*() functions (normally the globals of the strategy module)
+    def __init__(self, source: str, class_name: str, namespace: dict):
+        self.conditions = []  # vectorised expressions (compiled), one per condition
+        self.condition_keys = {}  # condition (ast dump) -> index, to share identical conditions
+        self.columns = set()  # columns used by the conditions
+        self.functions = {}  # compiled sell_*() functions, using flags
+        self.flags = {}  # pair -> (dates, packed flags array), from populate()
+        self.rows = {}  # pair -> (dataframe, date, flags as list) of the last row used
+        self.compile(source, class_name, namespace)
+
+    def compile(self, source: str, class_name: str, namespace: dict):
+        tree = ast.parse(source)
+        class_def = next(n for n in tree.body if isinstance(n, ast.ClassDef) and (n.name == class_name))
+        functions = [n for n in class_def.body if isinstance(n, ast.FunctionDef) and n.name.startswith(self.prefix)]
+
+        names = {f.name for f in functions}
+        module = ast.Module(body=[], type_ignores=[])
+        for function in functions:
+            function.decorator_list = []
+            module.body.append(FlagFunction(self, names).visit(function))
+        ast.fix_missing_locations(module)
+
+        self.functions = dict(namespace)
+        exec(compile(module, f"<vectorised {class_def.name}>", 'exec'), self.functions)
+        self.functions = {name: self.functions[name] for name in names}
+
+    # adds a condition (if new), returns the lookup that replaces it
+    def add_condition(self, node):
+        key = ast.dump(node)
+        if key not in self.condition_keys:
+            self.condition_keys[key] = len(self.conditions)
+            self.columns.update(n.slice.value for n in ast.walk(node)
+                                if isinstance(n, ast.Subscript) and isinstance(n.slice, ast.Constant))
+            expression = ast.Call(func=ast.Name(id='truth', ctx=ast.Load()),
+                                  args=[VectorExpression().visit(copy.deepcopy(node))],
+                                  keywords=[])
+            expression = ast.fix_missing_locations(ast.Expression(body=expression))
+            self.conditions.append(compile(expression, '<condition>', 'eval'))
+
+        return ast.Subscript(value=ast.Name(id=flags_name, ctx=ast.Load()),
+                             slice=ast.Constant(value=self.condition_keys[key]), ctx=ast.Load())
+
+    # flags for every condition (columns) and every candle (rows), packed into bits (see np.packbits()), i.e. each
+    # row has one bit per condition. A year of 5m candles with ~1000 conditions is ~14MB per pair (instead of ~110MB).
+    # The conditions are evaluated 8 at a time (one byte column), so the unpacked array is never created
+    def evaluate(self, dataframe: pd.DataFrame) -> np.ndarray:
+        namespace = {'columns': CandleColumns(dataframe), 'truth': truth, 'all_of': all_of, 'any_of': any_of}
+        num_rows = dataframe.shape[0]
+        packed = np.empty((num_rows, (len(self.conditions) + 7) // 8), dtype=np.uint8)
+        block = np.zeros((num_rows, 8), dtype=bool)
+        with np.errstate(invalid='ignore'):
+            for start in range(0, len(self.conditions), 8):
+                block[:] = False
+                for i, condition in enumerate(self.conditions[start:start + 8]):
+                    block[:, i] = eval(condition, namespace)
+                packed[:, start // 8] = np.packbits(block, axis=1)[:, 0]
+        return packed
+
+    # evaluates the conditions for the pair. If that is not possible, the pair falls back to the normal functions
+    # num_rows: only evaluate the last num_rows candles (in live/dry-run modes, only the last candle is used).
+    # 0 means all candles (backtesting)
+    def populate(self, pair: str, dataframe: pd.DataFrame, num_rows=0):
+        self.flags.pop(pair, None)
+        self.rows.pop(pair, None)
+
+        missing = self.columns.difference(dataframe.columns)
+        if missing:
+            log.warning(f"[{pair}] Not using vectorised sells, missing columns: {sorted(missing)}")
+            return
+
+        # the previous candles are needed to evaluate the first row
+        if num_rows > 0:
+            dataframe = dataframe.iloc[-(num_rows + len(candle_names) - 1):]
+
+        try:
+            flags = self.evaluate(dataframe)
+        except Exception as e:
+            log.warning(f"[{pair}] Not using vectorised sells: {e}")
+            return
+
+        if num_rows > 0:
+            dataframe = dataframe.iloc[-num_rows:]
+            flags = flags[-num_rows:]
+
+        self.flags[pair] = (pd.DatetimeIndex(dataframe['date']), flags)
+
+    # flags for the last candle of dataframe, as a list. None if the candle was not evaluated
+    def get_flags(self, pair: str, dataframe: pd.DataFrame):
+        if (pair not in self.flags) or (dataframe.shape[0] == 0):
+            return None
+
+        # in live/dry-run modes, the same (analyzed) dataframe is used for all the trades on the pair
+        if (pair in self.rows) and (self.rows[pair][0] is dataframe):
+            return self.rows[pair][2]
+
+        last_date = dataframe['date'].iat[-1]
+        if (pair in self.rows) and (self.rows[pair][1] == last_date):
+            self.rows[pair] = (dataframe, last_date, self.rows[pair][2])
+            return self.rows[pair][2]
+
+        dates, flags = self.flags[pair]
+        index = dates.searchsorted(last_date)
+        if (index >= len(dates)) or (dates[index] != last_date):
+            return None
+
+        row = np.unpackbits(flags[index], count=len(self.conditions)).astype(bool)
+        self.rows[pair] = (dataframe, last_date, row.tolist())
+        return self.rows[pair][2]
+
+    # calls the compiled version of a sell_*() function. Pass the flags in place of last_candle
+    def call(self, name: str, strategy, *args):
+        return self.functions[name](strategy, *args)
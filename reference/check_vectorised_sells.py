@@ -0,0 +1,225 @@
+# Equivalence check and timing for the vectorised sell signals of NostalgiaForInfinityX (see VectorisedSells.py)
+#
+# Does not need freqtrade: the sell_*() functions are compiled directly from NostalgiaForInfinityX.py, both as they
+# are (normal, candle rows) and with the candle conditions precomputed (vectorised, flags). For every candle of the
+# data, a set of random trades (profit, max profit/loss, open date, buy tag) is run through both versions of
+# sell_exit_signals() (the logic of custom_exit()) and the exit decisions (signal names) must be identical.
+#
+# The data is either an analyzed dataframe saved from the strategy (e.g. dataframe.to_feather() in a backtest), or
+# seeded synthetic data, with values for every column used by the sell signals spread around the thresholds that the
+# conditions test (so that most of the signals are reached).
+#
+# Usage: python check_vectorised_sells.py [options]
+#
+#   --data=<file>     analyzed dataframe (.feather, .pkl or .csv) with a 'date' column. Default is synthetic data
+#   --candles=N       number of (synthetic) candles. Default is 5000
+#   --trades=N        number of random trades per candle. Default is 20
+#   --quick           same as --candles=1000 --trades=10
+#
+# Exits with status 1 if any exit decision is different
+
+import ast
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(__file__).parent))
+
+from VectorisedSells import VectorisedSells, candle_names
+
+strategy_file = Path(__file__).parent / 'NostalgiaForInfinityX.py'
+strategy_class = 'NostalgiaForInfinityX'
+seed = 42
+
+buy_tags = ['empty', '1', '4 12', '21', '31', '31 32', '36', '31 4', '44 45']
+
+
+# -----------------------------------
+
+# the normal sell_*() functions, as methods of an otherwise empty class
+def get_normal_sells(source: str, namespace: dict):
+    tree = ast.parse(source)
+    class_def = next(n for n in tree.body if isinstance(n, ast.ClassDef) and (n.name == strategy_class))
+    functions = [n for n in class_def.body if isinstance(n, ast.FunctionDef) and n.name.startswith('sell_')]
+    module = ast.Module(body=functions, type_ignores=[])
+    functions_namespace = dict(namespace)
+    exec(compile(module, str(strategy_file), 'exec'), functions_namespace)
+    return type('NormalSells', (), {f.name: functions_namespace[f.name] for f in functions})()
+
+
+# constants that each column is compared to (columns compared to other columns are price-like)
+def get_thresholds(source: str):
+    thresholds = {}
+    price_columns = set()
+    for node in ast.walk(ast.parse(source)):
+        if not isinstance(node, ast.Compare):
+            continue
+        operands = [node.left] + node.comparators
+        columns = [n.slice.value for o in operands for n in ast.walk(o)
+                   if isinstance(n, ast.Subscript) and isinstance(n.value, ast.Name) and (n.value.id in candle_names)]
+        constants = []
+        for o in operands:
+            try:
+                constants.append(float(ast.literal_eval(o)))
+            except (ValueError, TypeError, SyntaxError):
+                pass
+        if len(columns) > 1:
+            price_columns.update(columns)
+        for column in columns:
+            thresholds.setdefault(column, set()).update(constants)
+    return thresholds, price_columns
+
+
+# seeded synthetic data, with every column used by the conditions
+def get_synthetic_data(columns, thresholds, price_columns, num_candles) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 100.0 * np.exp(np.cumsum(rng.normal(0.0, 0.01, num_candles)))
+    data = {'date': pd.date_range('2022-01-01', periods=num_candles, freq='5min', tz='UTC')}
+    for column in sorted(columns):
+        values = sorted(thresholds.get(column, []))
+        if column == 'close':
+            data[column] = close
+        elif column in price_columns:
+            data[column] = close * (1.0 + rng.normal(0.0, 0.05, num_candles))
+        elif values:
+            # close to one of the thresholds, plus some NaNs
+            spread = max(1.0, max(abs(v) for v in values)) * 0.05
+            data[column] = rng.choice(values, num_candles) + rng.normal(0.0, spread, num_candles)
+            data[column][rng.random(num_candles) < 0.01] = np.nan
+        else:
+            # flags (tested as bool), as after merging informative pairs
+            flags = pd.Series(rng.random(num_candles) < 0.5, dtype=object)
+            flags[rng.random(num_candles) < 0.01] = np.nan
+            data[column] = flags.to_numpy()
+    return pd.DataFrame(data)
+
+
+def load_data(path: str) -> pd.DataFrame:
+    if path.endswith('.feather'):
+        return pd.read_feather(path)
+    if path.endswith('.pkl'):
+        return pd.read_pickle(path)
+    return pd.read_csv(path, parse_dates=['date'])
+
+
+# -----------------------------------
+
+def random_trades(rng, current_time, num_trades):
+    trades = []
+    for _ in range(num_trades):
+        current_profit = float(rng.choice([rng.uniform(-0.3, 0.0), rng.uniform(0.0, 0.25), rng.uniform(0.25, 1.0)],
+                                          p=[0.35, 0.5, 0.15]))
+        max_profit = current_profit + float(rng.exponential(0.04))
+        max_loss = float(rng.exponential(0.08))
+        trade = SimpleNamespace(open_date_utc=current_time - timedelta(minutes=int(rng.integers(5, 10000))))
+        trades.append((current_profit, max_profit, max_loss, trade, str(rng.choice(buy_tags))))
+    return trades
+
+
+def main():
+    data_file = ""
+    num_candles = 5000
+    num_trades = 20
+
+    args = sys.argv[1:]
+    for arg in args:
+        if arg == '--quick':
+            num_candles = 1000
+            num_trades = 10
+        elif arg.startswith('--data='):
+            data_file = arg.split('=')[1]
+        elif arg.startswith('--candles='):
+            num_candles = int(arg.split('=')[1])
+        elif arg.startswith('--trades='):
+            num_trades = int(arg.split('=')[1])
+        else:
+            print(f"Unknown option: {arg}")
+            sys.exit(1)
+
+    source = strategy_file.read_text()
+    namespace = {'timedelta': timedelta, 'datetime': datetime}
+
+    start = time.perf_counter()
+    sells = VectorisedSells(source, strategy_class, namespace)
+    compile_time = time.perf_counter() - start
+    normal = get_normal_sells(source, namespace)
+    print(f"Compiled {len(sells.functions)} sell functions, {len(sells.conditions)} candle conditions "
+          f"({len(sells.columns)} columns) in {compile_time:.2f}s")
+
+    if data_file:
+        dataframe = load_data(data_file)
+        print(f"Loaded {dataframe.shape[0]} candles from {data_file}")
+    else:
+        thresholds, price_columns = get_thresholds(source)
+        dataframe = get_synthetic_data(sells.columns, thresholds, price_columns, num_candles)
+        print(f"Synthetic data: {dataframe.shape[0]} candles")
+
+    pair = 'BTC/USDT'
+    start = time.perf_counter()
+    sells.populate(pair, dataframe)
+    populate_time = time.perf_counter() - start
+    if pair not in sells.flags:
+        print("Could not evaluate the candle conditions")
+        sys.exit(1)
+
+    rng = np.random.default_rng(seed)
+    normal_time = 0.0
+    vectorised_time = 0.0
+    num_decisions = 0
+    num_exits = 0
+    mismatches = []
+    signals = set()
+
+    for i in range(5, dataframe.shape[0]):
+        current_time = dataframe['date'].iloc[i].to_pydatetime()
+        window = dataframe.iloc[i - 5:i + 1]
+        trades = random_trades(rng, current_time, num_trades)
+
+        # same as custom_exit(): the normal version reads the candle rows for every trade
+        start = time.perf_counter()
+        normal_results = []
+        for current_profit, max_profit, max_loss, trade, buy_tag in trades:
+            candles = [window.iloc[-1 - k] for k in range(6)]
+            normal_results.append(normal.sell_exit_signals(current_profit, max_profit, max_loss, *candles, trade,
+                                                           current_time, buy_tag))
+        normal_time += time.perf_counter() - start
+
+        start = time.perf_counter()
+        vectorised_results = []
+        for current_profit, max_profit, max_loss, trade, buy_tag in trades:
+            flags = sells.get_flags(pair, window)
+            vectorised_results.append(sells.call('sell_exit_signals', normal, current_profit, max_profit, max_loss,
+                                                 flags, None, None, None, None, None, trade, current_time, buy_tag))
+        vectorised_time += time.perf_counter() - start
+
+        for trade, normal_result, vectorised_result in zip(trades, normal_results, vectorised_results):
+            num_decisions += 1
+            if normal_result[0] and (normal_result[1] is not None):
+                num_exits += 1
+                signals.add(normal_result[1])
+            if normal_result != vectorised_result:
+                mismatches.append((i, trade[:3], trade[4], normal_result, vectorised_result))
+
+    print("")
+    print(f"Decisions: {num_decisions}, exits: {num_exits}, distinct signals: {len(signals)}")
+    print(f"Normal:     {1e6 * normal_time / num_decisions:8.1f} us per decision")
+    print(f"Vectorised: {1e6 * vectorised_time / num_decisions:8.1f} us per decision "
+          f"(+ {1e6 * populate_time / dataframe.shape[0]:.1f} us per candle to populate)")
+
+    if mismatches:
+        print(f"{len(mismatches)} different exit decisions, e.g.:")
+        for mismatch in mismatches[:10]:
+            print(f"  candle {mismatch[0]} trade {mismatch[1]} tag '{mismatch[2]}': "
+                  f"normal {mismatch[3]} vectorised {mismatch[4]}")
+        sys.exit(1)
+
+    print("All exit decisions are identical")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,502 @@
+# Streaming parser for test/hyperopt log files, with results stored in a (SQLite) database
+#
+# The Summarise*.py scripts used to re-parse the entire log file every time they were run, which is slow for
+# multi-hundred-MB logs. This module parses the result blocks into database tables instead, and records how far
+# each file has been parsed, so that repeated runs only parse new data (logs are appended to as tests run).
+#
+# Notes:
+#   - each log file has an entry in the 'files' table, containing the byte offset of the last *complete* result
+#     block, the parser context at that point (exchange, test date etc.) and a fingerprint of the data before it
+#   - if the fingerprint no longer matches (e.g. the log was overwritten by a new run) the file is parsed from scratch
+#   - incomplete blocks at the end of a file are stored (so that they show up in summaries), but are re-parsed the
+#     next time around
+#   - the database defaults to log_results.sqlite in the same directory as the log file
+#
+# Usage (from another script):
+#
+#   db = ResultsDB(ResultsDB.default_path(log_file))
+#   db.update(log_file, TestLogParser)
+#   df = db.query(TestLogParser, log_file)
+
+import hashlib
+import json
+import os
+import sqlite3
+from datetime import datetime
+
+import pandas
+
+
+###################################
+# Parsers
+# Each parser is fed one line at a time. Records are associated with the byte offset of the start of the result
+# block they came from, which is where parsing resumes if the block is not complete
+
+class LogParser():
+
+    table = ''
+    columns = []  # (name, sqlite type)
+
+    def __init__(self):
+        self.context = {}
+        self.block = None          # data for the current (incomplete) block
+        self.block_offset = None   # byte offset of the start of the current block
+        self.block_context = None  # context at the start of the current block
+        self.records = []          # completed records: (block_offset, seq, record)
+
+    def get_state(self) -> str:
+        context = self.context if self.block is None else self.block_context
+        return json.dumps(context)
+
+    def set_state(self, state: str):
+        self.context = json.loads(state) if state else {}
+
+    def start_block(self, offset: int, block: dict):
+        self.block_context = dict(self.context)
+        self.block_offset = offset
+        self.block = block
+
+    def end_block(self):
+        self.block = None
+        self.block_offset = None
+        self.block_context = None
+
+    def add_record(self, record: dict, seq=0):
+        self.records.append((self.block_offset, seq, record))
+
+    # offset at which parsing should resume
+    def checkpoint(self, offset: int) -> int:
+        return offset if self.block is None else self.block_offset
+
+    def feed(self, line: str, offset: int):
+        raise NotImplementedError
+
+    # called at end of file. Saves whatever is usable from the current block (which stays 'open')
+    def flush(self):
+        pass
+
+    @staticmethod
+    def table_cols(line: str) -> list:
+        cols = line.strip().split("|")
+        cols.pop(0)
+        cols.pop(len(cols) - 1)
+        return cols
+
+
+# results of backtests (test_*.log), as generated by test_group.sh, test_exchange.sh etc.
+class TestLogParser(LogParser):
+
+    table = 'test_results'
+    columns = [
+        ('exchange', 'TEXT'), ('test_date', 'TEXT'), ('num_test_days', 'INTEGER'), ('strategy', 'TEXT'),
+        ('entries', 'INTEGER'), ('daily_trades', 'REAL'), ('ave_profit', 'REAL'), ('tot_profit', 'REAL'),
+        ('win_pct', 'REAL'), ('expectancy', 'REAL'), ('daily_profit', 'REAL'), ('market_change', 'REAL')
+    ]
+
+    def feed(self, line: str, offset: int):
+
+        if "Result for strategy " in line:
+            self.flush()
+            self.end_block()
+            strat = line.rstrip().split(" ")[-1]
+            self.start_block(offset, {'strategy': strat, 'state': 'totals', 'record': None})
+            return
+
+        if self.block is None:
+            self.process_header(line)
+            return
+
+        state = self.block['state']
+        if state == 'totals':
+            if 'TOTAL' in line:
+                try:
+                    self.block['record'] = self.process_totals(self.block['strategy'], line)
+                    self.block['state'] = 'metrics'
+                except (ValueError, IndexError):
+                    pass  # not the results table
+
+        elif state == 'metrics':
+            if '================== SUMMARY METRICS' in line:
+                if self.block['record']['entries'] > 0:
+                    self.block['state'] = 'expectancy'
+                else:
+                    self.complete_block()
+
+        elif state == 'expectancy':
+            if 'Expectancy' in line:
+                try:
+                    self.block['record']['expectancy'] = self.process_expectancy(line)
+                except (ValueError, IndexError):
+                    pass
+                self.block['state'] = 'details'
+
+        elif state == 'details':
+            if 'daily profit %' in line:
+                # entry in test output is not very accurate, so just calculate
+                record = self.block['record']
+                if record['num_test_days'] > 0:
+                    record['daily_profit'] = round(float(record['tot_profit'] / record['num_test_days']), 3)
+            elif 'Market change' in line:
+                try:
+                    self.block['record']['market_change'] = self.process_market_change(line)
+                except (ValueError, IndexError):
+                    pass
+            elif line.lstrip().startswith('==============================='):
+                self.complete_block()
+
+    def complete_block(self):
+        self.add_record(self.block['record'])
+        self.end_block()
+
+    def flush(self):
+        if (self.block is not None) and (self.block['record'] is not None):
+            self.add_record(self.block['record'])
+
+    def process_header(self, line: str):
+
+        if ('exchange:' in line) and ('exchange' not in self.context):
+            # line format:
+            # Testing strategy list for exchange: binanceus...
+            exchange = line.split(":")[-1]
+            self.context['exchange'] = exchange.strip().replace(".", "")
+
+        elif line.lstrip().startswith('Date/time:'):
+            # line format:
+            # Date/time: Wed May 31 08:42:11 PDT 2023
+            date_string = line.strip().split(": ")[-1]
+            try:
+                date_object = datetime.strptime(date_string, "%a %b %d %H:%M:%S %Z %Y")
+                self.context['test_date'] = date_object.strftime("%Y %b %d")
+            except ValueError:
+                self.context['test_date'] = date_string
+
+        elif line.lstrip().startswith('Time range'):
+            # line format:
+            # Time range: 20220605-20230531
+            date_string = line.strip().split(":")[-1]
+            try:
+                start_date, end_date = date_string.split("-")
+                start_date = datetime.strptime(start_date.strip(), "%Y%m%d")
+                end_date = datetime.strptime(end_date.strip(), "%Y%m%d")
+                self.context['num_test_days'] = (end_date - start_date).days
+            except ValueError:
+                pass
+
+    def process_totals(self, strat: str, line: str) -> dict:
+        # format of line:
+        # | TOTAL | Entries | Avg Profit % | Cum Profit % |  Tot Profit USD | Tot Profit % | Avg Duration | Win  Draw  Loss  Win% |
+        cols = self.table_cols(line)
+
+        num_test_days = int(self.context.get('num_test_days', 0))
+        entries = int(cols[1])
+
+        return {
+            'exchange': self.context.get('exchange', ''),
+            'test_date': str(self.context.get('test_date', None)),
+            'num_test_days': num_test_days,
+            'strategy': strat,
+            'entries': entries,
+            'daily_trades': float(entries) / float(num_test_days) if num_test_days > 0 else 0.0,
+            'ave_profit': float(cols[2]),
+            'tot_profit': float(cols[5]),
+            'win_pct': float(cols[7].strip().split(" ")[-1]),
+            'expectancy': 0.0,
+            'daily_profit': 0.0,
+            'market_change': None
+        }
+
+    def process_expectancy(self, line: str) -> float:
+        # format of line:
+        # | Expectancy                  | -0.05               |
+        cols = self.table_cols(line)[-1]
+        if "(" in cols:
+            cols = cols.strip().split("(")[0]
+        return float(cols)
+
+    def process_market_change(self, line: str) -> float:
+        # format of line:
+        # | Market change                   | -16.55%                |
+        cols = self.table_cols(line)
+        return float(str(cols[-1]).strip().strip("%"))
+
+
+# results of hyperopt runs (hyp_*.log), as generated by hyp_group.sh etc.
+class HyperOptLogParser(LogParser):
+
+    table = 'hyperopt_results'
+    columns = [
+        ('strategy', 'TEXT'), ('entries', 'INTEGER'), ('wins', 'INTEGER'), ('draws', 'INTEGER'),
+        ('losses', 'INTEGER'), ('ave_profit', 'REAL'), ('tot_profit', 'REAL'), ('win_pct', 'REAL'),
+        ('details', 'TEXT')
+    ]
+
+    separator = '------------------'
+
+    def feed(self, line: str, offset: int):
+
+        text = line.rstrip()
+        state = None if self.block is None else self.block['state']
+
+        if state is None or state == 'details':
+            if line.lstrip().startswith(self.separator):
+                # header of new run
+                self.flush()
+                self.end_block()
+                self.start_block(offset, {'strategy': '', 'state': 'name', 'lines': ["", text], 'totals': None})
+            elif state == 'details':
+                if line.lstrip().startswith('# ROI table:'):
+                    self.complete_block()
+                else:
+                    self.block['lines'].append(text)
+            return
+
+        if state == 'name':
+            self.block['strategy'] = line.strip()
+            self.block['lines'].append(text)
+            self.block['state'] = 'header'
+
+        elif state == 'header':
+            self.block['lines'].append(text)
+            if line.lstrip().startswith(self.separator):
+                self.block['state'] = 'skip'
+
+        elif state == 'skip':
+            # skip anything between header & results
+            if line.lstrip().startswith('+--------'):
+                self.block['lines'].append(text)
+                self.block['state'] = 'table'
+
+        elif state == 'table':
+            # get the best results line
+            if 'Wins/Draws/Losses' in line:
+                self.block['totals'] = self.process_totals(line.strip())
+                self.block['lines'].append(text)
+                self.block['state'] = 'details'
+            elif "|" in line:
+                self.block['lines'].append(text)
+
+    def complete_block(self):
+        self.flush()
+        self.end_block()
+
+    def flush(self):
+        if self.block is not None:
+            record = {'strategy': self.block['strategy'], 'details': "\n".join(self.block['lines'])}
+            totals = self.block['totals']
+            if totals is None:
+                totals = {'entries': None, 'wins': None, 'draws': None, 'losses': None,
+                          'ave_profit': None, 'tot_profit': None, 'win_pct': None}
+            record.update(totals)
+            self.add_record(record)
+
+    def process_totals(self, line: str) -> dict:
+        # format of line:
+        # 97/100:     94 trades. 63/0/31 Wins/Draws/Losses. Avg profit   0.59%. Median profit   1.15%. Total profit 1658.03907912 USD (  16.58%). Avg duration 22:16:00 min. Objective: -30.83651
+        cols = " ".join(line[1:].split())  # get rid of multiple spaces (and 1st character, which could be '*')
+        cols = cols.strip().split(" ")
+
+        entries = int(cols[1])
+        wins, draws, losses = cols[3].strip().split("/")
+        return {
+            'entries': entries,
+            'wins': int(wins),
+            'draws': int(draws),
+            'losses': int(losses),
+            'ave_profit': float(cols[7].split('%')[0]),
+            'tot_profit': float(cols[16].split('%')[0]),
+            'win_pct': 100.0 * float(wins) / float(entries) if entries > 0 else 0.0
+        }
+
+
+# summary tables of monthly tests (as generated by test_monthly.sh)
+class MonthlyLogParser(LogParser):
+
+    table = 'monthly_results'
+    columns = [('strategy', 'TEXT'), ('profit', 'REAL'), ('win_pct', 'REAL'), ('draw', 'REAL')]
+
+    def feed(self, line: str, offset: int):
+
+        if self.block is None:
+            if "STRATEGY SUMMARY" in line:
+                self.start_block(offset, {'state': 'skip', 'rows': []})
+            return
+
+        if self.block['state'] == 'skip':
+            # skip the table header
+            self.block['state'] = 'data'
+
+        elif "===================" in line:
+            self.complete_block()
+
+        else:
+            items = line.split("|")
+            if len(items) < 10:
+                return
+            try:
+                row = {
+                    'strategy': items[1].strip(),
+                    'profit': float(items[6].strip()),
+                    'win_pct': float(items[8].split()[3].strip()),
+                    'draw': float(items[9].split()[2].strip().replace("%", ""))
+                }
+            except (ValueError, IndexError):
+                return
+            self.block['rows'].append(row)
+
+    def complete_block(self):
+        self.flush()
+        self.end_block()
+
+    def flush(self):
+        if self.block is not None:
+            for seq, row in enumerate(self.block['rows']):
+                self.add_record(row, seq)
+
+
+###################################
+# Results database
+
+class ResultsDB():
+
+    fingerprint_size = 65536  # bytes sampled from the start of the file and before the saved offset
+    verbose = True
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS files (path TEXT, kind TEXT, offset INTEGER, size INTEGER, "
+                          "fingerprint TEXT, state TEXT, PRIMARY KEY (path, kind))")
+        for parser_class in [TestLogParser, HyperOptLogParser, MonthlyLogParser]:
+            cols = ", ".join([f"{name} {ctype}" for name, ctype in parser_class.columns])
+            self.conn.execute(f"CREATE TABLE IF NOT EXISTS {parser_class.table} "
+                              f"(file TEXT, block_offset INTEGER, seq INTEGER, {cols})")
+            self.conn.execute(f"CREATE INDEX IF NOT EXISTS {parser_class.table}_file "
+                              f"ON {parser_class.table} (file, block_offset)")
+        self.conn.commit()
+
+    @staticmethod
+    def default_path(log_file: str) -> str:
+        return os.path.join(os.path.dirname(os.path.abspath(log_file)), "log_results.sqlite")
+
+    def close(self):
+        self.conn.close()
+
+    def get_fingerprint(self, log_file: str, offset: int) -> str:
+        hasher = hashlib.sha1()
+        with open(log_file, 'rb') as f:
+            hasher.update(f.read(min(offset, self.fingerprint_size)))
+            start = max(0, offset - self.fingerprint_size)
+            f.seek(start)
+            hasher.update(f.read(offset - start))
+        hasher.update(str(offset).encode('utf-8'))
+        return hasher.hexdigest()
+
+    # parse any new data in the log file. Returns the number of new (or updated) records
+    def update(self, log_file: str, parser_class, rebuild=False) -> int:
+
+        path = os.path.abspath(log_file)
+        kind = parser_class.table
+        size = os.path.getsize(path)
+        parser = parser_class()
+
+        offset = 0
+        row = self.conn.execute("SELECT offset, fingerprint, state FROM files WHERE path=? AND kind=?",
+                                (path, kind)).fetchone()
+        if (row is not None) and not rebuild:
+            saved_offset, fingerprint, state = row
+            if (saved_offset <= size) and (self.get_fingerprint(path, saved_offset) == fingerprint):
+                offset = saved_offset
+                parser.set_state(state)
+            elif self.verbose:
+                print(f"{log_file} has changed, re-parsing")
+
+        if (offset == size) and (row is not None) and not rebuild:
+            return 0  # nothing new
+
+        if self.verbose and (offset > 0):
+            print(f"Parsing {log_file} from byte {offset} ({size - offset} new bytes)")
+
+        # parse new data
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            pos = offset
+            partial_offset = None
+            for raw in f:
+                if not raw.endswith(b'\n'):
+                    partial_offset = pos  # last line is still being written
+                parser.feed(raw.decode('utf-8', errors='replace'), pos)
+                pos += len(raw)
+            parser.flush()
+
+        checkpoint = parser.checkpoint(pos)
+        if partial_offset is not None:
+            checkpoint = min(checkpoint, partial_offset)
+
+        # replace anything from the resume point onwards, then add the new records
+        names = [name for name, _ in parser_class.columns]
+        placeholders = ", ".join(["?"] * (len(names) + 3))
+        with self.conn:
+            self.conn.execute(f"DELETE FROM {kind} WHERE file=? AND block_offset>=?", (path, offset))
+            self.conn.executemany(
+                f"INSERT INTO {kind} (file, block_offset, seq, {', '.join(names)}) VALUES ({placeholders})",
+                [(path, block_offset, seq) + tuple(record.get(name, None) for name in names)
+                 for block_offset, seq, record in parser.records]
+            )
+            self.conn.execute("INSERT OR REPLACE INTO files (path, kind, offset, size, fingerprint, state) "
+                              "VALUES (?, ?, ?, ?, ?, ?)",
+                              (path, kind, checkpoint, size, self.get_fingerprint(path, checkpoint),
+                               parser.get_state()))
+
+        return len(parser.records)
+
+    # returns the records for the log file(s), in the order they appear in the log(s)
+    def query(self, parser_class, log_files=None) -> pandas.DataFrame:
+        sql = f"SELECT * FROM {parser_class.table}"
+        params = []
+        if log_files is not None:
+            if isinstance(log_files, str):
+                log_files = [log_files]
+            paths = [os.path.abspath(f) for f in log_files]
+            sql += " WHERE file IN ({})".format(", ".join(["?"] * len(paths)))
+            params = paths
+        df = pandas.read_sql_query(sql, self.conn, params=params)
+
+        if log_files is not None:
+            # keep the order of the supplied files
+            df['file_order'] = df['file'].map({p: i for i, p in enumerate(paths)})
+            df = df.sort_values(by=['file_order', 'block_offset', 'seq'], kind='stable').drop(columns=['file_order'])
+        else:
+            df = df.sort_values(by=['file', 'block_offset', 'seq'], kind='stable')
+
+        return df.reset_index(drop=True)
+
+
+# convenience function: update the database for the supplied log file(s) and return the results
+# args can contain '--rebuild' (re-parse everything) and '--db=<path>'
+def load_results(log_files: list, parser_class, args=None) -> pandas.DataFrame:
+    args = [] if args is None else args
+    rebuild = '--rebuild' in args
+    db_path = None
+    for arg in args:
+        if arg.startswith('--db='):
+            db_path = arg.split('=', 1)[1]
+
+    if db_path is None:
+        db_path = ResultsDB.default_path(log_files[0])
+
+    db = ResultsDB(db_path)
+    for log_file in log_files:
+        db.update(log_file, parser_class, rebuild=rebuild)
+    df = db.query(parser_class, log_files)
+    db.close()
+    return df
+
+
+# keep the latest result for each strategy, in order of first appearance (i.e. later results for the same
+# strategy replace earlier ones, but keep the original position)
+def latest_by_strategy(df: pandas.DataFrame) -> pandas.DataFrame:
+    if len(df) == 0:
+        return df
+    order = df.drop_duplicates(subset=['strategy'], keep='first')['strategy']
+    latest = df.drop_duplicates(subset=['strategy'], keep='last').set_index('strategy')
+    return latest.loc[order].reset_index()
@@ -0,0 +1,146 @@
+# Script to re-rank the results of a hyperopt run that used CompositeHyperOptLoss
+#
+# CompositeHyperOptLoss logs the metrics and the loss for each objective (Expectancy, MedianProfit, QuickProfit, Win)
+# for every epoch, so the same run can be ranked under any objective without re-running the backtests
+#
+# Usage: python RankCompositeResults.py <sidecar file> [<objective>|all] [<number of results>] [--fthypt=<file>]
+#
+#   <sidecar file>  e.g. user_data/hyperopt_results/<strategy>_composite.csv
+#   <objective>     one of the objectives (e.g. MedianProfit), or 'all' to rank by the average rank across all
+#                   objectives. Default is 'all'
+#   --fthypt=<file> hyperopt results file of the same run. Adds the epoch number to the ranking (matched using the
+#                   results_key column) and prints the parameters of the best epoch
+
+import json
+import sys
+import os
+from pathlib import Path
+
+import pandas
+from tabulate import tabulate
+
+sys.path.append(str(Path(__file__).parent.parent / "hyperopts"))
+
+from HyperOptMetrics import get_results_key
+
+
+def load_results(file_name) -> pandas.DataFrame:
+    text_cols = ['results_key', 'timerange']
+    df = pandas.read_csv(file_name, dtype={col: str for col in text_cols})
+
+    # parallel hyperopt workers can each write a header (only at the start of an empty file, but they can race)
+    df = df[df['timerange'] != 'timerange']
+    for col in df.columns:
+        if col not in text_cols:
+            df[col] = pandas.to_numeric(df[col], errors='coerce')
+
+    df = df.reset_index(drop=True)
+    df.insert(0, 'row', df.index + 1)
+    return df
+
+
+# epochs in a .fthypt file (one json object per line), keyed by results_key
+def load_epochs(file_name) -> dict:
+    epochs = {}
+    with open(file_name) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            epoch = json.loads(line)
+            key = get_results_key(epoch.get('results_metrics', {}))
+            # epochs with identical results have the same key, keep the first one
+            if key not in epochs:
+                epochs[key] = epoch
+    return epochs
+
+
+def rank_results(df: pandas.DataFrame, objective: str) -> pandas.DataFrame:
+    loss_cols = [col for col in df.columns if col.startswith('loss_')]
+
+    # lower loss is better, so rank ascending
+    for col in loss_cols:
+        df['rank_' + col[5:]] = df[col].rank(ascending=True, method='min', na_option='bottom')
+
+    if objective == 'all':
+        df['rank'] = df[['rank_' + col[5:] for col in loss_cols]].mean(axis=1)
+    else:
+        df['rank'] = df['rank_' + objective]
+
+    return df.sort_values(by=['rank'], ascending=True)
+
+
+def main():
+
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    fthypt_file = ""
+    for arg in sys.argv[1:]:
+        if arg.startswith('--fthypt='):
+            fthypt_file = arg.split('=')[1]
+        elif arg.startswith('--'):
+            print("Unknown option: {}".format(arg))
+            sys.exit()
+
+    if len(args) < 1:
+        print("Usage: python RankCompositeResults.py <sidecar file> [<objective>|all] [<number of results>] "
+              "[--fthypt=<file>]")
+        sys.exit()
+
+    if fthypt_file and not os.path.isfile(fthypt_file):
+        print("File {} does not exist. Exiting...".format(fthypt_file))
+        sys.exit()
+
+    file_name = args[0]
+    if not os.path.isfile(file_name):
+        print("File {} does not exist. Exiting...".format(file_name))
+        sys.exit()
+
+    objective = args[1] if len(args) > 1 else 'all'
+    num_results = int(args[2]) if len(args) > 2 else 10
+
+    df = load_results(file_name)
+    if len(df) == 0:
+        print("No results found")
+        sys.exit()
+
+    objectives = [col[5:] for col in df.columns if col.startswith('loss_')]
+    if (objective != 'all') and (objective not in objectives):
+        print("Unknown objective: {}. Valid values: all, {}".format(objective, ", ".join(objectives)))
+        sys.exit()
+
+    timeranges = df['timerange'].unique()
+    if len(timeranges) > 1:
+        print("WARNING: file contains results for multiple timeranges: {}".format(", ".join(timeranges)))
+
+    epochs = {}
+    if fthypt_file:
+        if 'results_key' not in df.columns:
+            print("Sidecar file has no results_key column (created by an older version of CompositeHyperOptLoss)")
+            sys.exit()
+        epochs = load_epochs(fthypt_file)
+        df.insert(1, 'epoch', [epochs[key].get('current_epoch', None) if key in epochs else None
+                               for key in df['results_key']])
+        num_matched = df['epoch'].notna().sum()
+        if num_matched < len(df):
+            print("WARNING: {} of {} results not found in {}".format(len(df) - num_matched, len(df), fthypt_file))
+
+    df = rank_results(df, objective)
+
+    cols = (['row', 'epoch'] if fthypt_file else ['row']) + ['rank', 'trade_count', 'win_rate', 'profit_total', 'expectancy', 'max_drawdown', 'calmar'] + \
+           ['loss_' + obj for obj in objectives]
+
+    print("")
+    print("{} epochs, ranked by: {}".format(len(df), objective))
+    print("")
+    print(tabulate(df[cols].head(num_results), showindex="never", headers=cols,
+                   floatfmt='.3f', numalign="decimal", tablefmt='psql'))
+
+    if epochs:
+        best_key = df['results_key'].iloc[0]
+        if best_key in epochs:
+            print("")
+            print("Parameters of the best epoch ({}):".format(epochs[best_key].get('current_epoch', '?')))
+            print(json.dumps(epochs[best_key].get('params_dict', {}), indent=4))
+
+
+if __name__ == '__main__':
+    main()
@@ -77,6 +77,7 @@ random.seed(seed)
 np.random.seed(seed)
 
 from DataframeUtils import DataframeUtils
+from DartsSeriesCache import DartsSeriesCache
 
 
 # ---------------------------
@@ -107,14 +108,25 @@ class ClassifierDarts():
     requires_dataframes = True  # set to True if classifier takes dataframes rather than tensors
     prescale_dataframe = False  # set to True if algorithms need dataframes to be pre-scaled
     single_prediction = False  # True if algorithm only produces 1 prediction (not entire data array)
+    batch_prediction = False  # True if predict_batch() can process multiple dataframes in a single call
 
     trainer = None
     trainer_args = {}
     # num_cpus = 1
     use_gpu = True  # Note: not all classifiers can use the GPU, and some are slower when they do
 
+    # execution profile. 64-bit inference is several times slower than 32-bit on CPU, so use 32-bit everywhere
+    use_float32 = True  # convert series (and loaded models) to 32-bit, even if there is no GPU
+    num_threads = 0  # torch intra-op threads used on CPU. 0: use all CPUs
+    forecast_horizon = 64  # number of predictions from each forecast origin in backtest()
+    forecast_stride = 64  # distance between forecast origins in backtest()
+    forecast_batch_size = 1024  # number of forecast origins processed in each forward pass
+
     train_cols = []  # used for debug
 
+    curr_pair = ""  # key for the series cache (set via set_pair())
+    series_cache = None  # scaled TimeSeries and scalers for each pair
+
     # ---------------------------
 
     # Note: pair is needed because we cannot combine model across pairs because of huge price differences
@@ -133,6 +145,14 @@ class ClassifierDarts():
         self.num_cpus = multiprocessing.cpu_count()
         print(f"    CPUs:{self.num_cpus} GPU:{self.is_gpu_available()}  use_gpu:{self.use_gpu}")
 
+        # target is not scaled, covariates are scaled using the training span
+        self.series_cache = DartsSeriesCache(covariate_scaler=MinMaxScaler, target_scaler=None,
+                                             use_float32=self.use_float32_data())
+
+        # CPU: set the number of threads used within each torch operation
+        if not self.is_gpu_available():
+            torch.set_num_threads(self.num_threads if self.num_threads > 0 else self.num_cpus)
+
         if self.model_per_pair:
             pair_suffix = "_" + pair.split("/")[0]
         else:
@@ -183,16 +203,18 @@ class ClassifierDarts():
 
         # self.trainer_args["devices"] = "auto"
 
-        if self.is_gpu_available():
-            # self.trainer_args['precision'] = 32
+        # precision must match the dtype of the series
+        if self.use_float32_data():
             self.trainer_args['precision'] = '32-true'
-            # self.trainer_args['precision'] = '64-true'
+        else:
+            self.trainer_args['precision'] = '64-true'
+
+        if self.is_gpu_available():
             # # the following should turn on hardware acceleration, if suported
             # torch.device("mps")
             devices = 1
             accelerator = "mps"
         else:
-            self.trainer_args['precision'] = '64-true'
             devices = 'auto'
             accelerator = "cpu"
 
@@ -273,6 +295,13 @@ class ClassifierDarts():
 
     # ---------------------------
 
+    # set the current pair. Scalers and cached series are kept separately for each pair
+    def set_pair(self, pair):
+        self.curr_pair = pair
+        return
+
+    # ---------------------------
+
     # the following are intended to be overridden by  the subclass, if necessary
 
     # return loss metric for fitting. Can vary by model, hence it's a function. Override in subclass if necessary
@@ -293,22 +322,25 @@ class ClassifierDarts():
 
         return model
 
+    # Note: with retrain=False, darts builds a single (strided) inference dataset covering all of the forecast origins,
+    # so each forward pass processes forecast_batch_size origins rather than one
     def model_historical_forecasts(self, model, target_series, covariate_series):
         preds = model.historical_forecasts(target_series,
                                            past_covariates=covariate_series,
-                                           forecast_horizon=64,
-                                           stride=64,
+                                           forecast_horizon=self.forecast_horizon,
+                                           stride=self.forecast_stride,
                                            last_points_only=False,
                                            retrain=False,
+                                           enable_optimization=True,
+                                           predict_kwargs=self.get_predict_args(),
                                            verbose=True)
 
-        predictions = []
-        for p in preds:
-            arr = np.squeeze(np.array(p.data_array()))
-            # print(f"arr: {arr}")
-            predictions = np.concatenate((predictions, arr))
-            predictions = np.where(((predictions > 5.0) | (predictions < -5.0)), 0.0, predictions)
-            # predictions = predictions.clip(-10.0, 10.0)
+        if len(preds) == 0:
+            return np.array([])
+
+        predictions = np.concatenate([np.asarray(p.values(), dtype=float)[:, 0] for p in preds])
+        predictions = np.where(((predictions > 5.0) | (predictions < -5.0)), 0.0, predictions)
+        # predictions = predictions.clip(-10.0, 10.0)
 
         # print(f"    predictions:{np.shape(predictions)}")
         return predictions
@@ -360,6 +392,9 @@ class ClassifierDarts():
 
         # just return if model has already been trained, unless force_train is set, or this was a new model
         if self.model_is_trained() and (not force_train) and (not self.new_model_created()):
+            # still need scalers for this pair (fitted on the training span only)
+            if not self.series_cache.has_scalers(self.curr_pair):
+                self.series_cache.fit_scalers(self.curr_pair, df_train, self.target_column)
             return
 
         # no model? Create it from scratch
@@ -425,9 +460,9 @@ class ClassifierDarts():
         test_covariate_series = df_scaler.transform(test_time_series)
 
 
-        # convert to 32-bit (allows use of GPU)
-        if self.is_gpu_available():
-            print("    Converting to 32-bit to allow GPU usage...")
+        # convert to 32-bit (allows use of GPU, and is much faster on CPU)
+        if self.use_float32_data():
+            print("    Converting to 32-bit...")
             train_covariate_series = train_covariate_series.astype(np.float32)
             test_covariate_series = test_covariate_series.astype(np.float32)
             train_gain_series = train_gain_series.astype(np.float32)
@@ -458,6 +493,9 @@ class ClassifierDarts():
 
         self.is_trained = True
 
+        # use the same (training span) scaling for backtest and predict
+        self.series_cache.fit_scalers(self.curr_pair, df_train, self.target_column)
+
         return
 
     # ---------------------------
@@ -478,38 +516,16 @@ class ClassifierDarts():
             print(f"  train_cols:{self.train_cols}")
             print(f"  predict_cols:{predict_cols}")
 
-        # use the whole dataframe the 'covariate' series
-        df = dataframe.copy()
-        df['date'] = pd.to_datetime(df.date).dt.tz_localize(None)
-
-        # convert closing price column to time series & scale
-        gain_series = darts.TimeSeries.from_dataframe(df, time_col='date', value_cols=self.target_column)
-        # gain_col = np.array(df[self.target_column]).reshape(-1,1)
-        # gain_scaler = Scaler(RobustScaler())
-        # gain_scaler = RobustScaler()
-        # gain_scaler = gain_scaler.fit(gain_col)
-        # gain_series = gain_scaler.transform(gain_col)
-
-        # convert dataframe to timeseries
-        df_time_series = darts.TimeSeries.from_dataframe(df, time_col='date')
-
-        # convert to 32-bit (allows use of GPU)
-        if self.is_gpu_available():
-            gain_series = gain_series.astype(np.float32)
-            df_time_series = df_time_series.astype(np.float32)
-
-        # scale the dataframe
-        # df_scaler = Scaler(RobustScaler())
-        df_scaler = Scaler(MinMaxScaler())
-        covariate_series = df_scaler.fit_transform(df_time_series)
-        # covariate_series = df_time_series
+        # use the whole dataframe as the 'covariate' series. Scaled using the training span, and cached per pair
+        gain_series, covariate_series = self.series_cache.get_series(self.curr_pair, dataframe, self.target_column)
 
         # print(f'    dataframe:{np.shape(dataframe)}')
         # print(f'    covariate_series:{covariate_series.n_samples}, {covariate_series.n_timesteps}, {covariate_series.n_components}')
         # print(f'    gain_series:{gain_series.n_samples}, {gain_series.n_timesteps}, {gain_series.n_components}')
 
-        time_est = dataframe.shape[0] / (200.0 * 60.0)  # ~200 it/sec
-        print(f"    backtesting {dataframe.shape[0]} samples. Estimated time:{time_est:.2f} (mins)")
+        num_forecasts = max(1, (dataframe.shape[0] - self.lookback) // self.forecast_stride)
+        print(f"    backtesting {dataframe.shape[0]} samples ({num_forecasts} forecasts, " +
+              f"batch size: {self.forecast_batch_size})")
         # run backtesting
 
         with torch.inference_mode():
@@ -560,32 +576,8 @@ class ClassifierDarts():
             print(f"  train_cols:{self.train_cols}")
             print(f"  predict_cols:{predict_cols}")
 
-        # use the whole dataframe the 'covariate' series
-        df = dataframe.copy()
-        df['date'] = pd.to_datetime(df.date).dt.tz_localize(None)
-
-        # convert target column to time series & scale
-        gain_series = darts.TimeSeries.from_dataframe(df, time_col='date', value_cols=self.target_column)
-        # gain_scaler = Scaler(RobustScaler())
-        # gain_scaler = gain_scaler.fit(gain_series)
-        # gain_series = gain_scaler.transform(gain_series)
-
-        # convert dataframe to timeseries
-        df_time_series = darts.TimeSeries.from_dataframe(df, time_col='date')
-
-        # # convert to 32-bit (allows use of GPU)
-        if self.is_gpu_available():
-            gain_series = gain_series.astype(np.float32)
-            df_time_series = df_time_series.astype(np.float32)
-
-        # workaround for GPU bug: always convert to 32-bit
-        # gain_series = gain_series.astype(np.float32)
-        # df_time_series = df_time_series.astype(np.float32)
-
-        # scale the dataframe
-        # df_scaler = Scaler(RobustScaler())
-        df_scaler = Scaler(MinMaxScaler())
-        covariate_series = df_scaler.fit_transform(df_time_series)
+        # use the whole dataframe as the 'covariate' series. Only candles that are not already cached are converted
+        gain_series, covariate_series = self.series_cache.get_series(self.curr_pair, dataframe, self.target_column)
 
 
         # print(f"    predict() gain_series: {len(gain_series)} covariate_series: {len(covariate_series)}")
@@ -744,6 +736,7 @@ class ClassifierDarts():
             print("    loading from: ", self.model_path)
             # self.model = joblib.load(self.model_path)
             self.model = self.load_from_file(self.model_path, use_gpu=self.is_gpu_available())
+            self.model = self.match_model_precision(self.model)
             self.loaded_from_file = True
             self.is_trained = True
             print(f'Model: {self.model_path}')
@@ -804,6 +797,11 @@ class ClassifierDarts():
 
     # ---------------------------
 
+    def supports_batch_prediction(self) -> bool:
+        return self.batch_prediction
+
+    # ---------------------------
+
     def new_model_created(self) -> bool:
         return ClassifierDarts.new_model  # note use of class-level variable
 
@@ -820,6 +818,33 @@ class ClassifierDarts():
 
     # ---------------------------
 
+    # True if series (and models) should be 32-bit
+    def use_float32_data(self) -> bool:
+        return self.use_float32 or self.is_gpu_available()
+
+    # ---------------------------
+
+    # args passed to model.predict() by historical_forecasts()
+    def get_predict_args(self):
+        return {'batch_size': self.forecast_batch_size}
+
+    # ---------------------------
+
+    # models saved from 64-bit series would otherwise reject (or run slowly with) 32-bit series, so cast them
+    def match_model_precision(self, model):
+        if (model is None) or (not self.use_float32_data()):
+            return model
+
+        module = getattr(model, 'model', None)
+        if (module is not None) and (module.dtype == torch.float64):
+            print("    Converting model to 32-bit...")
+            module.to_dtype(torch.float32)
+            model.trainer_params['precision'] = self.trainer_args['precision']
+
+        return model
+
+    # ---------------------------
+
     # Median Absolute Deviation
     def mad_score(self, points):
         """https://www.itl.nist.gov/div898/handbook/eda/section3/eda35h.htm """
@@ -57,6 +57,7 @@ class ClassifierKeras():
     requires_dataframes = False  # set to True if classifier takes dataframes rather than tensors
     prescale_dataframe = True  # set to True if algorithms need dataframes to be pre-scaled
     single_prediction = False  # True if algorithm only produces 1 prediction (not entire data array)
+    batch_prediction = False  # True if predict_batch() can process multiple dataframes in a single call
     combine_models = False  # True means combine models for all pairs (unless model per pair). False will train only on 1st pair
 
 
@@ -143,6 +144,24 @@ class ClassifierKeras():
         return
     
 
+    # ---------------------------
+
+    # set the current pair. Only used by classifiers that cache data for each pair
+    def set_pair(self, pair):
+        pass
+        return
+
+    # set the dates of the training samples. Only used by classifiers that update incrementally
+    def set_train_dates(self, dates):
+        pass
+        return
+
+    # set live mode (live/dry-run). Only used by classifiers that update incrementally
+    def set_live_mode(self, live_mode):
+        pass
+        return
+
+
     # ---------------------------
     
     def set_num_epochs(self, num_epochs=None):
@@ -588,6 +607,11 @@ class ClassifierKeras():
 
     # ---------------------------
 
+    def supports_batch_prediction(self) -> bool:
+        return self.batch_prediction
+
+    # ---------------------------
+
     def update_model_weights(self):
 
         self.checkpoint_path = self.get_checkpoint_path()
@@ -94,6 +94,7 @@ class ClassifierPyTorch():
     requires_dataframes = True  # set to True if classifier takes dataframes rather than tensors
     prescale_dataframe = False  # set to True if algorithms need dataframes to be pre-scaled
     single_prediction = True  # True if algorithm only produces 1 prediction (not entire data array)
+    batch_prediction = False  # True if predict_batch() can process multiple dataframes in a single call
 
     trainer = None
     num_cpus = 1
@@ -188,6 +189,12 @@ class ClassifierPyTorch():
 
     # ---------------------------
 
+    # set the current pair. Only used by classifiers that cache data for each pair
+    def set_pair(self, pair):
+        pass
+
+    # ---------------------------
+
     # create model - subclasses should overide this
     def create_model(self, seq_len, num_features):
 
@@ -632,6 +639,9 @@ class ClassifierPyTorch():
     def returns_single_prediction(self) -> bool:
         return self.single_prediction
 
+    def supports_batch_prediction(self) -> bool:
+        return self.batch_prediction
+
     # ---------------------------
 
     def new_model_created(self) -> bool:
@@ -0,0 +1,125 @@
+# DartsSeriesCache - scaled darts TimeSeries (target and covariates) for each pair, built incrementally
+#
+# The darts-based classifiers used to copy the dataframe, convert all of it to TimeSeries and fit new scalers on every
+# call to backtest() or predict(). Fitting the covariate scaler on the full series also leaks future data into
+# backtests. Instead:
+#   - the scalers are fitted once per pair, on the training span (fit_scalers(), called from train())
+#   - the scaled target and covariate values are kept for each pair, and only candles that are newer than the cached
+#     data are scaled and appended. In live/dry-run modes that is normally just the latest candle
+#   - the cache is rebuilt if the columns change, or if the new data does not line up with the cached data
+# darts TimeSeries operations (append, slice, transform) are relatively expensive, so the cache holds numpy arrays and
+# only creates the TimeSeries objects on the way out
+#
+# Usage:
+#   cache = DartsSeriesCache(covariate_scaler=MinMaxScaler, target_scaler=None)
+#   cache.fit_scalers(pair, df_train, target_column)  # from train()
+#   target_series, covariate_series = cache.get_series(pair, dataframe, target_column)
+
+import darts
+import numpy as np
+import pandas as pd
+
+
+class DartsSeriesCache():
+
+    def __init__(self, covariate_scaler=None, target_scaler=None, use_float32=False):
+        self.covariate_scaler_type = covariate_scaler  # sklearn scaler class, None for no scaling
+        self.target_scaler_type = target_scaler
+        self.use_float32 = use_float32
+        self.scalers = {}  # key -> (covariate scaler, target scaler)
+        self.entries = {}  # key -> cached (scaled) data
+
+    # ---------------------------
+
+    def has_scalers(self, key) -> bool:
+        return key in self.scalers
+
+    # fit the scalers for key to the supplied (training) dataframe. Any cached data was scaled differently, so is
+    # discarded
+    def fit_scalers(self, key, dataframe: pd.DataFrame, target_column: str):
+        target, covariates = self.get_values(dataframe, target_column)
+        covariate_scaler = None
+        target_scaler = None
+        if self.covariate_scaler_type is not None:
+            covariate_scaler = self.covariate_scaler_type().fit(np.nan_to_num(covariates, posinf=0.0, neginf=0.0))
+        if self.target_scaler_type is not None:
+            target_scaler = self.target_scaler_type().fit(np.nan_to_num(target, posinf=0.0, neginf=0.0))
+        self.scalers[key] = (covariate_scaler, target_scaler)
+        self.entries.pop(key, None)
+
+    # reverse the target scaling of a (prediction) array
+    def inverse_target(self, key, values) -> np.ndarray:
+        values = np.asarray(values, dtype=float)
+        target_scaler = self.scalers[key][1] if key in self.scalers else None
+        if target_scaler is None:
+            return values
+        return target_scaler.inverse_transform(values.reshape(-1, 1)).reshape(np.shape(values))
+
+    def clear(self):
+        self.scalers = {}
+        self.entries = {}
+
+    # ---------------------------
+
+    # unscaled target and covariate values. Covariates are all columns except the date, as in TimeSeries.from_dataframe()
+    def get_values(self, dataframe: pd.DataFrame, target_column: str):
+        dtype = np.float32 if self.use_float32 else float
+        target = dataframe[[target_column]].to_numpy(dtype=dtype)
+        covariates = dataframe.drop(columns='date').to_numpy(dtype=dtype)
+        return target, covariates
+
+    # scaled target and covariate values
+    def scale_values(self, key, dataframe: pd.DataFrame, target_column: str):
+        target, covariates = self.get_values(dataframe, target_column)
+        covariate_scaler, target_scaler = self.scalers[key]
+        if covariate_scaler is not None:
+            covariates = covariate_scaler.transform(covariates).astype(covariates.dtype)
+        if target_scaler is not None:
+            target = target_scaler.transform(target).astype(target.dtype)
+        return target, covariates
+
+    # ---------------------------
+
+    # returns the scaled (target, covariate) series covering the dates in dataframe. Scalers are fitted to dataframe
+    # if they have not been set for key (e.g. no training in this session)
+    def get_series(self, key, dataframe: pd.DataFrame, target_column: str):
+
+        if not self.has_scalers(key):
+            self.fit_scalers(key, dataframe, target_column)
+
+        dates = pd.DatetimeIndex(pd.to_datetime(dataframe['date']).dt.tz_localize(None))
+        columns = [col for col in dataframe.columns if col != 'date']
+
+        entry = self.entries.get(key, None)
+        if (entry is not None) and ((entry['columns'] != columns) or (entry['target_column'] != target_column)):
+            entry = None
+
+        if entry is not None:
+            # the older rows must already be in the cache, with the same dates
+            num_old = int(np.sum(dates <= entry['dates'][-1]))
+            start = entry['dates'].searchsorted(dates[0])
+            if (num_old == 0) or (not entry['dates'][start:start + num_old].equals(dates[:num_old])):
+                entry = None
+            else:
+                target = entry['target'][start:start + num_old]
+                covariates = entry['covariates'][start:start + num_old]
+                if num_old < len(dates):
+                    new_target, new_covariates = self.scale_values(key, dataframe.iloc[num_old:], target_column)
+                    target = np.concatenate([target, new_target])
+                    covariates = np.concatenate([covariates, new_covariates])
+
+        if entry is None:
+            target, covariates = self.scale_values(key, dataframe, target_column)
+
+        self.entries[key] = {
+            'dates': dates,
+            'target': target,
+            'covariates': covariates,
+            'columns': columns,
+            'target_column': target_column
+        }
+
+        target_series = darts.TimeSeries.from_times_and_values(dates, target, columns=[target_column])
+        covariate_series = darts.TimeSeries.from_times_and_values(dates, covariates, columns=columns)
+
+        return target_series, covariate_series
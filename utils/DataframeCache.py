@@ -0,0 +1,185 @@
+#
+# Persistent cache of 'analysed' dataframes, i.e. the output of populate_indicators()
+#
+# For the training-based strategies (NNTC, Anomaly etc.), almost all of the time in hyperopt is spent in
+# populate_indicators() - adding indicators, generating training labels, training models and running predictions.
+# None of that depends on the hyperopt parameters, so if we run hyperopt again on the same strategy, pairs and
+# timerange we can just re-use the previous results instead of re-calculating everything.
+#
+# Notes:
+#   - entries are keyed by strategy class, strategy source files (modification times), the non-hyperoptable
+#     parameters supplied by the strategy, any other files supplied by the strategy (e.g. saved models), timeframe,
+#     timerange and pair whitelist. Each pair entry also records a hash of the OHLCV data, so re-downloaded data
+#     is detected
+#   - models (and compressors etc.) are shared across pairs, so the results for one pair can depend on the pairs
+#     processed before it. Because of that, cached results are only used if *all* pairs in the whitelist are
+#     present, otherwise everything is re-calculated (and saved)
+#   - cache files are pickled dataframes, stored in <group>/cache/<strategy>/<key>/
+#   - if you change something that the key does not know about (e.g. retrain a model in a different directory),
+#     just delete the cache directory
+
+import hashlib
+import inspect
+import os
+import pickle
+import sys
+from pathlib import Path
+
+import pandas as pd
+from pandas import DataFrame
+
+sys.path.append(str(Path(__file__).parent))
+
+import logging
+
+log = logging.getLogger(__name__)
+
+
+class DataframeCache():
+
+    enabled = True
+    verbose = True
+
+    # columns used to detect changes to the underlying data
+    data_columns = ['date', 'open', 'high', 'low', 'close', 'volume']
+
+    def __init__(self, strategy, cache_dir: str, params: dict = None, files: list = None):
+        self.strategy_name = strategy.__class__.__name__
+        self.run_key = self.make_run_key(strategy, params, files)
+        self.cache_dir = os.path.join(cache_dir, self.strategy_name, self.run_key)
+        self.whitelist = self.get_whitelist(strategy)
+        self.use_cache = None  # decided on first load, so that all pairs are treated the same way
+        self.data_hashes = {}
+
+    # build the key for this 'run', i.e. everything except the pair and the data itself
+    def make_run_key(self, strategy, params: dict, files: list) -> str:
+        config = getattr(strategy, 'config', {}) or {}
+
+        key_items = {
+            'strategy': self.strategy_name,
+            'sources': self.get_source_info(strategy),
+            'files': self.get_file_info(files),
+            'timeframe': getattr(strategy, 'timeframe', ''),
+            'timerange': str(config.get('timerange', '')),
+            'whitelist': self.get_whitelist(strategy),
+            'params': {} if params is None else {k: str(v) for k, v in params.items()}
+        }
+
+        digest = hashlib.sha1(repr(sorted(key_items.items())).encode('utf-8')).hexdigest()
+        return digest[:16]
+
+    # modification times of the source files of the strategy and its base classes
+    def get_source_info(self, strategy):
+        sources = []
+        for cls in type(strategy).__mro__:
+            try:
+                src = inspect.getsourcefile(cls)
+            except TypeError:
+                continue  # builtin
+            if (src is not None) and os.path.isfile(src) and ('freqtrade' not in Path(src).parts):
+                sources.append((Path(src).name, os.path.getmtime(src)))
+        return sources
+
+    # modification times of the supplied files. Directories are scanned (non-recursively)
+    def get_file_info(self, files: list):
+        info = []
+        if files is None:
+            return info
+        for fpath in files:
+            if os.path.isdir(fpath):
+                for entry in sorted(os.scandir(fpath), key=lambda e: e.name):
+                    info.append((entry.name, entry.stat().st_mtime))
+            elif os.path.isfile(fpath):
+                info.append((Path(fpath).name, os.path.getmtime(fpath)))
+        return info
+
+    def get_whitelist(self, strategy):
+        try:
+            return list(strategy.dp.current_whitelist())
+        except Exception:
+            return []
+
+    # hash of the raw (OHLCV) data for a pair
+    # Note: hashes the values (pandas row hashes), not the raw array bytes - the tz-aware 'date' column converts to an
+    #       array of objects, whose bytes are pointers and change every time
+    def get_data_hash(self, dataframe: DataFrame) -> str:
+        columns = [col for col in self.data_columns if col in dataframe.columns]
+        hasher = hashlib.sha1(repr(columns).encode('utf-8'))
+        if len(columns) > 0:
+            hasher.update(pd.util.hash_pandas_object(dataframe[columns], index=False).to_numpy().tobytes())
+        return hasher.hexdigest()
+
+    def get_path(self, pair: str) -> str:
+        pair_name = pair.replace("/", "_").replace(":", "_")
+        return os.path.join(self.cache_dir, pair_name + ".pkl")
+
+    # only use cached entries if the whole whitelist is present (see note at top of file)
+    def check_complete(self) -> bool:
+        if len(self.whitelist) == 0:
+            return False
+        for pair in self.whitelist:
+            if not os.path.isfile(self.get_path(pair)):
+                return False
+        return True
+
+    # returns the cached dataframe for the pair, or None if not present (or not usable)
+    def load(self, pair: str, dataframe: DataFrame):
+
+        if not self.enabled:
+            return None
+
+        # hash the raw data before the strategy adds anything to it
+        data_hash = self.get_data_hash(dataframe)
+        self.data_hashes[pair] = data_hash
+
+        if self.use_cache is None:
+            self.use_cache = self.check_complete()
+            if self.verbose:
+                status = "using cached results" if self.use_cache else "results will be calculated and cached"
+                print(f"    Dataframe cache ({self.cache_dir}): {status}")
+
+        if not self.use_cache:
+            return None
+
+        path = self.get_path(pair)
+        try:
+            with open(path, 'rb') as f:
+                entry = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError) as e:
+            print(f"    WARNING: could not load cache entry for {pair}: {e}")
+            self.use_cache = False
+            return None
+
+        if (entry['data_hash'] != data_hash) or (len(entry['dataframe']) != len(dataframe)):
+            # data has changed. Anything after this point could depend on this pair, so stop using the cache
+            print(f"    WARNING: data for {pair} has changed, ignoring cached results")
+            self.use_cache = False
+            return None
+
+        if self.verbose:
+            print(f"    loaded cached dataframe for {pair}")
+
+        return entry['dataframe']
+
+    # save the analysed dataframe for the pair
+    def save(self, pair: str, dataframe: DataFrame):
+
+        if not self.enabled:
+            return
+
+        # use the hash of the raw data (from load()) if available, OHLCV columns should not have changed anyway
+        data_hash = self.data_hashes[pair] if pair in self.data_hashes else self.get_data_hash(dataframe)
+        entry = {
+            'data_hash': data_hash,
+            'dataframe': dataframe
+        }
+
+        path = self.get_path(pair)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = path + ".tmp"
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)  # atomic, so that an interrupted run does not leave a partial entry
+        except (OSError, pickle.PicklingError) as e:
+            print(f"    WARNING: could not save cache entry for {pair}: {e}")
@@ -15,23 +15,22 @@ import pywt
 from sklearn.preprocessing import RobustScaler
 from scipy.signal import savgol_filter
 
-import statsmodels.tsa.api as tsa
-from statsmodels.tsa.ar_model import ar_select_order
 
 class base_detrender(ABC):
 
     poly = None
+    vectorised = False  # True if detrend_1d() and retrend_1d() also work on 2-D arrays (column-wise, in one call)
 
     def __init__(self):
         super().__init__()
 
-    # function to detrend the supplied 1d signal
+    # function to detrend the supplied 1d signal (or 2d array of signals, if vectorised)
     @abstractmethod
     def detrend_1d(self, data: np.array) -> np.array:
         # base implementation is to just returns the original
         return data
 
-    # function to retrend the supplied 1d signal
+    # function to retrend the supplied 1d signal (or 2d array of signals, if vectorised)
     @abstractmethod
     def retrend_1d(self, data: np.array) -> np.array:
         # base implementation is to just returns the original
@@ -40,14 +39,18 @@ class base_detrender(ABC):
     # detrend 1d or 2d array
     def detrend(self, data: np.array) -> np.array:
 
-        if data.ndim == 1:
+        if (data.ndim == 1) or ((data.ndim == 2) and self.vectorised):
             return self.detrend_1d(data)
         elif data.ndim == 2:
+            # not vectorised, so process each column separately (and keep the trend for each column)
             ncols = np.shape(data)[1]
             x_detrend = np.zeros(np.shape(data), dtype=float)
+            polys = []
             for i in range(ncols):
                 col = np.array(data[:, i])
                 x_detrend[:,i] = self.detrend_1d(col)
+                polys.append(self.poly)
+            self.poly = np.stack(polys, axis=1)
             return x_detrend
         else:
             print(f'    *** ERR: too many dimensions: {np.shape(data)}')
@@ -56,15 +59,19 @@ class base_detrender(ABC):
     # retrend 1d or 2d array
     def retrend(self, data: np.array) -> np.array:
 
-        if data.ndim == 1:
+        if (data.ndim == 1) or ((data.ndim == 2) and self.vectorised):
             return self.retrend_1d(data)
         elif data.ndim == 2:
             ncols = np.shape(data)[1]
             # print(f'    re-trending {ncols} cols')
             x_trend = np.zeros(np.shape(data), dtype=float)
+            polys = self.poly
             for i in range(ncols):
                 col = np.array(data[:, i])
+                if (polys is not None) and (polys.ndim == 2):
+                    self.poly = polys[:, min(i, polys.shape[1]-1)]
                 x_trend[:,i] = self.retrend_1d(col)
+            self.poly = polys
             return x_trend
         else:
             print(f'    *** ERR: too many dimensions: {np.shape(data)}')
@@ -74,36 +81,41 @@ class base_detrender(ABC):
     def get_trend(self) -> np.array:
         return self.poly
 
+    # add the trend to the supplied data. The trend can be longer than the data (e.g. training vs prediction data),
+    # in which case the last portion is used. Works for 1d and 2d arrays
+    def add_trend(self, data: np.array) -> np.array:
+        poly = self.poly
+        if (data.ndim == 1) and (poly.ndim == 2):
+            poly = poly[:, -1]  # 1d data after 2d detrend: use the last column (as per the column-wise version)
+        elif (data.ndim == 2) and (poly.ndim == 1):
+            poly = poly.reshape(-1, 1)
+
+        dlen = min(len(data), len(poly))
+        x_trend = np.array(data, dtype=float)
+        x_trend[-dlen:] = x_trend[-dlen:] + poly[-dlen:]
+        return x_trend
 
 
-    # 'extend' the trend polynomial to support predicted values
+    # 'extend' the trend to support predicted values
+    # The trend is (by design) slowly varying, so a straight line fitted to the last extend_window points is
+    # projected forward. This is closed form (one least squares fit for all columns)
 
-    results_forecaster = None
+    extend_window = 8
 
     def extend_trend(self, steps):
 
-
         N = len(self.poly)
+        window = min(self.extend_window, N)
 
+        t = np.arange(window, dtype=float)
+        A = np.stack([t, np.ones(window)], axis=1)
+        coeff = np.linalg.lstsq(A, self.poly[-window:], rcond=None)[0]
 
-        # # Create an instance of the AutoReg class with the selected lag order
-        # mod = ar_select_order(self.poly, maxlag=6)
-        # self.model = tsa.AutoReg(self.poly, lags=mod.ar_lags).fit()
-        self.model = tsa.AutoReg(self.poly, lags=8).fit()
-        self.model = tsa.AutoReg(self.poly, lags=steps).fit()
-
-        # self.model = tsa.SimpleExpSmoothing(self.poly).fit()
-
-        # Predict the time series forward N steps
-        preds = self.model.predict(N, N + steps - 1)[-steps:]
+        t_pred = np.arange(window, window + steps, dtype=float)
+        A_pred = np.stack([t_pred, np.ones(steps)], axis=1)
+        preds = A_pred @ coeff
 
-        # t = np.arange(0, len(self.poly))
-        # coeff = np.polyfit(t, self.poly, 2)
-        # poly = np.poly1d(coeff)
-        # t2 = np.arange(N+1, N+steps)
-        # preds = poly(t2)
-
-        poly = np.concatenate((self.poly, preds), dtype=float)
+        poly = np.concatenate((self.poly, preds), axis=0, dtype=float)
         self.poly = poly[-N:]
         return
 
@@ -113,8 +125,11 @@ class base_detrender(ABC):
 # 'null' detrender - useful for use as a baseline while testing other detrenders
 
 class null_detrender(base_detrender):
+    vectorised = True
+
     def detrend_1d(self, data: np.array) -> np.array:
         # just returns the original
+        self.poly = np.zeros(np.shape(data), dtype=float)
         return data
 
     # function to retrend the supplied signal
@@ -125,49 +140,47 @@ class null_detrender(base_detrender):
 #---------------------------------------
 
 class differencing_detrender(base_detrender):
+    vectorised = True
 
     x_orig = 0.0
 
     def detrend_1d(self, data: np.array) -> np.array:
-        x_detrend = np.zeros(len(data), dtype=float)
-        self.x_orig = data[0]
-        for i in range(1, len(data)):
-            x_detrend[i] = data[i] - data[i - 1]
+        x_detrend = np.zeros(np.shape(data), dtype=float)
+        self.x_orig = np.array(data[0], dtype=float)
+        x_detrend[1:] = np.diff(data, axis=0)
 
         self.poly = data - x_detrend
         return x_detrend
 
     def retrend_1d(self, data: np.array) -> np.array:
-        x_trend = np.zeros(len(data), dtype=float)
+        x_trend = np.array(data, dtype=float)
         x_trend[0] = self.x_orig
-        for i in range(1, len(data)):
-            x_trend[i] = data[i] + x_trend[i - 1]
-        return x_trend
+        return np.cumsum(x_trend, axis=0)
 
 #---------------------------------------
 
 
 class linear_detrender(base_detrender):
+    vectorised = True
 
     def detrend_1d(self, data: np.array) -> np.array:
-        t = np.arange(0, len(data))
-        coeff = np.polyfit(t, data, 1)
-        # self.poly = np.poly1d(coeff)
-        self.poly = np.polyval(coeff, data)
+        # fit a line to each column (single least squares call) and evaluate it over the data
+        t = np.arange(0, len(data), dtype=float)
+        A = np.stack([t, np.ones(len(data))], axis=1)
+        coeff = np.linalg.lstsq(A, data, rcond=None)[0]
+        self.poly = A @ coeff
         x_detrend = data - self.poly
         return x_detrend
 
     def retrend_1d(self, data: np.array) -> np.array:
         # polynomial can be different length because training data is usually larger than prediction data. So, use last portion
-        dlen = min(len(data), len(self.poly))
-        x_trend = data
-        x_trend[-dlen:] = data[-dlen:] + self.poly[-dlen:]
-        return x_trend
+        return self.add_trend(data)
 
 #---------------------------------------
 
 
 class quadratic_detrender(base_detrender):
+    vectorised = True
 
     def detrend_1d(self, data: np.array) -> np.array:
         # t = np.linspace(0, 1, len(data))
@@ -176,50 +189,44 @@ class quadratic_detrender(base_detrender):
 
         window = max(8, len(data) // 2)
         # window = 8
-        self.poly = savgol_filter(data, window, 2)
+        self.poly = savgol_filter(data, window, 2, axis=0)
 
         x_detrend = data - self.poly
         return x_detrend
 
     def retrend_1d(self, data: np.array) -> np.array:
-        dlen = min(len(data), len(self.poly))
-        x_trend = data
-        x_trend[-dlen:] = data[-dlen:] + self.poly[-dlen:]
-        return x_trend
+        return self.add_trend(data)
 
 #---------------------------------------
 
 
 class smooth_detrender(base_detrender):
+    vectorised = True
+
+    window = 12
 
     def detrend_1d(self, data: np.array) -> np.array:
         # window = max(8, len(data) // 4)
-        window = 12
-        box = np.ones(window) / window
-        self.poly = np.convolve(data, box, mode="same")
+        box = np.ones(self.window) / self.window
+        if data.ndim == 1:
+            self.poly = np.convolve(data, box, mode="same")
+        else:
+            # same as np.convolve(mode="same") on each column, i.e. the (zero padded) moving average. Use running sums
+            w = self.window
+            padded = np.concatenate((np.zeros((w // 2 + 1, data.shape[1])), data, np.zeros(((w - 1) // 2, data.shape[1]))))
+            csum = np.cumsum(padded, axis=0)
+            self.poly = (csum[w:] - csum[:-w]) / w
         x_detrend = data - self.poly
-        # print(f'data:{np.shape(data)} poly:{np.shape(self.poly)} x_detrend:{np.shape(x_detrend)} ')
-        # np.set_printoptions(precision=3)
-        # print('----------------------')
-        # print(f'data:      {data}')
-        # print(f'poly:      {self.poly}')
-        # print(f'x_detrend: {x_detrend}')
         return x_detrend
 
     def retrend_1d(self, data: np.array) -> np.array:
-        dlen = min(len(data), len(self.poly))
-        x_trend = data
-        x_trend[-dlen:] = data[-dlen:] + self.poly[-dlen:]
-        # print(f'data:    {data}')
-        # print(f'poly:    {self.poly}')
-        # print(f'x_trend: {x_trend}')
-        return x_trend
+        return self.add_trend(data)
 
 #---------------------------------------
 
 
 class scaler_detrender(base_detrender):
-
+    vectorised = True
 
     scaler = None
 
@@ -233,6 +240,7 @@ class scaler_detrender(base_detrender):
         if self.scaler is None:
             self.scaler = RobustScaler()
 
+        # RobustScaler works column by column anyway
         self.scaler = self.scaler.fit(x_trend)
         x_detrend = self.scaler.transform(x_trend)
         if data.ndim == 1:
@@ -245,36 +253,38 @@ class scaler_detrender(base_detrender):
     # function to retrend the supplied signal
     def retrend_1d(self, data: np.array) -> np.array:
 
-        x_trend = self.scaler.inverse_transform(data.reshape(-1,1))
-        if data.ndim == 1:
-            x_trend = x_trend.reshape(-1).squeeze()
-        return x_trend
+        if data.ndim == 2:
+            return self.scaler.inverse_transform(data)
+
+        # 1d data: use the scaling of the last column
+        scale = self.scaler.scale_[-1] if self.scaler.scale_ is not None else 1.0
+        center = self.scaler.center_[-1] if self.scaler.center_ is not None else 0.0
+        return data * scale + center
 
 #---------------------------------------
 
 
 class fft_detrender(base_detrender):
+    vectorised = True
 
     def detrend_1d(self, data: np.array) -> np.array:
 
-        xf = np.fft.fft(data) # FFT of signal
+        xf = np.fft.fft(data, axis=0) # FFT of signal
         xf[4:] = 0.0
-        self.poly = np.fft.ifft(xf).real
+        self.poly = np.fft.ifft(xf, axis=0).real
         x_detrend = data - self.poly
 
         return x_detrend
 
     # function to retrend the supplied signal
     def retrend_1d(self, data: np.array) -> np.array:
-        dlen = min(len(data), len(self.poly))
-        x_trend = data
-        x_trend[-dlen:] = data[-dlen:] + self.poly[-dlen:]
-        return x_trend
+        return self.add_trend(data)
 
 #---------------------------------------
 
 
 class dwt_detrender(base_detrender):
+    vectorised = True
 
     wavelet = 'db4'
     # wavelet = 'haar'
@@ -282,23 +292,32 @@ class dwt_detrender(base_detrender):
     level = 2
     coeffs = None
 
+    # soft thresholding, same as pywt.threshold(mode='soft'), but the threshold can be different for each column
+    def soft_threshold(self, c, thresh):
+        magnitude = np.absolute(c)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # divide by zero okay as np.inf values get clipped
+            thresholded = (1 - thresh/magnitude)
+        thresholded = np.clip(thresholded, 0, None)
+        return c * thresholded
+
     def detrend_1d(self, data: np.array) -> np.array:
         # Choose a wavelet function and a level of decomposition
 
 
         # Perform the multilevel DWT
-        coeffs = pywt.wavedec(data, self.wavelet, level=self.level, mode='per')
+        coeffs = pywt.wavedec(data, self.wavelet, level=self.level, mode='per', axis=0)
 
         # Save a copy of the original coefficients
         self.coeffs = coeffs.copy()
 
         # Apply soft thresholding to the coefficients
         threshold = 0.99 # adjust this value to control the amount of denoising
-        thresh = threshold*np.nanmax(data)
-        coeffs[1:] = [pywt.threshold(c, thresh, 'soft') for c in coeffs[1:]]
+        thresh = threshold*np.nanmax(data, axis=0)
+        coeffs[1:] = [self.soft_threshold(c, thresh) for c in coeffs[1:]]
 
         # Perform the multilevel IDWT on the modified coefficients
-        self.poly = pywt.waverec(coeffs, self.wavelet, mode='per')
+        self.poly = pywt.waverec(coeffs, self.wavelet, mode='per', axis=0)
 
         if (len(data) != len(self.poly)):
             dlen = min(len(data), len(self.poly))
@@ -312,11 +331,7 @@ class dwt_detrender(base_detrender):
     def retrend_1d(self, data: np.array) -> np.array:
         # Add the trend component to the supplied values
         # x_trend = data + pywt.waverec([self.coeffs[0], *[np.zeros_like(c) for c in self.coeffs[1:]]], self.wavelet)[len(data):]
-
-        dlen = min(len(data), len(self.poly))
-        x_trend = data
-        x_trend[-dlen:] = data[-dlen:] + self.poly[-dlen:]
-        return np.nan_to_num(x_trend)
+        return np.nan_to_num(self.add_trend(data))
 
 #---------------------------------------
 
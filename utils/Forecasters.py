@@ -22,6 +22,7 @@ from sklearn.preprocessing import RobustScaler
 import statsmodels.tsa.api as tsa
 from statsmodels.tsa.forecasting.theta import ThetaModel
 from statsmodels.tsa.ar_model import ar_select_order
+from scipy.signal import lfilter
 from xgboost import XGBRegressor
 
 import lightgbm as lgbm
@@ -46,6 +47,7 @@ from pathlib import Path
 sys.path.append(str(Path(__file__).parent))
 
 import Detrenders
+from SlidingDFT import SlidingDFT
 
 # Define a timer decorator function
 def timer(func):
@@ -94,6 +96,7 @@ class base_forecaster(ABC):
     fitted_data: np.array = None
     results = None
     support_multiple_columns = False
+    support_multi_output = False
     support_retrain = False
     requires_training = False
     detrend_data = True
@@ -151,6 +154,10 @@ class base_forecaster(ABC):
     def supports_multiple_columns(self) -> bool:
         return self.support_multiple_columns
 
+    # specifies whether the algorithm can be trained on (and predict) multiple target columns at once (default is False)
+    def supports_multi_output(self) -> bool:
+        return self.support_multi_output
+
     # specifies whether the algorithm supports multidiemnsional data (default is False)
     def supports_retrain(self) -> bool:
         return self.support_retrain
@@ -436,7 +443,7 @@ class fft_extrapolation_forecaster(base_forecaster):
             y = self.detrend(y)
 
         # apply FFT
-        yf = np.fft.fft(y) # FFT of signal
+        yf = self.get_fft(y) # FFT of signal
         # yf = np.concatenate((yf[:(N+1)//2], np.zeros(N), yf[(N+1)//2:])) # zero-padding for higher resolution
 
         yf_filt = self.filter_freqs(yf, filter_type=self.filter_type)
@@ -457,6 +464,9 @@ class fft_extrapolation_forecaster(base_forecaster):
 
         return predictions.squeeze()[-N:]
 
+    def get_fft(self, y):
+        return np.fft.fft(y)
+
     # utility to filter out frequencies (various methods)
     def filter_freqs(self, yf, filter_type=0):
 
@@ -569,42 +579,114 @@ class fft_extrapolation_forecaster(base_forecaster):
         return yf_pred
 # -----------------------------------
 
+# same as fft_extrapolation_forecaster, but uses a sliding DFT (see SlidingDFT.py), i.e. the frequency bins are
+# updated incrementally when the window moves forward by one sample. Note that detrending (or smoothing) changes
+# the whole window, so the transform is recalculated in that case
 
-class exponential_forecaster(base_forecaster):
-    def get_name(self):
-        return "Exponential"
-
-    def forecast(self, data: np.array, steps) -> np.array:
- 
-        x = self.check_1d(data)
+class fft_sliding_forecaster(fft_extrapolation_forecaster):
+    sdft = None
 
-        # self.smooth
-        if self.smooth_data:
-            x = self.smooth(x, self.smooth_window)
+    def get_name(self):
+        return "FFT Extrapolation (sliding)"
 
-        # detrend
-        if self.detrend_data:
-            x = self.detrend(x)
+    def get_fft(self, y):
+        N = len(y)
+        if (self.sdft is None) or (self.sdft.N != N):
+            self.sdft = SlidingDFT(N)
+        # only the positive frequencies are tracked, the rest are the conjugates (input is real). This also keeps
+        # conjugate pairs exactly equal, which matters for the filters that sort or threshold the bins
+        yf = self.sdft.update(y)
+        return np.concatenate((yf, np.conj(yf[1:(N + 1) // 2][::-1])))
 
-        self.model = tsa.ExponentialSmoothing(x).fit()
-        predictions = self.model.predict(0, len(x) + steps)
 
-        predictions = np.concatenate((x, predictions), dtype=float)[-len(x):]
+# -----------------------------------
 
-        if self.detrend_data:
-            predictions = self.retrend(predictions)
+# base class for the statsmodels 'statistical' forecasters
+#
+# Estimating the model parameters (fit()) is by far the most expensive part of these forecasters, and doing it
+# for every candle makes them unusable in rolling backtests. Instead, the parameters are only re-estimated every
+# refit_interval calls. In between, the model is updated with the fixed parameters:
+#   - if the data is not smoothed or detrended, the window has moved forward by one sample, so the filter is just
+#     extended with the new sample (Kalman filter update)
+#   - otherwise (smoothing and detrending change the whole window when it moves), the filter is re-run over the
+#     new window
+#
+# Notes:
+#   - the model (parameters and filter state) is kept for each series. As in ar_forecaster, series are recognised by
+#     their (raw) contents, i.e. the start of the new window must match the end of the previous one, so a single
+#     forecaster can be shared by several pairs (or wavelet coefficients). A window that does not continue a known
+#     series starts a new one, with a full fit
+#   - if updating the model fails, the window is fitted from scratch (i.e. the original, non-incremental version),
+#     and if that also fails the forecast just repeats the last value
+
+class statespace_forecaster(base_forecaster):
+    refit_interval = 64  # number of forecast() calls between parameter re-estimation
+    extra_steps = 0      # additional forecast steps (to match the horizon of older versions)
+    max_series = 256     # max number of series tracked (least recently used series are dropped)
 
-        return predictions.squeeze()
-# -----------------------------------
+    def __init__(self):
+        super().__init__()
+        self.states = {}
+        self.res = None  # model of the current series
+        self.update_count = 0
+        self.fail_count = 0
+
+    # create the (statsmodels) model for the supplied data
+    def create_statespace_model(self, x):
+        return None
+
+    # estimate the parameters. Previous parameters (if any) are used as the starting point
+    def fit_model(self, x):
+        model = self.create_statespace_model(x)
+        start_params = None if self.res is None else self.res.params
+        return model.fit(start_params=start_params, disp=False)
+
+    # add new observations, using the current parameters
+    def extend_model(self, new_x):
+        return self.res.extend(new_x)
+
+    # run the filter over new data, using the current parameters
+    def apply_model(self, x):
+        return self.res.apply(x)
+
+    def forecast_model(self, steps):
+        return self.res.forecast(steps)
+
+    # update the model of the current series with the new window
+    def update_model(self, x, continues_series):
+        if (self.res is None) or (self.update_count >= self.refit_interval):
+            self.res = self.fit_model(x)
+            self.update_count = 0
+        elif continues_series and not (self.smooth_data or self.detrend_data):
+            self.res = self.extend_model(x[-1:])
+        else:
+            self.res = self.apply_model(x)
 
+        self.update_count += 1
+        return
 
-class statespace_exponential_forecaster(base_forecaster):
-    def get_name(self):
-        return "State Space Exponential"
+    # fallback if the model could not be updated: fit the window from scratch or, if that fails too (e.g. all
+    # zeroes at startup), repeat the last value
+    def fallback_forecast(self, x, steps, error):
+        self.fail_count += 1
+        if self.fail_count == 1:
+            print(f"    {self.get_name()} forecaster: model update failed ({error}). Re-fitting the window")
+
+        self.res = None
+        self.update_count = 0
+        try:
+            self.res = self.fit_model(x)
+            return np.asarray(self.forecast_model(steps), dtype=float)
+        except Exception as e:
+            self.res = None
+            if self.fail_count == 1:
+                print(f"    {self.get_name()} forecaster: fit failed ({e}). Using last value")
+            return np.full(steps, x[-1], dtype=float)
 
     def forecast(self, data: np.array, steps) -> np.array:
 
-        x = self.check_1d(data)
+        raw = np.ascontiguousarray(self.check_1d(data), dtype=float)
+        x = raw
 
         # self.smooth
         if self.smooth_data:
@@ -614,10 +696,26 @@ class statespace_exponential_forecaster(base_forecaster):
         if self.detrend_data:
             x = self.detrend(x)
 
-        self.model = tsa.statespace.ExponentialSmoothing(x).fit(disp=False)
-        predictions = self.model.predict(0, len(x) + steps)
+        x = np.ascontiguousarray(x, dtype=float)
+        N = len(x)
 
-        predictions = np.concatenate((x, predictions), dtype=float)[-len(x):]
+        # find the model for this series (if this window continues one that we have already seen)
+        state = self.states.pop(hash(raw[:-1].tobytes()), None)
+        continues_series = state is not None
+        self.res, self.update_count = (state['res'], state['count']) if continues_series else (None, 0)
+
+        try:
+            self.update_model(x, continues_series)
+            preds = np.asarray(self.forecast_model(steps + self.extra_steps), dtype=float)
+        except Exception as e:
+            preds = self.fallback_forecast(x, steps + self.extra_steps, e)
+
+        if self.res is not None:
+            self.states[hash(raw[1:].tobytes())] = {'res': self.res, 'count': self.update_count}
+            if len(self.states) > self.max_series:
+                del self.states[next(iter(self.states))]  # dicts are ordered, so this is the least recently used
+
+        predictions = np.concatenate((x, preds), dtype=float)[-N:]
 
         if self.detrend_data:
             predictions = self.retrend(predictions)
@@ -628,15 +726,14 @@ class statespace_exponential_forecaster(base_forecaster):
 # -----------------------------------
 
 
-class holt_forecaster(base_forecaster):
+class exponential_forecaster(base_forecaster):
     def get_name(self):
-        return "Holt"
+        return "Exponential"
 
     def forecast(self, data: np.array, steps) -> np.array:
-
+ 
         x = self.check_1d(data)
 
-
         # self.smooth
         if self.smooth_data:
             x = self.smooth(x, self.smooth_window)
@@ -645,63 +742,53 @@ class holt_forecaster(base_forecaster):
         if self.detrend_data:
             x = self.detrend(x)
 
-        N = len(x)
-        self.model = tsa.Holt(x, damped_trend=True, initialization_method="estimated").fit()
-        # predictions = self.model.predict(0, len(x) + steps)
-        # predictions = self.model.predict(N, N + steps - 1)
-
-        predictions = self.model.predict(start=N, end=N + steps - 1)
+        self.model = tsa.ExponentialSmoothing(x).fit()
+        predictions = self.model.predict(0, len(x) + steps)
 
         predictions = np.concatenate((x, predictions), dtype=float)[-len(x):]
 
         if self.detrend_data:
             predictions = self.retrend(predictions)
 
-        return predictions.squeeze()[-len(x):]
-
-
+        return predictions.squeeze()
 # -----------------------------------
 
 
-class simple_exponential_forecaster(base_forecaster):
-    def get_name(self):
-        return "SimpleExponential"
+class statespace_exponential_forecaster(statespace_forecaster):
+    extra_steps = 1
 
-    def forecast(self, data: np.array, steps) -> np.array:
- 
-        x = self.check_1d(data)
+    def get_name(self):
+        return "State Space Exponential"
 
+    def create_statespace_model(self, x):
+        return tsa.statespace.ExponentialSmoothing(x)
 
-        # self.smooth
-        if self.smooth_data:
-            x = self.smooth(x, self.smooth_window)
 
-        # detrend
-        if self.detrend_data:
-            x = self.detrend(x)
+# -----------------------------------
 
-        self.model = tsa.SimpleExpSmoothing(x).fit()
-        predictions = self.model.predict(0, len(x) + steps)
 
-        predictions = np.concatenate((x, predictions), dtype=float)[-len(x):]
+# Damped Holt model. Uses the state space version, which can be updated without re-estimating the parameters
 
-        if self.detrend_data:
-            predictions = self.retrend(predictions)
+class holt_forecaster(statespace_forecaster):
+    def get_name(self):
+        return "Holt"
 
-        return predictions.squeeze()
+    def create_statespace_model(self, x):
+        return tsa.statespace.ExponentialSmoothing(x, trend=True, damped_trend=True)
 
 
 # -----------------------------------
 
 
-class ets_forecaster(base_forecaster):
+class simple_exponential_forecaster(base_forecaster):
     def get_name(self):
-        return "ETS"
+        return "SimpleExponential"
 
     def forecast(self, data: np.array, steps) -> np.array:
-
+ 
         x = self.check_1d(data)
 
+
         # self.smooth
         if self.smooth_data:
             x = self.smooth(x, self.smooth_window)
@@ -710,7 +797,7 @@ class ets_forecaster(base_forecaster):
         if self.detrend_data:
             x = self.detrend(x)
 
-        self.model = tsa.ETSModel(x).fit(disp=False)
+        self.model = tsa.SimpleExpSmoothing(x).fit()
         predictions = self.model.predict(0, len(x) + steps)
 
         predictions = np.concatenate((x, predictions), dtype=float)[-len(x):]
@@ -724,56 +811,61 @@ class ets_forecaster(base_forecaster):
 # -----------------------------------
 
 
-class arima_forecaster(base_forecaster):
+# ETS models are not state space models in statsmodels, so they cannot be extended. Instead, the smoother is
+# re-run over the window with the current parameters (which is still much cheaper than estimating them)
+
+class ets_forecaster(statespace_forecaster):
+    extra_steps = 1
+
     def get_name(self):
-        return "ARIMA"
+        return "ETS"
 
-    def forecast(self, data: np.array, steps) -> np.array:
-        try:  # ARIMA is very sensitive to zeroes in data, which happens a lot at startup
+    def create_statespace_model(self, x):
+        return tsa.ETSModel(x)
 
-            y = self.check_1d(data)
+    def fit_model(self, x):
+        return self.create_statespace_model(x).fit(disp=False)
 
-            # self.smooth
-            if self.smooth_data:
-                y = self.smooth(y, self.smooth_window)
+    def extend_model(self, new_x):
+        return self.apply_model(np.concatenate((self.res.model.endog, new_x))[-len(self.res.model.endog):])
 
-            # detrend
-            if self.detrend_data:
-                y = self.detrend(y)
+    def apply_model(self, x):
+        return self.create_statespace_model(x).smooth(self.res.params)
 
-            if self.model is None:
-                 # Choose the order of the ARIMA model
-                # order = (1, 1, 1)  # AR(1), I(1), MA(1)
-                # order = (0, 0, 1)  # zero order model for 1d
-                order = (2, 1, 2) 
 
-                 # create the model and fit
-                self.model = tsa.ARIMA(y, order=order)
+# -----------------------------------
 
-            res = self.model.fit()
-            start = len(data)
 
-            # predictions = res.forecast(start, start + steps)
-            # predictions = res.predict(0, start + steps, typ='levels')
-            predictions = res.predict(0, start + steps)
+class arima_forecaster(statespace_forecaster):
+    extra_steps = 1
 
+    # Choose the order of the ARIMA model
+    # order = (1, 1, 1)  # AR(1), I(1), MA(1)
+    # order = (0, 0, 1)  # zero order model for 1d
+    order = (2, 1, 2)
 
-            predictions = np.concatenate((y, predictions), dtype=float)[-len(y):]
+    def get_name(self):
+        return "ARIMA"
 
-            if self.detrend_data:
-                predictions = self.retrend(predictions)
+    def create_statespace_model(self, x):
+        return tsa.ARIMA(x, order=self.order)
 
-        except Exception as e:
-            predictions = np.zeros(len(data), dtype=float)
+    def fit_model(self, x):
+        # ARIMA.fit() does not accept disp
+        model = self.create_statespace_model(x)
+        start_params = None if self.res is None else self.res.params
+        return model.fit(start_params=start_params)
 
-        return np.array(predictions)
 
 # -----------------------------------
 
 
-class ar_forecaster(base_forecaster):
+# original AutoReg forecaster, which selects the lag order and re-fits the model for every window.
+# Kept for comparison with the recursive version (below)
+
+class ar_select_forecaster(base_forecaster):
     def get_name(self):
-        return "AutoReg"
+        return "AutoReg (select)"
 
     def forecast(self, data: np.array, steps) -> np.array:
 
@@ -812,16 +904,69 @@ class ar_forecaster(base_forecaster):
 
 # -----------------------------------
 
+# AutoReg forecaster using Recursive Least Squares (RLS)
+#
+# The rolling prediction loops call forecast() once per candle, with a window that moves forward by one sample each
+# time. Selecting the lag order and re-fitting the model for every window is expensive (ar_select_order() fits
+# ~15 models), so this version keeps the RLS state (coefficients and inverse covariance) for each series, and
+# just updates the coefficients with the new sample, which is O(p^2).
+# The lag order is re-selected (BIC, nested fits from a single QR decomposition) on the first call for a series,
+# every reselect_interval updates, and whenever the supplied window does not continue a known series.
+#
+# Notes:
+#   - series are recognised by their contents (the start of the new window must match the end of the previous one),
+#     so one forecaster can track several interleaved series (e.g. wavelet coefficients) without any extra info
+#   - the RLS update tracks the stream of raw samples, so it is only used if smoothing and detrending are off (both
+#     change the whole window when it moves, so there is no sample stream to track). The constant term and the
+#     forgetting factor deal with level changes. If either is on, the lag order is selected and the model fitted
+#     for each (smoothed/detrended) window, as in ar_select_forecaster but with the cheaper selection
+#   - the forgetting factor defaults to 1 - 1/N, i.e. a memory of about one window, which is the span that the
+#     per-window fit used
+
+class ar_forecaster(base_forecaster):
+    max_lag = 15              # maximum lag order considered
+    reselect_interval = 64    # number of updates between lag order selections
+    forget_factor = None      # RLS forgetting factor. None means 1 - 1/N
+    max_series = 256          # max number of series tracked (least recently used series are dropped)
 
-class theta_forecaster(base_forecaster):
-    res = None
+    def __init__(self):
+        super().__init__()
+        self.states = {}
 
     def get_name(self):
-        return "Theta"
+        return "AutoReg (RLS)"
 
     def forecast(self, data: np.array, steps) -> np.array:
 
-        x = self.check_1d(data)
+        x = np.ascontiguousarray(self.check_1d(data), dtype=float)
+        N = len(x)
+
+        if N < 8:
+            return x.copy()
+
+        if self.smooth_data or self.detrend_data:
+            return self.forecast_window(x, steps)
+
+        # find the state for this series (if this window continues one that we have already seen)
+        state = self.states.pop(hash(x[:-1].tobytes()), None)
+
+        if (state is None) or (state['count'] >= self.reselect_interval) or (state['N'] != N):
+            state = self.fit_window(x)
+        else:
+            self.rls_update(state, x)
+
+        self.states[hash(x[1:].tobytes())] = state
+        if len(self.states) > self.max_series:
+            del self.states[next(iter(self.states))]  # dicts are ordered, so this is the least recently used
+
+        preds = self.predict_steps(state['theta'], x, steps)
+        predictions = np.concatenate((x, preds), dtype=float)[-N:]
+        return predictions
+
+    # fit the model to a single (smoothed/detrended) window, i.e. no RLS state
+    def forecast_window(self, x, steps):
+
+        N = len(x)
 
         # self.smooth
         if self.smooth_data:
@@ -831,25 +976,118 @@ class theta_forecaster(base_forecaster):
         if self.detrend_data:
             x = self.detrend(x)
 
-        if self.model is None:
-            # Create a pandas date range with 5-minute frequency and the same length as the array
-            # TODO: pass in pd.Series?
-            dates = pd.date_range(start="2023-01-01", periods=len(x), freq="5m")
-            y = pd.Series(x, index=dates)
-            # y = pd.Series(data)
-
-            # create the model and fit
-            self.model = ThetaModel(y)
-            # print(model.summary())
+        x = np.ascontiguousarray(x, dtype=float)
+        state = self.fit_window(x)
+        preds = self.predict_steps(state['theta'], x, steps)
 
-        # get a prediction
-        res = self.model.fit()
-
-        preds = res.forecast(steps, theta=1.2)
-        predictions = np.concatenate((x, preds), dtype=float)[-len(x):]
+        predictions = np.concatenate((x, preds), dtype=float)[-N:]
         if self.detrend_data:
             predictions = self.retrend(predictions)
-        return np.array(predictions)
+        return predictions.squeeze()
+
+    # build the regression matrix: [1, x[t-1], x[t-2], ... x[t-p]] for t = p..N-1
+    def lag_matrix(self, x, p):
+        N = len(x)
+        X = np.ones((N - p, p + 1), dtype=float)
+        for i in range(1, p + 1):
+            X[:, i] = x[p - i:N - i]
+        return X, x[p:]
+
+    # select the lag order and fit the model to the whole window
+    def fit_window(self, x):
+        N = len(x)
+        max_lag = max(1, min(self.max_lag, N // 2 - 2))
+
+        # fit all orders over a common sample. Because the models are nested, a single QR decomposition gives
+        # the residual sum of squares for every order
+        X, y = self.lag_matrix(x, max_lag)
+        n = len(y)
+        Q, R = np.linalg.qr(X)
+        qy = Q.T @ y
+        rss = (y @ y) - np.cumsum(qy * qy)  # rss[k] is for the first k+1 columns, i.e. order k
+        rss = np.maximum(rss, 1e-12 * max(y @ y, 1e-12))
+        bic = n * np.log(rss / n) + np.log(n) * (np.arange(max_lag + 1) + 1)
+        p = int(np.argmin(bic))
+
+        # fit the selected order over the whole window, and initialise the RLS state from it
+        X, y = self.lag_matrix(x, p)
+        XtX = X.T @ X
+        XtX[np.diag_indices_from(XtX)] += 1e-8 * (np.trace(XtX) / (p + 1) + 1.0)
+        P = np.linalg.inv(XtX)
+        theta = P @ (X.T @ y)
+
+        lam = self.forget_factor if self.forget_factor is not None else 1.0 - 1.0 / N
+        return {'p': p, 'theta': theta, 'P': P, 'lam': lam, 'N': N, 'count': 0}
+
+    # update the coefficients with the latest sample (standard RLS update)
+    def rls_update(self, state, x):
+        p = state['p']
+        phi = np.empty(p + 1, dtype=float)
+        phi[0] = 1.0
+        if p > 0:
+            phi[1:] = x[-2:-p - 2:-1]
+
+        P = state['P']
+        lam = state['lam']
+        Pphi = P @ phi
+        k = Pphi / (lam + phi @ Pphi)
+        state['theta'] = state['theta'] + k * (x[-1] - state['theta'] @ phi)
+        P = (P - np.outer(k, Pphi)) / lam
+        state['P'] = 0.5 * (P + P.T)  # keep symmetric, otherwise rounding errors accumulate
+        state['count'] += 1
+        return
+
+    # iterate the AR model forward
+    def predict_steps(self, theta, x, steps):
+        p = len(theta) - 1
+        hist = list(x[-p:]) if p > 0 else []
+        preds = np.empty(steps, dtype=float)
+        coeffs = theta[1:][::-1]  # oldest lag first, to match hist
+        for i in range(steps):
+            val = theta[0] + (float(np.dot(coeffs, hist[-p:])) if p > 0 else 0.0)
+            preds[i] = val
+            hist.append(val)
+        return preds
+
+
+# -----------------------------------
+
+
+# Theta model (two-step version, i.e. OLS trend plus simple exponential smoothing)
+# ThetaModel is not a state space model, but the forecast only depends on the trend slope (b0), the smoothing
+# parameter (alpha) and the SES level, so the level is updated directly with the current parameters
+
+class theta_forecaster(statespace_forecaster):
+    theta = 1.2
+
+    def get_name(self):
+        return "Theta"
+
+    def fit_model(self, x):
+        # no seasonality in candle data (the model would otherwise test for it using the index frequency)
+        res = ThetaModel(x, deseasonalize=False).fit()
+        return {'b0': float(res.params['b0']), 'alpha': float(res.params['alpha']),
+                'level': float(np.asarray(res.forecast_components(1)['ses'])[0]), 'nobs': len(x)}
+
+    def extend_model(self, new_x):
+        res = dict(self.res)
+        for val in new_x:
+            res['level'] = res['alpha'] * val + (1.0 - res['alpha']) * res['level']
+        return res
+
+    def apply_model(self, x):
+        # SES over the window, starting from the first value (as ThetaModel does)
+        alpha = self.res['alpha']
+        res = dict(self.res, nobs=len(x))
+        res['level'] = float(lfilter([alpha], [1.0, alpha - 1.0], x[1:], zi=[(1.0 - alpha) * x[0]])[0][-1]) \
+            if len(x) > 1 else float(x[0])
+        return res
+
+    def forecast_model(self, steps):
+        # see statsmodels ThetaModelResults.forecast()
+        alpha = self.res['alpha']
+        trend = self.res['b0'] * (np.arange(steps) + 1.0 / alpha - ((1.0 - alpha) ** self.res['nobs']) / alpha)
+        return ((self.theta - 1.0) / self.theta) * trend + self.res['level']
 
 
 # -----------------------------------
@@ -1085,6 +1323,7 @@ class lgbm_forecaster(base_forecaster):
 class mlp_forecaster(base_forecaster):
     reuse_model = True
     support_multiple_columns = True
+    support_multi_output = True # MLPRegressor supports multiple targets
     support_retrain = True
     requires_training = True
 
@@ -1152,7 +1391,8 @@ class mlp_forecaster(base_forecaster):
         predictions = self.model.predict(x)
 
         if self.detrend_data:
-             predictions = self.retrend_results(predictions.reshape(-1,1), steps).squeeze()
+             # (rows, targets), so that multi-output predictions are retrended column by column
+             predictions = self.retrend_results(predictions.reshape(len(predictions), -1), steps).squeeze()
 
         return predictions.squeeze()
 
@@ -1576,12 +1816,14 @@ class ForecasterType(Enum):
     LINEAR = linear_forecaster
     QUADRATIC = quadratic_forecaster
     FFT_EXTRAPOLATION = fft_extrapolation_forecaster
+    FFT_SLIDING = fft_sliding_forecaster
     SS_EXPONENTAL = statespace_exponential_forecaster
     EXPONENTAL = exponential_forecaster
     HOLT = holt_forecaster
     SIMPLE_EXPONENTAL = simple_exponential_forecaster
     ETS = ets_forecaster
     AR = ar_forecaster
+    AR_SELECT = ar_select_forecaster
     ARIMA = arima_forecaster
     THETA = theta_forecaster
 
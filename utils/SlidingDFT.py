@@ -0,0 +1,110 @@
+#
+# Sliding DFT - incremental Fourier transform of a rolling window
+#
+# The rolling predictions (and the wavelet coefficient tables) transform a window that moves forward by one sample
+# each time. Instead of computing a full FFT of every window, the sliding DFT updates each frequency bin with the
+# sample that enters and the sample that leaves the window:
+#
+#     X_k(t+1) = (X_k(t) + x_new - x_old) * exp(2j * pi * k / N)
+#
+# which is O(N) per step (or less, if only the first few bins are needed, e.g. FFTA). Rounding errors accumulate
+# slowly, so the bins are recalculated exactly every recompute_interval updates.
+#
+# Usage:
+#   streaming (live):  sdft = SlidingDFT(N); sdft.reset(window); ... bins = sdft.push(new_sample)
+#   rolling windows:   bins = sdft.update(window)   - pushes the latest sample if the window continues the previous
+#                                                     one, otherwise recalculates from scratch
+#   batch (backtest):  table = sdft.batch(data)     - bins for every full window of data, one row per window
+#
+# Bins follow the numpy conventions, i.e. rfft() layout if real=True (the default), otherwise fft() layout
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+class SlidingDFT():
+
+    recompute_interval = 1024  # number of updates between exact recalculations (bounds numerical drift)
+
+    def __init__(self, N, num_bins=None, real=True):
+        self.N = N
+        self.real = real
+        max_bins = (N // 2 + 1) if real else N
+        self.num_bins = max_bins if num_bins is None else min(num_bins, max_bins)
+
+        self.twiddle = np.exp(2j * np.pi * np.arange(self.num_bins) / N)
+        self.buffer = np.zeros(N, dtype=float)
+        self.pos = 0  # index of the oldest sample in buffer
+        self.bins = None
+        self.update_count = 0
+        self.next_key = None
+
+    # exact transform of the supplied window, truncated to num_bins
+    def transform(self, window):
+        if self.real:
+            return np.fft.rfft(window)[:self.num_bins]
+        else:
+            return np.fft.fft(window)[:self.num_bins]
+
+    # (re-)initialise from a full window
+    def reset(self, window):
+        window = np.asarray(window, dtype=float)
+        if len(window) != self.N:
+            raise ValueError(f"window length ({len(window)}) does not match N ({self.N})")
+        self.buffer[:] = window
+        self.pos = 0
+        self.bins = self.transform(self.buffer)
+        self.update_count = 0
+        self.next_key = hash(self.buffer[1:].tobytes())
+        return self.bins
+
+    # current window contents (oldest first)
+    def window(self):
+        return np.concatenate((self.buffer[self.pos:], self.buffer[:self.pos]))
+
+    # add a new sample (the oldest one drops out of the window)
+    def push(self, sample):
+        if self.bins is None:
+            raise RuntimeError("SlidingDFT.push() called before reset()")
+
+        sample = float(sample)
+        x_old = self.buffer[self.pos]
+        self.buffer[self.pos] = sample
+        self.pos = (self.pos + 1) % self.N
+
+        self.bins = (self.bins + (sample - x_old)) * self.twiddle
+        self.update_count += 1
+
+        if self.update_count >= self.recompute_interval:
+            self.reset(self.window())
+        else:
+            self.next_key = None  # only calculated if needed (see update())
+
+        return self.bins
+
+    # bins for the supplied window. Uses the incremental update if the window continues the previous one
+    def update(self, window):
+        window = np.ascontiguousarray(window, dtype=float)
+
+        if (self.bins is not None) and (len(window) == self.N):
+            if self.next_key is None:
+                self.next_key = hash(self.window()[1:].tobytes())
+            if hash(window[:-1].tobytes()) == self.next_key:
+                self.push(window[-1])
+                self.next_key = hash(window[1:].tobytes())
+                return self.bins
+
+        return self.reset(window)
+
+    # bins for every full window of data (one row per window). This is a vectorised exact transform, which is
+    # faster than stepping through the data in python when all of the windows are known in advance
+    def batch(self, data):
+        data = np.asarray(data, dtype=float)
+        if len(data) < self.N:
+            return np.zeros((0, self.num_bins), dtype=complex)
+
+        windows = sliding_window_view(data, self.N)
+        if self.real:
+            return np.fft.rfft(windows, axis=1)[:, :self.num_bins]
+        else:
+            return np.fft.fft(windows, axis=1)[:, :self.num_bins]
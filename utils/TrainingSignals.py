@@ -11,6 +11,7 @@
 
 
 import sys
+import weakref
 from pathlib import Path
 
 import freqtrade.vendor.qtpylib.indicators as qtpylib
@@ -45,6 +46,133 @@ pd.options.mode.chained_assignment = None  # default='warn'
 
 # To add a new type of training signal, define the corresponding class and add it to the SignalType enum
 
+# Signal conditions should be expressed using the SignalFeatures cache (see get_signal_features()), rather than
+# directly on the dataframe. This means that any feature shared between signal types (columns, shifts,
+# peaks/valleys, smoothing etc.) is only computed once per dataframe, and all conditions are evaluated as
+# numpy boolean arrays
+
+# -----------------------------------
+
+# SignalFeatures - cache of the (numpy) features used by the signal conditions for a specific dataframe
+# Notes:
+#   - features are computed on first use, then re-used by every signal type (and by entry and exit signals)
+#   - comparisons involving NaN evaluate to False, which matches the behaviour of the equivalent pandas expressions
+#   - the cache assumes that existing columns are not modified while signals are being generated. Adding columns
+#     is OK, changing the number of rows creates a new cache
+
+class SignalFeatures():
+
+    def __init__(self, dataframe: DataFrame):
+        self.df_ref = weakref.ref(dataframe)
+        self.nrows = dataframe.shape[0]
+        self.cache = {}
+
+    # check whether this cache applies to the supplied dataframe
+    def matches(self, dataframe: DataFrame) -> bool:
+        return (self.df_ref() is dataframe) and (self.nrows == dataframe.shape[0])
+
+    def dataframe(self) -> DataFrame:
+        return self.df_ref()
+
+    # returns the named column as a float array
+    def col(self, name) -> np.ndarray:
+        key = ('col', name)
+        if key not in self.cache:
+            self.cache[key] = self.dataframe()[name].to_numpy(dtype=float)
+        return self.cache[key]
+
+    # allows f['name'] as shorthand for f.col('name')
+    def __getitem__(self, name) -> np.ndarray:
+        return self.col(name)
+
+    # equivalent to dataframe[name].shift(periods), i.e. +ve looks back, -ve looks forward
+    def shift(self, name, periods=1) -> np.ndarray:
+        key = ('shift', name, periods)
+        if key not in self.cache:
+            src = self.col(name)
+            shifted = np.full(self.nrows, np.nan, dtype=float)
+            if periods == 0:
+                shifted[:] = src
+            elif abs(periods) < self.nrows:
+                if periods > 0:
+                    shifted[periods:] = src[:-periods]
+                else:
+                    shifted[:periods] = src[-periods:]
+            self.cache[key] = shifted
+        return self.cache[key]
+
+    # exponentially weighted mean of a column, same as dataframe[name].ewm(span=span).mean()
+    def ewm(self, name, span) -> np.ndarray:
+        key = ('ewm', name, span)
+        if key not in self.cache:
+            self.cache[key] = self.dataframe()[name].ewm(span=span).mean().to_numpy(dtype=float)
+        return self.cache[key]
+
+    # mean of the -ve (clip(upper=0)) or +ve (clip(lower=0)) portion of a column, ignoring NaNs (as pandas does)
+    def neg_mean(self, name) -> float:
+        key = ('neg_mean', name)
+        if key not in self.cache:
+            self.cache[key] = np.nanmean(np.minimum(self.col(name), 0.0))
+        return self.cache[key]
+
+    def pos_mean(self, name) -> float:
+        key = ('pos_mean', name)
+        if key not in self.cache:
+            self.cache[key] = np.nanmean(np.maximum(self.col(name), 0.0))
+        return self.cache[key]
+
+    # peak/valley detection (via argrelextrema). If span is specified, then the smoothed (ewm) version is used
+    def peaks(self, name, order, span=None) -> np.ndarray:
+        return self._extrema('peaks', np.greater_equal, name, order, span)
+
+    def valleys(self, name, order, span=None) -> np.ndarray:
+        return self._extrema('valleys', np.less_equal, name, order, span)
+
+    def _extrema(self, kind, comparator, name, order, span) -> np.ndarray:
+        key = (kind, name, order, span)
+        if key not in self.cache:
+            data = self.col(name) if span is None else self.ewm(name, span)
+            flags = np.zeros(self.nrows, dtype=bool)
+            flags[scipy.signal.argrelextrema(data, comparator, order=order)[0]] = True
+            self.cache[key] = flags
+        return self.cache[key]
+
+    # the 'standard' future profit/loss conditions used by most of the signal types
+    def future_profit(self, scale=1.0) -> np.ndarray:
+        key = ('future_profit', scale)
+        if key not in self.cache:
+            self.cache[key] = self.col('future_profit_max') >= scale * self.col('future_profit_threshold')
+        return self.cache[key]
+
+    def future_loss(self, scale=1.0) -> np.ndarray:
+        key = ('future_loss', scale)
+        if key not in self.cache:
+            self.cache[key] = self.col('future_loss_min') <= scale * self.col('future_loss_threshold')
+        return self.cache[key]
+
+
+# single-entry cache, so that consecutive calls on the same dataframe (entry & exit signals, guard conditions,
+# all_signals etc.) share the same features
+_curr_features: SignalFeatures = None
+
+
+def get_signal_features(dataframe: DataFrame) -> SignalFeatures:
+    global _curr_features
+    if (_curr_features is None) or (not _curr_features.matches(dataframe)):
+        _curr_features = SignalFeatures(dataframe)
+    return _curr_features
+
+
+# discard any cached features (e.g. if the contents of a dataframe have been modified in place)
+def clear_signal_features():
+    global _curr_features
+    _curr_features = None
+
+
+# converts a boolean condition into the signal format expected by the strategies
+def to_signal(condition) -> np.ndarray:
+    return np.where(condition, 1.0, 0.0)
+
 # -----------------------------------
 
 # base class - to allow generic treatment of all signal types
@@ -142,37 +270,35 @@ class adx_signals(base_signals):
 
     # function to get buy signals
     def get_entry_training_signals(self, future_df: DataFrame):
-
         # classic ADX:
         # ADX above 25 and DI+ above DI-: That's an uptrend.
         # ADX above 25 and DI- above DI+: That's a downtrend.
 
-        signals = np.where(
-            (
-                (future_df['fisher_wr'] < -0.5) & # guard
+        f = get_signal_features(future_df)
+        signals = to_signal(
+            (f['fisher_wr'] < -0.5) &  # guard
 
-                (future_df['adx'] > 25) &
-                (future_df['di_delta'] < 0) & # downtrend
+            (f['adx'] > 25) &
+            (f['di_delta'] < 0) &  # downtrend
 
-                # future profit exceeds threshold
-                (future_df['future_profit_max'] >= future_df['future_profit_threshold'])
-            ), 1.0, 0.0)
+            # future profit exceeds threshold
+            f.future_profit()
+        )
         return signals
 
     # function to get sell signals
 
     def get_exit_training_signals(self, future_df: DataFrame):
+        f = get_signal_features(future_df)
+        signals = to_signal(
+            (f['fisher_wr'] > 0.5) &  # guard
 
-        signals = np.where(
-            (
-                (future_df['fisher_wr'] > 0.5) & # guard
-
-                (future_df['adx'] > 25) &
-                (future_df['di_delta'] > 0) & # uptrend
+            (f['adx'] > 25) &
+            (f['di_delta'] > 0) &  # uptrend
 
-                # future loss exceeds threshold
-                (future_df['future_loss_min'] <= future_df['future_loss_threshold'])
-            ), 1.0, 0.0)
+            # future loss exceeds threshold
+            f.future_loss()
+        )
         return signals
 
     # function to get entry/buy guard conditions
@@ -218,37 +344,33 @@ class adx2_signals(base_signals):
 
     # function to get buy signals
     def get_entry_training_signals(self, future_df: DataFrame):
-
         # classic ADX crossing:
         # ADX above 20 and DI+ crosses above DI-
         # ADX above 20 and DI+ crosses below DI+
 
         # just the crossing points don't generate enough signals, so look for range around the crossing instead
 
-        signals = np.where(
-            (
-                # (future_df['adx'] > 20) &
-                (future_df['di_delta'] >= 0) &
-                (future_df['di_delta'] <= 5) &
+        f = get_signal_features(future_df)
+        signals = to_signal(
+            (f['di_delta'] >= 0) &
+            (f['di_delta'] <= 5) &
 
-                # future profit exceeds threshold
-                (future_df['future_profit_max'] >= future_df['future_profit_threshold'])
-            ), 1.0, 0.0)
+            # future profit exceeds threshold
+            f.future_profit()
+        )
         return signals
 
     # function to get sell signals
 
     def get_exit_training_signals(self, future_df: DataFrame):
-
-        signals = np.where(
-            (
-                # (future_df['adx'] > 20) &
-                (future_df['di_delta'] <= 0) &
-                (future_df['di_delta'] >= -5) &
-
-                # future loss exceeds threshold
-                (future_df['future_loss_min'] <= future_df['future_loss_threshold'])
-            ), 1.0, 0.0)
+        f = get_signal_features(future_df)
+        signals = to_signal(
+            (f['di_delta'] <= 0) &
+            (f['di_delta'] >= -5) &
+
+            # future loss exceeds threshold
+            f.future_loss()
+        )
         return signals
 
     # function to get entry/buy guard conditions
@@ -294,35 +416,33 @@ class adx3_signals(base_signals):
 
     # function to get buy signals
     def get_entry_training_signals(self, future_df: DataFrame):
-
         # classic ADX crossing:
         # ADX above 20 and DI+ crosses above DI-
         # ADX above 20 and DI+ crosses below DI+
 
         # just the crossing points don't generate enough signals, so look for range around the crossing instead
 
-        signals = np.where(
-            (
-                (future_df['adx'] > 20) &
-                (future_df['di_delta'] <= -10) &
+        f = get_signal_features(future_df)
+        signals = to_signal(
+            (f['adx'] > 20) &
+            (f['di_delta'] <= -10) &
 
-                # future profit exceeds threshold
-                (future_df['future_profit_max'] >= future_df['future_profit_threshold'])
-            ), 1.0, 0.0)
+            # future profit exceeds threshold
+            f.future_profit()
+        )
         return signals
 
     # function to get sell signals
 
     def get_exit_training_signals(self, future_df: DataFrame):
-
-        signals = np.where(
-            (
-                (future_df['adx'] > 20) &
-                (future_df['di_delta'] >= 10) &
-
-                # future loss exceeds threshold
-                (future_df['future_loss_min'] <= future_df['future_loss_threshold'])
-            ), 1.0, 0.0)
+        f = get_signal_features(future_df)
+        signals = to_signal(
+            (f['adx'] > 20) &
+            (f['di_delta'] >= 10) &
+
+            # future loss exceeds threshold
+            f.future_loss()
+        )
         return signals
 
     # function to get entry/buy guard conditions
@@ -371,36 +491,31 @@ class aroon_signals(base_signals):
 
     # function to get buy signals
     def get_entry_training_signals(self, future_df: DataFrame):
-        signals = np.where(
-            (
-                # uptrend
-                    (future_df['aroonup'] > future_df['aroondown']) &
-                    (
-                            (future_df['aroonup'] > 90) &
-                            (future_df['aroondown'] < 10)
-                    ) &
-
-                    # future profit exceeds threshold
-                    (future_df['future_profit_max'] >= future_df['future_profit_threshold'])
-            ), 1.0, 0.0)
+        f = get_signal_features(future_df)
+        signals = to_signal(
+            # uptrend
+            (f['aroonup'] > f['aroondown']) &
+            (f['aroonup'] > 90) &
+            (f['aroondown'] < 10) &
+
+            # future profit exceeds threshold
+            f.future_profit()
+        )
         return signals
 
     # function to get sell signals
 
     def get_exit_training_signals(self, future_df: DataFrame):
-
-        signals = np.where(
-            (
-                # downtrend
-                    (future_df['aroonup'] < future_df['aroondown']) &
-                    (
-                            (future_df['aroonup'] < 10) &
-                            (future_df['aroondown'] > 90)
-                    ) &
-
-                # future loss exceeds threshold
-                (future_df['future_loss_min'] <= future_df['future_loss_threshold'])
-            ), 1.0, 0.0)
+        f = get_signal_features(future_df)
+        signals = to_signal(
+            # downtrend
+            (f['aroonup'] < f['aroondown']) &
+            (f['aroonup'] < 10) &
+            (f['aroondown'] > 90) &
+
+            # future loss exceeds threshold
+            f.future_loss()
+        )
         return signals
 
     # function to get entry/buy guard conditions
@@ -439,45 +554,27 @@ class bbw_signals(base_signals):
 
     # function to get buy signals
     def get_entry_training_signals(self, future_df: DataFrame):
-
-        peaks = np.zeros(future_df.shape[0], dtype=float)
-        order = 4
-
-        p_idx = scipy.signal.argrelextrema(future_df['bb_width'].to_numpy(), np.greater_equal, order=order)[0]
-        peaks[p_idx] = 1.0
-
-        signals = np.where(
-            (
-                # (future_df['fisher_wr'] > 0.1) &  # guard
-
-                # peak detected
-                    (peaks > 0) &
-
-                    # future profit exceeds threshold
-                    (future_df['future_profit_max'] >= future_df['future_profit_threshold'])
-
-            ), 1.0, 0.0)
+        f = get_signal_features(future_df)
+        signals = to_signal(
+            # peak detected
+            f.peaks('bb_width', order=4) &
+
+            # future profit exceeds threshold
+            f.future_profit()
+        )
         return signals
 
     # function to get sell signals
 
     def get_exit_training_signals(self, future_df: DataFrame):
-        valleys = np.zeros(future_df.shape[0], dtype=float)
-        order = 4
-
-        v_idx = scipy.signal.argrelextrema(future_df['bb_width'].to_numpy(), np.less_equal, order=order)[0]
-        valleys[v_idx] = 1.0
-
-        signals = np.where(
-            (
-                # (future_df['fisher_wr'] < -0.1) &  # guard
-
-                # valley detected
-                    (valleys > 0.0) &
-
-                    # future loss exceeds threshold
-                    (future_df['future_loss_min'] <= future_df['future_loss_threshold'])
-            ), 1.0, 0.0)
+        f = get_signal_features(future_df)
+        signals = to_signal(
+            # valley detected
+            f.valleys('bb_width', order=4) &
+
+            # future loss exceeds threshold
+            f.future_loss()
+        )
         return signals
 
     # function to get entry/buy guard conditions
@@ -527,45 +624,35 @@ class dwt_signals(base_signals):
         return self.indicators_present(ind_list, dataframe)
 
     def get_entry_training_signals(self, future_df: DataFrame):
-        global lookahead
-        signals = np.where(
-            (
-                (future_df['fisher_wr'] < -0.5) &
-                # (future_df['close'] <= future_df['recent_min']) &  # local low
+        f = get_signal_features(future_df)
+        signals = to_signal(
+            (f['fisher_wr'] < -0.5) &
 
-                # forward model below backward model
-                    (future_df['dwt_diff'] < 0) &
+            # forward model below backward model
+            (f['dwt_diff'] < 0) &
 
-                    # # current loss below threshold
-                    # (future_df['dwt_diff'] <= future_df['future_loss_threshold']) &
+            # forward model above backward model at lookahead
+            (f.shift('dwt_diff', -self.lookahead) > 0) &
 
-                    # forward model above backward model at lookahead
-                    (future_df['dwt_diff'].shift(-self.lookahead) > 0) &
-
-                    # future profit exceeds threshold
-                    (future_df['future_profit_max'] >= future_df['future_profit_threshold'])
-            ), 1.0, 0.0)
+            # future profit exceeds threshold
+            f.future_profit()
+        )
         return signals
 
     def get_exit_training_signals(self, future_df: DataFrame):
-        global lookahead
-        signals = np.where(
-            (
-                (future_df['fisher_wr'] > 0.5) &
-                    # (future_df['close'] >= future_df['recent_max']) &  # local high
+        f = get_signal_features(future_df)
+        signals = to_signal(
+            (f['fisher_wr'] > 0.5) &
 
-                    # forward model above backward model
-                    (future_df['dwt_diff'] > 0) &
+            # forward model above backward model
+            (f['dwt_diff'] > 0) &
 
-                    # # current profit above threshold
-                    # (future_df['dwt_diff'] >= future_df['future_profit_threshold']) &
+            # forward model below backward model at lookahead
+            (f.shift('dwt_diff', -self.lookahead) < 0) &
 
-                    # forward model below backward model at lookahead
-                    (future_df['dwt_diff'].shift(-self.lookahead) < 0) &
-
-                    # future loss exceeds threshold
-                    (future_df['future_loss_min'] <= future_df['future_loss_threshold'])
-            ), 1.0, 0.0)
+            # future loss exceeds threshold
+            f.future_loss()
+        )
         return signals
 
     def get_entry_guard_conditions(self, dataframe: DataFrame):
@@ -610,45 +697,29 @@ class dwt2_signals(base_signals):
         return self.indicators_present(ind_list, dataframe)
 
     def get_entry_training_signals(self, future_df: DataFrame):
-        global lookahead
-        # detect valleys
-        valleys = np.zeros(future_df.shape[0], dtype=float)
-        order = 4
+        f = get_signal_features(future_df)
+        signals = to_signal(
+            (f['fisher_wr'] < -0.1) &  # guard
 
-        v_idx = scipy.signal.argrelextrema(future_df['full_dwt'].to_numpy(), np.less_equal, order=order)[0]
-        valleys[v_idx] = 1.0
-
-        signals = np.where(
-            (
-                    (future_df['fisher_wr'] < -0.1) &  # guard
+            # valley detected
+            f.valleys('full_dwt', order=4) &
 
-                    # valley detected
-                    (valleys > 0.0) &
-
-                    # future profit exceeds threshold
-                    (future_df['future_profit_max'] >= future_df['future_profit_threshold'])
-            ), 1.0, 0.0)
+            # future profit exceeds threshold
+            f.future_profit()
+        )
         return signals
 
     def get_exit_training_signals(self, future_df: DataFrame):
-        global lookahead
-
-        peaks = np.zeros(future_df.shape[0], dtype=float)
-        order = 4
+        f = get_signal_features(future_df)
+        signals = to_signal(
+            (f['fisher_wr'] > 0.1) &  # guard
 
-        p_idx = scipy.signal.argrelextrema(future_df['full_dwt'].to_numpy(), np.greater_equal, order=order)[0]
-        peaks[p_idx] = 1.0
+            # peak detected
+            f.peaks('full_dwt', order=4) &
 
-        signals = np.where(
-            (
-                    (future_df['fisher_wr'] > 0.1) &  # guard
-
-                    # peak detected
-                    (peaks > 0) &
-
-                    # future loss exceeds threshold
-                    (future_df['future_loss_min'] <= future_df['future_loss_threshold'])
-            ), 1.0, 0.0)
+            # future loss exceeds threshold
+            f.future_loss()
+        )
         return signals
 
     def get_entry_guard_conditions(self, dataframe: DataFrame):
@@ -694,30 +765,30 @@ class fbb_signals(base_signals):
         return self.indicators_present(ind_list, dataframe)
 
     def get_entry_training_signals(self, future_df: DataFrame):
-        signals = np.where(
-            (
-                # oversold condition with high potential profit
-                    (future_df['mfi'] < 50) &  # MFI in buy range
-                    (future_df['fisher_wr'] < -0.8) &
-                    (future_df['bb_gain'] >= future_df['profit_threshold'] / 100.0) &
-
-                    # future profit
-                    (future_df['future_profit_max'] >= future_df['future_profit_threshold']) &
-                    (future_df['future_gain'] > 0)
-            ), 1.0, 0.0)
+        f = get_signal_features(future_df)
+        signals = to_signal(
+            # oversold condition with high potential profit
+            (f['mfi'] < 50) &  # MFI in buy range
+            (f['fisher_wr'] < -0.8) &
+            (f['bb_gain'] >= f['profit_threshold'] / 100.0) &
+
+            # future profit
+            f.future_profit() &
+            (f['future_gain'] > 0)
+        )
         return signals
 
     def get_exit_training_signals(self, future_df: DataFrame):
-        signals = np.where(
-            (
-                # overbought condition with high potential loss
-                    (future_df['mfi'] > 50) &  # MFI in sell range
-                    (future_df['fisher_wr'] > 0.8) &
-                    (future_df['bb_loss'] <= future_df['loss_threshold'] / 100.0) &
-
-                    # future loss
-                    (future_df['future_profit_min'] <= future_df['future_loss_threshold'])
-            ), 1.0, 0.0)
+        f = get_signal_features(future_df)
+        signals = to_signal(
+            # overbought condition with high potential loss
+            (f['mfi'] > 50) &  # MFI in sell range
+            (f['fisher_wr'] > 0.8) &
+            (f['bb_loss'] <= f['loss_threshold'] / 100.0) &
+
+            # future loss
+            (f['future_profit_min'] <= f['future_loss_threshold'])
+        )
         return signals
 
     def get_entry_guard_conditions(self, dataframe: DataFrame):
@@ -767,25 +838,25 @@ class fwr_signals(base_signals):
         return self.indicators_present(ind_list, dataframe)
 
     def get_entry_training_signals(self, future_df: DataFrame):
-        signals = np.where(
-            (
-                # oversold condition
-                    (future_df['fisher_wr'] <= -0.8) &
-
-                    # future profit
-                    (future_df['future_profit_max'] >= future_df['future_profit_threshold'])
-            ), 1.0, 0.0)
+        f = get_signal_features(future_df)
+        signals = to_signal(
+            # oversold condition
+            (f['fisher_wr'] <= -0.8) &
+
+            # future profit
+            f.future_profit()
+        )
         return signals
 
     def get_exit_training_signals(self, future_df: DataFrame):
-        signals = np.where(
-            (
-                # overbought condition
-                    (future_df['fisher_wr'] >= 0.8) &
-
-                    # future loss
-                    (future_df['future_loss_min'] <= future_df['future_loss_threshold'])
-            ), 1.0, 0.0)
+        f = get_signal_features(future_df)
+        signals = to_signal(
+            # overbought condition
+            (f['fisher_wr'] >= 0.8) &
+
+            # future loss
+            f.future_loss()
+        )
         return signals
 
     def get_entry_guard_conditions(self, dataframe: DataFrame):
@@ -823,21 +894,19 @@ class highlow_signals(base_signals):
         return self.indicators_present(ind_list, dataframe)
 
     def get_entry_training_signals(self, future_df: DataFrame):
-        signals = np.where(
-            (
-                    (future_df['dwt_at_low'] > 0) &  # at low of full window
-                    # (future_df['full_dwt'] <= future_df['future_min'])  # at min of future window
-                    (future_df['future_profit_max'] >= future_df['future_profit_threshold'])
-            ), 1.0, 0.0)
+        f = get_signal_features(future_df)
+        signals = to_signal(
+            (f['dwt_at_low'] > 0) &  # at low of full window
+            f.future_profit()
+        )
         return signals
 
     def get_exit_training_signals(self, future_df: DataFrame):
-        signals = np.where(
-            (
-                    (future_df['dwt_at_high'] > 0) &  # at high of full window
-                    # (future_df['full_dwt'] >= future_df['future_max'])  # at max of future window
-                    (future_df['future_loss_min'] <= future_df['future_loss_threshold'])
-            ), 1.0, 0.0)
+        f = get_signal_features(future_df)
+        signals = to_signal(
+            (f['dwt_at_high'] > 0) &  # at high of full window
+            f.future_loss()
+        )
         return signals
 
     def get_entry_guard_conditions(self, dataframe: DataFrame):
@@ -881,37 +950,31 @@ class jump_signals(base_signals):
         return self.indicators_present(ind_list, dataframe)
 
     def get_entry_training_signals(self, future_df: DataFrame):
-        signals = np.where(
-            (
-                # previous candle dropped more than 2 std dev
-                    (
-                            future_df['gain'].shift() <=
-                            (future_df['future_loss_mean'] - 2.0 * abs(future_df['future_loss_std']))
-                    ) &
+        f = get_signal_features(future_df)
+        signals = to_signal(
+            # previous candle dropped more than 2 std dev
+            (f.shift('gain') <= (f['future_loss_mean'] - 2.0 * np.abs(f['future_loss_std']))) &
 
-                    # big drop somewhere in previous window
-                    (future_df['dwt_delta_min'] <= 1.0) &
+            # big drop somewhere in previous window
+            (f['dwt_delta_min'] <= 1.0) &
 
-                    # upcoming window exceeds profit threshold
-                    (future_df['future_profit_max'] >= future_df['future_profit_threshold'])
-            ), 1.0, 0.0)
+            # upcoming window exceeds profit threshold
+            f.future_profit()
+        )
         return signals
 
     def get_exit_training_signals(self, future_df: DataFrame):
-        signals = np.where(
-            (
-                # previous candle gained more than 2 std dev
-                    (
-                            future_df['gain'].shift() >=
-                            (future_df['future_profit_mean'] + 2.0 * abs(future_df['future_profit_std']))
-                    ) &
+        f = get_signal_features(future_df)
+        signals = to_signal(
+            # previous candle gained more than 2 std dev
+            (f.shift('gain') >= (f['future_profit_mean'] + 2.0 * np.abs(f['future_profit_std']))) &
 
-                    # big gain somewhere in previous window
-                    (future_df['dwt_delta_max'] >= 1.0) &
+            # big gain somewhere in previous window
+            (f['dwt_delta_max'] >= 1.0) &
 
-                    # upcoming window exceeds loss threshold
-                    (future_df['future_loss_min'] <= future_df['future_loss_threshold'])
-            ), 1.0, 0.0)
+            # upcoming window exceeds loss threshold
+            f.future_loss()
+        )
         return signals
 
     def get_entry_guard_conditions(self, dataframe: DataFrame):
@@ -953,27 +1016,27 @@ class macd_signals(base_signals):
         return self.indicators_present(ind_list, dataframe)
 
     def get_entry_training_signals(self, future_df: DataFrame):
-        signals = np.where(
-            (
-                # MACD turns around -ve to +ve
-                    (future_df['macdhist'].shift() < 0) &
-                    (future_df['macdhist'] >= 0) &
-
-                    # future gain exceeds threshold
-                    (future_df['future_profit_max'] >= future_df['future_profit_threshold'])
-            ), 1.0, 0.0)
+        f = get_signal_features(future_df)
+        signals = to_signal(
+            # MACD turns around -ve to +ve
+            (f.shift('macdhist') < 0) &
+            (f['macdhist'] >= 0) &
+
+            # future gain exceeds threshold
+            f.future_profit()
+        )
         return signals
 
     def get_exit_training_signals(self, future_df: DataFrame):
-        signals = np.where(
-            (
-                # MACD turns around +ve to -ve
-                    (future_df['macdhist'].shift() > 0) &
-                    (future_df['macdhist'] <= 0) &
-
-                    # future loss exceeds threshold
-                    (future_df['future_loss_min'] <= future_df['future_loss_threshold'])
-            ), 1.0, 0.0)
+        f = get_signal_features(future_df)
+        signals = to_signal(
+            # MACD turns around +ve to -ve
+            (f.shift('macdhist') > 0) &
+            (f['macdhist'] <= 0) &
+
+            # future loss exceeds threshold
+            f.future_loss()
+        )
         return signals
 
     def get_entry_guard_conditions(self, dataframe: DataFrame):
@@ -1011,38 +1074,25 @@ class macd2_signals(base_signals):
         return self.indicators_present(ind_list, dataframe)
 
     def get_entry_training_signals(self, future_df: DataFrame):
-        # detect valleys
-        valleys = np.zeros(future_df.shape[0], dtype=float)
-        order = 4
-
-        v_idx = scipy.signal.argrelextrema(future_df['macdhist'].to_numpy(), np.less_equal, order=order)[0]
-        valleys[v_idx] = 1.0
-
-        signals = np.where(
-            (
-                # valley detected
-                    (valleys > 0.0) &
-
-                    # future profit exceeds threshold
-                    (future_df['future_profit_max'] >= future_df['future_profit_threshold'])
-            ), 1.0, 0.0)
+        f = get_signal_features(future_df)
+        signals = to_signal(
+            # valley detected
+            f.valleys('macdhist', order=4) &
+
+            # future profit exceeds threshold
+            f.future_profit()
+        )
         return signals
 
     def get_exit_training_signals(self, future_df: DataFrame):
-        peaks = np.zeros(future_df.shape[0], dtype=float)
-        order = 2
-
-        p_idx = scipy.signal.argrelextrema(future_df['macdhist'].to_numpy(), np.greater_equal, order=order)[0]
-        peaks[p_idx] = 1.0
-
-        signals = np.where(
-            (
-                # peak detected
-                    (peaks > 0) &
-
-                    # future loss exceeds threshold
-                    (future_df['future_loss_min'] <= future_df['future_loss_threshold'])
-            ), 1.0, 0.0)
+        f = get_signal_features(future_df)
+        signals = to_signal(
+            # peak detected
+            f.peaks('macdhist', order=2) &
+
+            # future loss exceeds threshold
+            f.future_loss()
+        )
         return signals
 
     def get_entry_guard_conditions(self, dataframe: DataFrame):
@@ -1081,43 +1131,35 @@ class macd3_signals(base_signals):
 
     def get_entry_training_signals(self, future_df: DataFrame):
         # MACD is related to price, so need to figure out scale
-        macd_neg = future_df['macdhist'].clip(upper=0.0)
-        # threshold = macd_neg.mean() - abs(macd_neg.std())
-        threshold = macd_neg.mean()
+        f = get_signal_features(future_df)
+        threshold = f.neg_mean('macdhist')
 
-        # print(f"DBG: buy threshold: {threshold}")
+        signals = to_signal(
+            # macdhist in low region
+            (f['macdhist'] < threshold) &
 
-        signals = np.where(
-            (
-                # macdhist in low region
-                    (future_df['macdhist'] < threshold) &
-
-                    # buy region
-                    (future_df['mfi'] < 50) &
+            # buy region
+            (f['mfi'] < 50) &
 
-                    # future profit exceeds threshold
-                    (future_df['future_profit_max'] >= future_df['future_profit_threshold'])
-            ), 1.0, 0.0)
+            # future profit exceeds threshold
+            f.future_profit()
+        )
         return signals
 
     def get_exit_training_signals(self, future_df: DataFrame):
-        macd_pos = future_df['macdhist'].clip(lower=0.0)
-        # threshold = macd_pos.mean() + abs(macd_pos.std())
-        threshold = macd_pos.mean()
+        f = get_signal_features(future_df)
+        threshold = f.pos_mean('macdhist')
 
-        # print(f"DBG: sell threshold: {threshold}")
+        signals = to_signal(
+            # macdhist in high region
+            (f['macdhist'] > threshold) &
 
-        signals = np.where(
-            (
-                # macdhist in high region
-                    (future_df['macdhist'] > threshold) &
-
-                    # sell region
-                    (future_df['mfi'] > 50) &
+            # sell region
+            (f['mfi'] > 50) &
 
-                    # future loss exceeds threshold
-                    (future_df['future_loss_min'] <= future_df['future_loss_threshold'])
-            ), 1.0, 0.0)
+            # future loss exceeds threshold
+            f.future_loss()
+        )
         return signals
 
     def get_entry_guard_conditions(self, dataframe: DataFrame):
@@ -1155,25 +1197,25 @@ class mfi_signals(base_signals):
         return self.indicators_present(ind_list, dataframe)
 
     def get_entry_training_signals(self, future_df: DataFrame):
-        signals = np.where(
-            (
-                # oversold condition
-                    (future_df['mfi'] <= 15) &
-
-                    # future profit
-                    (future_df['future_profit_max'] >= future_df['future_profit_threshold'])
-            ), 1.0, 0.0)
+        f = get_signal_features(future_df)
+        signals = to_signal(
+            # oversold condition
+            (f['mfi'] <= 15) &
+
+            # future profit
+            f.future_profit()
+        )
         return signals
 
     def get_exit_training_signals(self, future_df: DataFrame):
-        signals = np.where(
-            (
-                # overbought condition
-                    (future_df['mfi'] >= 85) &
-
-                    # future loss
-                    (future_df['future_loss_min'] <= future_df['future_loss_threshold'])
-            ), 1.0, 0.0)
+        f = get_signal_features(future_df)
+        signals = to_signal(
+            # overbought condition
+            (f['mfi'] >= 85) &
+
+            # future loss
+            f.future_loss()
+        )
         return signals
 
     def get_entry_guard_conditions(self, dataframe: DataFrame):
@@ -1211,31 +1253,31 @@ class minmax_signals(base_signals):
         return self.indicators_present(ind_list, dataframe)
 
     def get_entry_training_signals(self, future_df: DataFrame):
-        signals = np.where(
-            (
-                # at min of past window
-                    (future_df['full_dwt'] <= future_df['dwt_recent_min']) &
+        f = get_signal_features(future_df)
+        signals = to_signal(
+            # at min of past window
+            (f['full_dwt'] <= f['dwt_recent_min']) &
 
-                    # at min of future window
-                    (future_df['full_dwt'] <= future_df['future_min']) &
+            # at min of future window
+            (f['full_dwt'] <= f['future_min']) &
 
-                    # future profit exceeds threshold
-                    (future_df['future_profit_max'] >= future_df['future_profit_threshold'])
-            ), 1.0, 0.0)
+            # future profit exceeds threshold
+            f.future_profit()
+        )
         return signals
 
     def get_exit_training_signals(self, future_df: DataFrame):
-        signals = np.where(
-            (
-                # at max of past window
-                    (future_df['full_dwt'] >= future_df['dwt_recent_max']) &
+        f = get_signal_features(future_df)
+        signals = to_signal(
+            # at max of past window
+            (f['full_dwt'] >= f['dwt_recent_max']) &
 
-                    # at max of future window
-                    (future_df['full_dwt'] >= future_df['future_max']) &
+            # at max of future window
+            (f['full_dwt'] >= f['future_max']) &
 
-                    # loss in next window exceeds threshold
-                    (future_df['future_loss_min'] <= future_df['future_loss_threshold'])
-            ), 1.0, 0.0)
+            # loss in next window exceeds threshold
+            f.future_loss()
+        )
         return signals
 
     def get_entry_guard_conditions(self, dataframe: DataFrame):
@@ -1278,33 +1320,25 @@ class nseq_signals(base_signals):
         return self.indicators_present(ind_list, dataframe)
 
     def get_entry_training_signals(self, future_df: DataFrame):
-        signals = np.where(
-            (
-                # long down run just happened, or a long up run is about to happen
-                    (
-                            (future_df['full_dwt_nseq_dn'] >= 10) |
-
-                            (future_df['future_nseq_up'] >= 15)
-                    ) &
-
-                    # future profit exceeds threshold
-                    (future_df['future_profit_max'] >= future_df['future_profit_threshold'])
-            ), 1.0, 0.0)
+        f = get_signal_features(future_df)
+        signals = to_signal(
+            # long down run just happened, or a long up run is about to happen
+            ((f['full_dwt_nseq_dn'] >= 10) | (f['future_nseq_up'] >= 15)) &
+
+            # future profit exceeds threshold
+            f.future_profit()
+        )
         return signals
 
     def get_exit_training_signals(self, future_df: DataFrame):
-        signals = np.where(
-            (
-                # long up run just happened, or a long down run is about to happen
-                    (
-                            (future_df['full_dwt_nseq_up'] >= 10) |
-
-                            (future_df['future_nseq_dn'] >= 15)
-                    ) &
-
-                    # future profit exceeds threshold
-                    (future_df['future_loss_min'] <= future_df['future_loss_threshold'])
-            ), 1.0, 0.0)
+        f = get_signal_features(future_df)
+        signals = to_signal(
+            # long up run just happened, or a long down run is about to happen
+            ((f['full_dwt_nseq_up'] >= 10) | (f['future_nseq_dn'] >= 15)) &
+
+            # future loss exceeds threshold
+            f.future_loss()
+        )
         return signals
 
     def get_entry_guard_conditions(self, dataframe: DataFrame):
@@ -1351,28 +1385,28 @@ class over_signals(base_signals):
         return self.indicators_present(ind_list, dataframe)
 
     def get_entry_training_signals(self, future_df: DataFrame):
-        signals = np.where(
-            (
-                # various overbought condition (can't be too strict or there will be no matches)
-                    (future_df['rsi'] < 40) &
-                    (future_df['mfi'] < 40) &
-                    (future_df['fisher_wr'] < -0.4) &
-
-                    # future profit
-                    (future_df['future_profit_max'] >= future_df['future_profit_threshold'])
-            ), 1.0, 0.0)
+        f = get_signal_features(future_df)
+        signals = to_signal(
+            # various overbought condition (can't be too strict or there will be no matches)
+            (f['rsi'] < 40) &
+            (f['mfi'] < 40) &
+            (f['fisher_wr'] < -0.4) &
+
+            # future profit
+            f.future_profit()
+        )
         return signals
 
     def get_exit_training_signals(self, future_df: DataFrame):
-        signals = np.where(
-            (
-                    (future_df['rsi'] > 60) &
-                    (future_df['mfi'] > 60) &
-                    (future_df['fisher_wr'] > 0.6) &
-
-                    # future loss
-                    (future_df['future_loss_min'] <= future_df['future_loss_threshold'])
-            ), 1.0, 0.0)
+        f = get_signal_features(future_df)
+        signals = to_signal(
+            (f['rsi'] > 60) &
+            (f['mfi'] > 60) &
+            (f['fisher_wr'] > 0.6) &
+
+            # future loss
+            f.future_loss()
+        )
         return signals
 
     def get_entry_guard_conditions(self, dataframe: DataFrame):
@@ -1415,23 +1449,19 @@ class profit_signals(base_signals):
         return self.indicators_present(ind_list, dataframe)
 
     def get_entry_training_signals(self, future_df: DataFrame):
-        signals = np.where(
-            (
-                    (future_df['fisher_wr'] < -0.5) &
-
-                    # qtpylib.crossed_above(future_df['future_gain'], 2.0 * future_df['future_profit_threshold'])
-                    (future_df['future_profit_max'] >= 2.0 * future_df['future_profit_threshold'])
-            ), 1.0, 0.0)
+        f = get_signal_features(future_df)
+        signals = to_signal(
+            (f['fisher_wr'] < -0.5) &
+            f.future_profit(scale=2.0)
+        )
         return signals
 
     def get_exit_training_signals(self, future_df: DataFrame):
-        signals = np.where(
-            (
-                    (future_df['fisher_wr'] > 0.5) &
-
-                    # qtpylib.crossed_below(future_df['future_gain'], 2.0 * future_df['future_loss_threshold'])
-                    (future_df['future_loss_min'] <= 2.0 * future_df['future_loss_threshold'])
-            ), 1.0, 0.0)
+        f = get_signal_features(future_df)
+        signals = to_signal(
+            (f['fisher_wr'] > 0.5) &
+            f.future_loss(scale=2.0)
+        )
         return signals
 
     def get_entry_guard_conditions(self, dataframe: DataFrame):
@@ -1474,41 +1504,27 @@ class pv_signals(base_signals):
         return self.indicators_present(ind_list, dataframe)
 
     def get_entry_training_signals(self, future_df: DataFrame):
-        global lookahead
-        valleys = np.zeros(future_df.shape[0], dtype=float)
-        order = 4
-
-        v_idx = scipy.signal.argrelextrema(future_df['full_dwt'].to_numpy(), np.less_equal, order=order)[0]
-        valleys[v_idx] = 1.0
-
-        # print(f'future_df: {future_df.shape} valleys: {np.shape(valleys)}')
-        signals = np.where(
-            (
-                # overbought condition with high potential profit
-                    (valleys > 0.0) &
-
-                    # future profit
-                    (future_df['future_profit_max'] >= future_df['future_profit_threshold']) &
-                    (future_df['future_gain'] > 0)
-            ), 1.0, 0.0)
+        f = get_signal_features(future_df)
+        signals = to_signal(
+            # valley detected
+            f.valleys('full_dwt', order=4) &
+
+            # future profit
+            f.future_profit() &
+            (f['future_gain'] > 0)
+        )
         return signals
 
     def get_exit_training_signals(self, future_df: DataFrame):
-        global lookahead
-        peaks = np.zeros(future_df.shape[0], dtype=float)
-        order = 4
-
-        p_idx = scipy.signal.argrelextrema(future_df['full_dwt'].to_numpy(), np.greater_equal, order=order)[0]
-        peaks[p_idx] = 1.0
-
-        signals = np.where(
-            (
-                    (peaks > 0) &
-
-                    # future loss
-                    (future_df['future_loss_min'] <= future_df['future_loss_threshold']) &
-                    (future_df['future_gain'] < 0)
-            ), 1.0, 0.0)
+        f = get_signal_features(future_df)
+        signals = to_signal(
+            # peak detected
+            f.peaks('full_dwt', order=4) &
+
+            # future loss
+            f.future_loss() &
+            (f['future_gain'] < 0)
+        )
         return signals
 
     def get_entry_guard_conditions(self, dataframe: DataFrame):
@@ -1546,40 +1562,37 @@ class slope_signals(base_signals):
         return self.indicators_present(ind_list, dataframe)
 
     def get_entry_training_signals(self, future_df: DataFrame):
-        global lookahead
-        signals = np.where(
-            (
-                # in a downtrend
-                    (future_df['dwt_slope'] < 0) &
+        f = get_signal_features(future_df)
+        signals = to_signal(
+            # in a downtrend
+            (f['dwt_slope'] < 0) &
 
-                    # future up trend
-                    (future_df['future_slope'] > 0) &
+            # future up trend
+            (f['future_slope'] > 0) &
 
-                    (future_df['fisher_wr'] < -0.5) &
+            (f['fisher_wr'] < -0.5) &
 
-                    # future profit
-                    (future_df['future_profit_max'] >= future_df['future_profit_threshold']) &
-                    (future_df['future_gain'] > 0)
-            ), 1.0, 0.0)
+            # future profit
+            f.future_profit() &
+            (f['future_gain'] > 0)
+        )
         return signals
 
     def get_exit_training_signals(self, future_df: DataFrame):
-        global lookahead
-        signals = np.where(
-            (
-                # in an uptrend
-                    (future_df['dwt_slope'] > 0) &
+        f = get_signal_features(future_df)
+        signals = to_signal(
+            # in an uptrend
+            (f['dwt_slope'] > 0) &
 
-                    # future down trend
-                    (future_df['future_slope'] < 0) &
+            # future down trend
+            (f['future_slope'] < 0) &
 
-                    (future_df['fisher_wr'] > 0.5) &
+            (f['fisher_wr'] > 0.5) &
 
-                    # future loss
-                    (future_df['future_loss_min'] <= future_df['future_loss_threshold']) &
-                    (future_df['future_gain'] < 0)
-
-            ), 1.0, 0.0)
+            # future loss
+            f.future_loss() &
+            (f['future_gain'] < 0)
+        )
         return signals
 
     def get_entry_guard_conditions(self, dataframe: DataFrame):
@@ -1621,52 +1634,31 @@ class smooth_signals(base_signals):
         return self.indicators_present(ind_list, dataframe)
 
     def get_entry_training_signals(self, future_df: DataFrame):
-        global lookahead
-
-        # get the smoothed version
-        smoothed = future_df['mid'].ewm(span=7).mean().to_numpy()
+        # valleys of the smoothed version
+        f = get_signal_features(future_df)
+        signals = to_signal(
+            (f['fisher_wr'] < -0.1) &  # guard
 
-        # detect valleys
-        valleys = np.zeros(future_df.shape[0], dtype=float)
-        order = 4
+            # valley detected
+            f.valleys('mid', order=4, span=7) &
 
-        v_idx = scipy.signal.argrelextrema(smoothed, np.less_equal, order=order)[0]
-        valleys[v_idx] = 1.0
-
-        signals = np.where(
-            (
-                    (future_df['fisher_wr'] < -0.1) &  # guard
-
-                    # valley detected
-                    (valleys > 0.0) &
-
-                    # future profit exceeds threshold
-                    (future_df['future_profit_max'] >= future_df['future_profit_threshold'])
-            ), 1.0, 0.0)
+            # future profit exceeds threshold
+            f.future_profit()
+        )
         return signals
 
     def get_exit_training_signals(self, future_df: DataFrame):
-        global lookahead
-
-        # get the smoothed version
-        smoothed = future_df['mid'].ewm(span=7).mean().to_numpy()
-
-        peaks = np.zeros(future_df.shape[0], dtype=float)
-        order = 4
+        # peaks of the smoothed version
+        f = get_signal_features(future_df)
+        signals = to_signal(
+            (f['fisher_wr'] > 0.1) &  # guard
 
-        p_idx = scipy.signal.argrelextrema(smoothed, np.greater_equal, order=order)[0]
-        peaks[p_idx] = 1.0
+            # peak detected
+            f.peaks('mid', order=4, span=7) &
 
-        signals = np.where(
-            (
-                    (future_df['fisher_wr'] > 0.1) &  # guard
-
-                    # peak detected
-                    (peaks > 0) &
-
-                    # future loss exceeds threshold
-                    (future_df['future_loss_min'] <= future_df['future_loss_threshold'])
-            ), 1.0, 0.0)
+            # future loss exceeds threshold
+            f.future_loss()
+        )
         return signals
 
     def get_entry_guard_conditions(self, dataframe: DataFrame):
@@ -1708,30 +1700,27 @@ class stochastic_signals(base_signals):
         return self.indicators_present(ind_list, dataframe)
 
     def get_entry_training_signals(self, future_df: DataFrame):
-        global lookahead
-        signals = np.where(
-            (
-                # stochastics show overbought condition
-                    ((future_df['fast_diff'] > 0) & (future_df['fast_diff'].shift(-self.lookahead) <= 0)) &
-
-                    # future profit
-                    (future_df['future_profit_max'] >= future_df['future_profit_threshold']) &
-                    (future_df['future_gain'] > 0)
-            ), 1.0, 0.0)
+        f = get_signal_features(future_df)
+        signals = to_signal(
+            # stochastics show overbought condition
+            (f['fast_diff'] > 0) & (f.shift('fast_diff', -self.lookahead) <= 0) &
+
+            # future profit
+            f.future_profit() &
+            (f['future_gain'] > 0)
+        )
         return signals
 
     def get_exit_training_signals(self, future_df: DataFrame):
-        global lookahead
-        signals = np.where(
-            (
-                # stochastics show oversold condition
-                    ((future_df['fast_diff'] < 0) & (future_df['fast_diff'].shift(-self.lookahead) >= 0)) &
-
-                    # future loss
-                    (future_df['future_loss_min'] <= future_df['future_loss_threshold']) &
-                    (future_df['future_gain'] < 0)
-
-            ), 1.0, 0.0)
+        f = get_signal_features(future_df)
+        signals = to_signal(
+            # stochastics show oversold condition
+            (f['fast_diff'] < 0) & (f.shift('fast_diff', -self.lookahead) >= 0) &
+
+            # future loss
+            f.future_loss() &
+            (f['future_gain'] < 0)
+        )
         return signals
 
     def get_entry_guard_conditions(self, dataframe: DataFrame):
@@ -1770,27 +1759,27 @@ class swing_signals(base_signals):
         return self.indicators_present(ind_list, dataframe)
 
     def get_entry_training_signals(self, future_df: DataFrame):
-        signals = np.where(
-            (
-                # bottom of trend
-                    (future_df['dwt_bottom'] > 0) &
-
-                    # future gain
-                    (future_df['future_profit_max'] >= future_df['future_profit_threshold']) &
-                    (future_df['future_profit'] > 0)
-            ), 1.0, 0.0)
+        f = get_signal_features(future_df)
+        signals = to_signal(
+            # bottom of trend
+            (f['dwt_bottom'] > 0) &
+
+            # future gain
+            f.future_profit() &
+            (f['future_profit'] > 0)
+        )
         return signals
 
     def get_exit_training_signals(self, future_df: DataFrame):
-        signals = np.where(
-            (
-                # top of trend
-                    (future_df['dwt_top'] > 0) &
-
-                    # future gain
-                    (future_df['future_loss_min'] <= future_df['future_loss_threshold']) &
-                    (future_df['future_loss'] < 0)
-            ), 1.0, 0.0)
+        f = get_signal_features(future_df)
+        signals = to_signal(
+            # top of trend
+            (f['dwt_top'] > 0) &
+
+            # future loss
+            f.future_loss() &
+            (f['future_loss'] < 0)
+        )
         return signals
 
     def get_entry_guard_conditions(self, dataframe: DataFrame):
@@ -1830,76 +1819,32 @@ class all_signals(base_signals):
         return self.indicators_present(ind_list, dataframe)
 
     def get_entry_training_signals(self, future_df: DataFrame):
+        f = get_signal_features(future_df)
+        signals, filter = self.combine_signals(get_component_signals(future_df, 'entry'))
 
-        signals = None
-        count = None # for tracking stats
-
-        # loop through all signal types (except this one)
-        for stype in SignalType:
-            if stype != SignalType.ALL:
-                tsig = create_training_signals(stype, 12)
-                sigs = tsig.get_entry_training_signals(future_df)
-                if signals is None:
-                    signals = sigs
-                else:
-                    signals = pd.Series(np.where(signals == 1, 1, np.where(sigs == 1, 1, 0)))
-
-                if count is None:
-                    count = np.array(sigs)
-                else:
-                    count = count + np.array(sigs)
-
-        # create filter where number of signals is greater than the mean + stddev (rounded down)
-        threshold = int(count.mean()) + int(count.std())
-        filter = np.where(count>threshold, 1, 0)
-
-        trend_filter = np.where(
-            (
-                 (future_df['fisher_wr'] < 0)
-            ), 1.0, 0.0)
-        
         # filter out the signals, otherwise there are far too many
-        signals = signals.astype(int) & filter.astype(int) & trend_filter.astype(int)
+        signals = to_signal(signals & filter & (f['fisher_wr'] < 0))
 
         return signals
 
-
     def get_exit_training_signals(self, future_df: DataFrame):
+        f = get_signal_features(future_df)
+        signals, filter = self.combine_signals(get_component_signals(future_df, 'exit'))
 
-        signals = None
-        count = None # for tracking stats
-
-        # loop through all signal types (except this one)
-        for stype in SignalType:
-            if stype != SignalType.ALL:
-                tsig = create_training_signals(stype, 12)
-                sigs = tsig.get_exit_training_signals(future_df)
-                if signals is None:
-                    signals = sigs
-                else:
-                    signals = pd.Series(np.where(signals == 1, 1, np.where(sigs == 1, 1, 0)))
-                    # signals = signals | sigs
-
-                if count is None:
-                    count = np.array(sigs)
-                else:
-                    count = count + np.array(sigs)
-
-
-        # create filter where number of signals is greater than the mean + stddev (rounded down)
-        threshold = int(count.mean()) + int(count.std())
-        filter = np.where(count>threshold, 1, 0)
-
-        trend_filter = np.where(
-            (
-                 (future_df['fisher_wr'] > 0)
-            ), 1.0, 0.0)
-                
         # filter out the signals, otherwise there are far too many
-        signals = signals.astype(int) & filter.astype(int) & trend_filter.astype(int)
+        signals = to_signal(signals & filter & (f['fisher_wr'] > 0))
 
         return signals
 
+    # OR the component signals together, and create filter where number of signals is greater than the
+    # mean + stddev (rounded down)
+    def combine_signals(self, sigs: np.ndarray):
+        signals = sigs.any(axis=0)
+        count = sigs.sum(axis=0)
+        threshold = int(count.mean()) + int(count.std())
+        filter = count > threshold
+        return signals, filter
+
     def get_entry_guard_conditions(self, dataframe: DataFrame):
         condition = np.where(
             (
@@ -1957,4 +1902,35 @@ class SignalType(Enum):
 def create_training_signals(signal_type: SignalType, lookahead):
     return signal_type.value(lookahead)
 
+
+# returns a (num types x num rows) boolean array of the entry or exit signals of every signal type (except ALL),
+# in SignalType order. Used by all_signals
+# Note: the component signals always use a lookahead of 12, independent of the lookahead of the calling strategy
+def get_component_signals(future_df: DataFrame, direction='entry', lookahead=12) -> np.ndarray:
+    stypes = [stype for stype in SignalType if stype != SignalType.ALL]
+    sigs = np.zeros((len(stypes), future_df.shape[0]), dtype=bool)
+    for i, stype in enumerate(stypes):
+        tsig = create_training_signals(stype, lookahead)
+        if direction == 'entry':
+            sigs[i] = tsig.get_entry_training_signals(future_df) > 0
+        else:
+            sigs[i] = tsig.get_exit_training_signals(future_df) > 0
+    return sigs
+
+
+# get the entry and exit training signals for every signal type in a single pass over the dataframe
+# (features shared between signal types are only calculated once).
+# Returns a dataframe with columns <signal name>_entry and <signal name>_exit, one pair per signal type.
+# Intended for strategies (or scripts) that want to compare signal sets
+def get_all_training_signals(future_df: DataFrame, lookahead=12, include_all=False) -> DataFrame:
+    signals = {}
+    for stype in SignalType:
+        if (stype == SignalType.ALL) and (not include_all):
+            continue
+        tsig = create_training_signals(stype, lookahead)
+        name = tsig.get_signal_name()
+        signals[f'{name}_entry'] = tsig.get_entry_training_signals(future_df)
+        signals[f'{name}_exit'] = tsig.get_exit_training_signals(future_df)
+    return pd.DataFrame(signals, index=future_df.index)
+
 # -----------------------------------
@@ -17,6 +17,8 @@ import scipy
 from scipy.fft import fft, hfft, ifft, ihfft, rfft, irfft, fftfreq
 from scipy.fft import fht, ifht
 from modwt import modwt, imodwt, modwtmra
+from SlidingDFT import SlidingDFT
+from numpy.lib.stride_tricks import sliding_window_view
 
 # all actual instantiations follow this base class
 
@@ -73,6 +75,16 @@ class base_wavelet(ABC):
         return coeffs
 
 
+    # get the coefficients (as 1d arrays) for every window of the supplied data, i.e. one row per window position.
+    # Equivalent to calling get_coeffs() and coeff_to_array() for data[i:i+win_size], but can be overridden
+    # by wavelets that have a faster batch implementation
+    def get_coeffs_batch(self, data: np.array, win_size) -> list:
+        c_table = []
+        for i in range(0, len(data) - win_size + 1):
+            coeffs = self.get_coeffs(data[i:i + win_size])
+            c_table.append(np.array(self.coeff_to_array(coeffs)))
+        return c_table
+
     # set lookahead value (for detrending). Only need to do this if you are projecting ahead
     def set_lookahead(self, lookahead):
         self.lookahead = lookahead
@@ -350,6 +362,57 @@ class ffta_wavelet(base_wavelet):
 
 # -----------------------------------
 
+# Sliding FFT/FFTA - same coefficients as FFT/FFTA, but calculated using a sliding DFT (see SlidingDFT.py)
+# Consecutive (rolling) windows are updated incrementally, and get_coeffs_batch() transforms all windows at once
+
+class fft_sliding_wavelet(fft_wavelet):
+
+    sdft = None
+
+    def get_sdft(self, N):
+        if (self.sdft is None) or (self.sdft.N != N):
+            self.sdft = SlidingDFT(N)
+        return self.sdft
+
+    def get_coeffs(self, data: np.array) -> np.array:
+        freqs = self.get_sdft(len(data)).update(data)
+        coeffs = np.concatenate([np.real(freqs), np.imag(freqs)])
+        self.data_shape = np.shape(coeffs)
+        return coeffs
+
+    def get_coeffs_batch(self, data: np.array, win_size) -> list:
+        freqs = self.get_sdft(win_size).batch(data)
+        coeffs = np.concatenate([np.real(freqs), np.imag(freqs)], axis=1)
+        self.data_shape = np.shape(coeffs)[1:]
+        return list(coeffs)
+
+
+class ffta_sliding_wavelet(ffta_wavelet):
+
+    sdft = None
+    num_bins = 8  # number of harmonics kept (must match ffta_wavelet)
+
+    def get_sdft(self, N):
+        if (self.sdft is None) or (self.sdft.N != N):
+            self.sdft = SlidingDFT(N, num_bins=self.num_bins)
+        return self.sdft
+
+    def get_coeffs(self, data: np.array) -> np.array:
+        freqs = self.get_sdft(len(data)).update(data)
+        self.orig_len = len(data) // 2 + 1
+        coeffs = np.concatenate([np.real(freqs), np.imag(freqs)])
+        self.data_shape = np.shape(coeffs)
+        return coeffs
+
+    def get_coeffs_batch(self, data: np.array, win_size) -> list:
+        freqs = self.get_sdft(win_size).batch(data)
+        self.orig_len = win_size // 2 + 1
+        coeffs = np.concatenate([np.real(freqs), np.imag(freqs)], axis=1)
+        self.data_shape = np.shape(coeffs)[1:]
+        return list(coeffs)
+
+# -----------------------------------
+
 # HFFT - Hermitian Fast Fourier Transform
 
 class hfft_wavelet(base_wavelet):
@@ -417,6 +480,9 @@ class fht_wavelet(base_wavelet):
 # MODWT - Maximal Overlap Discrete Wavelet Transform
 
 class modwt_wavelet(base_wavelet):
+    level = 5
+    batch_size = 4096  # max number of windows transformed at once (see get_coeffs_batch)
+
     def get_coeffs(self, data: np.array) -> np.array:
 
         x = data
@@ -429,10 +495,20 @@ class modwt_wavelet(base_wavelet):
         # self.wavelet = 'db8'
         self.wavelet = 'haar'
         # self.wavelet = 'bior3.9' # does not work well with MODWT
-        level = 5
-        coeffs = modwt(x, self.wavelet, level)
+        coeffs = modwt(x, self.wavelet, self.level)
         return coeffs
 
+    # the MODWT engine transforms a 2-D batch of windows at once. Done in chunks to limit memory usage
+    def get_coeffs_batch(self, data: np.array, win_size) -> list:
+        self.wavelet = 'haar'
+        windows = sliding_window_view(np.asarray(data, dtype=float), win_size)
+        c_table = []
+        for start in range(0, len(windows), self.batch_size):
+            coeffs = modwt(windows[start:start + self.batch_size], self.wavelet, self.level)
+            self.data_shape = np.shape(coeffs)[1:]
+            c_table.extend(coeffs.reshape(len(coeffs), -1))
+        return c_table
+
     def get_values(self, coeffs):
         series = imodwt(coeffs, self.wavelet)
 
@@ -577,6 +653,8 @@ class WaveletType(Enum):
     DWTA = dwta_wavelet
     FFT = fft_wavelet
     FFTA = ffta_wavelet
+    FFT_SLIDING = fft_sliding_wavelet
+    FFTA_SLIDING = ffta_sliding_wavelet
     HFFT = hfft_wavelet
     FHT = fht_wavelet
     MODWT = modwt_wavelet
@@ -0,0 +1,300 @@
+# Benchmark for the Forecasters (headless replacement for the timing part of test_forecasters.py)
+#
+# Runs a rolling prediction (one forecast per candle, same as the TSPredict strategies) for every ForecasterType,
+# with and without detrending, for several window sizes and over both synthetic and recorded gain series.
+# For each combination it records:
+#   - throughput (forecasts/sec, including any training done in the rolling loop)
+#   - peak memory (tracemalloc, measured in a separate, shorter, run because tracing slows everything down)
+#   - prediction error (MAE/RMSE of the lookahead prediction vs the actual gain)
+#
+# Usage: python bench_forecasters.py [options]
+#
+#   --types=AR,SGD,...     forecaster types to run (ForecasterType names). Default is all
+#   --windows=32,64,128    window sizes. Default is 32,64,128
+#   --detrend=both         both, on or off. Default is both
+#   --series=all           comma-separated list of series (see get_series()), or 'all'
+#   --steps=N              max number of forecasts per run (default 200). Limits run time for the slow forecasters
+#   --quick                same as --windows=64 --steps=100 --series=random_walk
+#   --csv=<file>           save results to a CSV file
+#   --save=<file>          save results as a JSON baseline
+#   --baseline=<file>      compare throughput against a JSON baseline. Exits with status 1 if any forecaster is
+#                          slower than the baseline by more than the threshold, or fails where the baseline ran
+#   --threshold=0.25       allowed throughput regression (fraction). Default is 0.25
+#
+# Note: throughput depends on the machine (and load), so only compare against baselines saved on the same machine
+
+import json
+import csv
+import os
+import sys
+import time
+import tracemalloc
+import warnings
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).parent))
+
+import Forecasters
+
+
+lookahead = 6
+train_len_factor = 4  # training length is train_len_factor * window size (as in TSPredict)
+mem_steps = 20        # number of forecasts used for the memory measurement
+
+# -----------------------------------
+
+# gain series used for the benchmark. Synthetic series are seeded, so they are the same for every run
+
+
+def get_series(length=1000) -> dict:
+    rng = np.random.default_rng(42)
+
+    series = {}
+
+    # random walk of price, converted to % gain
+    price = 100.0 * np.exp(np.cumsum(rng.normal(0.0, 0.004, length)))
+    series['random_walk'] = 100.0 * np.diff(price, prepend=price[0]) / price
+
+    # AR(2) process
+    x = np.zeros(length)
+    e = rng.normal(0.0, 0.3, length)
+    for i in range(2, length):
+        x[i] = 0.6 * x[i - 1] - 0.3 * x[i - 2] + e[i]
+    series['ar2'] = x
+
+    # cycles plus noise, with a regime change halfway through
+    t = np.arange(length)
+    cycles = np.where(t < length // 2, 0.8 * np.sin(2 * np.pi * t / 24.0), 0.5 * np.sin(2 * np.pi * t / 60.0))
+    series['cycles'] = cycles + rng.normal(0.0, 0.2, length)
+
+    # recorded data (from test_forecasters.py etc.)
+    data_file = Path(__file__).parent / 'test_data.npy'
+    if data_file.is_file():
+        series['recorded'] = np.nan_to_num(np.load(str(data_file)))
+
+    return series
+
+# -----------------------------------
+
+# rolling prediction, same approach as test_forecasters.py (and TSPredict), limited to max_steps forecasts.
+# Returns the predictions (NaN where not predicted), number of forecasts and elapsed time
+
+
+def rolling_predict(forecaster, data, window_size, max_steps):
+
+    train_len = window_size * train_len_factor
+    train_results = np.roll(data, -lookahead)
+    train_results[-lookahead:].fill(0)
+
+    nrows = len(data)
+    preds = np.full(nrows, np.nan, dtype=float)
+
+    if forecaster.requires_pretraining():
+        min_data = max(window_size, train_len + lookahead + 1)
+    else:
+        min_data = window_size
+
+    # run on the last part of the data (so that all runs predict the same candles, whatever the window size)
+    first_end = max(min_data, nrows - lookahead - max_steps + 1)
+    count = 0
+
+    start_time = time.perf_counter()
+    for end in range(first_end, nrows - lookahead + 1):
+        if forecaster.requires_pretraining():
+            t_end = min(end - lookahead - 1, nrows - lookahead - 1)
+            t_start = max(0, t_end - train_len)
+            forecaster.train(data[t_start:t_end].reshape(-1, 1), train_results[t_start:t_end], incremental=True)
+
+        forecast = forecaster.forecast(data[end - window_size:end].reshape(-1, 1), lookahead)
+        preds[end - 1] = np.ravel(forecast)[-1]
+        count = count + 1
+
+    elapsed = time.perf_counter() - start_time
+    return preds, count, elapsed
+
+
+def make_forecaster(ftype, detrend):
+    forecaster = Forecasters.make_forecaster(ftype)
+    forecaster.set_detrend(detrend)
+    return forecaster
+
+# -----------------------------------
+
+
+def run_benchmark(ftype, detrend, window_size, series_name, data, max_steps) -> dict:
+
+    result = {
+        'forecaster': ftype.name,
+        'detrend': detrend,
+        'window': window_size,
+        'series': series_name,
+        'forecasts': 0,
+        'throughput': 0.0,
+        'peak_mem_kb': np.nan,
+        'mae': np.nan,
+        'rmse': np.nan,
+        'status': 'ok'
+    }
+
+    try:
+        # timing (and error)
+        forecaster = make_forecaster(ftype, detrend)
+        preds, count, elapsed = rolling_predict(forecaster, data, window_size, max_steps)
+
+        result['forecasts'] = count
+        result['throughput'] = count / elapsed if elapsed > 0 else 0.0
+
+        # prediction at end-1 is for lookahead candles later
+        actual = np.roll(data, -lookahead)
+        mask = np.isfinite(preds)
+        if np.any(mask):
+            err = preds[mask] - actual[mask]
+            result['mae'] = float(np.mean(np.abs(err)))
+            result['rmse'] = float(np.sqrt(np.mean(err * err)))
+
+        # peak memory, using a new forecaster (so that it includes creating/training the model)
+        tracemalloc.start()
+        forecaster = make_forecaster(ftype, detrend)
+        rolling_predict(forecaster, data, window_size, mem_steps)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        result['peak_mem_kb'] = peak / 1024.0
+
+    except Exception as e:
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        result['status'] = f"error: {e}"
+
+    return result
+
+
+def result_key(result) -> str:
+    detrend = 'detrend' if result['detrend'] else 'raw'
+    return f"{result['forecaster']}/{detrend}/{result['window']}/{result['series']}"
+
+# -----------------------------------
+
+
+def print_results(results):
+    print("")
+    print(f"{'Forecaster':20s} {'Detrend':>7s} {'Window':>6s} {'Series':>12s} {'Fcst/s':>10s} "
+          f"{'PeakKB':>10s} {'MAE':>8s} {'RMSE':>8s}  Status")
+    for r in results:
+        print(f"{r['forecaster']:20s} {str(r['detrend']):>7s} {r['window']:6d} {r['series']:>12s} "
+              f"{r['throughput']:10.1f} {r['peak_mem_kb']:10.1f} {r['mae']:8.4f} {r['rmse']:8.4f}  {r['status']}")
+    print("")
+
+
+def save_csv(results, file_name):
+    with open(file_name, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(results[0].keys()))
+        writer.writeheader()
+        writer.writerows(results)
+    print(f"Results saved to {file_name}")
+
+
+def save_baseline(results, file_name):
+    baseline = {result_key(r): {k: r[k] for k in ['throughput', 'peak_mem_kb', 'mae', 'rmse']}
+                for r in results if r['status'] == 'ok'}
+    with open(file_name, 'w') as f:
+        json.dump(baseline, f, indent=4)
+    print(f"Baseline saved to {file_name}")
+
+
+# compare throughput against the baseline. Returns the list of regressions (slower, or failed)
+def compare_baseline(results, file_name, threshold):
+    with open(file_name, 'r') as f:
+        baseline = json.load(f)
+
+    regressions = []
+    print(f"Comparing against baseline: {file_name} (threshold: {threshold:.0%})")
+    for r in results:
+        key = result_key(r)
+        if key not in baseline:
+            continue
+        # only successful runs are saved in the baseline, so an error now is a regression
+        if r['status'] != 'ok':
+            regressions.append(key)
+            print(f"    FAILED:     {key} {r['status']}")
+            continue
+        base = baseline[key]['throughput']
+        if base <= 0:
+            continue
+        change = r['throughput'] / base - 1.0
+        if change < -threshold:
+            regressions.append(key)
+            print(f"    REGRESSION: {key} {base:.1f} -> {r['throughput']:.1f} forecasts/sec ({change:+.0%})")
+        elif change > threshold:
+            print(f"    improved:   {key} {base:.1f} -> {r['throughput']:.1f} forecasts/sec ({change:+.0%})")
+
+    if len(regressions) == 0:
+        print("    no regressions")
+    return regressions
+
+# -----------------------------------
+
+
+def get_option(args, name, default=None):
+    for arg in args:
+        if arg.startswith(f'--{name}='):
+            return arg.split('=', 1)[1]
+    return default
+
+
+def main():
+    args = sys.argv[1:]
+
+    quick = '--quick' in args
+
+    types = get_option(args, 'types', None)
+    if types is None:
+        ftypes = list(Forecasters.ForecasterType)
+    else:
+        ftypes = [Forecasters.ForecasterType[name.strip().upper()] for name in types.split(',')]
+
+    windows = [int(w) for w in get_option(args, 'windows', '64' if quick else '32,64,128').split(',')]
+    max_steps = int(get_option(args, 'steps', '100' if quick else '200'))
+    threshold = float(get_option(args, 'threshold', '0.25'))
+
+    detrend_opt = get_option(args, 'detrend', 'both')
+    detrend_list = {'both': [False, True], 'on': [True], 'off': [False]}[detrend_opt]
+
+    all_series = get_series()
+    series_opt = get_option(args, 'series', 'random_walk' if quick else 'all')
+    series_names = list(all_series.keys()) if series_opt == 'all' else series_opt.split(',')
+
+    warnings.simplefilter('ignore')  # statsmodels convergence warnings etc.
+
+    results = []
+    for ftype in ftypes:
+        for detrend in detrend_list:
+            for window_size in windows:
+                for series_name in series_names:
+                    r = run_benchmark(ftype, detrend, window_size, series_name, all_series[series_name], max_steps)
+                    print(f"    {result_key(r):50s} {r['throughput']:10.1f} forecasts/sec  {r['status']}")
+                    results.append(r)
+
+    print_results(results)
+
+    csv_file = get_option(args, 'csv', None)
+    if csv_file:
+        save_csv(results, csv_file)
+
+    save_file = get_option(args, 'save', None)
+    if save_file:
+        save_baseline(results, save_file)
+
+    baseline_file = get_option(args, 'baseline', None)
+    if baseline_file:
+        if not os.path.isfile(baseline_file):
+            print(f"Baseline file {baseline_file} does not exist")
+            sys.exit(1)
+        regressions = compare_baseline(results, baseline_file, threshold)
+        if len(regressions) > 0:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,434 @@
+# Benchmark for the populate_indicators() pipeline of a strategy (NNTC, Anomaly, TSPredict, NNPredict families),
+# without needing a freqtrade backtest or downloaded data
+#
+# Generates synthetic OHLCV data (geometric brownian motion with regime switches) for N pairs x M candles, stubs the
+# strategy DataProvider (self.dp), runs populate_indicators(), populate_entry_trend() and populate_exit_trend() for
+# each pair, and times each stage of the pipeline:
+#
+#   indicators, labelling, normalisation, compression, tensorisation, training, prediction, signals
+#
+# Stages are timed by wrapping the strategy methods (and the DataframePopulator/DataframeUtils methods) that implement
+# them, so the same harness works for all strategy families. Times are 'self' times, i.e. a stage called from inside
+# another stage (e.g. normalisation inside training) is only counted once, and 'other' is whatever is left over.
+# Model training follows the runmode (e.g. backtest retrains, hyperopt uses saved models).
+#
+# The strategies save models (and the DataframeCache) relative to their source files, which would mix the synthetic
+# pairs into the real models and caches. So, while the benchmark runs, the module paths (__file__, group_dir,
+# strat_dir) of the strategy and utils modules are redirected to a temporary directory, which is also the working
+# directory, and deleted afterwards. This means that there are never any saved models, so every runmode trains
+#
+# Usage: python bench_populate.py <strategy file> [options]
+#
+#   --pairs=N              number of pairs (default 3)
+#   --candles=M            number of candles per pair (default 4096)
+#   --runmode=backtest     runmode reported by the stubbed DataProvider (backtest, hyperopt, plot, dry_run, live)
+#   --seed=N               random seed for the synthetic data (default 42)
+#   --save=<file>          save per-stage times (seconds per pair) as a JSON baseline
+#   --baseline=<file>      compare against a JSON baseline. Exits with status 1 if any stage is slower than the
+#                          baseline by more than the threshold
+#   --threshold=0.25       allowed slowdown (fraction). Default is 0.25
+#
+# Example: python utils/bench_populate.py NNTC/NNTC_macd_LSTM.py --pairs=2 --candles=2048
+#
+# Note: strategies must be importable (i.e. freqtrade, talib etc. must be installed), but no exchange, config or
+#       data files are needed
+
+import importlib.util
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from enum import Enum
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+
+group_dir = str(Path(__file__).parent.parent)
+sys.path.append(str(Path(__file__).parent))
+sys.path.append(group_dir)
+
+
+stages = ['indicators', 'labelling', 'normalisation', 'compression', 'tensorisation', 'training', 'prediction',
+          'signals', 'other']
+
+# methods that implement each stage. Only the ones that exist are wrapped.
+# Strategy methods are wrapped on the strategy instance:
+strategy_stage_methods = {
+    'add_strategy_indicators': 'indicators',
+    'add_indicators': 'indicators',
+    'update_gain_targets': 'indicators',
+    'create_training_data': 'labelling',
+    'add_training_indicators': 'labelling',
+    'get_future_gain': 'labelling',
+    'convert_dataframe': 'normalisation',
+    'compress_dataframe': 'compression',
+    'train_models': 'training',
+    'train_model': 'training',
+    'predict_buysell': 'prediction',
+    'predict_buy': 'prediction',
+    'predict_sell': 'prediction',
+    'add_predictions': 'prediction',
+    'populate_entry_trend': 'signals',
+    'populate_exit_trend': 'signals',
+}
+
+# shared utilities are wrapped on the class. Utils modules are imported both as 'utils.X' (by strategies) and as 'X'
+# (by other utils), which gives two different classes, so patch both
+class_stage_methods = [
+    ('DataframePopulator', 'DataframePopulator', 'add_indicators', 'indicators'),
+    ('DataframeUtils', 'DataframeUtils', 'norm_dataframe', 'normalisation'),
+    ('DataframeUtils', 'DataframeUtils', 'df_to_tensor', 'tensorisation'),
+]
+
+# -----------------------------------
+
+# synthetic OHLCV data: geometric brownian motion, where drift and volatility switch between regimes
+# (quiet, bull, bear, volatile) following a Markov chain
+
+
+class SyntheticOHLCV():
+
+    timeframe_mins = 5
+    regime_drift = np.array([0.0, 0.0004, -0.0004, 0.0])        # per candle
+    regime_vol = np.array([0.0015, 0.0025, 0.0030, 0.0060])     # per candle
+    regime_stay = 0.995                                         # probability of staying in the same regime
+
+    def __init__(self, seed=42):
+        self.rng = np.random.default_rng(seed)
+
+    def get_regimes(self, num_candles):
+        num_regimes = len(self.regime_drift)
+        switches = self.rng.random(num_candles) > self.regime_stay
+        jumps = self.rng.integers(1, num_regimes, num_candles)  # jump to any *other* regime
+        return np.cumsum(np.where(switches, jumps, 0)) % num_regimes
+
+    def generate(self, num_candles, start_price=100.0) -> DataFrame:
+        regimes = self.get_regimes(num_candles)
+        drift = self.regime_drift[regimes]
+        vol = self.regime_vol[regimes]
+
+        # close prices
+        rets = (drift - 0.5 * vol * vol) + vol * self.rng.standard_normal(num_candles)
+        close = start_price * np.exp(np.cumsum(rets))
+
+        # open is the previous close (plus a small gap), high/low extend beyond open/close by a fraction of the vol
+        open_ = np.empty(num_candles)
+        open_[0] = start_price
+        open_[1:] = close[:-1]
+        open_ = open_ * (1.0 + 0.1 * vol * self.rng.standard_normal(num_candles))
+        high = np.maximum(open_, close) * (1.0 + vol * np.abs(self.rng.standard_normal(num_candles)))
+        low = np.minimum(open_, close) * (1.0 - vol * np.abs(self.rng.standard_normal(num_candles)))
+
+        # volume increases with the size of the move
+        volume = 1000.0 * self.rng.lognormal(0.0, 0.5, num_candles) * (1.0 + np.abs(rets) / vol)
+
+        end = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        dates = pd.date_range(end=end, periods=num_candles, freq=f'{self.timeframe_mins}min')
+
+        return DataFrame({'date': dates, 'open': open_, 'high': high, 'low': low, 'close': close,
+                          'volume': volume})
+
+# -----------------------------------
+
+# minimal replacement for the freqtrade DataProvider (only the parts used by the strategies)
+
+
+class BenchRunMode(Enum):
+    BACKTEST = 'backtest'
+    HYPEROPT = 'hyperopt'
+    PLOT = 'plot'
+    DRY_RUN = 'dry_run'
+    LIVE = 'live'
+
+
+class BenchDataProvider():
+
+    def __init__(self, runmode: str, data: dict):
+        self.runmode = BenchRunMode(runmode)
+        self.data = data
+        self.analyzed = {}
+
+    def current_whitelist(self):
+        return list(self.data.keys())
+
+    def get_pair_dataframe(self, pair, timeframe=None, candle_type=''):
+        return self.data[pair].copy()
+
+    def historic_ohlcv(self, pair, timeframe=None, candle_type=''):
+        return self.get_pair_dataframe(pair, timeframe)
+
+    def ohlcv(self, pair, timeframe=None, copy=True, candle_type=''):
+        return self.get_pair_dataframe(pair, timeframe)
+
+    def get_analyzed_dataframe(self, pair, timeframe):
+        return self.analyzed.get(pair, DataFrame()), datetime.now(timezone.utc)
+
+    def market(self, pair):
+        return None
+
+# -----------------------------------
+
+# times nested calls, and attributes the 'self' time (excluding nested stages) to each stage
+
+
+class StageTimer():
+
+    def __init__(self):
+        self.times = {stage: 0.0 for stage in stages}
+        self.calls = {stage: 0 for stage in stages}
+        self.stack = []  # [start time, time in nested stages]
+        self.patches = []
+
+    def reset(self):
+        for stage in stages:
+            self.times[stage] = 0.0
+            self.calls[stage] = 0
+
+    def wrap(self, func, stage):
+        timer = self
+
+        def timed(*args, **kwargs):
+            timer.stack.append([time.perf_counter(), 0.0])
+            try:
+                return func(*args, **kwargs)
+            finally:
+                start, nested = timer.stack.pop()
+                elapsed = time.perf_counter() - start
+                timer.times[stage] += elapsed - nested
+                timer.calls[stage] += 1
+                if timer.stack:
+                    timer.stack[-1][1] += elapsed
+
+        timed.__wrapped__ = func
+        return timed
+
+    # wrap the stage methods of the strategy instance and the shared utility classes
+    def instrument(self, strategy):
+        for name, stage in strategy_stage_methods.items():
+            method = getattr(strategy, name, None)
+            if callable(method):
+                setattr(strategy, name, self.wrap(method, stage))
+
+        for module_name, class_name, name, stage in class_stage_methods:
+            for prefix in ('', 'utils.'):
+                module = sys.modules.get(prefix + module_name)
+                cls = getattr(module, class_name, None) if module is not None else None
+                if (cls is not None) and (name in cls.__dict__):
+                    original = cls.__dict__[name]
+                    self.patches.append((cls, name, original))
+                    setattr(cls, name, self.wrap(original, stage))
+
+    # restore the utility classes
+    def restore(self):
+        for cls, name, original in reversed(self.patches):
+            setattr(cls, name, original)
+        self.patches = []
+
+# -----------------------------------
+
+
+# redirects the paths of the modules in this repository (anything they save relative to their source file) to
+# output_dir. Returns the changes, so that they can be restored
+
+
+def redirect_module_paths(output_dir):
+    changes = []
+    for name, module in list(sys.modules.items()):
+        module_file = getattr(module, '__file__', None)
+        if (module is sys.modules[__name__]) or (name == '__main__') or not module_file:
+            continue
+        if os.path.commonpath([group_dir, os.path.abspath(module_file)]) != group_dir:
+            continue
+
+        for var in ('__file__', 'group_dir', 'strat_dir'):
+            value = module.__dict__.get(var, None)
+            if isinstance(value, str):
+                changes.append((module, var, value))
+                setattr(module, var, os.path.join(output_dir, os.path.relpath(os.path.abspath(value), group_dir)))
+    return changes
+
+
+def restore_module_paths(changes):
+    for module, var, value in reversed(changes):
+        setattr(module, var, value)
+
+
+def load_strategy(file_name, config, output_dir):
+    path = Path(file_name).resolve()
+    sys.path.append(str(path.parent))
+
+    spec = importlib.util.spec_from_file_location(path.stem, str(path))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[path.stem] = module
+    spec.loader.exec_module(module)
+
+    # all modules used by the strategy are loaded now, so redirect their paths before anything is saved
+    changes = redirect_module_paths(output_dir)
+
+    strategy_class = getattr(module, path.stem)
+    strategy_class.__file__ = str(path)  # so that parameters are loaded from the json file, as in freqtrade
+    strategy = strategy_class(config)
+
+    # loads the hyperopt parameters and calls bot_start(), if available
+    if hasattr(strategy, 'ft_bot_start'):
+        strategy.ft_bot_start()
+    elif hasattr(strategy, 'bot_start'):
+        strategy.bot_start()
+
+    return strategy, changes
+
+
+def run_benchmark(strategy_file, num_pairs, num_candles, runmode, seed):
+
+    generator = SyntheticOHLCV(seed)
+    data = {f'SYN{i}/USDT': generator.generate(num_candles, start_price=10.0 ** generator.rng.uniform(-1, 3))
+            for i in range(num_pairs)}
+
+    # models and caches are saved here (see redirect_module_paths())
+    output_dir = tempfile.mkdtemp(prefix='bench_populate_')
+    print(f"Saving models and caches to {output_dir} (deleted afterwards)")
+
+    config = {
+        'runmode': runmode,
+        'timeframe': '5m',
+        'stake_currency': 'USDT',
+        'dry_run': True,
+        'user_data_dir': Path(output_dir) / 'user_data',
+        'exchange': {'name': 'binance', 'pair_whitelist': list(data.keys())},
+    }
+
+    strategy_file = str(Path(strategy_file).resolve())
+    curr_dir = os.getcwd()
+    os.chdir(output_dir)  # some classes save relative to the working directory
+    changes = []
+    timer = StageTimer()
+
+    per_pair = []
+    try:
+        strategy, changes = load_strategy(strategy_file, config, output_dir)
+        dp = BenchDataProvider(runmode, data)
+        strategy.dp = dp
+
+        timer.instrument(strategy)
+
+        for pair, ohlcv in data.items():
+            timer.reset()
+            metadata = {'pair': pair}
+
+            start = time.perf_counter()
+            dataframe = strategy.populate_indicators(ohlcv.copy(), metadata)
+            dataframe = strategy.populate_entry_trend(dataframe, metadata)
+            dataframe = strategy.populate_exit_trend(dataframe, metadata)
+            total = time.perf_counter() - start
+
+            dp.analyzed[pair] = dataframe
+
+            timer.times['other'] = total - sum(timer.times[s] for s in stages if s != 'other')
+            per_pair.append({'pair': pair, 'total': total, 'times': dict(timer.times), 'calls': dict(timer.calls)})
+    finally:
+        timer.restore()
+        restore_module_paths(changes)
+        os.chdir(curr_dir)
+        shutil.rmtree(output_dir, ignore_errors=True)
+
+    return per_pair
+
+# -----------------------------------
+
+
+def summarise(per_pair) -> dict:
+    num_pairs = len(per_pair)
+    summary = {stage: sum(p['times'][stage] for p in per_pair) / num_pairs for stage in stages}
+    summary['total'] = sum(p['total'] for p in per_pair) / num_pairs
+    return summary
+
+
+def print_results(strategy_name, per_pair, summary):
+    print("")
+    print(f"{strategy_name}: time per stage (seconds)")
+    print("")
+    print(f"{'Pair':14s} " + " ".join([f"{s[:13]:>13s}" for s in stages]) + f" {'total':>9s}")
+    for p in per_pair:
+        print(f"{p['pair']:14s} " + " ".join([f"{p['times'][s]:13.3f}" for s in stages]) + f" {p['total']:9.3f}")
+    print(f"{'mean':14s} " + " ".join([f"{summary[s]:13.3f}" for s in stages]) + f" {summary['total']:9.3f}")
+    print(f"{'%':14s} " + " ".join([f"{100.0 * summary[s] / summary['total']:13.1f}" for s in stages]))
+    print("")
+
+
+def compare_baseline(summary, file_name, threshold):
+    with open(file_name, 'r') as f:
+        baseline = json.load(f)
+
+    regressions = []
+    print(f"Comparing against baseline: {file_name} (threshold: {threshold:.0%})")
+    for stage in stages + ['total']:
+        base = baseline.get(stage, 0.0)
+        if base <= 0.0:
+            continue
+        change = summary[stage] / base - 1.0
+        if change > threshold:
+            regressions.append(stage)
+            print(f"    SLOWER:     {stage} {base:.3f} -> {summary[stage]:.3f} s/pair ({change:+.0%})")
+        elif change < -threshold:
+            print(f"    faster:     {stage} {base:.3f} -> {summary[stage]:.3f} s/pair ({change:+.0%})")
+
+    if len(regressions) == 0:
+        print("    no regressions")
+    return regressions
+
+# -----------------------------------
+
+
+def get_option(args, name, default=None):
+    for arg in args:
+        if arg.startswith(f'--{name}='):
+            return arg.split('=', 1)[1]
+    return default
+
+
+def main():
+    args = sys.argv[1:]
+    files = [arg for arg in args if not arg.startswith('--')]
+
+    if len(files) != 1:
+        print("Usage: python bench_populate.py <strategy file> [--pairs=N] [--candles=M] [--runmode=backtest] "
+              "[--seed=N] [--save=<file>] [--baseline=<file>] [--threshold=0.25]")
+        sys.exit()
+
+    strategy_file = files[0]
+    if not os.path.isfile(strategy_file):
+        print(f"File {strategy_file} does not exist. Exiting...")
+        sys.exit()
+
+    num_pairs = int(get_option(args, 'pairs', '3'))
+    num_candles = int(get_option(args, 'candles', '4096'))
+    runmode = get_option(args, 'runmode', 'backtest')
+    seed = int(get_option(args, 'seed', '42'))
+    threshold = float(get_option(args, 'threshold', '0.25'))
+
+    per_pair = run_benchmark(strategy_file, num_pairs, num_candles, runmode, seed)
+    summary = summarise(per_pair)
+    print_results(Path(strategy_file).stem, per_pair, summary)
+
+    save_file = get_option(args, 'save', None)
+    if save_file:
+        with open(save_file, 'w') as f:
+            json.dump(summary, f, indent=4)
+        print(f"Baseline saved to {save_file}")
+
+    baseline_file = get_option(args, 'baseline', None)
+    if baseline_file:
+        if not os.path.isfile(baseline_file):
+            print(f"Baseline file {baseline_file} does not exist")
+            sys.exit(1)
+        if len(compare_baseline(summary, baseline_file, threshold)) > 0:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
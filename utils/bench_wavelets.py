@@ -0,0 +1,290 @@
+# Benchmark and equivalence check for the Wavelets (headless, unlike test_wavelets.py, test_fft.py etc.)
+#
+# For every WaveletType and window size, runs a rolling transform over a gain series (one window per candle, as in
+# TS_Wavelet/TS_Coeff) in two modes:
+#   - single:  get_coeffs() + coeff_to_array() for each window, then array_to_coeff() + get_values()
+#   - batched: get_coeffs_batch() for all windows at once, then array_to_coeff() + get_values() for the latest row
+# and records:
+#   - time per window for the forward transform and for the round trip (forward + inverse)
+#   - reconstruction error (max abs difference between the reconstructed values and the original window)
+#   - batch error (max abs difference between the batched and single coefficients, i.e. numerical equivalence)
+#
+# Usage: python bench_wavelets.py [options]
+#
+#   --types=DWT,FFT,...        wavelet types to run (WaveletType names). Default is all
+#   --windows=16,32,...,512    window sizes. Default is 16,32,64,128,256,512
+#   --steps=N                  number of windows per run (default 256)
+#   --quick                    same as --windows=32,128 --steps=64
+#   --csv=<file>               save results to a CSV file
+#   --save=<file>              save results as a JSON baseline
+#   --baseline=<file>          compare against a JSON baseline. Exits with status 1 if any transform is slower than the
+#                              baseline by more than the threshold, or if any error is larger than in the baseline
+#                              (by more than the tolerance)
+#   --threshold=0.25           allowed slowdown (fraction). Default is 0.25
+#   --tolerance=1e-8           allowed increase in reconstruction/batch error. Default is 1e-8
+#
+# Note: some transforms are lossy by design (e.g. FFTA only keeps the first few harmonics), so the reconstruction
+#       error is compared to the baseline, not to zero
+
+import json
+import csv
+import os
+import sys
+import time
+import warnings
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).parent))
+
+import Wavelets
+
+
+# -----------------------------------
+
+# gain series used for the benchmark (seeded, so the same for every run). Uses the recorded data if it is long enough
+
+
+def get_series(length) -> np.array:
+    data_file = Path(__file__).parent / 'test_data.npy'
+    if data_file.is_file():
+        data = np.nan_to_num(np.load(str(data_file)))
+        if len(data) >= length:
+            return data[-length:]
+
+    rng = np.random.default_rng(42)
+    t = np.arange(length)
+    return 0.8 * np.sin(2 * np.pi * t / 24.0) + np.cumsum(rng.normal(0.0, 0.1, length)) + rng.normal(0.0, 0.2, length)
+
+# -----------------------------------
+
+
+# max abs difference between the reconstructed values and the original window. Some transforms return slightly
+# different lengths, so compare the most recent values (which are the ones used for predictions)
+def reconstruction_error(values, window) -> float:
+    values = np.real(np.ravel(values))
+    n = min(len(values), len(window))
+    return float(np.max(np.abs(values[-n:] - window[-n:])))
+
+
+def inverse(wavelet, array):
+    return wavelet.get_values(wavelet.array_to_coeff(np.asarray(array)))
+
+
+def run_single(wavelet, data, win_size):
+    nwin = len(data) - win_size + 1
+
+    # forward transform only
+    start_time = time.perf_counter()
+    c_table = []
+    for i in range(nwin):
+        coeffs = wavelet.get_coeffs(data[i:i + win_size])
+        c_table.append(np.array(wavelet.coeff_to_array(coeffs)))
+    fwd_time = time.perf_counter() - start_time
+
+    # round trip (forward + inverse), which is how the wavelet is used in rolling predictions
+    err = 0.0
+    start_time = time.perf_counter()
+    for i in range(nwin):
+        window = data[i:i + win_size]
+        array = np.array(wavelet.coeff_to_array(wavelet.get_coeffs(window)))
+        err = max(err, reconstruction_error(inverse(wavelet, array), window))
+    rt_time = time.perf_counter() - start_time
+
+    return c_table, fwd_time / nwin, rt_time / nwin, err
+
+
+def run_batch(wavelet, data, win_size):
+    nwin = len(data) - win_size + 1
+
+    start_time = time.perf_counter()
+    c_table = wavelet.get_coeffs_batch(data, win_size)
+    fwd_time = time.perf_counter() - start_time
+
+    # inverse of the latest row. Some transforms keep per-window state (e.g. detrending) from the last transform, so
+    # only the latest row can be reconstructed, which is also the only one used for predictions
+    start_time = time.perf_counter()
+    err = reconstruction_error(inverse(wavelet, c_table[-1]), data[-win_size:])
+    inv_time = time.perf_counter() - start_time
+
+    return c_table, fwd_time / nwin, (fwd_time + nwin * inv_time) / nwin, err
+
+
+def run_benchmark(wtype, win_size, steps) -> dict:
+
+    result = {
+        'wavelet': wtype.name,
+        'window': win_size,
+        'windows': 0,
+        'single_fwd_us': np.nan,
+        'single_rt_us': np.nan,
+        'single_err': np.nan,
+        'batch_fwd_us': np.nan,
+        'batch_rt_us': np.nan,
+        'batch_err': np.nan,
+        'equiv_err': np.nan,
+        'status': 'ok'
+    }
+
+    data = get_series(win_size + steps - 1)
+
+    try:
+        # separate instances, so that state (e.g. sliding transforms) does not carry across modes
+        s_table, fwd, rt, err = run_single(Wavelets.make_wavelet(wtype), data, win_size)
+        result['windows'] = len(s_table)
+        result['single_fwd_us'] = fwd * 1e6
+        result['single_rt_us'] = rt * 1e6
+        result['single_err'] = err
+
+        b_table, fwd, rt, err = run_batch(Wavelets.make_wavelet(wtype), data, win_size)
+        result['batch_fwd_us'] = fwd * 1e6
+        result['batch_rt_us'] = rt * 1e6
+        result['batch_err'] = err
+
+        if len(b_table) != len(s_table):
+            result['status'] = f"batch returned {len(b_table)} rows, expected {len(s_table)}"
+        else:
+            result['equiv_err'] = float(max(np.max(np.abs(np.asarray(b) - np.asarray(s)))
+                                            for b, s in zip(b_table, s_table)))
+
+    except Exception as e:
+        result['status'] = f"error: {e}"
+
+    return result
+
+
+def result_key(result) -> str:
+    return f"{result['wavelet']}/{result['window']}"
+
+# -----------------------------------
+
+
+def print_results(results):
+    print("")
+    print(f"{'Wavelet':14s} {'Window':>6s} {'Fwd(us)':>9s} {'RT(us)':>9s} {'BFwd(us)':>9s} {'BRT(us)':>9s} "
+          f"{'Speedup':>7s} {'RecErr':>9s} {'BatchErr':>9s} {'Equiv':>9s}  Status")
+    for r in results:
+        speedup = r['single_fwd_us'] / r['batch_fwd_us'] if r['batch_fwd_us'] > 0 else np.nan
+        print(f"{r['wavelet']:14s} {r['window']:6d} {r['single_fwd_us']:9.1f} {r['single_rt_us']:9.1f} "
+              f"{r['batch_fwd_us']:9.1f} {r['batch_rt_us']:9.1f} {speedup:7.2f} {r['single_err']:9.2e} "
+              f"{r['batch_err']:9.2e} {r['equiv_err']:9.2e}  {r['status']}")
+    print("")
+
+
+def save_csv(results, file_name):
+    with open(file_name, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(results[0].keys()))
+        writer.writeheader()
+        writer.writerows(results)
+    print(f"Results saved to {file_name}")
+
+
+timing_fields = ['single_fwd_us', 'single_rt_us', 'batch_fwd_us', 'batch_rt_us']
+error_fields = ['single_err', 'batch_err', 'equiv_err']
+
+
+def save_baseline(results, file_name):
+    baseline = {result_key(r): {k: r[k] for k in timing_fields + error_fields}
+                for r in results if r['status'] == 'ok'}
+    with open(file_name, 'w') as f:
+        json.dump(baseline, f, indent=4)
+    print(f"Baseline saved to {file_name}")
+
+
+# compare timings and errors against the baseline. Returns the list of failures
+def compare_baseline(results, file_name, threshold, tolerance):
+    with open(file_name, 'r') as f:
+        baseline = json.load(f)
+
+    failures = []
+    print(f"Comparing against baseline: {file_name} (threshold: {threshold:.0%}, tolerance: {tolerance:.1e})")
+    for r in results:
+        key = result_key(r)
+        if key not in baseline:
+            continue
+        if r['status'] != 'ok':
+            failures.append(key)
+            print(f"    FAILED:     {key} {r['status']}")
+            continue
+
+        base = baseline[key]
+        for field in timing_fields:
+            if not (base[field] > 0) or np.isnan(r[field]):
+                continue
+            change = r[field] / base[field] - 1.0
+            if change > threshold:
+                failures.append(key)
+                print(f"    SLOWER:     {key} {field} {base[field]:.1f} -> {r[field]:.1f} us ({change:+.0%})")
+            elif change < -threshold:
+                print(f"    faster:     {key} {field} {base[field]:.1f} -> {r[field]:.1f} us ({change:+.0%})")
+
+        for field in error_fields:
+            if np.isnan(base[field]) or np.isnan(r[field]):
+                continue
+            if r[field] > base[field] + tolerance:
+                failures.append(key)
+                print(f"    ERROR:      {key} {field} {base[field]:.2e} -> {r[field]:.2e}")
+
+    if len(failures) == 0:
+        print("    no regressions")
+    return failures
+
+# -----------------------------------
+
+
+def get_option(args, name, default=None):
+    for arg in args:
+        if arg.startswith(f'--{name}='):
+            return arg.split('=', 1)[1]
+    return default
+
+
+def main():
+    args = sys.argv[1:]
+
+    quick = '--quick' in args
+
+    types = get_option(args, 'types', None)
+    if types is None:
+        wtypes = list(Wavelets.WaveletType)
+    else:
+        wtypes = [Wavelets.WaveletType[name.strip().upper()] for name in types.split(',')]
+
+    windows = [int(w) for w in get_option(args, 'windows', '32,128' if quick else '16,32,64,128,256,512').split(',')]
+    steps = int(get_option(args, 'steps', '64' if quick else '256'))
+    threshold = float(get_option(args, 'threshold', '0.25'))
+    tolerance = float(get_option(args, 'tolerance', '1e-8'))
+
+    warnings.simplefilter('ignore')  # pywt boundary warnings etc.
+
+    results = []
+    for wtype in wtypes:
+        for win_size in windows:
+            r = run_benchmark(wtype, win_size, steps)
+            print(f"    {result_key(r):20s} single:{r['single_fwd_us']:9.1f} us  batch:{r['batch_fwd_us']:9.1f} us"
+                  f"  {r['status']}")
+            results.append(r)
+
+    print_results(results)
+
+    csv_file = get_option(args, 'csv', None)
+    if csv_file:
+        save_csv(results, csv_file)
+
+    save_file = get_option(args, 'save', None)
+    if save_file:
+        save_baseline(results, save_file)
+
+    baseline_file = get_option(args, 'baseline', None)
+    if baseline_file:
+        if not os.path.isfile(baseline_file):
+            print(f"Baseline file {baseline_file} does not exist")
+            sys.exit(1)
+        failures = compare_baseline(results, baseline_file, threshold, tolerance)
+        if len(failures) > 0:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
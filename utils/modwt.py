@@ -1,8 +1,16 @@
 '''
 modwt.py - Python implementation of matlab modwt
             based on https://github.com/pistonly/modwtpy
+
+modwt(), imodwt() and modwtmra() use an FFT-based engine: every level of the transform is a circular convolution,
+so the (combined) filters for each level are pre-computed in the frequency domain, cached per (wavelet, level, N),
+and all levels are then calculated with a single FFT/inverse FFT. These functions also accept a 2-D array of
+windows (one window per row), which transforms all of them at once.
+The original (direct convolution) versions are kept as modwt_direct(), imodwt_direct() and modwtmra_direct()
 '''
 
+import functools
+
 import numpy as np
 import pdb
 import pywt
@@ -88,7 +96,7 @@ def circular_convolve_s(h_t, g_t, w_j, v_j, j):
     return v_j_1
 
 
-def modwt(x, filters, level):
+def modwt_direct(x, filters, level):
     '''
     filters: 'db1', 'db2', 'haar', ...
     return: see matlab
@@ -109,7 +117,7 @@ def modwt(x, filters, level):
     return np.vstack(wavecoeff)
 
 
-def imodwt(w, filters):
+def imodwt_direct(w, filters):
     ''' inverse modwt '''
     # filter
     wavelet = pywt.Wavelet(filters)
@@ -125,7 +133,7 @@ def imodwt(w, filters):
     return v_j
 
 
-def modwtmra(w, filters):
+def modwtmra_direct(w, filters):
     ''' Multiresolution analysis based on MODWT'''
     # filter
     wavelet = pywt.Wavelet(filters)
@@ -158,6 +166,102 @@ def modwtmra(w, filters):
     return np.vstack(D)
 
 
+# -----------------------------------
+# FFT-based engine
+
+@functools.lru_cache(maxsize=None)
+def get_wavelet_filters(filters):
+    wavelet = pywt.Wavelet(filters)
+    h_t = np.array(wavelet.dec_hi) / np.sqrt(2)
+    g_t = np.array(wavelet.dec_lo) / np.sqrt(2)
+    return wavelet, h_t, g_t
+
+
+# frequency response of a circular (linear, shift invariant) operator on length N data, found from its impulse
+# response. This guarantees that the filters line up exactly with the direct versions
+def impulse_response(op, N):
+    impulse = np.zeros(N)
+    impulse[0] = 1.0
+    return np.fft.rfft(op(impulse))
+
+
+# decomposition filters: row j gives W_j (j < level), last row gives V_level. Shape (level+1, N//2+1)
+@functools.lru_cache(maxsize=64)
+def get_modwt_filters(filters, level, N):
+    _, h_t, g_t = get_wavelet_filters(filters)
+    bank = np.zeros((level + 1, N // 2 + 1), dtype=complex)
+    v = np.ones(N // 2 + 1, dtype=complex)  # response of V_0 (i.e. the data itself)
+    for j in range(level):
+        bank[j] = v * impulse_response(lambda x: circular_convolve_d(h_t, x, j + 1), N)
+        v = v * impulse_response(lambda x: circular_convolve_d(g_t, x, j + 1), N)
+    bank[level] = v
+    bank.flags.writeable = False
+    return bank
+
+
+# synthesis filters: the reconstruction is the sum over rows of (filter * coefficients). Shape (level+1, N//2+1)
+@functools.lru_cache(maxsize=64)
+def get_imodwt_filters(filters, level, N):
+    _, h_t, g_t = get_wavelet_filters(filters)
+    bank = np.zeros((level + 1, N // 2 + 1), dtype=complex)
+    zeros = np.zeros(N)
+    v = np.ones(N // 2 + 1, dtype=complex)  # response from V_{j-1} to the output
+    for j in range(level):
+        bank[j] = v * impulse_response(lambda x: circular_convolve_s(h_t, g_t, x, zeros, j + 1), N)
+        v = v * impulse_response(lambda x: circular_convolve_s(h_t, g_t, zeros, x, j + 1), N)
+    bank[level] = v
+    bank.flags.writeable = False
+    return bank
+
+
+# MRA filters, i.e. the filters applied to each row of the coefficients. Shape (level+1, N//2+1)
+@functools.lru_cache(maxsize=64)
+def get_modwtmra_filters(filters, level, N):
+    bank = np.zeros((level + 1, N // 2 + 1), dtype=complex)
+    for j in range(level + 1):
+        # the direct version calculates all rows together, so extract each row from the response to an impulse
+        def op(x, j=j):
+            w = np.zeros((level + 1, N))
+            w[j] = x
+            return modwtmra_direct(w, filters)[j]
+        bank[j] = impulse_response(op, N)
+    bank.flags.writeable = False
+    return bank
+
+
+def modwt(x, filters, level):
+    '''
+    filters: 'db1', 'db2', 'haar', ...
+    x: 1-D data, or 2-D array with one window per row
+    return: see matlab. Shape is (level+1, N), or (nwindows, level+1, N) for 2-D input
+    '''
+    x = np.asarray(x, dtype=float)
+    N = x.shape[-1]
+    bank = get_modwt_filters(filters, level, N)
+    xf = np.fft.rfft(x, axis=-1)
+    return np.fft.irfft(xf[..., np.newaxis, :] * bank, n=N, axis=-1)
+
+
+def imodwt(w, filters):
+    ''' inverse modwt. w has shape (level+1, N), or (nwindows, level+1, N) '''
+    w = np.asarray(w, dtype=float)
+    level = w.shape[-2] - 1
+    N = w.shape[-1]
+    bank = get_imodwt_filters(filters, level, N)
+    wf = np.fft.rfft(w, axis=-1)
+    return np.fft.irfft(np.sum(wf * bank, axis=-2), n=N, axis=-1)
+
+
+def modwtmra(w, filters):
+    ''' Multiresolution analysis based on MODWT. w has shape (level+1, N), or (nwindows, level+1, N) '''
+    w = np.asarray(w, dtype=float)
+    level = w.shape[-2] - 1
+    N = w.shape[-1]
+    bank = get_modwtmra_filters(filters, level, N)
+    wf = np.fft.rfft(w, axis=-1)
+    return np.fft.irfft(wf * bank, n=N, axis=-1)
+
+
 if __name__ == '__main__':
     s1 = np.arange(10)
     ws = modwt(s1, 'db2', 3)
@@ -1,6 +1,6 @@
 # utility functions to help with profiling
 
-# Usage:
+# Memory tracing (tracemalloc) usage:
 #    import profiler
 #
 #    # to start tracing call:
@@ -13,9 +13,20 @@
 #    profiler.display_stats()
 #    profiler.compare()
 #    profiler.print_trace()
+#
+# See below for stage timing (wall/CPU time and peak RSS per strategy stage)
 
+import atexit
+import os
+import sys
+import time
 import tracemalloc
 
+try:
+    import resource
+except ImportError:
+    resource = None  # not available on Windows
+
 # list to store memory snapshots
 snaps = []
 
@@ -74,4 +85,266 @@ def print_trace():
 
     print(f"\n*** Trace for largest memory block - ({largest.count} blocks, {largest.size / 1024} Kb) ***")
     for l in largest.traceback.format():
-        print(l)
\ No newline at end of file
+        print(l)
+
+# -----------------------------------
+
+# Stage timing
+#
+# Records wall time, CPU time and peak RSS for each stage of a strategy, per pair, and aggregates the wall times
+# into histograms. Disabled by default, in which case the overhead is a single check per stage.
+#
+# Usage:
+#    import utils.profiler as profiler
+#
+#    # once, e.g. in bot_start() or the first call to populate_indicators():
+#    profiler.configure(self.config, self.dp.runmode.value)
+#
+#    # time a method (pair and strategy name are taken from self.curr_pair and the class name):
+#    @profiler.timed('training')
+#    def train_models(self, ...):
+#
+#    # time a block of code (pair and strategy default to those of the enclosing stage):
+#    with profiler.stage('normalisation'):
+#        df_norm = self.dataframeUtils.norm_dataframe(dataframe)
+#
+# Enable via the freqtrade config file:
+#    "profiler": {
+#        "enabled": true,
+#        "interval": 3600,                          # seconds between summaries in live/dry-run modes
+#        "file": "user_data/logs/profiler.prom"     # optional, Prometheus text format
+#    }
+#
+# A summary is printed (and the file written) at exit, e.g. at the end of a backtest, and every 'interval' seconds
+# in live/dry-run modes. Stage times are 'self' times, i.e. time spent in nested stages is not counted twice.
+
+enabled = False
+dump_interval = 0
+dump_file = ""
+
+# upper bounds (seconds) of the histogram buckets
+hist_buckets = [0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, float('inf')]
+
+# stats, keyed by (strategy, stage, pair)
+stage_stats = {}
+
+# stack of active stages: [strategy, pair, start wall time, start cpu time, time in nested stages]
+stage_stack = []
+
+last_dump = 0.0
+exit_registered = False
+
+
+class StageStats():
+
+    def __init__(self):
+        self.count = 0
+        self.wall = 0.0
+        self.self_wall = 0.0
+        self.cpu = 0.0
+        self.max_wall = 0.0
+        self.peak_rss = 0
+        self.hist = [0] * len(hist_buckets)
+
+    def add(self, wall, self_wall, cpu, rss):
+        self.count += 1
+        self.wall += wall
+        self.self_wall += self_wall
+        self.cpu += cpu
+        self.max_wall = max(self.max_wall, wall)
+        self.peak_rss = max(self.peak_rss, rss)
+        for i, bound in enumerate(hist_buckets):
+            if wall <= bound:
+                self.hist[i] += 1
+                break
+
+    def merge(self, other):
+        self.count += other.count
+        self.wall += other.wall
+        self.self_wall += other.self_wall
+        self.cpu += other.cpu
+        self.max_wall = max(self.max_wall, other.max_wall)
+        self.peak_rss = max(self.peak_rss, other.peak_rss)
+        self.hist = [a + b for a, b in zip(self.hist, other.hist)]
+
+
+# peak resident set size of the process (bytes)
+def get_peak_rss() -> int:
+    if resource is None:
+        return 0
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == 'darwin' else rss * 1024  # bytes on macOS, KB on Linux
+
+
+def configure(config: dict, runmode: str = ""):
+    global enabled, dump_interval, dump_file, last_dump, exit_registered
+
+    settings = config.get('profiler', {}) if config else {}
+    enabled = bool(settings.get('enabled', False))
+    dump_file = settings.get('file', "")
+
+    # periodic summaries only make sense in live modes
+    if runmode in ('dry_run', 'live'):
+        dump_interval = float(settings.get('interval', 3600))
+    else:
+        dump_interval = 0
+
+    last_dump = time.time()
+
+    if enabled and not exit_registered:
+        atexit.register(dump)
+        exit_registered = True
+
+
+class stage():
+
+    def __init__(self, name: str, pair: str = None, strategy: str = None):
+        self.name = name
+        self.pair = pair
+        self.strategy = strategy
+
+    def __enter__(self):
+        if not enabled:
+            return self
+
+        # default to the pair/strategy of the enclosing stage
+        if stage_stack:
+            parent = stage_stack[-1]
+            self.strategy = parent[0] if self.strategy is None else self.strategy
+            self.pair = parent[1] if self.pair is None else self.pair
+
+        stage_stack.append([self.strategy or "", self.pair or "", time.perf_counter(), time.process_time(), 0.0])
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        if not enabled or not stage_stack:
+            return False
+
+        strategy, pair, start_wall, start_cpu, nested = stage_stack.pop()
+        wall = time.perf_counter() - start_wall
+        cpu = time.process_time() - start_cpu
+
+        key = (strategy, self.name, pair)
+        if key not in stage_stats:
+            stage_stats[key] = StageStats()
+        stage_stats[key].add(wall, wall - nested, cpu, get_peak_rss())
+
+        if stage_stack:
+            stage_stack[-1][4] += wall
+        elif (dump_interval > 0) and (time.time() - last_dump >= dump_interval):
+            dump()
+
+        return False
+
+
+# decorator for strategy methods. Uses the class name of self, and the pair from the metadata argument (for the
+# populate_* methods), or self.curr_pair
+def timed(name: str):
+    def decorator(func):
+        def wrapper(self, *args, **kwargs):
+            if not enabled:
+                return func(self, *args, **kwargs)
+
+            metadata = kwargs.get('metadata', args[1] if len(args) > 1 else None)
+            if isinstance(metadata, dict) and ('pair' in metadata):
+                pair = metadata['pair']
+            else:
+                pair = getattr(self, 'curr_pair', None)
+
+            with stage(name, pair, self.__class__.__name__):
+                return func(self, *args, **kwargs)
+
+        wrapper.__name__ = func.__name__
+        wrapper.__doc__ = func.__doc__
+        wrapper.__wrapped__ = func
+        return wrapper
+
+    return decorator
+
+
+def reset_stages():
+    stage_stats.clear()
+    stage_stack.clear()
+
+
+# stats aggregated across pairs, keyed by (strategy, stage)
+def get_stage_summary() -> dict:
+    summary = {}
+    for (strategy, name, pair), stats in stage_stats.items():
+        key = (strategy, name)
+        if key not in summary:
+            summary[key] = StageStats()
+        summary[key].merge(stats)
+    return summary
+
+
+def print_stage_summary():
+    summary = get_stage_summary()
+    if len(summary) == 0:
+        return
+
+    print("")
+    print("*** Stage timing summary ***")
+    print(f"{'Strategy':24s} {'Stage':16s} {'Calls':>7s} {'Self(s)':>10s} {'Wall(s)':>10s} {'CPU(s)':>10s} "
+          f"{'Mean(s)':>9s} {'Max(s)':>9s} {'PeakRSS(MB)':>12s}")
+
+    for (strategy, name), stats in sorted(summary.items(), key=lambda x: -x[1].self_wall):
+        print(f"{strategy[:24]:24s} {name[:16]:16s} {stats.count:7d} {stats.self_wall:10.3f} {stats.wall:10.3f} "
+              f"{stats.cpu:10.3f} {stats.wall / stats.count:9.4f} {stats.max_wall:9.4f} "
+              f"{stats.peak_rss / (1024 * 1024):12.1f}")
+    print("")
+
+
+def escape_label(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"')
+
+
+# write the per-pair stats in Prometheus text format
+def write_prometheus(file_name: str):
+    lines = [
+        "# HELP strategy_stage_seconds Wall time per strategy stage",
+        "# TYPE strategy_stage_seconds histogram",
+    ]
+    for (strategy, name, pair), stats in stage_stats.items():
+        labels = f'strategy="{escape_label(strategy)}",stage="{escape_label(name)}",pair="{escape_label(pair)}"'
+        cumulative = 0
+        for bound, count in zip(hist_buckets, stats.hist):
+            cumulative += count
+            le = "+Inf" if bound == float('inf') else f"{bound:g}"
+            lines.append(f'strategy_stage_seconds_bucket{{{labels},le="{le}"}} {cumulative}')
+        lines.append(f'strategy_stage_seconds_sum{{{labels}}} {stats.wall:.6f}')
+        lines.append(f'strategy_stage_seconds_count{{{labels}}} {stats.count}')
+
+    for metric, help_text, attr in [
+        ("strategy_stage_self_seconds_total", "Wall time per stage, excluding nested stages", 'self_wall'),
+        ("strategy_stage_cpu_seconds_total", "CPU time per stage", 'cpu'),
+        ("strategy_stage_peak_rss_bytes", "Peak RSS of the process at the end of the stage", 'peak_rss'),
+    ]:
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} {'gauge' if attr == 'peak_rss' else 'counter'}")
+        for (strategy, name, pair), stats in stage_stats.items():
+            labels = f'strategy="{escape_label(strategy)}",stage="{escape_label(name)}",pair="{escape_label(pair)}"'
+            lines.append(f"{metric}{{{labels}}} {getattr(stats, attr)}")
+
+    # write to a temp file and rename, so that scrapers never see a partial file
+    tmp_file = file_name + ".tmp"
+    with open(tmp_file, 'w') as f:
+        f.write("\n".join(lines) + "\n")
+    os.replace(tmp_file, file_name)
+
+
+# print the summary and write the stats file (if configured)
+def dump():
+    global last_dump
+
+    last_dump = time.time()
+    if not enabled:
+        return
+
+    print_stage_summary()
+
+    if dump_file:
+        try:
+            write_prometheus(dump_file)
+        except OSError as e:
+            print(f"    profiler: error writing {dump_file}: {e}")
@@ -0,0 +1,65 @@
+# test program for DataframeCache - checks that the data hash only depends on the data
+#
+# Usage: python test_dataframe_cache.py
+#
+# Exits with status 1 if any check fails
+
+import sys
+import tempfile
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(__file__).parent))
+
+from DataframeCache import DataframeCache
+
+
+# -----------------------------------
+
+def get_data(num_rows=1000, seed=42) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 100.0 * np.exp(np.cumsum(rng.normal(0.0, 0.01, num_rows)))
+    return pd.DataFrame({
+        'date': pd.date_range('2023-01-01', periods=num_rows, freq='5min', tz='UTC'),
+        'open': close * (1.0 + rng.normal(0.0, 0.001, num_rows)),
+        'high': close * 1.002,
+        'low': close * 0.998,
+        'close': close,
+        'volume': rng.uniform(100.0, 1000.0, num_rows)
+    })
+
+
+def main():
+    cache = DataframeCache(SimpleNamespace(), tempfile.mkdtemp())
+    dataframe = get_data()
+
+    changed = dataframe.copy()
+    changed.loc[changed.index[-1], 'close'] *= 1.001
+
+    shifted = dataframe.copy()
+    shifted['date'] = shifted['date'] + pd.Timedelta(minutes=5)
+
+    checks = [
+        ("same data, same hash", cache.get_data_hash(dataframe) == cache.get_data_hash(dataframe)),
+        ("copy, same hash", cache.get_data_hash(dataframe) == cache.get_data_hash(dataframe.copy())),
+        ("re-created data, same hash", cache.get_data_hash(dataframe) == cache.get_data_hash(get_data())),
+        ("extra columns ignored", cache.get_data_hash(dataframe) ==
+         cache.get_data_hash(dataframe.assign(rsi=50.0))),
+        ("changed price, different hash", cache.get_data_hash(dataframe) != cache.get_data_hash(changed)),
+        ("changed dates, different hash", cache.get_data_hash(dataframe) != cache.get_data_hash(shifted))
+    ]
+
+    failed = False
+    for name, ok in checks:
+        print(f"{name:<32} {'ok' if ok else 'FAIL'}")
+        failed = failed or (not ok)
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()